@@ -0,0 +1,325 @@
+"""
+Columnar analytics snapshot.
+
+export_snapshot() dumps denormalized fact tables from SQL Server to Parquet
+files (one dataset per fact, partitioned by year / month of the fact's date),
+streaming each query with fetchmany so only one batch is in memory, and the
+query helpers below read them back with pandas / pyarrow, so heavy
+reporting reads files instead of competing with form submissions on the
+OLTP database.
+
+Each fact is written to a temporary directory and swapped in with a rename,
+so readers always see a complete snapshot. snapshot.json records when each
+fact was exported and how many rows it has.
+
+Facts:
+- evaluations: one row per evaluation detail (score) with the evaluation,
+  criteria, employee department and evaluation type,
+- enrollments: one row per training enrollment with its session and course,
+- candidate_logs: one row per candidate log entry with the candidate and job,
+- headcount_events: one row per hire / leave (USERINFO + EmployeeArchive).
+"""
+import decimal
+import json
+import os
+import shutil
+import time
+from datetime import date, datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+SNAPSHOT_DIR = os.environ.get(
+    'ANALYTICS_SNAPSHOT_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'analytics_snapshot'))
+
+INFO_FILE = 'snapshot.json'
+
+FACTS = {
+    'evaluations': {
+        'date_column': 'EvaluationDate',
+        'sql': """
+            SELECT E.EvaluationID, E.EvaluationDate, E.EvaluationTypeID, ET.DisplayName AS EvaluationType,
+                   E.CycleID, E.EmployeeUserID, E.EvaluatorUserID, U.DEFAULTDEPTID AS DeptID, D.DEPTNAME AS DeptName,
+                   U.employee_class AS EmployeeClass, E.OverallScore, E.OverallRating, E.RecommendationID,
+                   ED.CriteriaID, EC.CriteriaName, EC.CriteriaWeight, EC.MaxScore, ED.ScoreGiven
+            FROM [Zktime_Copy].[dbo].[Evaluations] E
+            JOIN [Zktime_Copy].[dbo].[EvaluationDetails] ED ON ED.EvaluationID = E.EvaluationID
+            JOIN [Zktime_Copy].[dbo].[EvaluationCriteria] EC ON EC.CriteriaID = ED.CriteriaID
+            LEFT JOIN [Zktime_Copy].[dbo].[USERINFO] U ON U.USERID = E.EmployeeUserID
+            LEFT JOIN [Zktime_Copy].[dbo].[DEPARTMENTS] D ON D.DEPTID = U.DEFAULTDEPTID
+            LEFT JOIN [Zktime_Copy].[dbo].[EvaluationTypes] ET ON ET.EvaluationTypeID = E.EvaluationTypeID
+        """
+    },
+    'enrollments': {
+        'date_column': 'SessionDate',
+        'sql': """
+            SELECT TE.EnrollmentID, TE.EmployeeUserID, TE.EnrollmentDate, TE.PassStatus, TE.Grade, TE.AttendanceStatus,
+                   TS.SessionID, TS.SessionDate, TS.IsExternal, TS.InstructorID,
+                   TC.TrainingCourseID AS CourseID, TC.TrainingCourseText AS CourseName, TC.DurationHours,
+                   U.DEFAULTDEPTID AS DeptID, D.DEPTNAME AS DeptName
+            FROM [Zktime_Copy].[dbo].[TrainingEnrollments] TE
+            JOIN [Zktime_Copy].[dbo].[TrainingSessions] TS ON TS.SessionID = TE.SessionID
+            LEFT JOIN [Zktime_Copy].[dbo].[TrainingCourses] TC ON TC.TrainingCourseID = TS.CourseID
+            LEFT JOIN [Zktime_Copy].[dbo].[USERINFO] U ON U.USERID = TE.EmployeeUserID
+            LEFT JOIN [Zktime_Copy].[dbo].[DEPARTMENTS] D ON D.DEPTID = U.DEFAULTDEPTID
+        """
+    },
+    'candidate_logs': {
+        'date_column': 'ActionDate',
+        'sql': """
+            SELECT L.LogID, L.CandidateID, L.FromStage, L.ToStage, L.EvaluationScore, L.ActionDate,
+                   C.Status AS CurrentStatus, C.Source, C.ApplicationDate, C.HireDate,
+                   J.JobID, J.JobTitle, J.DepartmentID AS DeptID, D.DEPTNAME AS DeptName
+            FROM CandidateLogs L
+            JOIN Candidates C ON C.CandidateID = L.CandidateID
+            LEFT JOIN Jobs J ON J.JobID = C.JobID
+            LEFT JOIN DEPARTMENTS D ON D.DEPTID = J.DepartmentID
+        """
+    },
+    'headcount_events': {
+        'date_column': 'EventDate',
+        'sql': """
+            SELECT 'Hire' AS EventType, U.USERID AS EmployeeID, U.HIREDDAY AS EventDate,
+                   U.DEFAULTDEPTID AS DeptID, D.DEPTNAME AS DeptName, U.PositionID, P.PositionName,
+                   CAST(NULL AS INT) AS ArchiveReasonID
+            FROM [Zktime_Copy].[dbo].[USERINFO] U
+            LEFT JOIN [Zktime_Copy].[dbo].[DEPARTMENTS] D ON D.DEPTID = U.DEFAULTDEPTID
+            LEFT JOIN [Zktime_Copy].[dbo].[POSITIONS] P ON P.PositionID = U.PositionID
+            WHERE U.HIREDDAY IS NOT NULL AND U.DEFAULTDEPTID <> -1
+            UNION ALL
+            -- Archived employees whose USERINFO row is gone still count as hires
+            SELECT 'Hire', A.UserID, A.HiredDay, A.ArchivedDeptID, D.DEPTNAME, A.ArchivedPosID, P.PositionName, NULL
+            FROM [Zktime_Copy].[dbo].[EmployeeArchive] A
+            LEFT JOIN [Zktime_Copy].[dbo].[DEPARTMENTS] D ON D.DEPTID = A.ArchivedDeptID
+            LEFT JOIN [Zktime_Copy].[dbo].[POSITIONS] P ON P.PositionID = A.ArchivedPosID
+            WHERE A.HiredDay IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM [Zktime_Copy].[dbo].[USERINFO] U WHERE U.USERID = A.UserID)
+            UNION ALL
+            SELECT 'Leave', A.UserID, A.EndDay, A.ArchivedDeptID, D.DEPTNAME, A.ArchivedPosID, P.PositionName, A.ArchiveReasonID
+            FROM [Zktime_Copy].[dbo].[EmployeeArchive] A
+            LEFT JOIN [Zktime_Copy].[dbo].[DEPARTMENTS] D ON D.DEPTID = A.ArchivedDeptID
+            LEFT JOIN [Zktime_Copy].[dbo].[POSITIONS] P ON P.PositionID = A.ArchivedPosID
+            WHERE A.EndDay IS NOT NULL
+        """
+    }
+}
+
+
+# --- Export ---
+
+# Rows fetched from SQL Server per round trip; each batch becomes one Parquet row group per month it covers
+FETCH_ROWS = 50000
+
+# pyodbc reports each column's Python type in cursor.description; DECIMAL / NUMERIC
+# (OverallScore, Grade, CriteriaWeight, ...) are stored as float64, which pandas reads natively
+ARROW_TYPES = {
+    int: pa.int64(),
+    float: pa.float64(),
+    decimal.Decimal: pa.float64(),
+    bool: pa.bool_(),
+    str: pa.string(),
+    datetime: pa.timestamp('us'),
+    date: pa.timestamp('us'),
+    bytes: pa.binary(),
+}
+
+
+def fact_schema(description, date_column):
+    """ Arrow schema for a fact's result set; the date column is always a timestamp. """
+    fields = []
+    for col in description:
+        arrow_type = pa.timestamp('us') if col[0] == date_column else ARROW_TYPES.get(col[1], pa.string())
+        fields.append(pa.field(col[0], arrow_type))
+    return pa.schema(fields)
+
+
+def fetch_fact(cursor, name, fetch_rows=FETCH_ROWS):
+    """
+    Runs the fact's query ordered by its date column and yields
+    (schema, DataFrame) batches of at most fetch_rows rows.
+    """
+    fact = FACTS[name]
+    cursor.execute(f"SELECT * FROM ({fact['sql']}) F ORDER BY F.{fact['date_column']}")
+    columns = [col[0] for col in cursor.description]
+    schema = fact_schema(cursor.description, fact['date_column'])
+    decimal_columns = [col[0] for col in cursor.description if col[1] is decimal.Decimal]
+    while True:
+        rows = cursor.fetchmany(fetch_rows)
+        if not rows:
+            break
+        frame = pd.DataFrame.from_records([tuple(r) for r in rows], columns=columns)
+        for col in decimal_columns:
+            frame[col] = pd.to_numeric(frame[col], errors='coerce').astype('float64')
+        yield schema, frame
+
+
+def write_fact(batches, name, root=SNAPSHOT_DIR):
+    """
+    Writes one fact as a year / month partitioned dataset, replacing the
+    previous one atomically. batches are (schema, DataFrame) pairs sorted by
+    the date column (fetch_fact), so each month's file is written once, a row
+    group per batch, and only one file is open at a time. Returns the row count.
+    """
+    date_column = FACTS[name]['date_column']
+    target = os.path.join(root, name)
+    staging = target + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    rows = 0
+    partition, writer = None, None
+    files = {}
+    try:
+        for schema, frame in batches:
+            dates = pd.to_datetime(frame[date_column], errors='coerce')
+            frame[date_column] = dates
+            # Undated rows land in year 0 / month 0 rather than being dropped
+            keys = pd.DataFrame({'year': dates.dt.year.fillna(0).astype('int32'),
+                                 'month': dates.dt.month.fillna(0).astype('int32')})
+            for (year, month), index in keys.groupby(['year', 'month'], sort=False).groups.items():
+                if (year, month) != partition:
+                    if writer is not None:
+                        writer.close()
+                    partition = (year, month)
+                    directory = os.path.join(staging, f'year={year}', f'month={month}')
+                    os.makedirs(directory, exist_ok=True)
+                    # Dates pandas can't hold (NaT, year 0) may come back after other months; never reuse a file
+                    files[partition] = files.get(partition, -1) + 1
+                    writer = pq.ParquetWriter(os.path.join(directory, f'part-{files[partition]}.parquet'), schema,
+                                              compression='zstd')
+                writer.write_table(pa.Table.from_pandas(frame.loc[index], schema=schema, preserve_index=False))
+            rows += len(frame)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    previous = target + '.old'
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.isdir(target):
+        os.rename(target, previous)
+    os.rename(staging, target)
+    shutil.rmtree(previous, ignore_errors=True)
+    return rows
+
+
+def export_snapshot(conn, root=SNAPSHOT_DIR, facts=None, log=print):
+    """ Exports the given facts (default: all). Returns snapshot info {fact: {rows, seconds, exported_at}}. """
+    os.makedirs(root, exist_ok=True)
+    info = snapshot_info(root)
+    cursor = conn.cursor()
+    for name in facts or FACTS:
+        started = time.perf_counter()
+        rows = write_fact(fetch_fact(cursor, name), name, root)
+        info[name] = {
+            'rows': rows,
+            'seconds': round(time.perf_counter() - started, 2),
+            'exported_at': datetime.now().isoformat(timespec='seconds')
+        }
+        log(f"  {name}: {rows} rows in {info[name]['seconds']}s")
+
+    with open(os.path.join(root, INFO_FILE), 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=1)
+    return info
+
+
+# --- Query layer ---
+
+def snapshot_info(root=SNAPSHOT_DIR):
+    path = os.path.join(root, INFO_FILE)
+    if not os.path.isfile(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def has_fact(name, root=SNAPSHOT_DIR):
+    return os.path.isdir(os.path.join(root, name))
+
+
+def snapshot_age_seconds(name, root=SNAPSHOT_DIR):
+    """ Seconds since the fact was exported, or None if it never was. """
+    exported_at = snapshot_info(root).get(name, {}).get('exported_at')
+    if not exported_at:
+        return None
+    return (datetime.now() - datetime.fromisoformat(exported_at)).total_seconds()
+
+
+def load_fact(name, columns=None, start=None, end=None, filters=None, root=SNAPSHOT_DIR):
+    """
+    Reads a fact into a DataFrame. start / end (dates, inclusive) prune whole
+    year / month partitions before reading and are then applied exactly on the
+    date column. filters: extra pyarrow filters, e.g. [('DeptID', '=', 5)].
+    """
+    date_column = FACTS[name]['date_column']
+    path = os.path.join(root, name)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"Analytics snapshot '{name}' has not been exported yet")
+
+    partition_filters = list(filters or [])
+    if start is not None:
+        start = pd.Timestamp(start)
+        partition_filters.append(('year', '>=', start.year))
+    if end is not None:
+        end = pd.Timestamp(end)
+        partition_filters.append(('year', '<=', end.year))
+
+    read_columns = None
+    if columns is not None:
+        read_columns = list(dict.fromkeys(list(columns) + ([date_column] if start is not None or end is not None else [])))
+
+    frame = pd.read_parquet(path, engine='pyarrow', columns=read_columns, filters=partition_filters or None)
+    for col in ('year', 'month'):
+        if col in frame.columns and (columns is None or col not in columns):
+            frame = frame.drop(columns=col)
+
+    if start is not None:
+        frame = frame[frame[date_column] >= start]
+    if end is not None:
+        frame = frame[frame[date_column] < end + pd.Timedelta(days=1)]
+    return frame.reset_index(drop=True)
+
+
+def evaluation_scores_by_month(start=None, end=None, root=SNAPSHOT_DIR):
+    """ Average overall score and evaluation count per month and department. """
+    frame = load_fact('evaluations', ['EvaluationID', 'EvaluationDate', 'DeptName', 'OverallScore'], start, end, root=root)
+    frame = frame.drop_duplicates('EvaluationID')
+    frame['Month'] = frame['EvaluationDate'].dt.strftime('%Y-%m')
+    return (frame.groupby(['Month', 'DeptName'], dropna=False)
+            .agg(Evaluations=('EvaluationID', 'count'), AvgScore=('OverallScore', 'mean'))
+            .reset_index())
+
+
+def criteria_averages(start=None, end=None, dept_id=None, root=SNAPSHOT_DIR):
+    """ Average score as a percentage of the criterion's max, per criterion. """
+    filters = [('DeptID', '=', dept_id)] if dept_id is not None else None
+    frame = load_fact('evaluations', ['CriteriaID', 'CriteriaName', 'ScoreGiven', 'MaxScore'], start, end, filters, root=root)
+    frame['Percent'] = frame['ScoreGiven'] * 100.0 / frame['MaxScore'].where(frame['MaxScore'] > 0)
+    return frame.groupby(['CriteriaID', 'CriteriaName']).agg(Scores=('Percent', 'count'), AvgPercent=('Percent', 'mean')).reset_index()
+
+
+def training_by_course(start=None, end=None, root=SNAPSHOT_DIR):
+    """ Enrollments, passes and training hours per course. """
+    frame = load_fact('enrollments', ['CourseName', 'EnrollmentID', 'PassStatus', 'DurationHours'], start, end, root=root)
+    frame['Passed'] = frame['PassStatus'].astype('string').str.lower().isin(['pass', 'passed', 'ناجح'])
+    return (frame.groupby('CourseName', dropna=False)
+            .agg(Enrollments=('EnrollmentID', 'count'), Passed=('Passed', 'sum'), Hours=('DurationHours', 'sum'))
+            .reset_index())
+
+
+def candidate_transitions_by_month(start=None, end=None, root=SNAPSHOT_DIR):
+    """ Count of candidates entering each stage per month. """
+    frame = load_fact('candidate_logs', ['ActionDate', 'ToStage', 'CandidateID'], start, end, root=root)
+    frame = frame[frame['ToStage'].notna()]
+    frame['Month'] = frame['ActionDate'].dt.strftime('%Y-%m')
+    return frame.groupby(['Month', 'ToStage'])['CandidateID'].nunique().rename('Candidates').reset_index()
+
+
+def headcount_events_by_month(start=None, end=None, dept_id=None, root=SNAPSHOT_DIR):
+    """ Hires and leaves per month (columns Hire / Leave). """
+    filters = [('DeptID', '=', dept_id)] if dept_id is not None else None
+    frame = load_fact('headcount_events', ['EventType', 'EventDate'], start, end, filters, root=root)
+    frame['Month'] = frame['EventDate'].dt.strftime('%Y-%m')
+    table = frame.pivot_table(index='Month', columns='EventType', aggfunc='size', fill_value=0)
+    return table.reindex(columns=['Hire', 'Leave'], fill_value=0).reset_index()
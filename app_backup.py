@@ -0,0 +1,436 @@
+"""
+Incremental, resumable backup / restore of the tables the app owns.
+
+A backup is a directory under the backup root named by its start time, with
+one Parquet file (zstd) per chunk of CHUNK_ROWS rows per table and a
+manifest.json listing every file with its row count and SHA-256. The manifest
+is rewritten after each chunk, so an interrupted backup resumes from the last
+written chunk.
+
+How a table is read depends on what it has (checked at run time):
+
+- change tracking enabled (see enable_backup_change_tracking.py) and a single
+  int primary key: incremental backups read CHANGETABLE(CHANGES ...) since the
+  version recorded by the previous backup, including deletes ('changes'),
+- a single int primary key and listed in APPEND_ONLY_TABLES (rows are only
+  ever inserted): incremental backups read rows with a key above the previous
+  backup's highest key ('append'),
+- anything else: every backup copies the whole table ('snapshot'). A key
+  watermark would miss updates and deletes, so an untracked table that is
+  edited in place is never treated as append-only.
+
+USERINFO is reloaded from the attendance database (userinfo_sync.py), so only
+the columns the app itself writes (COLUMN_EXTRACTS: class, IsActive and the
+'_A' badge of archived employees) are copied, keyed by USERID. A restore
+writes them back onto the rows that exist and never deletes or inserts there.
+
+The first backup (or --full) is a full one. Restore replays the latest full
+backup and the incrementals after it, in BACKUP_TABLES order, with
+fast_executemany inserts, after verifying every checksum.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Parents before children, so a restore can re-enable the foreign keys at the end
+BACKUP_TABLES = [
+    'Roles', 'Users', 'EmployeeClasses',
+    'EvaluationTypes', 'EvaluationCriteria', 'Recommendations', 'EvaluationCycles', 'CycleDepartments',
+    'Evaluations', 'EvaluationDetails',
+    'TrainingCourses', 'TrainingSessions', 'TrainingSessionDays', 'TrainingEnrollments', 'TrainingAttendance',
+    'Jobs', 'Candidates', 'CandidateLogs',
+    'TerminationTypes', 'TerminationReasons', 'EmployeeArchive', 'USERINFO',
+    'AppLogs'
+]
+
+# Tables owned by another system: only these app-written columns are backed up, keyed by the first
+COLUMN_EXTRACTS = {
+    'USERINFO': ['USERID', 'BADGENUMBER', 'IsActive', 'employee_class'],
+}
+
+# Insert-only tables; the only ones backed up incrementally without change tracking
+APPEND_ONLY_TABLES = {'AppLogs', 'CandidateLogs'}
+
+CHUNK_ROWS = 50000
+
+MANIFEST_FILE = 'manifest.json'
+OP_COLUMN = '__op'    # I / U / D on change-tracking chunks
+KEY_COLUMN = '__key'  # primary key of the changed row (the row itself is NULL for deletes)
+
+STRATEGY_CHANGES = 'changes'
+STRATEGY_APPEND = 'append'
+STRATEGY_SNAPSHOT = 'snapshot'
+
+INT_TYPES = ('int', 'bigint', 'smallint', 'tinyint')
+
+
+def table_info(cursor, table):
+    """ Columns, single int primary key, identity flag and change tracking state of dbo.<table>, or None. """
+    object_name = f'dbo.{table}'
+    cursor.execute("""
+        SELECT c.name, c.is_identity, c.is_computed, t.name AS type_name
+        FROM sys.columns c
+        JOIN sys.types t ON c.user_type_id = t.user_type_id
+        WHERE c.object_id = OBJECT_ID(?)
+        ORDER BY c.column_id
+    """, (object_name,))
+    columns = cursor.fetchall()
+    if not columns:
+        return None
+
+    cursor.execute("""
+        SELECT COL_NAME(ic.object_id, ic.column_id) AS name
+        FROM sys.indexes i
+        JOIN sys.index_columns ic ON i.object_id = ic.object_id AND i.index_id = ic.index_id
+        WHERE i.object_id = OBJECT_ID(?) AND i.is_primary_key = 1
+    """, (object_name,))
+    pk = [r.name for r in cursor.fetchall()]
+    types = {c.name: c.type_name for c in columns}
+    key = pk[0] if len(pk) == 1 and types.get(pk[0]) in INT_TYPES else None
+
+    cursor.execute("SELECT 1 FROM sys.change_tracking_tables WHERE object_id = OBJECT_ID(?)", (object_name,))
+    tracked = cursor.fetchone() is not None
+
+    if tracked and key:
+        strategy = STRATEGY_CHANGES
+    elif key and table in APPEND_ONLY_TABLES:
+        strategy = STRATEGY_APPEND
+    else:
+        strategy = STRATEGY_SNAPSHOT
+
+    return {
+        # rowversion columns can't be inserted and computed columns are derived
+        'columns': [c.name for c in columns if not c.is_computed and c.type_name != 'timestamp'],
+        'key': key,
+        'identity': any(c.is_identity for c in columns),
+        'strategy': strategy
+    }
+
+
+def backup_info(cursor, table):
+    """ table_info(), or the fixed key + columns of a COLUMN_EXTRACTS table (always a full copy). """
+    if table in COLUMN_EXTRACTS:
+        columns = COLUMN_EXTRACTS[table]
+        return {'columns': columns, 'key': columns[0], 'identity': False, 'strategy': STRATEGY_SNAPSHOT, 'extract': True}
+    return table_info(cursor, table)
+
+
+# --- Manifests ---
+
+def list_backups(root):
+    """ Manifests of every backup under root, oldest first. """
+    manifests = []
+    if not os.path.isdir(root):
+        return manifests
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name, MANIFEST_FILE)
+        if os.path.isfile(path):
+            with open(path, encoding='utf-8') as f:
+                manifests.append(json.load(f))
+    return manifests
+
+
+def save_manifest(root, manifest):
+    """ Atomic rewrite (write + rename) so a crash never leaves a half-written manifest. """
+    path = os.path.join(root, manifest['id'], MANIFEST_FILE)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, default=str)
+    os.replace(tmp, path)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_chunk(path, columns, rows):
+    """ Rows (pyodbc rows / tuples) -> one zstd Parquet file. Types are inferred per column from the values. """
+    arrays = {col: pa.array([row[i] for row in rows]) for i, col in enumerate(columns)}
+    pq.write_table(pa.table(arrays), path, compression='zstd')
+    return file_sha256(path)
+
+
+def read_chunk(path):
+    """ (columns, list of row tuples) with plain Python values. """
+    table = pq.read_table(path)
+    columns = table.column_names
+    data = [table.column(col).to_pylist() for col in columns]
+    return columns, list(zip(*data))
+
+
+# --- Backup ---
+
+def _previous_entries(manifests):
+    """ Per table, the entry of the most recent complete backup that has it. """
+    entries = {}
+    for manifest in manifests:
+        if manifest.get('complete'):
+            entries.update(manifest['tables'])
+    return entries
+
+
+def _read_sql(info, table, mode, last_key):
+    cols = ', '.join(f'T.[{c}]' for c in info['columns'])
+    key = info['key']
+    if mode == STRATEGY_CHANGES:
+        after = "AND CT.[{0}] > ?".format(key) if last_key is not None else ""
+        return f"""
+            SELECT TOP (?) CT.SYS_CHANGE_OPERATION AS [{OP_COLUMN}], CT.[{key}] AS [{KEY_COLUMN}], {cols}
+            FROM CHANGETABLE(CHANGES [dbo].[{table}], ?) CT
+            LEFT JOIN [dbo].[{table}] T ON T.[{key}] = CT.[{key}]
+            WHERE 1 = 1 {after}
+            ORDER BY CT.[{key}]
+        """
+    if key:
+        after = f"WHERE T.[{key}] > ?" if last_key is not None else ""
+        return f"SELECT TOP (?) {cols} FROM [dbo].[{table}] T {after} ORDER BY T.[{key}]"
+    return f"SELECT {cols} FROM [dbo].[{table}] T"
+
+
+def backup_table(cursor, root, manifest, table, previous, chunk_rows=CHUNK_ROWS, log=print):
+    info = backup_info(cursor, table)
+    if info is None:
+        log(f"  {table}: not found, skipped")
+        return
+
+    entry = manifest['tables'].get(table)
+    if entry is None or entry.get('columns') != info['columns']:
+        # Decide once per backup; a resumed run keeps the decision and the start watermark
+        mode = 'full'
+        if manifest['kind'] == 'incremental' and previous and previous.get('columns') == info['columns']:
+            if info['strategy'] == STRATEGY_CHANGES and previous.get('ct_version') is not None:
+                cursor.execute("SELECT CHANGE_TRACKING_MIN_VALID_VERSION(OBJECT_ID(?)) AS v", (f'dbo.{table}',))
+                min_valid = cursor.fetchone().v
+                if min_valid is not None and min_valid <= previous['ct_version']:
+                    mode = STRATEGY_CHANGES
+            elif info['strategy'] == STRATEGY_APPEND and previous.get('max_key') is not None:
+                mode = STRATEGY_APPEND
+
+        ct_version = None
+        if info['strategy'] == STRATEGY_CHANGES:
+            cursor.execute("SELECT CHANGE_TRACKING_CURRENT_VERSION() AS v")
+            ct_version = cursor.fetchone().v
+
+        entry = manifest['tables'][table] = {
+            'strategy': info['strategy'], 'mode': mode, 'key': info['key'], 'columns': info['columns'],
+            'since_version': previous.get('ct_version') if mode == STRATEGY_CHANGES else None,
+            'ct_version': ct_version,
+            'max_key': previous.get('max_key') if mode == STRATEGY_APPEND else None,
+            'files': [], 'rows': 0, 'done': False
+        }
+    elif entry['files'] and not info['key']:
+        entry['files'], entry['rows'] = [], 0  # snapshot tables can't resume mid-table
+
+    table_dir = os.path.join(root, manifest['id'], table)
+    os.makedirs(table_dir, exist_ok=True)
+
+    mode = entry['mode']
+    columns = ([OP_COLUMN, KEY_COLUMN] if mode == STRATEGY_CHANGES else []) + info['columns']
+    key_index = columns.index(KEY_COLUMN if mode == STRATEGY_CHANGES else info['key']) if info['key'] else None
+
+    def write(rows):
+        name = f"{len(entry['files']):05d}.parquet"
+        sha = write_chunk(os.path.join(table_dir, name), columns, rows)
+        entry['files'].append({'file': f"{table}/{name}", 'rows': len(rows), 'sha256': sha,
+                               'last_key': rows[-1][key_index] if key_index is not None else None})
+        entry['rows'] += len(rows)
+        save_manifest(root, manifest)
+
+    if info['key']:
+        # Keyset pagination; resumes after the last written chunk
+        last_key = entry['files'][-1]['last_key'] if entry['files'] else (entry['max_key'] if mode == STRATEGY_APPEND else None)
+        while True:
+            params = [chunk_rows] + ([entry['since_version']] if mode == STRATEGY_CHANGES else [])
+            params += [last_key] if last_key is not None else []
+            cursor.execute(_read_sql(info, table, mode, last_key), params)
+            rows = cursor.fetchall()
+            if rows:
+                write(rows)
+                last_key = rows[-1][key_index]
+            if len(rows) < chunk_rows:
+                break
+        if mode != STRATEGY_CHANGES:
+            entry['max_key'] = last_key
+    else:
+        cursor.execute(_read_sql(info, table, mode, None))
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            write(rows)
+
+    entry['done'] = True
+    save_manifest(root, manifest)
+    log(f"  {table}: {entry['rows']} rows ({mode}, {len(entry['files'])} file(s))")
+
+
+def run_backup(conn, root, full=False, resume=True, tables=None, chunk_rows=CHUNK_ROWS, log=print):
+    """ Takes (or resumes) a backup. Returns its manifest. """
+    os.makedirs(root, exist_ok=True)
+    manifests = list_backups(root)
+    cursor = conn.cursor()
+
+    if resume and manifests and not manifests[-1].get('complete'):
+        manifest = manifests[-1]
+        manifests = manifests[:-1]
+        log(f"Resuming backup {manifest['id']}")
+    else:
+        has_full = any(m.get('complete') and m['kind'] == 'full' for m in manifests)
+        manifest = {
+            'id': datetime.now().strftime('%Y%m%dT%H%M%S'),
+            'kind': 'incremental' if has_full and not full else 'full',
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'complete': False,
+            'tables': {}
+        }
+        os.makedirs(os.path.join(root, manifest['id']), exist_ok=True)
+        save_manifest(root, manifest)
+        log(f"Starting {manifest['kind']} backup {manifest['id']}")
+
+    previous = _previous_entries(manifests)
+    for table in tables or BACKUP_TABLES:
+        if manifest['tables'].get(table, {}).get('done'):
+            continue
+        backup_table(cursor, root, manifest, table, previous.get(table), chunk_rows, log)
+
+    manifest['complete'] = True
+    manifest['completed_at'] = datetime.now().isoformat(timespec='seconds')
+    save_manifest(root, manifest)
+    return manifest
+
+
+# --- Verify / restore ---
+
+def verify_backup(root, manifest):
+    """ List of problems (missing files / checksum mismatches) in one backup. """
+    problems = []
+    for table, entry in manifest['tables'].items():
+        for f in entry['files']:
+            path = os.path.join(root, manifest['id'], f['file'])
+            if not os.path.isfile(path):
+                problems.append(f"{manifest['id']}/{f['file']}: missing")
+            elif file_sha256(path) != f['sha256']:
+                problems.append(f"{manifest['id']}/{f['file']}: checksum mismatch")
+    return problems
+
+
+def restore_chain(root, upto=None):
+    """ The latest complete full backup (at or before upto) followed by the complete incrementals after it. """
+    manifests = [m for m in list_backups(root) if m.get('complete') and (upto is None or m['id'] <= upto)]
+    fulls = [i for i, m in enumerate(manifests) if m['kind'] == 'full']
+    if not fulls:
+        raise ValueError('No complete full backup found')
+    return manifests[fulls[-1]:]
+
+
+def _insert_rows(cursor, table, columns, rows, identity):
+    if not rows:
+        return
+    col_sql = ', '.join(f'[{c}]' for c in columns)
+    sql = f"INSERT INTO [dbo].[{table}] ({col_sql}) VALUES ({', '.join('?' for _ in columns)})"
+    if identity:
+        cursor.execute(f"SET IDENTITY_INSERT [dbo].[{table}] ON")
+    cursor.fast_executemany = True
+    cursor.executemany(sql, rows)
+    cursor.fast_executemany = False
+    if identity:
+        cursor.execute(f"SET IDENTITY_INSERT [dbo].[{table}] OFF")
+
+
+def _update_rows(cursor, table, key, columns, rows):
+    """ Writes the backed-up columns onto the existing rows with the same key; the other columns are kept. """
+    if not rows:
+        return
+    values = [i for i, c in enumerate(columns) if c != key]
+    key_i = columns.index(key)
+    sql = f"UPDATE [dbo].[{table}] SET {', '.join(f'[{columns[i]}] = ?' for i in values)} WHERE [{key}] = ?"
+    cursor.fast_executemany = True
+    cursor.executemany(sql, [tuple(r[i] for i in values) + (r[key_i],) for r in rows])
+    cursor.fast_executemany = False
+
+
+def _delete_keys(cursor, table, key, keys):
+    if not keys:
+        return
+    cursor.execute("IF OBJECT_ID('tempdb..#RestoreKeys') IS NOT NULL DROP TABLE #RestoreKeys; CREATE TABLE #RestoreKeys (K BIGINT PRIMARY KEY)")
+    cursor.fast_executemany = True
+    cursor.executemany("INSERT INTO #RestoreKeys (K) VALUES (?)", [(k,) for k in sorted(set(keys))])
+    cursor.fast_executemany = False
+    cursor.execute(f"DELETE T FROM [dbo].[{table}] T JOIN #RestoreKeys R ON T.[{key}] = R.K")
+
+
+def restore_table(cursor, root, manifest, table, entry, target, log=print):
+    # Only the columns both sides have (a column added since the backup keeps its default)
+    for f in entry['files']:
+        file_columns, rows = read_chunk(os.path.join(root, manifest['id'], f['file']))
+        if OP_COLUMN in file_columns:
+            op_i, key_i = file_columns.index(OP_COLUMN), file_columns.index(KEY_COLUMN)
+            _delete_keys(cursor, table, entry['key'], [r[key_i] for r in rows])
+            rows = [r for r in rows if r[op_i] != 'D']
+
+        keep = [i for i, c in enumerate(file_columns) if c in target['columns']]
+        columns = [file_columns[i] for i in keep]
+        rows = [tuple(r[i] for i in keep) for r in rows]
+
+        if target.get('extract'):
+            _update_rows(cursor, table, entry['key'], columns, rows)
+            continue
+        if entry['mode'] == STRATEGY_APPEND and entry['key']:
+            # A resumed or repeated restore may already have these keys
+            _delete_keys(cursor, table, entry['key'], [r[columns.index(entry['key'])] for r in rows])
+        _insert_rows(cursor, table, columns, rows, target['identity'])
+    log(f"  {table}: {entry['rows']} rows from {manifest['id']} ({entry['mode']})")
+
+
+def run_restore(conn, root, upto=None, replace=False, tables=None, log=print):
+    """
+    Restores the chain into the connection's database. Tables that already
+    have rows are only overwritten with replace=True (COLUMN_EXTRACTS tables
+    are always updated in place). Each table is committed on its own; foreign
+    keys are disabled meanwhile and re-checked at the end.
+    """
+    chain = restore_chain(root, upto)
+    problems = [p for m in chain for p in verify_backup(root, m)]
+    if problems:
+        raise ValueError('Backup verification failed:\n' + '\n'.join(problems))
+
+    cursor = conn.cursor()
+    plan = []
+    for table in tables or BACKUP_TABLES:
+        target = backup_info(cursor, table)
+        entries = [(m, m['tables'][table]) for m in chain if table in m['tables']]
+        if target is None or not entries:
+            continue
+        if target.get('extract'):
+            plan.append((table, target, entries))
+            continue
+        cursor.execute(f"SELECT COUNT(*) AS n FROM [dbo].[{table}]")
+        if cursor.fetchone().n and not replace:
+            raise ValueError(f"{table} is not empty in the target database (use --replace)")
+        plan.append((table, target, entries))
+
+    # Constraints off on every restored table first, so deleting a parent doesn't trip a child's foreign key
+    checked = [table for table, target, _ in plan if not target.get('extract')]
+    for table in checked:
+        cursor.execute(f"ALTER TABLE [dbo].[{table}] NOCHECK CONSTRAINT ALL")
+    conn.commit()
+
+    for table, target, entries in plan:
+        for manifest, entry in entries:
+            if entry['mode'] == 'full' and not target.get('extract'):
+                cursor.execute(f"DELETE FROM [dbo].[{table}]")
+            restore_table(cursor, root, manifest, table, entry, target, log)
+        conn.commit()
+
+    for table in checked:
+        cursor.execute(f"ALTER TABLE [dbo].[{table}] WITH CHECK CHECK CONSTRAINT ALL")
+    conn.commit()
+    return [table for table, _, _ in plan]
@@ -0,0 +1,123 @@
+"""
+Prometheus metrics, served at /metrics.
+
+init_metrics(app) counts every request per endpoint (the Flask endpoint name,
+e.g. dashboard.dashboard, so URL parameters don't multiply the series):
+
+- http_requests_total{endpoint, method, status}
+- http_request_errors_total{endpoint}: 5xx responses
+- http_request_duration_seconds{endpoint}: histogram
+- http_request_db_seconds{endpoint}: histogram of the time spent in SQL
+  (from sql_instrumentation), and http_request_db_queries_total{endpoint}
+- db_connections_opened_total / db_connections_unclosed_total: connections
+  opened by requests and the ones still open when the request ended. pyodbc's
+  pool lives in the ODBC driver manager and has no counters of its own.
+- cache_lookups_total{cache, result}: hits / misses of the in-process caches
+  (record_cache_lookup)
+- wsgi_queue_depth / wsgi_active_threads: requests waiting for a waitress
+  worker thread, and busy threads (serve.py only)
+
+Under gunicorn each worker writes its values to PROMETHEUS_MULTIPROC_DIR
+(set by gunicorn.conf.py) and /metrics adds up all workers. With waitress,
+which runs one process, the counters stay in memory.
+
+/metrics answers requests with "Authorization: Bearer <METRICS_TOKEN>" and
+logged-in admins. METRICS_ALLOWED_IPS (default: none) lets listed addresses
+scrape without a token; it is not applied to requests that came through a
+proxy (X-Forwarded-For / Forwarded set), since behind a reverse proxy on the
+same host every visitor has the proxy's address.
+
+Without the prometheus_client package every function here does nothing and
+/metrics returns 404.
+"""
+import os
+
+from flask import Response, abort, request
+
+from sql_instrumentation import current_request_stats
+from web_helpers import is_admin
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+    from prometheus_client import multiprocess
+except ImportError:  # optional: metrics are off without it
+    Counter = None
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+METRICS_ALLOWED_IPS = {ip.strip() for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if ip.strip()}
+
+if Counter is not None:
+    REQUESTS = Counter('http_requests_total', 'Requests handled', ['endpoint', 'method', 'status'])
+    ERRORS = Counter('http_request_errors_total', 'Requests answered with a 5xx status', ['endpoint'])
+    LATENCY = Histogram('http_request_duration_seconds', 'Request duration', ['endpoint'], buckets=LATENCY_BUCKETS)
+    DB_TIME = Histogram('http_request_db_seconds', 'Time spent in SQL per request', ['endpoint'], buckets=LATENCY_BUCKETS)
+    DB_QUERIES = Counter('http_request_db_queries_total', 'SQL statements executed', ['endpoint'])
+    CONNECTIONS_OPENED = Counter('db_connections_opened_total', 'Database connections opened by requests')
+    CONNECTIONS_UNCLOSED = Counter('db_connections_unclosed_total', 'Connections still open when their request ended', ['endpoint'])
+    CACHE_LOOKUPS = Counter('cache_lookups_total', 'In-process cache lookups', ['cache', 'result'])
+    QUEUE_DEPTH = Gauge('wsgi_queue_depth', 'Requests waiting for a worker thread', multiprocess_mode='livesum')
+    ACTIVE_THREADS = Gauge('wsgi_active_threads', 'Worker threads handling a request', multiprocess_mode='livesum')
+
+_task_dispatcher = None
+
+
+def record_cache_lookup(cache, hit):
+    """ Called by the cached loaders (workforce, dashboard charts, ...) on every lookup. """
+    if Counter is not None:
+        CACHE_LOOKUPS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def set_task_dispatcher(dispatcher):
+    """ serve.py passes waitress' task dispatcher so /metrics can report its queue. """
+    global _task_dispatcher
+    _task_dispatcher = dispatcher
+
+
+def _record_request(response):
+    stats = current_request_stats()
+    endpoint = request.endpoint or 'unmatched'
+
+    REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+    if response.status_code >= 500:
+        ERRORS.labels(endpoint).inc()
+    if stats is not None:
+        LATENCY.labels(endpoint).observe(stats.elapsed())
+        DB_TIME.labels(endpoint).observe(stats.db_seconds)
+        DB_QUERIES.labels(endpoint).inc(len(stats.statements))
+        CONNECTIONS_OPENED.inc(stats.connections_opened)
+        if stats.connections_opened > stats.connections_closed:
+            CONNECTIONS_UNCLOSED.labels(endpoint).inc(stats.connections_opened - stats.connections_closed)
+    return response
+
+
+def _allowed():
+    if METRICS_TOKEN and request.headers.get('Authorization') == f'Bearer {METRICS_TOKEN}':
+        return True
+    if is_admin():
+        return True
+    proxied = 'X-Forwarded-For' in request.headers or 'Forwarded' in request.headers
+    return not proxied and request.remote_addr in METRICS_ALLOWED_IPS
+
+
+def metrics():
+    if not _allowed():
+        abort(403)
+    if _task_dispatcher is not None:
+        QUEUE_DEPTH.set(len(_task_dispatcher.queue))
+        ACTIVE_THREADS.set(_task_dispatcher.active_count)
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        from prometheus_client import REGISTRY as registry
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app):
+    if Counter is None:
+        return
+    app.after_request(_record_request)
+    app.add_url_rule('/metrics', 'metrics', metrics)
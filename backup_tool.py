@@ -0,0 +1,72 @@
+import argparse
+import os
+import time
+import pyodbc
+from config import CONNECTION_STRING
+from app_backup import run_backup, run_restore, list_backups, verify_backup, CHUNK_ROWS
+
+DEFAULT_BACKUP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backups')
+
+def cmd_backup(args):
+    conn = pyodbc.connect(CONNECTION_STRING)
+    started = time.perf_counter()
+    try:
+        manifest = run_backup(conn, args.dir, full=args.full, resume=not args.no_resume,
+                              tables=args.tables, chunk_rows=args.chunk_rows)
+        total = sum(t['rows'] for t in manifest['tables'].values())
+        print(f"Backup {manifest['id']} ({manifest['kind']}) complete: {total} rows in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        print(f"Error during backup (run again to resume): {e}")
+    conn.close()
+
+def cmd_restore(args):
+    conn = pyodbc.connect(args.target or CONNECTION_STRING)
+    started = time.perf_counter()
+    try:
+        restored = run_restore(conn, args.dir, upto=args.upto, replace=args.replace, tables=args.tables)
+        print(f"Restored {len(restored)} table(s) in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        conn.rollback()
+        print(f"Error during restore: {e}")
+    conn.close()
+
+def cmd_verify(args):
+    failed = False
+    for manifest in list_backups(args.dir):
+        problems = verify_backup(args.dir, manifest)
+        state = 'OK' if not problems else 'FAILED'
+        failed = failed or bool(problems)
+        print(f"{manifest['id']} {manifest['kind']:<11} {'complete' if manifest.get('complete') else 'INCOMPLETE':<10} {state}")
+        for p in problems:
+            print(f"  {p}")
+    return 1 if failed else 0
+
+def cmd_list(args):
+    for manifest in list_backups(args.dir):
+        total = sum(t['rows'] for t in manifest['tables'].values())
+        print(f"{manifest['id']} {manifest['kind']:<11} {'complete' if manifest.get('complete') else 'INCOMPLETE':<10} {total} rows")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental backup / restore of the app's tables (Parquet + checksums).")
+    parser.add_argument('--dir', default=DEFAULT_BACKUP_DIR, help="Backup root directory")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('backup', help="Take a backup (incremental after the first full one)")
+    p.add_argument('--full', action='store_true', help="Force a full backup")
+    p.add_argument('--no-resume', action='store_true', help="Start a new backup even if the last one is incomplete")
+    p.add_argument('--tables', nargs='+')
+    p.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    p.set_defaults(func=cmd_backup)
+
+    p = sub.add_parser('restore', help="Restore the latest full backup + incrementals into a database")
+    p.add_argument('--target', help="ODBC connection string of the target database (default: config.CONNECTION_STRING)")
+    p.add_argument('--upto', help="Restore the chain up to this backup id (e.g. 20250101T020000)")
+    p.add_argument('--replace', action='store_true', help="Overwrite tables that already have rows")
+    p.add_argument('--tables', nargs='+')
+    p.set_defaults(func=cmd_restore)
+
+    sub.add_parser('verify', help="Recompute every file checksum").set_defaults(func=cmd_verify)
+    sub.add_parser('list', help="List backups").set_defaults(func=cmd_list)
+
+    args = parser.parse_args()
+    raise SystemExit(args.func(args) or 0)
@@ -0,0 +1,160 @@
+"""
+Grid-style evaluation of a whole department (/evaluation/batch).
+
+A manager picks an evaluation type and an employee class; every active
+employee of that class in the manager's department shares the same criteria
+set, so the grid is one row per employee and one column per criterion.
+The form data is loaded in one batch, the submitted grid is validated in one
+pass, scores are computed as a matrix and all Evaluations/EvaluationDetails
+rows are written with a handful of statements in the caller's transaction.
+"""
+import time
+from datetime import datetime
+
+import numpy as np
+
+from evaluation_form import REFERENCE_BATCH_SQL, NO_CLASS, cached_reference, read_reference_sets
+from scoring import weighted_percentages, ratings_for_scores
+
+# 8 parameters per row keeps a multi-row INSERT under SQL Server's 2100 limit
+INSERT_CHUNK_SIZE = 250
+
+BATCH_FORM_SQL = """
+    SET NOCOUNT ON;
+    DECLARE @EvaluatorID INT = ?, @Today DATE = ?;
+    DECLARE @Dept INT;
+    SELECT @Dept = DepartmentID FROM [Zktime_Copy].[dbo].[Users] WHERE UserID = @EvaluatorID;
+
+    -- 1. Manager department
+    SELECT @Dept AS DepartmentID, (SELECT DEPTNAME FROM [dbo].[DEPARTMENTS] WHERE DEPTID = @Dept) AS DEPTNAME;
+
+    -- 2. Active employees of the department
+    SELECT UI.USERID, UI.BADGENUMBER, UI.NAME, UI.TITLE, UI.employee_class
+    FROM [Zktime_Copy].[dbo].[USERINFO] UI
+    WHERE UI.DEFAULTDEPTID = @Dept AND UI.USERID != @EvaluatorID
+      AND (UI.IsActive = 1 OR UI.IsActive IS NULL)
+    ORDER BY UI.NAME;
+
+    -- 3. Evaluation types each of them already completed
+    SELECT DISTINCT E.EmployeeUserID, E.EvaluationTypeID
+    FROM [Zktime_Copy].[dbo].[Evaluations] E
+    JOIN [Zktime_Copy].[dbo].[USERINFO] UI ON E.EmployeeUserID = UI.USERID
+    WHERE UI.DEFAULTDEPTID = @Dept;
+
+    -- 4. Open cycles
+    SELECT C.CycleID, C.EvaluationTypeID, C.StartDate, CD.DepartmentID
+    FROM [Zktime_Copy].[dbo].[EvaluationCycles] C
+    LEFT JOIN [Zktime_Copy].[dbo].[CycleDepartments] CD ON C.CycleID = CD.CycleID
+    WHERE C.IsEnabled = 1 AND @Today BETWEEN C.StartDate AND C.EndDate;
+"""
+
+
+def load_batch_form(cursor, evaluator_user_id, today=None):
+    """ Everything the batch grid needs, in one round trip. """
+    today = today or datetime.now().date()
+    reference = cached_reference()
+
+    sql = BATCH_FORM_SQL
+    if reference is None:
+        sql += REFERENCE_BATCH_SQL
+    queried_at = time.time()
+    cursor.execute(sql, (evaluator_user_id, today))
+
+    dept = cursor.fetchone()
+    employees = cursor.fetchall() if cursor.nextset() else []
+    completed = {}
+    if cursor.nextset():
+        for row in cursor.fetchall():
+            completed.setdefault(row.EmployeeUserID, set()).add(row.EvaluationTypeID)
+    active_cycles = cursor.fetchall() if cursor.nextset() else []
+
+    if reference is None:
+        reference = read_reference_sets(cursor, queried_at)
+
+    return {
+        'dept_id': dept.DepartmentID if dept else None,
+        'dept_name': dept.DEPTNAME if dept else None,
+        'employees': employees,
+        'completed': completed,
+        'active_cycles': active_cycles,
+        'reference': reference
+    }
+
+
+def employee_classes(employees):
+    """ {class string: employee count}, in first-seen order. """
+    classes = {}
+    for emp in employees:
+        cls = emp.employee_class or NO_CLASS
+        classes[cls] = classes.get(cls, 0) + 1
+    return classes
+
+
+def parse_batch_scores(form, employees, criteria):
+    """
+    Validates the submitted grid in one pass. Returns (entries, score_matrix, errors):
+    entries are the selected employees with their comments/recommendation,
+    score_matrix is (entries x criteria) ints.
+    """
+    selected = set(form.getlist('employee_ids'))
+    rows = [emp for emp in employees if str(emp.USERID) in selected]
+    if not rows:
+        return [], None, ['لم يتم اختيار أي موظف.']
+
+    raw = np.array([[(form.get(f'score_{emp.USERID}_{c.CriteriaID}') or '').strip() for c in criteria] for emp in rows], dtype=str)
+    valid = np.char.isdigit(raw)
+    values = np.where(valid, raw, '0').astype(int)
+    max_scores = np.array([int(c.MaxScore) for c in criteria])
+    bad = ~valid | (values < 0) | (values > max_scores)
+
+    errors = []
+    for r, col in zip(*np.nonzero(bad)):
+        errors.append(f"{rows[r].NAME}: الدرجة للبند '{criteria[col].CriteriaName}' يجب أن تكون بين 0 و {max_scores[col]}.")
+
+    entries = []
+    for emp in rows:
+        entries.append({
+            'employee_id': emp.USERID,
+            'name': emp.NAME,
+            'comments': (form.get(f'comments_{emp.USERID}') or '').strip(),
+            'recommendation_id': form.get(f'recommendation_{emp.USERID}') or None
+        })
+    return entries, values, errors
+
+
+def save_batch_evaluations(cursor, entries, score_matrix, criteria, evaluator_user_id, eval_type_id, cycle_id):
+    """
+    Inserts one evaluation per entry (scores already computed) and all their
+    details. The caller commits. Returns [(employee_id, evaluation_id, score, rating)].
+    """
+    overall = weighted_percentages(score_matrix, [c.MaxScore for c in criteria], [c.CriteriaWeight for c in criteria])
+    ratings = ratings_for_scores(overall)
+
+    evaluation_ids = {}
+    for start in range(0, len(entries), INSERT_CHUNK_SIZE):
+        chunk = range(start, min(start + INSERT_CHUNK_SIZE, len(entries)))
+        values_sql = ','.join(['(?, ?, ?, ?, ?, ?, ?, ?)'] * len(chunk))
+        params = []
+        for i in chunk:
+            e = entries[i]
+            params.extend([e['employee_id'], evaluator_user_id, eval_type_id, e['comments'], e['recommendation_id'],
+                           cycle_id, float(overall[i]), str(ratings[i])])
+        cursor.execute(f"""
+            INSERT INTO [Zktime_Copy].[dbo].[Evaluations]
+                (EmployeeUserID, EvaluatorUserID, EvaluationTypeID, ManagerComments, RecommendationID, CycleID, OverallScore, OverallRating)
+            OUTPUT INSERTED.EvaluationID, INSERTED.EmployeeUserID
+            VALUES {values_sql}
+        """, params)
+        for row in cursor.fetchall():
+            evaluation_ids[row.EmployeeUserID] = row.EvaluationID
+
+    details = []
+    for i, e in enumerate(entries):
+        evaluation_id = evaluation_ids[e['employee_id']]
+        details.extend((evaluation_id, c.CriteriaID, int(score_matrix[i][j])) for j, c in enumerate(criteria))
+
+    cursor.fast_executemany = True
+    cursor.executemany("INSERT INTO [Zktime_Copy].[dbo].[EvaluationDetails] (EvaluationID, CriteriaID, ScoreGiven) VALUES (?, ?, ?)", details)
+    cursor.fast_executemany = False
+
+    return [(e['employee_id'], evaluation_ids[e['employee_id']], float(overall[i]), str(ratings[i])) for i, e in enumerate(entries)]
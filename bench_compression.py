@@ -0,0 +1,68 @@
+"""
+Transferred bytes per page with and without response compression.
+
+    python bench_compression.py --path /userinfo --path /evaluation/reports --path /training/employee_report
+    python bench_compression.py --url http://hr-server:8080 --path /userinfo --cookie "session=..."
+
+Without --url the pages are rendered in-process through the test client,
+logged in as --user-id / --role-id (admin by default), against the database
+in config.py. Each page is requested with Accept-Encoding identity, gzip and
+br; the time column is the server-side time for the whole request.
+"""
+import argparse
+import time
+import urllib.request
+
+ENCODINGS = ['identity', 'gzip', 'br']
+
+
+def fetch_local(client, path, encoding):
+    started = time.perf_counter()
+    response = client.get(path, headers={'Accept-Encoding': encoding})
+    elapsed = time.perf_counter() - started
+    return response.status_code, len(response.data), response.headers.get('Content-Encoding'), elapsed
+
+
+def fetch_remote(base_url, path, encoding, cookie):
+    headers = {'Accept-Encoding': encoding}
+    if cookie:
+        headers['Cookie'] = cookie
+    started = time.perf_counter()
+    with urllib.request.urlopen(urllib.request.Request(base_url.rstrip('/') + path, headers=headers), timeout=60) as response:
+        body = response.read()  # urllib doesn't decode, so this is the on-the-wire size
+        elapsed = time.perf_counter() - started
+        return response.status, len(body), response.headers.get('Content-Encoding'), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure compressed vs uncompressed page sizes")
+    parser.add_argument('--path', action='append', required=True, help="Route to request (repeatable)")
+    parser.add_argument('--url', help="Base URL of a running server; default: in-process test client")
+    parser.add_argument('--cookie', help="Cookie header for --url (a logged-in session)")
+    parser.add_argument('--user-id', type=int, default=1, help="Session user for the in-process client")
+    parser.add_argument('--role-id', type=int, default=1, help="Session role for the in-process client")
+    args = parser.parse_args()
+
+    if args.url:
+        fetch = lambda path, encoding: fetch_remote(args.url, path, encoding, args.cookie)
+    else:
+        from app import create_app
+        client = create_app().test_client()
+        with client.session_transaction() as s:
+            s['user_id'] = args.user_id
+            s['role_id'] = args.role_id
+            s['username'] = 'bench'
+        fetch = lambda path, encoding: fetch_local(client, path, encoding)
+
+    print(f"{'Route':<32} {'encoding':<9} {'status':>6} {'bytes':>10} {'ratio':>6} {'ms':>7}")
+    for path in args.path:
+        plain = None
+        for encoding in ENCODINGS:
+            fetch(path, encoding)  # warm-up (template compile, caches)
+            status, size, served, elapsed = fetch(path, encoding)
+            plain = plain or size
+            print(f"{path:<32} {served or 'identity':<9} {status:>6} {size:>10,} {size / plain:>6.1%} {elapsed * 1000:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Startup benchmark: cold import time of the app and latency of the first
+request, each measured in a fresh interpreter.
+
+    python bench_startup.py --runs 5 --path /
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+app = create_app()
+imported = time.perf_counter()
+response = app.test_client().get(sys.argv[1])
+done = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'first_request_ms': (done - imported) * 1000,
+                  'status': response.status_code, 'modules': len(sys.modules),
+                  'pandas': 'pandas' in sys.modules, 'PIL': 'PIL' in sys.modules}))
+"""
+
+
+def probe(path):
+    output = subprocess.run([sys.executable, '-c', PROBE, path], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import and first-request latency of the app.")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--path', default='/')
+    args = parser.parse_args()
+
+    results = [probe(args.path) for _ in range(args.runs)]
+    last = results[-1]
+    print(f"cold import:    {statistics.median(r['import_ms'] for r in results):8.1f} ms (median of {args.runs})")
+    print(f"first request:  {statistics.median(r['first_request_ms'] for r in results):8.1f} ms ({args.path} -> {last['status']})")
+    print(f"modules loaded: {last['modules']} (pandas: {last['pandas']}, PIL: {last['PIL']})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Throughput benchmark: the Werkzeug dev server vs the production servers on
+the app's own routes.
+
+    DB_BACKEND=sqlite python bench_wsgi.py --server dev --server waitress --login admin:admin
+    python bench_wsgi.py --url http://hr-server:8080 --path /dashboard --cookie "session=..."
+
+With --server each server is started on --port, warmed up, measured and
+stopped in turn; with --url an already running server is measured. The
+default routes are the login page (/) and two pages behind it (/dashboard,
+/userinfo), which need --login or --cookie. Redirects are not followed and
+any status other than 2xx counts as an error, so a missing session shows up
+instead of measuring the login redirect.
+"""
+import argparse
+import os
+import urllib.parse
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SERVERS = {
+    # The same call as app.py's __main__ (debugger on, single process, threaded)
+    'dev': lambda port: [sys.executable, '-c',
+                         f"from app import create_app; create_app().run(host='127.0.0.1', port={port}, debug=True, use_reloader=False)"],
+    'waitress': lambda port: [sys.executable, 'serve.py', '--host', '127.0.0.1', '--port', str(port)],
+    'gunicorn': lambda port: [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+                              '--access-logfile', '/dev/null', 'wsgi:application'],
+}
+
+
+DEFAULT_PATHS = ['/', '/dashboard', '/userinfo']
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def fetch(url, cookie):
+    request = urllib.request.Request(url, headers={'Cookie': cookie} if cookie else {})
+    started = time.perf_counter()
+    try:
+        with _opener.open(request, timeout=30) as response:
+            response.read()
+            ok = 200 <= response.status < 300
+    except Exception:  # HTTPError for 3xx / 4xx / 5xx
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def login_cookie(base, credentials):
+    """ Logs in through the form at / and returns the session cookie ("session=..."). """
+    username, _, password = credentials.partition(':')
+    data = urllib.parse.urlencode({'username': username, 'password': password}).encode()
+    try:
+        response = _opener.open(urllib.request.Request(base + '/', data=data), timeout=30)
+    except urllib.error.HTTPError as e:  # the successful login answers with a redirect
+        response = e
+    cookie = response.headers.get('Set-Cookie', '').split(';')[0]
+    if response.status not in (301, 302, 303) or not cookie.startswith('session='):
+        raise SystemExit(f"Login as {username} failed (status {response.status})")
+    return cookie
+
+
+def measure(url, requests, concurrency, cookie=None):
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(lambda _: fetch(url, cookie), range(concurrency * 2)))  # warm-up
+        started = time.perf_counter()
+        results = list(pool.map(lambda _: fetch(url, cookie), range(requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(r[0] for r in results)
+    return {
+        'rps': requests / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'errors': sum(1 for r in results if not r[1])
+    }
+
+
+def wait_until_up(url, seconds=30):
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=2)
+            return True
+        except urllib.error.HTTPError:
+            return True
+        except Exception:
+            time.sleep(0.2)
+    return False
+
+
+def report(server, path, result, concurrency):
+    print(f"{server:<10} {path:<28} c={concurrency:<4} {result['rps']:>8.1f} req/s   "
+          f"p50 {result['p50_ms']:>7.1f} ms   p95 {result['p95_ms']:>7.1f} ms   errors {result['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure requests/second of the app under different servers.")
+    parser.add_argument('--server', action='append', choices=sorted(SERVERS), help="Server(s) to start and measure")
+    parser.add_argument('--url', help="Measure an already running server instead, e.g. http://127.0.0.1:8080")
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--path', action='append', help=f"Route(s) to request (default: {' '.join(DEFAULT_PATHS)})")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--cookie', help="Cookie header for routes behind login, e.g. \"session=...\"")
+    parser.add_argument('--login', metavar='USER:PASSWORD', help="Log in through / and use that session (instead of --cookie)")
+    args = parser.parse_args()
+    paths = args.path or DEFAULT_PATHS
+
+    if args.url:
+        cookie = login_cookie(args.url, args.login) if args.login else args.cookie
+        for path in paths:
+            report('running', path, measure(args.url + path, args.requests, args.concurrency, cookie), args.concurrency)
+        return
+    if not args.server:
+        parser.error("give --server or --url")
+
+    for server in args.server:
+        base = f'http://127.0.0.1:{args.port}'
+        process = subprocess.Popen(SERVERS[server](args.port), cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not wait_until_up(base + '/'):
+                print(f"{server}: did not start")
+                continue
+            cookie = login_cookie(base, args.login) if args.login else args.cookie
+            for path in paths:
+                report(server, path, measure(base + path, args.requests, args.concurrency, cookie), args.concurrency)
+        finally:
+            process.terminate()
+            process.wait(10)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,12 @@
+"""
+Route blueprints. URLs are the same as before the split; endpoints carry the
+blueprint name, e.g. url_for('userinfo.userinfo_list').
+"""
+from blueprints import admin, auth, dashboard, evaluation, recruitment, training, userinfo
+
+BLUEPRINTS = [auth.bp, dashboard.bp, admin.bp, userinfo.bp, evaluation.bp, training.bp, recruitment.bp]
+
+
+def register_blueprints(app):
+    for blueprint in BLUEPRINTS:
+        app.register_blueprint(blueprint)
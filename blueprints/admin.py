@@ -0,0 +1,427 @@
+"""
+System administration: users, roles, employee classes, departments, the activity log and saved request profiles.
+"""
+from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, abort
+from web_helpers import get_db_connection, is_admin, login_required, admin_required, get_all_classes
+from request_profiler import list_profiles, load_profile, profile_stats_path, delete_profile
+
+bp = Blueprint('admin', __name__)
+
+@bp.route('/users')
+@login_required
+def users():
+    search = request.args.get('search', '').strip()
+    role_id_filter = request.args.get('role_id', '')
+    dept_id_filter = request.args.get('dept_id', '')
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    query_base = "SELECT U.UserID, U.Username, COALESCE(U.Name, UI.NAME) AS FullName, U.DepartmentID, D.DEPTNAME, U.RoleID, R.RoleName FROM [Zktime_Copy].[dbo].[Users] U LEFT JOIN [Zktime_Copy].[dbo].[USERINFO] UI ON U.UserID = UI.USERID LEFT JOIN [Zktime_Copy].[dbo].[DEPARTMENTS] D ON U.DepartmentID = D.DEPTID LEFT JOIN [Zktime_Copy].[dbo].[Roles] R ON U.RoleID = R.RoleID"
+    where_clauses = ["1=1"] 
+    params = []
+    if search:
+        where_clauses.append("(U.Username LIKE ? OR COALESCE(U.Name, UI.NAME) LIKE ?)")
+        params.extend([f"%{search}%", f"%{search}%"])
+    if role_id_filter:
+        where_clauses.append("U.RoleID = ?")
+        params.append(role_id_filter)
+    if dept_id_filter:
+        where_clauses.append("U.DepartmentID = ?")
+        params.append(dept_id_filter)
+    query = f"{query_base} WHERE {' AND '.join(where_clauses)} ORDER BY U.UserID"
+    cursor.execute(query, params)
+    users = cursor.fetchall()
+    cursor.execute("SELECT RoleID, RoleName FROM [Zktime_Copy].[dbo].[Roles] ORDER BY RoleID")
+    roles = cursor.fetchall()
+    cursor.execute("SELECT DEPTID, DEPTNAME FROM [Zktime_Copy].[dbo].[DEPARTMENTS] ORDER BY DEPTID")
+    depts = cursor.fetchall()
+    conn.close()
+    return render_template('users.html', users=users, roles=roles, depts=depts, filters=request.args, is_admin=is_admin())
+
+@bp.route('/users/add', methods=['GET', 'POST'])
+@admin_required
+def add_user():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT RoleID, RoleName FROM [Zktime_Copy].[dbo].[Roles] ORDER BY RoleID")
+    roles = cursor.fetchall()
+    cursor.execute("SELECT DEPTID, DEPTNAME FROM [Zktime_Copy].[dbo].[DEPARTMENTS] ORDER BY DEPTID")
+    depts = cursor.fetchall()
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password'] 
+        name = request.form.get('name') or None
+        role_id = request.form.get('role_id') or None
+        dept_id = request.form.get('department_id') or None
+        try:
+            cursor.execute("INSERT INTO [Zktime_Copy].[dbo].[Users] (Username, PasswordHash, RoleID, Name, DepartmentID) VALUES (?, ?, ?, ?, ?)", (username, password, role_id, name, dept_id))
+            conn.commit()
+            flash('✅ User added successfully!', 'success')
+            return redirect(url_for('admin.users'))
+        except Exception as e:
+            flash(f'❌ Error: {e}', 'danger')
+        finally:
+            conn.close()
+    return render_template('user_form.html', roles=roles, depts=depts, action='Add')
+
+@bp.route('/users/edit/<int:user_id>', methods=['GET', 'POST'])
+@admin_required
+def edit_user(user_id):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT RoleID, RoleName FROM [Zktime_Copy].[dbo].[Roles] ORDER BY RoleID")
+    roles = cursor.fetchall()
+    cursor.execute("SELECT DEPTID, DEPTNAME FROM [Zktime_Copy].[dbo].[DEPARTMENTS] ORDER BY DEPTID")
+    depts = cursor.fetchall()
+    cursor.execute("SELECT UserID, Username, RoleID, Name, DepartmentID FROM [Zktime_Copy].[dbo].[Users] WHERE UserID = ?", (user_id,))
+    user = cursor.fetchone()
+    if request.method == 'POST':
+        username = request.form['username']
+        name = request.form.get('name') or None
+        role_id = request.form.get('role_id') or None
+        dept_id = request.form.get('department_id') or None
+        new_password = request.form.get('password') or None
+        if new_password:
+            cursor.execute("UPDATE [Zktime_Copy].[dbo].[Users] SET Username = ?, Name = ?, RoleID = ?, DepartmentID = ?, PasswordHash = ? WHERE UserID = ?", (username, name, role_id, dept_id, new_password, user_id))
+        else:
+            cursor.execute("UPDATE [Zktime_Copy].[dbo].[Users] SET Username = ?, Name = ?, RoleID = ?, DepartmentID = ? WHERE UserID = ?", (username, name, role_id, dept_id, user_id))
+        conn.commit()
+        conn.close()
+        flash('User updated successfully!', 'success')
+        return redirect(url_for('admin.users'))
+    conn.close()
+    return render_template('user_form.html', user=user, roles=roles, depts=depts, action='Edit')
+
+@bp.route('/users/delete/<int:user_id>', methods=['POST'])
+@admin_required
+def delete_user(user_id):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM [Zktime_Copy].[dbo].[Users] WHERE UserID = ?", (user_id,))
+    conn.commit()
+    conn.close()
+    flash('User deleted successfully!', 'info')
+    return redirect(url_for('admin.users'))
+
+@bp.route('/roles')
+@login_required
+def roles():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT RoleID, RoleName FROM [Zktime_Copy].[dbo].[Roles] ORDER BY RoleID")
+    rows = cursor.fetchall()
+    conn.close()
+    return render_template('roles.html', roles=rows)
+
+@bp.route('/roles/add', methods=['GET', 'POST'])
+@admin_required
+def roles_add():
+    if request.method == 'POST':
+        name = request.form['rolename']
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO [Zktime_Copy].[dbo].[Roles] (RoleName) VALUES (?)", (name,))
+        conn.commit()
+        conn.close()
+        flash('Role added successfully!', 'success')
+        return redirect(url_for('admin.roles'))
+    return render_template('role_form.html', action='Add')
+
+@bp.route('/roles/edit/<int:rid>', methods=['GET', 'POST'])
+@admin_required
+def roles_edit(rid):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT RoleID, RoleName FROM [Zktime_Copy].[dbo].[Roles] WHERE RoleID = ?", (rid,))
+    role = cursor.fetchone()
+    if request.method == 'POST':
+        name = request.form['rolename']
+        cursor.execute("UPDATE [Zktime_Copy].[dbo].[Roles] SET RoleName = ? WHERE RoleID = ?", (name, rid))
+        conn.commit()
+        conn.close()
+        flash('Role updated successfully!', 'success')
+        return redirect(url_for('admin.roles'))
+    conn.close()
+    return render_template('role_form.html', role=role, action='Edit')
+
+@bp.route('/roles/delete/<int:rid>', methods=['POST'])
+@admin_required
+def roles_delete(rid):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM [Zktime_Copy].[dbo].[Roles] WHERE RoleID = ?", (rid,))
+    conn.commit()
+    conn.close()
+    flash('Role deleted successfully!', 'info')
+    return redirect(url_for('admin.roles'))
+
+@bp.route('/admin/classes')
+@admin_required
+def classes_list():
+    classes = get_all_classes()
+    return render_template('classes_list.html', classes=classes)
+
+@bp.route('/admin/classes/add', methods=['POST'])
+@admin_required
+def classes_add():
+    class_name = request.form.get('class_name', '').strip()
+    display_name = request.form.get('display_name', '').strip()
+    
+    if not class_name:
+        flash('❌ يرجى إدخال رمز الفئة', 'danger')
+        return redirect(url_for('admin.classes_list'))
+        
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        # Check uniqueness
+        cursor.execute("SELECT Count(*) FROM [Zktime_Copy].[dbo].[EmployeeClasses] WHERE ClassName = ?", (class_name,))
+        if cursor.fetchone()[0] > 0:
+            flash(f'❌ الفئة "{class_name}" موجودة بالفعل.', 'danger')
+        else:
+            cursor.execute("INSERT INTO [Zktime_Copy].[dbo].[EmployeeClasses] (ClassName, DisplayName) VALUES (?, ?)", (class_name, display_name or class_name))
+            conn.commit()
+            flash('✅ تم إضافة الفئة بنجاح.', 'success')
+        conn.close()
+    except Exception as e:
+        flash(f'❌ خطأ: {e}', 'danger')
+        
+    return redirect(url_for('admin.classes_list'))
+
+@bp.route('/admin/logs')
+@admin_required
+def logs_dashboard():
+    # 1. Filters
+    page = request.args.get('page', 1, type=int)
+    search = request.args.get('search', '').strip()
+    username = request.args.get('username', '')
+    date_from = request.args.get('date_from', '')
+    date_to = request.args.get('date_to', '')
+    module = request.args.get('module', '')
+    action_type = request.args.get('action_type', '')
+    
+    limit = 50
+    offset = (page - 1) * limit
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    # 2. Build Query
+    where_clauses = ["1=1"]
+    params = []
+    
+    if search:
+        where_clauses.append("(Description LIKE ? OR Username LIKE ?)")
+        params.extend([f'%{search}%', f'%{search}%'])
+        
+    if username:
+        where_clauses.append("Username = ?")
+        params.append(username)
+
+    if module:
+        where_clauses.append("Module = ?")
+        params.append(module)
+        
+    if action_type:
+        where_clauses.append("ActionType = ?")
+        params.append(action_type)
+        
+    if date_from:
+        where_clauses.append("CAST(Timestamp AS DATE) >= ?")
+        params.append(date_from)
+        
+    if date_to:
+        where_clauses.append("CAST(Timestamp AS DATE) <= ?")
+        params.append(date_to)
+        
+    where_sql = " AND ".join(where_clauses)
+    
+    # 3. KPIs
+    # Total Logs
+    cursor.execute(f"SELECT COUNT(*) FROM AppLogs WHERE {where_sql}", params)
+    total_logs = cursor.fetchone()[0]
+    total_pages = (total_logs + limit - 1) // limit
+    
+    # Active Users
+    cursor.execute("SELECT DISTINCT Username FROM AppLogs WHERE Username IS NOT NULL ORDER BY Username")
+    all_usernames = [row[0] for row in cursor.fetchall()]
+    
+    # Active Users (Filtered)
+    cursor.execute(f"SELECT COUNT(DISTINCT Username) FROM AppLogs WHERE {where_sql}", params)
+    active_users = cursor.fetchone()[0]
+    
+    # Today Actions
+    cursor.execute("SELECT COUNT(*) FROM AppLogs WHERE CAST(Timestamp AS DATE) = CAST(GETDATE() AS DATE)")
+    today_actions = cursor.fetchone()[0]
+    
+    # 4. Chart Data
+    cursor.execute("""
+        SELECT TOP 7 
+            FORMAT(Timestamp, 'MM-dd') as Day, 
+            COUNT(*) as Count 
+        FROM AppLogs 
+        GROUP BY FORMAT(Timestamp, 'MM-dd') 
+        ORDER BY Day DESC
+    """)
+    chart_rows = cursor.fetchall()
+    chart_data = {
+        'labels': [row.Day for row in reversed(chart_rows)],
+        'data': [row.Count for row in reversed(chart_rows)]
+    }
+    
+    # 5. Fetch Logs
+    query = f"""
+        SELECT * FROM AppLogs 
+        WHERE {where_sql} 
+        ORDER BY Timestamp DESC 
+        OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
+    """
+    params.extend([offset, limit])
+    
+    cursor.execute(query, params)
+    logs = cursor.fetchall()
+    
+    conn.close()
+    
+    from datetime import datetime
+    return render_template('logs_dashboard.html',
+                           logs=logs,
+                           total_logs=total_logs,
+                           total_pages=total_pages,
+                           current_page=page,
+                           active_users=active_users,
+                           today_actions=today_actions,
+                           all_usernames=all_usernames,
+                           today_date=datetime.now().strftime('%Y-%m-%d'),
+                           chart_data=chart_data,
+                           modules=['Recruitment', 'Training', 'Evaluations', 'Access', 'Users', 'Settings'],
+                           action_types=['Login', 'Create', 'Update', 'Delete', 'Archive', 'Restore', 'Other'])
+
+@bp.route('/admin/profiles')
+@admin_required
+def profiles_list():
+    # Captured with ?_profile=1 on any page (request_profiler.py)
+    return render_template('profiles_list.html', profiles=list_profiles())
+
+@bp.route('/admin/profiles/<profile_id>')
+@admin_required
+def profile_details(profile_id):
+    profile = load_profile(profile_id)
+    if profile is None:
+        abort(404)
+    return render_template('profile_details.html', profile=profile)
+
+@bp.route('/admin/profiles/<profile_id>/download')
+@admin_required
+def profile_download(profile_id):
+    path = profile_stats_path(profile_id)
+    if path is None:
+        abort(404)
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True, download_name=f'{profile_id}.prof')
+
+@bp.route('/admin/profiles/<profile_id>/delete', methods=['POST'])
+@admin_required
+def profile_delete(profile_id):
+    delete_profile(profile_id)
+    flash('✅ تم حذف التحليل.', 'success')
+    return redirect(url_for('admin.profiles_list'))
+
+@bp.route('/admin/classes/delete/<int:id>', methods=['POST'])
+@admin_required
+def classes_delete(id):
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        # Check if it's a core class, although UI prevents it, secure backend too
+        cursor.execute("SELECT ClassName FROM [Zktime_Copy].[dbo].[EmployeeClasses] WHERE ClassID = ?", (id,))
+        row = cursor.fetchone()
+        if row and row.ClassName in ['A', 'B', 'C', 'مشرف', 'مدير']:
+            flash('⚠️ لا يمكن حذف الفئات الأساسية للنظام.', 'warning')
+        else:
+            cursor.execute("DELETE FROM [Zktime_Copy].[dbo].[EmployeeClasses] WHERE ClassID = ?", (id,))
+            conn.commit()
+            flash('✅ تم حذف الفئة بنجاح.', 'success')
+            
+        conn.close()
+    except Exception as e:
+        flash(f'❌ خطأ: {e}', 'danger')
+        
+    return redirect(url_for('admin.classes_list'))
+
+@bp.route('/departments/manage')
+@login_required
+def departments_manage():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT DEPTID, DEPTNAME, SUPDEPTID FROM [Zktime_Copy].[dbo].[DEPARTMENTS] ORDER BY DEPTID")
+    rows = cursor.fetchall()
+    conn.close()
+    return render_template('departments.html', departments=rows)
+
+@bp.route('/departments/add', methods=['GET', 'POST'])
+@admin_required
+def departments_add():
+    if request.method == 'POST':
+        name = request.form['deptname']
+        sup = request.form.get('supdeptid') or None
+        
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        try:
+            # 1. Calculate the next available DEPTID
+            cursor.execute("SELECT MAX(DEPTID) FROM [Zktime_Copy].[dbo].[DEPARTMENTS]")
+            row = cursor.fetchone()
+            # If table is empty, start at 1, otherwise add 1 to the max ID
+            new_dept_id = (row[0] or 0) + 1
+            
+            # 2. Insert with the manually generated DEPTID
+            cursor.execute("""
+                INSERT INTO [Zktime_Copy].[dbo].[DEPARTMENTS] (DEPTID, DEPTNAME, SUPDEPTID) 
+                VALUES (?, ?, ?)
+            """, (new_dept_id, name, sup))
+            
+            conn.commit()
+            flash('Department added successfully!', 'success')
+            return redirect(url_for('admin.departments_manage'))
+            
+        except Exception as e:
+            conn.rollback()
+            flash(f'Error adding department: {e}', 'danger')
+            # It's helpful to print the error to console for debugging
+            print(f"Database Error: {e}") 
+            return redirect(url_for('admin.departments_add'))
+            
+        finally:
+            conn.close()
+
+    return render_template('department_form.html', action='Add')
+
+@bp.route('/departments/edit/<int:did>', methods=['GET', 'POST'])
+@admin_required
+def departments_edit(did):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT DEPTID, DEPTNAME, SUPDEPTID FROM [Zktime_Copy].[dbo].[DEPARTMENTS] WHERE DEPTID = ?", (did,))
+    dept = cursor.fetchone()
+    if request.method == 'POST':
+        name = request.form['deptname']
+        sup = request.form.get('supdeptid') or None
+        cursor.execute("UPDATE [Zktime_Copy].[dbo].[DEPARTMENTS] SET DEPTNAME = ?, SUPDEPTID = ? WHERE DEPTID = ?", (name, sup, did))
+        conn.commit()
+        conn.close()
+        flash('Department updated successfully!', 'success')
+        return redirect(url_for('admin.departments_manage'))
+    conn.close()
+    return render_template('department_form.html', dept=dept, action='Edit')
+
+@bp.route('/departments/delete/<int:did>', methods=['POST'])
+@admin_required
+def departments_delete(did):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM [Zktime_Copy].[dbo].[DEPARTMENTS] WHERE DEPTID = ?", (did,))
+    conn.commit()
+    conn.close()
+    flash('Department deleted successfully!', 'info')
+    return redirect(url_for('admin.departments_manage'))
@@ -0,0 +1,56 @@
+"""
+Login and logout.
+"""
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from web_helpers import get_db_connection, log_system_action
+
+bp = Blueprint('auth', __name__)
+
+@bp.route('/', methods=['GET', 'POST'])
+def login():
+    # جديد: امسح أي session قديمة فورًا عشان نضمن إن كل زيارة جديدة تبدأ من الصفر
+    session.clear()
+
+    if request.method == 'POST':
+        username = request.form['username'].strip()
+        password = request.form['password'].strip()
+
+        conn = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT UserID, Username, PasswordHash, RoleID, Name FROM [Zktime_Copy].[dbo].[Users] WHERE Username = ?", (username,))
+            user = cursor.fetchone()
+        except Exception as e:
+            flash('❌ حدث خطأ في قاعدة البيانات.', 'danger')
+            return render_template('login.html')
+        finally:
+            if conn: 
+                conn.close()
+
+        if user and password == getattr(user, 'PasswordHash', None):
+            # أعد إنشاء الـ session من جديد بعد التحقق
+            session['user_id'] = int(user.UserID)
+            session['role_id'] = int(user.RoleID) if user.RoleID else None
+            session['username'] = user.Username
+            session['name'] = user.Name
+
+            flash('✅ تم تسجيل الدخول بنجاح!', 'success')
+            log_system_action('Access', 'Login', 'تم تسجيل الدخول بنجاح', user_id=user.UserID, username=user.Username)
+
+            # توجيه حسب الدور (تم حذف Role 5 الخاص بالتوظيف)
+            if user.RoleID == 6:
+                return redirect(url_for('training.training_sessions'))
+            else:
+                return redirect(url_for('dashboard.dashboard'))
+        else:
+            flash('❌ اسم المستخدم أو كلمة المرور غير صحيحة', 'danger')
+
+    # GET request أو لو ما فيش بوست → اعرض صفحة الـ login (بعد ما مسحنا الـ session)
+    return render_template('login.html')
+
+@bp.route('/logout')
+def logout():
+    session.clear()
+    flash('You have been logged out.', 'info')
+    return redirect(url_for('auth.login'))
@@ -0,0 +1,301 @@
+"""
+Dashboard page: KPIs, evaluation charts, turnover / headcount and the managers' activity panel.
+"""
+from flask import Blueprint, render_template, request, session, json
+from web_helpers import get_db_connection, is_admin, admin_or_manager_required, login_required, admin_required
+from datetime import datetime, timedelta
+
+bp = Blueprint('dashboard', __name__)
+
+def user_department_scope():
+    """
+    (visible, dept_id) for the charts: admins see the whole company
+    (dept_id None), everyone else their own department; visible is False
+    when the user has no department.
+    """
+    if is_admin():
+        return True, None
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT DepartmentID FROM [Zktime_Copy].[dbo].[Users] WHERE UserID = ?", (session.get('user_id'),))
+        row = cursor.fetchone()
+    finally:
+        conn.close()
+    if not row or not row.DepartmentID:
+        return False, None
+    return True, row.DepartmentID
+
+@bp.route('/dashboard')
+@login_required
+def dashboard():
+    """ KPI cards and lists; the charts load their data from /api/dashboard/charts/<name> """
+    # 1. Initialize Context with Defaults
+    ctx = {
+        'user_id': session.get('user_id'),
+        'username': session.get('username'),
+        'name': session.get('name'),
+        'role_id': session.get('role_id'),
+        'is_admin': is_admin(),
+        # Default values to prevent Jinja errors if DB fails
+        'users_count': 0, 'employees_count': 0, 'archived_count': 0, 'evals_count': 0, 'avg_score': 0,
+        'top_performers': [], 'recent_evaluations': [],
+        'active_evaluators': [], 'inactive_managers': []
+    }
+
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        # ==========================================
+        # PART 1: PREPARE FILTERS
+        # ==========================================
+        # We build SQL snippets dynamically based on role
+        if is_admin():
+            # Admin Global Filters
+            kpi_where = "1=1" 
+            chart_where = "1=1"
+            kpi_params = []
+            chart_params = []
+            
+            # KPI Logic: Count All
+            sql_kpis = """
+                SELECT 
+                    (SELECT COUNT(*) FROM [Zktime_Copy].[dbo].[Users]) as UsersCount,
+                    (SELECT COUNT(*) FROM [Zktime_Copy].[dbo].[USERINFO] WHERE (IsActive = 1 OR IsActive IS NULL)) as ActiveCount,
+                    (SELECT COUNT(*) FROM [Zktime_Copy].[dbo].[USERINFO] WHERE IsActive = 0) as ArchivedCount,
+                    (SELECT COUNT(*) FROM [Zktime_Copy].[dbo].[Evaluations] WHERE OverallScore IS NOT NULL) as EvalsCount,
+                    (SELECT AVG(OverallScore) FROM [Zktime_Copy].[dbo].[Evaluations] WHERE OverallScore IS NOT NULL) as AvgScore
+            """
+        else:
+            # Manager Department Filters
+            # Get Manager's Dept ID first
+            cursor.execute("SELECT DepartmentID FROM [Zktime_Copy].[dbo].[Users] WHERE UserID = ?", (ctx['user_id'],))
+            user_row = cursor.fetchone()
+            dept_id = user_row.DepartmentID if user_row else None
+            
+            if not dept_id:
+                # If manager has no dept, show 0s
+                return render_template('dashboard.html', **ctx)
+
+            kpi_where = "DepartmentID = ?"
+            chart_where = "UI.DEFAULTDEPTID = ?"
+            # We need to pass the parameter multiple times for the subqueries
+            kpi_params = [dept_id, dept_id, dept_id, dept_id, dept_id]
+            chart_params = [] # We will fill this when building the chart query
+
+            sql_kpis = """
+                SELECT 
+                    (SELECT COUNT(*) FROM [Zktime_Copy].[dbo].[Users] WHERE DepartmentID = ?) as UsersCount,
+                    (SELECT COUNT(*) FROM [Zktime_Copy].[dbo].[USERINFO] WHERE DEFAULTDEPTID = ? AND (IsActive = 1 OR IsActive IS NULL)) as ActiveCount,
+                    (SELECT COUNT(*) FROM [Zktime_Copy].[dbo].[USERINFO] WHERE DEFAULTDEPTID = ? AND IsActive = 0) as ArchivedCount,
+                    (SELECT COUNT(*) FROM [Zktime_Copy].[dbo].[Evaluations] E JOIN [Zktime_Copy].[dbo].[USERINFO] UI ON E.EmployeeUserID = UI.USERID WHERE UI.DEFAULTDEPTID = ? AND E.OverallScore IS NOT NULL) as EvalsCount,
+                    (SELECT AVG(E.OverallScore) FROM [Zktime_Copy].[dbo].[Evaluations] E JOIN [Zktime_Copy].[dbo].[USERINFO] UI ON E.EmployeeUserID = UI.USERID WHERE UI.DEFAULTDEPTID = ? AND E.OverallScore IS NOT NULL) as AvgScore
+            """
+
+        # ==========================================
+        # PART 2: EXECUTE KPIs (Trip #1)
+        # ==========================================
+        cursor.execute(sql_kpis, kpi_params)
+        kpi_row = cursor.fetchone()
+        if kpi_row:
+            ctx['users_count'] = kpi_row.UsersCount
+            ctx['employees_count'] = kpi_row.ActiveCount
+            ctx['archived_count'] = kpi_row.ArchivedCount
+            ctx['evals_count'] = kpi_row.EvalsCount
+            ctx['avg_score'] = kpi_row.AvgScore if kpi_row.AvgScore else 0
+
+        # ==========================================
+        # PART 3: EXECUTE CHARTS & LISTS (Trip #2)
+        # ==========================================
+        # We concatenate the 2 list queries into one string separated by ';'
+        # Note: We must ensure the params list matches the order of '?' in the string
+        
+        base_joins = """
+            FROM [Zktime_Copy].[dbo].[Evaluations] E
+            LEFT JOIN [Zktime_Copy].[dbo].[USERINFO] UI ON E.EmployeeUserID = UI.USERID
+            LEFT JOIN [Zktime_Copy].[dbo].[Users] U ON E.EmployeeUserID = U.UserID
+            LEFT JOIN [Zktime_Copy].[dbo].[Users] Mgr ON E.EvaluatorUserID = Mgr.UserID
+            LEFT JOIN [Zktime_Copy].[dbo].[EvaluationTypes] ET ON E.EvaluationTypeID = ET.EvaluationTypeID
+        """
+
+        sql_charts = f"""
+        -- 3. Top Performers (ADDED ALIAS BELOW)
+        SELECT TOP 5 
+            COALESCE(UI.NAME, U.Name, U.Username) AS EmployeeName, 
+            E.OverallScore, 
+            E.OverallRating, 
+            E.EvaluationDate 
+        {base_joins} 
+        WHERE {chart_where} AND E.EvaluationDate >= DATEADD(day, -30, GETDATE()) 
+        ORDER BY E.OverallScore DESC;
+
+        -- 4. Recent Evaluations (ADDED ALIASES BELOW)
+        SELECT TOP 10 
+            E.EvaluationID, 
+            COALESCE(UI.NAME, U.Name, U.Username) AS EmployeeName, 
+            COALESCE(Mgr.Name, Mgr.Username) AS EvaluatorName, 
+            E.OverallScore, 
+            E.OverallRating, 
+            COALESCE(ET.DisplayName, E.EvaluationType) AS EvaluationType, 
+            E.EvaluationDate 
+        {base_joins} 
+        WHERE {chart_where} 
+        ORDER BY E.EvaluationDate DESC;
+
+        """
+
+        # Prepare params: We have 2 queries. If admin, params is empty. 
+        # If manager, each query needs 'dept_id'. So we repeat dept_id 2 times.
+        if is_admin():
+            chart_params = []
+        else:
+            chart_params = [dept_id] * 2
+
+        # Execute Batch
+        cursor.execute(sql_charts, chart_params)
+
+        # Fetch Results Sequentially using nextset()
+        ctx['top_performers'] = cursor.fetchall()
+        if cursor.nextset(): ctx['recent_evaluations'] = cursor.fetchall()
+
+        # ==========================================
+        # PART 4: ADMIN ONLY EXTRAS (Trip #3 - Optional)
+        # ==========================================
+        if is_admin():
+            # -- Inactive Managers Pagination Logic --
+            managers_page = 1
+            managers_limit = 5
+            managers_offset = 0
+
+            # 1. Get Total Count
+            cursor.execute("""
+                SELECT COUNT(*) 
+                FROM [Zktime_Copy].[dbo].[Users] U
+                WHERE U.RoleID = 3 
+                AND U.UserID NOT IN (SELECT DISTINCT EvaluatorUserID FROM [Zktime_Copy].[dbo].[Evaluations] WHERE EvaluatorUserID IS NOT NULL)
+            """)
+            managers_count = cursor.fetchone()[0]
+            managers_total_pages = (managers_count + managers_limit - 1) // managers_limit
+            ctx['managers_page'] = managers_page
+            ctx['managers_total_pages'] = managers_total_pages
+
+            sql_admin = """
+            -- Inactive Managers (Paginated)
+            SELECT U.UserID, U.Name, D.DEPTNAME,
+                (SELECT COUNT(*) FROM [Zktime_Copy].[dbo].[USERINFO] WHERE DEFAULTDEPTID = U.DepartmentID AND IsActive = 1) as TotalEmployees
+            FROM [Zktime_Copy].[dbo].[Users] U
+            LEFT JOIN [Zktime_Copy].[dbo].[DEPARTMENTS] D ON U.DepartmentID = D.DEPTID
+            WHERE U.RoleID = 3 AND U.UserID NOT IN (SELECT DISTINCT EvaluatorUserID FROM [Zktime_Copy].[dbo].[Evaluations] WHERE EvaluatorUserID IS NOT NULL)
+            ORDER BY U.Name
+            OFFSET 0 ROWS FETCH NEXT 5 ROWS ONLY;
+
+            -- Active Evaluators
+            SELECT TOP 5 
+                COALESCE(Mgr.Name, Mgr.Username) AS EvaluatorName, 
+                COUNT(E.EvaluationID) as evaluation_count, 
+                COUNT(DISTINCT E.EmployeeUserID) as distinct_evaluated,
+                (SELECT COUNT(*) FROM [Zktime_Copy].[dbo].[USERINFO] WHERE DEFAULTDEPTID = Mgr.DepartmentID AND IsActive = 1) as total_dept_employees
+            FROM [Zktime_Copy].[dbo].[Evaluations] E
+            LEFT JOIN [Zktime_Copy].[dbo].[Users] Mgr ON E.EvaluatorUserID = Mgr.UserID
+            GROUP BY Mgr.UserID, Mgr.Name, Mgr.Username, Mgr.DepartmentID
+            HAVING COALESCE(Mgr.Name, Mgr.Username) IS NOT NULL ORDER BY COUNT(E.EvaluationID) DESC;
+            """
+
+            cursor.execute(sql_admin)
+            ctx['inactive_managers'] = cursor.fetchall()
+            if cursor.nextset(): ctx['active_evaluators'] = cursor.fetchall()
+
+    except Exception as e:
+        print(f"Dashboard Error: {e}")
+        # In production, you might want to log this to a file
+    finally:
+        if conn: conn.close()
+    
+    return render_template('dashboard.html', **ctx)
+
+@bp.route('/api/dashboard/charts/<name>')
+@login_required
+def dashboard_chart_api(name):
+    """ Data for one dashboard chart (ratings, types, score_ranges, turnover), cached per scope """
+    from dashboard_charts import get_dashboard_chart, CHART_NAMES
+    if name not in CHART_NAMES:
+        return json.jsonify({'success': False, 'error': f'Unknown chart: {name}'}), 404
+    try:
+        visible, dept_id = user_department_scope()
+        if not visible:
+            return json.jsonify({'success': True, 'empty': True})
+        return json.jsonify({'success': True, **get_dashboard_chart(get_db_connection, name, dept_id)})
+    except Exception as e:
+        return json.jsonify({'success': False, 'error': str(e)})
+
+@bp.route('/api/dashboard/headcount')
+@admin_or_manager_required
+def dashboard_headcount_api():
+    """ Headcount as of each day / month end in [start, end] (default: last 2 years by month) """
+    from workforce_analytics import get_headcount_chart_data
+    freq = request.args.get('freq', 'month')
+    by_department = request.args.get('by') == 'department'
+
+    try:
+        end = datetime.strptime(request.args.get('end') or datetime.now().strftime('%Y-%m-%d'), '%Y-%m-%d')
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d') if request.args.get('start') else end - timedelta(days=730)
+        visible, dept_id = user_department_scope()
+        if not visible:
+            return json.jsonify({'success': True, 'labels': [], 'total': [], 'departments': []})
+        if is_admin():
+            dept_id = request.args.get('dept_id', type=int)
+
+        series = get_headcount_chart_data(get_db_connection, start, end, freq, dept_id, by_department)
+        return json.jsonify({'success': True, **series})
+    except ValueError as e:
+        return json.jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return json.jsonify({'success': False, 'error': str(e)})
+
+@bp.route('/dashboard/managers-partial')
+@admin_required
+def dashboard_managers_partial():
+    page = request.args.get('page', 1, type=int)
+    limit = 5
+    offset = (page - 1) * limit
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        # 1. Get Total Count
+        cursor.execute("""
+            SELECT COUNT(*) 
+            FROM [Zktime_Copy].[dbo].[Users] U
+            WHERE U.RoleID = 3 
+            AND U.UserID NOT IN (SELECT DISTINCT EvaluatorUserID FROM [Zktime_Copy].[dbo].[Evaluations] WHERE EvaluatorUserID IS NOT NULL)
+        """)
+        total_count = cursor.fetchone()[0]
+        total_pages = (total_count + limit - 1) // limit
+        
+        # 2. Get Paginated Data
+        sql = """
+            SELECT U.UserID, U.Name, D.DEPTNAME,
+                (SELECT COUNT(*) FROM [Zktime_Copy].[dbo].[USERINFO] WHERE DEFAULTDEPTID = U.DepartmentID AND IsActive = 1) as TotalEmployees
+            FROM [Zktime_Copy].[dbo].[Users] U
+            LEFT JOIN [Zktime_Copy].[dbo].[DEPARTMENTS] D ON U.DepartmentID = D.DEPTID
+            WHERE U.RoleID = 3 
+            AND U.UserID NOT IN (SELECT DISTINCT EvaluatorUserID FROM [Zktime_Copy].[dbo].[Evaluations] WHERE EvaluatorUserID IS NOT NULL)
+            ORDER BY U.Name
+            OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
+        """
+        cursor.execute(sql, (offset, limit))
+        managers = cursor.fetchall()
+        
+        return render_template('partials/managers_table.html', 
+                             inactive_managers=managers, 
+                             managers_page=page, 
+                             managers_total_pages=total_pages)
+                             
+    except Exception as e:
+        print(f"Error in partial: {e}")
+        return f"<div class='alert alert-danger'>Error loading data: {e}</div>"
+    finally:
+        conn.close()
@@ -0,0 +1,1061 @@
+"""
+Evaluations: criteria, recommendations, types, cycles and progress, new / batch evaluations and reports.
+"""
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, json
+from cycle_progress import rebuild_cycle_progress, record_evaluation, get_cycle_progress
+from scoring import get_rating_from_score, weighted_percentage, recompute_scores
+from batch_evaluation import load_batch_form, employee_classes, parse_batch_scores, save_batch_evaluations
+from dashboard_charts import invalidate_dashboard_charts
+from evaluation_form import NO_CLASS, load_evaluation_form, invalidate_evaluation_form_cache, employee_class_of, filter_criteria, filter_by_department, build_available_evaluation_types, pick_cycle_id
+from web_helpers import get_db_connection, log_system_action, is_admin, admin_or_manager_required, login_required, admin_required, get_all_classes
+from datetime import datetime
+
+bp = Blueprint('evaluation', __name__)
+
+# ========== EVALUATION LOGIC ==========
+
+def get_available_evaluation_types(conn, employee_id, manager_dept_id):
+    """
+    Checks an employee and returns a list of evaluation types 
+    that are currently available or disabled for them.
+    """
+    try:
+        cursor = conn.cursor()
+        
+        # --- FIX: استخدام الطريقة الصحيحة لجلب التاريخ الحالي ---
+        # بما أنك تستخدم from datetime import datetime، يجب استخدام now().date()
+        today = datetime.now().date()
+        
+        # 1. Get employee's completed evals
+        cursor.execute("SELECT DISTINCT EvaluationTypeID FROM [Zktime_Copy].[dbo].[Evaluations] WHERE EmployeeUserID = ?", (employee_id,))
+        completed_eval_ids = {row.EvaluationTypeID for row in cursor.fetchall()}
+        
+        # 2. Get all rules
+        cursor.execute("SELECT * FROM [Zktime_Copy].[dbo].[EvaluationTypes] ORDER BY SortOrder")
+        all_types_rules = cursor.fetchall()
+        
+        # 3. Get all active, open cycles
+        cursor.execute("""
+            SELECT C.EvaluationTypeID, CD.DepartmentID
+            FROM [Zktime_Copy].[dbo].[EvaluationCycles] C
+            LEFT JOIN [Zktime_Copy].[dbo].[CycleDepartments] CD ON C.CycleID = CD.CycleID
+            WHERE C.IsEnabled = 1 AND ? BETWEEN C.StartDate AND C.EndDate
+        """, (today,))
+        active_cycles = cursor.fetchall()
+
+        return build_available_evaluation_types(all_types_rules, completed_eval_ids, active_cycles, manager_dept_id)
+    
+    except Exception as e:
+        # طباعة الخطأ في التيرمينال لمعرفة السبب إذا استمرت المشكلة
+        print(f"❌ Error in get_available_evaluation_types: {e}")
+        return []
+
+@bp.route('/recommendations')
+@admin_required
+def recommendations_list():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT R.RecommendationID, R.RecommendationText, R.AppliesToDeptID, D.DEPTNAME FROM [Zktime_Copy].[dbo].[Recommendations] R LEFT JOIN [Zktime_Copy].[dbo].[DEPARTMENTS] D ON R.AppliesToDeptID = D.DEPTID ORDER BY R.RecommendationID")
+    recommendations = cursor.fetchall()
+    conn.close()
+    return render_template('recommendations_list.html', recommendations=recommendations)
+
+@bp.route('/recommendations/add', methods=['GET', 'POST'])
+@admin_required
+def recommendations_add():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT DEPTID, DEPTNAME FROM [Zktime_Copy].[dbo].[DEPARTMENTS] ORDER BY DEPTID")
+    departments = cursor.fetchall()
+    if request.method == 'POST':
+        text = request.form['text']
+        dept_id = request.form.get('dept_id')
+        dept_id = int(dept_id) if dept_id else None
+        try:
+            cursor.execute("INSERT INTO [Zktime_Copy].[dbo].[Recommendations] (RecommendationText, AppliesToDeptID) VALUES (?, ?)", (text, dept_id))
+            conn.commit()
+            invalidate_evaluation_form_cache()
+            flash('✅ تم إضافة التوصية بنجاح!', 'success')
+            return redirect(url_for('evaluation.recommendations_list'))
+        except Exception as e:
+            conn.rollback()
+            flash(f'❌ خطأ في قاعدة البيانات: {e}', 'danger')
+        finally:
+            conn.close()
+    conn.close()
+    return render_template('recommendation_form.html', departments=departments, action='Add')
+
+@bp.route('/recommendations/edit/<int:rid>', methods=['GET', 'POST'])
+@admin_required
+def recommendations_edit(rid):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT DEPTID, DEPTNAME FROM [Zktime_Copy].[dbo].[DEPARTMENTS] ORDER BY DEPTID")
+    departments = cursor.fetchall()
+    cursor.execute("SELECT * FROM [Zktime_Copy].[dbo].[Recommendations] WHERE RecommendationID = ?", (rid,))
+    recommendation = cursor.fetchone()
+    if not recommendation:
+        flash('لم يتم العثور على التوصية!', 'warning')
+        conn.close()
+        return redirect(url_for('evaluation.recommendations_list'))
+    if request.method == 'POST':
+        text = request.form['text']
+        dept_id = request.form.get('dept_id')
+        dept_id = int(dept_id) if dept_id else None
+        try:
+            cursor.execute("UPDATE [Zktime_Copy].[dbo].[Recommendations] SET RecommendationText = ?, AppliesToDeptID = ? WHERE RecommendationID = ?", (text, dept_id, rid))
+            conn.commit()
+            invalidate_evaluation_form_cache()
+            flash('✅ تم تحديث التوصية بنجاح!', 'success')
+            return redirect(url_for('evaluation.recommendations_list'))
+        except Exception as e:
+            conn.rollback()
+            flash(f'❌ خطأ في قاعدة البيانات: {e}', 'danger')
+        finally:
+            conn.close()
+    conn.close()
+    return render_template('recommendation_form.html', departments=departments, recommendation=recommendation, action='Edit')
+
+@bp.route('/recommendations/delete/<int:rid>', methods=['POST'])
+@admin_required
+def recommendations_delete(rid):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) as cnt FROM [Zktime_Copy].[dbo].[Evaluations] WHERE RecommendationID = ?", (rid,))
+        if cursor.fetchone().cnt > 0:
+            flash('لا يمكن حذف توصية مستخدمة في تقييمات سابقة.', 'danger')
+        else:
+            cursor.execute("DELETE FROM [Zktime_Copy].[dbo].[Recommendations] WHERE RecommendationID = ?", (rid,))
+            conn.commit()
+            invalidate_evaluation_form_cache()
+            flash('تم حذف التوصية بنجاح!', 'info')
+    except Exception as e:
+        conn.rollback()
+        flash(f'Error deleting recommendation: {e}', 'danger')
+    finally:
+        conn.close()
+    return redirect(url_for('evaluation.recommendations_list'))
+
+@bp.route('/evaluation/criteria')
+@admin_required
+def criteria_list():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    # 1. Fetch Criteria (No Join on Departments)
+    cursor.execute("SELECT CriteriaID, CriteriaName, CriteriaWeight, MaxScore, AppliesToDeptID, employee_class FROM [Zktime_Copy].[dbo].[EvaluationCriteria] ORDER BY CriteriaID")
+    criteria_rows = cursor.fetchall()
+    
+    # 2. Fetch Departments Reference
+    cursor.execute("SELECT DEPTID, DEPTNAME FROM [Zktime_Copy].[dbo].[DEPARTMENTS]")
+    depts_rows = cursor.fetchall()
+    dept_map = {d.DEPTID: d.DEPTNAME for d in depts_rows}
+    
+    conn.close()
+
+    # 3. Process Data (Convert to dicts and map Dept Names)
+    criteria = []
+    for row in criteria_rows:
+        c_dict = {
+            'CriteriaID': row.CriteriaID,
+            'CriteriaName': row.CriteriaName,
+            'CriteriaWeight': row.CriteriaWeight,
+            'MaxScore': row.MaxScore,
+            'employee_class': row.employee_class
+        }
+        
+        # Resolve Dept Names
+        if not row.AppliesToDeptID:
+            c_dict['DEPTNAME'] = 'عام (كل الأقسام)'
+        else:
+            try:
+                # Split CSV, map to names, join
+                ids = [int(x) for x in str(row.AppliesToDeptID).split(',') if x.strip()]
+                names = [dept_map.get(dept_id, '?') for dept_id in ids]
+                c_dict['DEPTNAME'] = '، '.join(names)
+            except:
+                c_dict['DEPTNAME'] = row.AppliesToDeptID # Fallback
+                
+        criteria.append(c_dict)
+
+    return render_template('criteria_list.html', criteria=criteria)
+
+@bp.route('/evaluation/criteria/add', methods=['GET', 'POST'])
+@admin_required
+def criteria_add():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT DEPTID, DEPTNAME FROM [Zktime_Copy].[dbo].[DEPARTMENTS] ORDER BY DEPTID")
+        departments = cursor.fetchall()
+        
+        classes = get_all_classes() 
+        
+        if request.method == 'POST':
+            name = request.form['name']
+            weight = request.form['weight']
+            max_score = request.form.get('max_score', 10)
+            
+            # --- Handle Multiple Departments ---
+            dept_ids_list = request.form.getlist('dept_ids')
+            if not dept_ids_list or '' in dept_ids_list:
+                 applies_to_dept = None
+            else:
+                 clean_ids = [x for x in dept_ids_list if x.strip()]
+                 applies_to_dept = ','.join(clean_ids) if clean_ids else None
+
+            employee_levels = request.form.getlist('employee_levels')
+            employee_class = ','.join(employee_levels) if employee_levels else 'لم تضاف'
+            
+            try:
+                weight_float = float(weight)
+                max_score_int = int(max_score)
+                if not (0 < weight_float <= 1):
+                    raise ValueError("Weight must be between 0 and 1 (e.g., 0.20 for 20%)")
+                if max_score_int <= 0:
+                     raise ValueError("Max score must be positive")
+                if not employee_levels:
+                    raise ValueError("Please select at least one employee level")
+                    
+                cursor.execute("INSERT INTO [Zktime_Copy].[dbo].[EvaluationCriteria] (CriteriaName, CriteriaWeight, MaxScore, AppliesToDeptID, employee_class) VALUES (?, ?, ?, ?, ?)", (name, weight_float, max_score_int, applies_to_dept, employee_class))
+                conn.commit()
+                invalidate_evaluation_form_cache()
+                flash('✅ Criterion added successfully!', 'success')
+                return redirect(url_for('evaluation.criteria_list'))
+            except ValueError as e:
+                flash(f'Invalid input: {e}', 'danger')
+                # No need to return here, just fall through to render template
+            except Exception as e:
+                conn.rollback()
+                flash(f'❌ Database error: {e}', 'danger')
+
+        return render_template('criteria_form.html', departments=departments, classes=classes, action='Add')
+    finally:
+        conn.close()
+
+@bp.route('/evaluation/criteria/edit/<int:cid>', methods=['GET', 'POST'])
+@admin_required
+def criteria_edit(cid):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT DEPTID, DEPTNAME FROM [Zktime_Copy].[dbo].[DEPARTMENTS] ORDER BY DEPTID")
+        departments = cursor.fetchall()
+        cursor.execute("SELECT * FROM [Zktime_Copy].[dbo].[EvaluationCriteria] WHERE CriteriaID = ?", (cid,))
+        row = cursor.fetchone()
+        if not row:
+            flash('Criterion not found!', 'warning')
+            return redirect(url_for('evaluation.criteria_list'))
+        
+        selected_depts = []
+        if row.AppliesToDeptID:
+            selected_depts = [x.strip() for x in str(row.AppliesToDeptID).split(',') if x.strip()]
+
+        classes = get_all_classes() 
+        
+        if request.method == 'POST':
+            name = request.form['name']
+            weight = request.form['weight']
+            max_score = request.form.get('max_score', 10)
+            
+            dept_ids_list = request.form.getlist('dept_ids')
+            if not dept_ids_list or '' in dept_ids_list:
+                 applies_to_dept = None
+            else:
+                 clean_ids = [x for x in dept_ids_list if x.strip()]
+                 applies_to_dept = ','.join(clean_ids) if clean_ids else None
+
+            employee_levels = request.form.getlist('employee_levels')
+            employee_class = ','.join(employee_levels) if employee_levels else 'لم تضاف'
+            try:
+                weight_float = float(weight)
+                max_score_int = int(max_score)
+                if not (0 < weight_float <= 1):
+                    raise ValueError("Weight must be between 0 and 1 (e.g., 0.20 for 20%)")
+                if max_score_int <= 0:
+                     raise ValueError("Max score must be positive")
+                if not employee_levels:
+                    raise ValueError("Please select at least one employee level")
+                
+                cursor.execute("UPDATE [Zktime_Copy].[dbo].[EvaluationCriteria] SET CriteriaName = ?, CriteriaWeight = ?, MaxScore = ?, AppliesToDeptID = ?, employee_class = ? WHERE CriteriaID = ?", (name, weight_float, max_score_int, applies_to_dept, employee_class, cid))
+
+                # Weight / max score changes affect the stored scores of past evaluations
+                rescore_report = None
+                if float(row.CriteriaWeight) != weight_float or int(row.MaxScore) != max_score_int:
+                    rescore_report = recompute_scores(cursor, criteria_ids=[cid])
+                conn.commit()
+                invalidate_evaluation_form_cache()
+                if rescore_report:
+                    invalidate_dashboard_charts()
+                flash('✅ Criterion updated successfully!', 'success')
+                if rescore_report:
+                    log_system_action('Evaluations', 'Update', f"Re-scored evaluations after editing criterion {cid}: {rescore_report['changed']} of {rescore_report['checked']} changed")
+                    flash(f"🔄 تم إعادة احتساب {rescore_report['checked']} تقييم ({rescore_report['changed']} تغيرت درجتها، {rescore_report['rating_changed']} تغير تقديرها).", 'info')
+                return redirect(url_for('evaluation.criteria_list'))
+            except ValueError as e:
+                flash(f'Invalid input: {e}', 'danger')
+                # Fall through
+            except Exception as e:
+                conn.rollback()
+                flash(f'❌ Database error: {e}', 'danger')
+
+        return render_template('criteria_form.html', departments=departments, criterion=row, classes=classes, selected_depts=selected_depts, action='Edit')
+    finally:
+        conn.close()
+
+@bp.route('/evaluation/criteria/delete/<int:cid>', methods=['POST'])
+@admin_required
+def criteria_delete(cid):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) as cnt FROM [Zktime_Copy].[dbo].[EvaluationDetails] WHERE CriteriaID = ?", (cid,))
+        usage_count = cursor.fetchone().cnt
+        if usage_count > 0:
+            flash('Cannot delete criterion, it is used in existing evaluations.', 'danger')
+        else:
+            cursor.execute("DELETE FROM [Zktime_Copy].[dbo].[EvaluationCriteria] WHERE CriteriaID = ?", (cid,))
+            conn.commit()
+            invalidate_evaluation_form_cache()
+            flash('Criterion deleted successfully!', 'info')
+    except Exception as e:
+        conn.rollback()
+        flash(f'Error deleting criterion: {e}', 'danger')
+    finally:
+        conn.close()
+    return redirect(url_for('evaluation.criteria_list'))
+
+@bp.route('/evaluation/select_user')
+@login_required
+def select_user_for_evaluation():
+    role_id = session.get('role_id')
+    evaluator_user_id = session.get('user_id')
+    search_query = request.args.get('search', '').strip()
+    
+    if role_id not in [2, 3]:
+        flash('ليس لديك الصلاحية لإنشاء تقييم.', 'danger')
+        return redirect(url_for('dashboard.dashboard'))
+        
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    users_to_evaluate = []
+    page_title = "اختر موظف للتقييم"
+    
+    if role_id == 3:
+        cursor.execute("SELECT DepartmentID FROM [Zktime_Copy].[dbo].[Users] WHERE UserID = ?", (evaluator_user_id,))
+        user_record = cursor.fetchone()
+        manager_dept_id = user_record.DepartmentID if user_record else None
+        
+        if manager_dept_id:
+            # UPDATED QUERY: Now selects UI.BADGENUMBER
+            query = "SELECT UI.USERID, UI.NAME, UI.TITLE, UI.PositionID, P.PositionName, D.DEPTNAME, UI.BADGENUMBER FROM [Zktime_Copy].[dbo].[USERINFO] UI LEFT JOIN [dbo].[POSITIONS] P ON UI.PositionID = P.PositionID LEFT JOIN [dbo].[DEPARTMENTS] D ON UI.DEFAULTDEPTID = D.DEPTID WHERE UI.DEFAULTDEPTID = ? AND UI.USERID != ?"
+            params = [manager_dept_id, evaluator_user_id]
+            
+            if search_query:
+                query += " AND (UI.NAME LIKE ? OR UI.TITLE LIKE ? OR P.PositionName LIKE ?)"
+                params.extend([f"%{search_query}%", f"%{search_query}%", f"%{search_query}%"])
+            
+            cursor.execute(query, params)
+            users_to_evaluate = cursor.fetchall()
+        else:
+             flash('لم يتم تحديد قسم لهذا المدير.', 'warning')
+             
+    elif role_id == 2:
+        page_title = "اختر مدير للتقييم"
+        # UPDATED QUERY: Now selects UI.BADGENUMBER logic
+        query = "SELECT U.UserID, U.Name, U.Username, U.DepartmentID, D.DEPTNAME, UI.BADGENUMBER FROM [Zktime_Copy].[dbo].[Users] U LEFT JOIN [dbo].[DEPARTMENTS] D ON U.DepartmentID = D.DEPTID LEFT JOIN [Zktime_Copy].[dbo].[USERINFO] UI ON U.UserID = UI.USERID WHERE U.RoleID = 3 AND U.UserID != ?"
+        params = [evaluator_user_id]
+        
+        if search_query:
+            query += " AND (U.Name LIKE ? OR U.Username LIKE ? OR D.DEPTNAME LIKE ?)"
+            params.extend([f"%{search_query}%", f"%{search_query}%", f"%{search_query}%"])
+            
+        cursor.execute(query, params)
+        managers = cursor.fetchall()
+        for mgr in managers:
+            users_to_evaluate.append({
+                'USERID': mgr.UserID, 
+                'NAME': mgr.Name or mgr.Username, 
+                'TITLE': 'Manager', 
+                'PositionName': None, 
+                'DEPTNAME': mgr.DEPTNAME or 'غير محدد', 
+                'IsManager': True,
+                'BADGENUMBER': mgr.BADGENUMBER # Added this
+            })
+            
+    conn.close()
+    return render_template('select_user_for_evaluation.html', users=users_to_evaluate, role_id=role_id, page_title=page_title, filters=request.args)
+
+@bp.route('/evaluation/new/<string:badgenumber_str>', methods=['GET', 'POST'])
+@login_required
+def new_evaluation(badgenumber_str):
+    """
+    Handles the creation of a new performance evaluation, using the employee's
+    BADGENUMBER from the URL to look up the internal UserID.
+    """
+    role_id = session.get('role_id')
+    evaluator_user_id = session.get('user_id')
+
+    # 1. Authorization Check
+    if role_id not in [2, 3]:
+        flash('ليس لديك الصلاحية لإنشاء تقييم.', 'danger')
+        return redirect(url_for('dashboard.dashboard'))
+
+    is_manager = request.args.get('is_manager', 'false').lower() == 'true'
+
+    # 2. Employee Lookup based on BADGENUMBER
+    # HR (role 2) evaluates managers, managers (role 3) evaluate their employees
+    if not ((is_manager and role_id == 2) or (not is_manager and role_id == 3)):
+        flash('لم يتم العثور على المستخدم المطلوب.', 'danger')
+        return redirect(url_for('evaluation.select_user_for_evaluation'))
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # كل بيانات النموذج في رحلة واحدة لقاعدة البيانات (القوائم المرجعية من الكاش)
+    form_data = load_evaluation_form(cursor, evaluator_user_id, badgenumber_str, manager_target=is_manager)
+    manager_dept_id = form_data['manager_dept_id']
+    employee_info = form_data['employee']
+    reference = form_data['reference']
+
+    if not employee_info:
+        flash('لم يتم العثور على المستخدم المطلوب.', 'danger')
+        conn.close()
+        return redirect(url_for('evaluation.select_user_for_evaluation'))
+    employee_user_id = employee_info.USERID
+
+    # 3. Department and Permission Checks
+    employee_dept_id = employee_info.DEFAULTDEPTID
+    if role_id == 3 and manager_dept_id != employee_dept_id:
+        flash('لا يمكنك تقييم موظف ليس في قسمك.', 'danger')
+        conn.close()
+        return redirect(url_for('evaluation.select_user_for_evaluation'))
+
+    training_history = form_data['training_history']
+
+    # 4. Evaluation Criteria (class + multi-dept CSV filtering)
+    employee_class_string = employee_class_of(employee_info)
+    criteria = filter_criteria(reference['criteria'], employee_class_string, employee_dept_id)
+
+    if not criteria:
+        flash(f'⚠️ لم يتم تعريف معايير تقييم للفئة "{employee_class_string}" في هذا القسم.', 'warning')
+        conn.close()
+        return redirect(url_for('evaluation.select_user_for_evaluation'))
+
+    recommendations = filter_by_department(reference['recommendations'], employee_dept_id)
+    training_courses = filter_by_department(reference['training_courses'], employee_dept_id)
+
+    available_evals = build_available_evaluation_types(reference['types'], form_data['completed_ids'], form_data['active_cycles'], manager_dept_id)
+
+    # 5. POST Request Handling
+    if request.method == 'POST':
+        try:
+            eval_type_id = request.form['evaluation_type_id']
+            if not eval_type_id or not any(e['id'] == int(eval_type_id) and not e['disabled'] for e in available_evals):
+                flash('❌ نوع التقييم المختار غير متاح أو غير صحيح.', 'danger')
+                raise ValueError("Invalid or disabled evaluation type submitted.")
+
+            comments = request.form.get('comments', '').strip()
+            recommendation_id = request.form.get('recommendation_id') or None
+            training_course_id = request.form.get('training_course_id') or None
+            cycle_id = pick_cycle_id(form_data['active_cycles'], int(eval_type_id), manager_dept_id)
+
+            cursor.execute("INSERT INTO [Zktime_Copy].[dbo].[Evaluations] (EmployeeUserID, EvaluatorUserID, EvaluationTypeID, ManagerComments, RecommendationID, TrainingCourseID, CycleID) OUTPUT INSERTED.EvaluationID VALUES (?, ?, ?, ?, ?, ?, ?)", (employee_user_id, evaluator_user_id, eval_type_id, comments, recommendation_id, training_course_id, cycle_id))
+            evaluation_id = cursor.fetchone().EvaluationID
+
+            scores_data = []
+
+            for item in criteria:
+                score_str = request.form.get(f'score_{item.CriteriaID}')
+                if score_str is None or not score_str.isdigit():
+                    raise ValueError(f"الدرجة المدخلة للبند '{item.CriteriaName}' غير صحيحة.")
+                
+                score = int(score_str)
+                max_score = int(item.MaxScore)
+                
+                if not (0 <= score <= max_score):
+                    raise ValueError(f"الدرجة للبند '{item.CriteriaName}' يجب أن تكون بين 0 و {max_score}.")
+                
+                scores_data.append((evaluation_id, item.CriteriaID, score))
+
+            if scores_data:
+                cursor.executemany("INSERT INTO [Zktime_Copy].[dbo].[EvaluationDetails] (EvaluationID, CriteriaID, ScoreGiven) VALUES (?, ?, ?)", scores_data)
+
+            final_percentage = weighted_percentage([d[2] for d in scores_data], [item.MaxScore for item in criteria], [item.CriteriaWeight for item in criteria])
+            final_rating = get_rating_from_score(final_percentage)
+
+            cursor.execute("UPDATE [Zktime_Copy].[dbo].[Evaluations] SET OverallScore = ?, OverallRating = ? WHERE EvaluationID = ?", (final_percentage, final_rating, evaluation_id))
+            record_evaluation(cursor, cycle_id, employee_dept_id, evaluator_user_id, employee_user_id, 1)
+            
+            conn.commit()
+            invalidate_dashboard_charts()
+            flash('تم إرسال التقييم بنجاح!', 'success')
+            return redirect(url_for('dashboard.dashboard'))
+
+        except ValueError as ve:
+            conn.rollback()
+            flash(f'خطأ في الإدخال: {ve}', 'danger')
+        except Exception as e:
+            conn.rollback()
+            flash(f'حدث خطأ غير متوقع: {e}', 'danger')
+        finally:
+            conn.close() 
+
+    conn.close() # تأكد من إغلاق الاتصال في حالة GET أيضاً
+    return render_template('new_evaluation_form.html', 
+                           employee=employee_info, 
+                           criteria=criteria, 
+                           recommendations=recommendations, 
+                           training_courses=training_courses, 
+                           employee_class=employee_class_string, 
+                           available_evals=available_evals,
+                           training_history=training_history)
+
+@bp.route('/evaluation/batch', methods=['GET', 'POST'])
+@login_required
+def batch_evaluation():
+    """ Evaluates many employees of the manager's department (same class / criteria set) at once. """
+    role_id = session.get('role_id')
+    evaluator_user_id = session.get('user_id')
+
+    if role_id != 3:
+        flash('ليس لديك الصلاحية لإنشاء تقييم.', 'danger')
+        return redirect(url_for('dashboard.dashboard'))
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        form_data = load_batch_form(cursor, evaluator_user_id)
+        dept_id = form_data['dept_id']
+        reference = form_data['reference']
+        if not dept_id:
+            flash('لم يتم تحديد قسم لهذا المدير.', 'warning')
+            return redirect(url_for('dashboard.dashboard'))
+
+        source = request.form if request.method == 'POST' else request.args
+        classes = employee_classes(form_data['employees'])
+        selected_class = source.get('employee_class') or next(iter(classes), NO_CLASS)
+        eval_type_id = source.get('evaluation_type_id', type=int)
+
+        employees = [e for e in form_data['employees'] if (e.employee_class or NO_CLASS) == selected_class]
+        criteria = filter_criteria(reference['criteria'], selected_class, dept_id)
+        recommendations = filter_by_department(reference['recommendations'], dept_id)
+
+        # Availability of the chosen type for each employee (prerequisites / repeatability / cycle)
+        availability = {}
+        if eval_type_id:
+            for emp in employees:
+                types = build_available_evaluation_types(reference['types'], form_data['completed'].get(emp.USERID, set()), form_data['active_cycles'], dept_id)
+                availability[emp.USERID] = next((t for t in types if t['id'] == eval_type_id), None)
+
+        if request.method == 'POST':
+            if not eval_type_id or not criteria:
+                flash('❌ يجب اختيار نوع التقييم وفئة لها معايير معرفة.', 'danger')
+            else:
+                entries, score_matrix, errors = parse_batch_scores(request.form, employees, criteria)
+                for e in entries:
+                    status = availability.get(e['employee_id'])
+                    if not status or status['disabled']:
+                        errors.append(f"{e['name']}: نوع التقييم غير متاح {status['note'] if status else ''}")
+
+                if errors:
+                    for err in errors[:10]:
+                        flash(f'خطأ في الإدخال: {err}', 'danger')
+                    if len(errors) > 10:
+                        flash(f'... و {len(errors) - 10} أخطاء أخرى', 'danger')
+                else:
+                    try:
+                        cycle_id = pick_cycle_id(form_data['active_cycles'], eval_type_id, dept_id)
+                        saved = save_batch_evaluations(cursor, entries, score_matrix, criteria, evaluator_user_id, eval_type_id, cycle_id)
+                        if cycle_id:
+                            rebuild_cycle_progress(cursor, cycle_id)
+                        conn.commit()
+                        invalidate_dashboard_charts()
+                        log_system_action('Evaluations', 'Create', f'Batch evaluation of {len(saved)} employees (type {eval_type_id})')
+                        flash(f'✅ تم حفظ {len(saved)} تقييم بنجاح!', 'success')
+                        return redirect(url_for('evaluation.batch_evaluation', evaluation_type_id=eval_type_id, employee_class=selected_class))
+                    except Exception as e:
+                        conn.rollback()
+                        flash(f'حدث خطأ غير متوقع: {e}', 'danger')
+
+        return render_template('batch_evaluation_form.html',
+                               dept_name=form_data['dept_name'],
+                               evaluation_types=reference['types'],
+                               eval_type_id=eval_type_id,
+                               classes=classes,
+                               selected_class=selected_class,
+                               employees=employees,
+                               availability=availability,
+                               criteria=criteria,
+                               recommendations=recommendations,
+                               form=request.form)
+    finally:
+        conn.close()
+
+@bp.route('/evaluation/reports')
+@login_required
+def evaluation_reports():
+    conn = None
+    reports = []
+    search_employee = request.args.get('search_employee', '').strip()
+    search_evaluator = request.args.get('search_evaluator', '').strip()
+    eval_type_id = request.args.get('eval_type_id', '')
+    date_from = request.args.get('date_from', '')
+    date_to = request.args.get('date_to', '')
+    recommendation_id = request.args.get('recommendation_id', '')
+    training_course_id = request.args.get('training_course_id', '')
+    taken_course_id = request.args.get('taken_course_id', '')
+    overall_rating = request.args.get('overall_rating', '')
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        role_id = session.get('role_id')
+        user_id = session.get('user_id')
+        cursor.execute("SELECT RecommendationID, RecommendationText FROM [Zktime_Copy].[dbo].[Recommendations] ORDER BY RecommendationText")
+        all_recommendations = cursor.fetchall()
+        cursor.execute("SELECT TrainingCourseID, TrainingCourseText FROM [Zktime_Copy].[dbo].[TrainingCourses] ORDER BY TrainingCourseText")
+        all_training_courses = cursor.fetchall()
+        cursor.execute("SELECT EvaluationTypeID, DisplayName FROM [Zktime_Copy].[dbo].[EvaluationTypes] ORDER BY SortOrder")
+        all_evaluation_types = cursor.fetchall()
+        query = """
+            SELECT E.EvaluationID, E.EvaluationDate, COALESCE(ET.DisplayName, E.EvaluationType) as EvaluationType,
+                E.OverallScore, E.OverallRating, E.ManagerComments, E.EmployeeUserID,
+                COALESCE(EmpInfo.NAME, EmpUser.Name, EmpUser.Username) AS EmployeeName, 
+                COALESCE(Mgr.Name, Mgr.Username) AS EvaluatorName, EmpInfo.employee_class,
+                R.RecommendationText, TC.TrainingCourseText,
+                (
+                    SELECT STUFF((
+                        SELECT '###' + TC_Sub.TrainingCourseText
+                        FROM [Zktime_Copy].[dbo].[TrainingEnrollments] TE_Sub 
+                        JOIN [Zktime_Copy].[dbo].[TrainingSessions] TS_Sub ON TE_Sub.SessionID = TS_Sub.SessionID
+                        JOIN [Zktime_Copy].[dbo].[TrainingCourses] TC_Sub ON TS_Sub.CourseID = TC_Sub.TrainingCourseID
+                        WHERE TE_Sub.EmployeeUserID = EmpInfo.USERID
+                        ORDER BY TC_Sub.TrainingCourseText
+                        FOR XML PATH('')
+                    ), 1, 3, '')
+                ) as CoursesTaken
+            FROM [Zktime_Copy].[dbo].[Evaluations] E
+            LEFT JOIN [Zktime_Copy].[dbo].[Users] Mgr ON E.EvaluatorUserID = Mgr.UserID 
+            LEFT JOIN [Zktime_Copy].[dbo].[USERINFO] EmpInfo ON E.EmployeeUserID = EmpInfo.USERID
+            LEFT JOIN [Zktime_Copy].[dbo].[Users] EmpUser ON E.EmployeeUserID = EmpUser.UserID
+            LEFT JOIN [Zktime_Copy].[dbo].[Recommendations] R ON E.RecommendationID = R.RecommendationID
+            LEFT JOIN [Zktime_Copy].[dbo].[TrainingCourses] TC ON E.TrainingCourseID = TC.TrainingCourseID
+            LEFT JOIN [Zktime_Copy].[dbo].[EvaluationTypes] ET ON E.EvaluationTypeID = ET.EvaluationTypeID
+        """
+        where_clauses = []
+        params = []
+        if role_id == 5:
+            where_clauses.append("E.EmployeeUserID = ?")
+            params.append(user_id)
+        elif role_id == 3 or role_id == 2:
+            where_clauses.append("E.EvaluatorUserID = ?")
+            params.append(user_id)
+        elif role_id in [1, 4]:
+             where_clauses.append("1=1")
+        else:
+             where_clauses.append("1=0") 
+        if search_employee:
+            where_clauses.append("(COALESCE(EmpInfo.NAME, EmpUser.Name, EmpUser.Username) LIKE ?)")
+            params.append(f"%{search_employee}%")
+        if is_admin():
+            if search_evaluator:
+                where_clauses.append("(COALESCE(Mgr.Name, Mgr.Username) LIKE ?)")
+                params.append(f"%{search_evaluator}%")
+        elif role_id != 5:
+            if search_evaluator:
+                 where_clauses.append("(COALESCE(Mgr.Name, Mgr.Username) LIKE ? AND E.EvaluatorUserID = ?)")
+                 params.append(f"%{search_evaluator}%")
+                 params.append(user_id)
+        if eval_type_id:
+            where_clauses.append("E.EvaluationTypeID = ?")
+            params.append(eval_type_id)
+        if date_from:
+            where_clauses.append("E.EvaluationDate >= ?")
+            params.append(date_from)
+        if date_to:
+            where_clauses.append("E.EvaluationDate < DATEADD(day, 1, ?)") 
+            params.append(date_to)
+        if recommendation_id:
+            where_clauses.append("E.RecommendationID = ?")
+            params.append(recommendation_id)
+        if training_course_id:
+            where_clauses.append("E.TrainingCourseID = ?")
+            params.append(training_course_id)
+        if taken_course_id:
+            where_clauses.append("""
+                EXISTS (
+                    SELECT 1 FROM [Zktime_Copy].[dbo].[TrainingEnrollments] TE_F
+                    JOIN [Zktime_Copy].[dbo].[TrainingSessions] TS_F ON TE_F.SessionID = TS_F.SessionID
+                    WHERE TE_F.EmployeeUserID = E.EmployeeUserID AND TS_F.CourseID = ?
+                )
+            """)
+            params.append(taken_course_id)
+            
+        if overall_rating:
+            where_clauses.append("E.OverallRating = ?")
+            params.append(overall_rating)
+
+        query += " WHERE " + " AND ".join(where_clauses)
+        query += " ORDER BY E.EvaluationDate DESC"
+        cursor.execute(query, params)
+        reports = cursor.fetchall()
+    except Exception as e:
+        flash(f"Error fetching reports: {e}", "danger")
+    finally:
+        if conn: conn.close()
+    return render_template('evaluation_reports.html', reports=reports, is_admin=is_admin(), filters=request.args, all_recommendations=all_recommendations, all_training_courses=all_training_courses, all_evaluation_types=all_evaluation_types)
+
+@bp.route('/evaluation-types')
+@admin_required
+def evaluation_types_list():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT ET.EvaluationTypeID, ET.TypeName, ET.DisplayName, ET.IsRepeatable, ET.SortOrder, Pre.DisplayName as PrerequisiteName FROM [Zktime_Copy].[dbo].[EvaluationTypes] ET LEFT JOIN [Zktime_Copy].[dbo].[EvaluationTypes] Pre ON ET.PrerequisiteTypeID = Pre.EvaluationTypeID ORDER BY ET.SortOrder")
+    types = cursor.fetchall()
+    conn.close()
+    return render_template('evaluation_types_list.html', types=types)
+
+@bp.route('/evaluation-types/add', methods=['GET', 'POST'])
+@admin_required
+def evaluation_types_add():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT EvaluationTypeID, DisplayName FROM [Zktime_Copy].[dbo].[EvaluationTypes] ORDER BY SortOrder")
+    all_types = cursor.fetchall()
+    if request.method == 'POST':
+        try:
+            type_name = request.form['type_name']
+            display_name = request.form['display_name']
+            is_repeatable = 'is_repeatable' in request.form
+            prerequisite_id = request.form.get('prerequisite_id') or None
+            sort_order = request.form.get('sort_order', 100)
+            cursor.execute("INSERT INTO [Zktime_Copy].[dbo].[EvaluationTypes] (TypeName, DisplayName, IsRepeatable, PrerequisiteTypeID, SortOrder) VALUES (?, ?, ?, ?, ?)", (type_name, display_name, is_repeatable, prerequisite_id, sort_order))
+            conn.commit()
+            invalidate_evaluation_form_cache()
+            flash('✅ تم إضافة نوع التقييم بنجاح', 'success')
+            return redirect(url_for('evaluation.evaluation_types_list'))
+        except Exception as e:
+            conn.rollback()
+            flash(f'❌ خطأ في قاعدة البيانات: {e}', 'danger')
+        finally:
+            conn.close()
+    conn.close()
+    return render_template('evaluation_type_form.html', action='Add', all_types=all_types)
+
+@bp.route('/evaluation-types/edit/<int:type_id>', methods=['GET', 'POST'])
+@admin_required
+def evaluation_types_edit(type_id):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT EvaluationTypeID, DisplayName FROM [Zktime_Copy].[dbo].[EvaluationTypes] WHERE EvaluationTypeID != ? ORDER BY SortOrder", (type_id,))
+    all_types = cursor.fetchall()
+    cursor.execute("SELECT * FROM [Zktime_Copy].[dbo].[EvaluationTypes] WHERE EvaluationTypeID = ?", (type_id,))
+    eval_type = cursor.fetchone()
+    if not eval_type:
+        flash('❌ لم يتم العثور على نوع التقييم', 'danger')
+        conn.close()
+        return redirect(url_for('evaluation.evaluation_types_list'))
+    if request.method == 'POST':
+        try:
+            type_name = request.form['type_name']
+            display_name = request.form['display_name']
+            is_repeatable = 'is_repeatable' in request.form
+            prerequisite_id = request.form.get('prerequisite_id') or None
+            sort_order = request.form.get('sort_order', 100)
+            cursor.execute("UPDATE [Zktime_Copy].[dbo].[EvaluationTypes] SET TypeName = ?, DisplayName = ?, IsRepeatable = ?, PrerequisiteTypeID = ?, SortOrder = ? WHERE EvaluationTypeID = ?", (type_name, display_name, is_repeatable, prerequisite_id, sort_order, type_id))
+            conn.commit()
+            invalidate_evaluation_form_cache()
+            invalidate_dashboard_charts()  # the types chart shows DisplayName
+            flash('✅ تم تحديث نوع التقييم بنجاح', 'success')
+            return redirect(url_for('evaluation.evaluation_types_list'))
+        except Exception as e:
+            conn.rollback()
+            flash(f'❌ خطأ في قاعدة البيانات: {e}', 'danger')
+        finally:
+            conn.close()
+    conn.close()
+    return render_template('evaluation_type_form.html', action='Edit', eval_type=eval_type, all_types=all_types)
+
+@bp.route('/evaluation-types/delete/<int:type_id>', methods=['POST'])
+@admin_required
+def evaluation_types_delete(type_id):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) as cnt FROM [Zktime_Copy].[dbo].[Evaluations] WHERE EvaluationTypeID = ?", (type_id,))
+        if cursor.fetchone().cnt > 0:
+            flash('❌ لا يمكن الحذف، هذا النوع مستخدم في تقييمات سابقة.', 'danger')
+            conn.close()
+            return redirect(url_for('evaluation.evaluation_types_list'))
+        cursor.execute("SELECT COUNT(*) as cnt FROM [Zktime_Copy].[dbo].[EvaluationTypes] WHERE PrerequisiteTypeID = ?", (type_id,))
+        if cursor.fetchone().cnt > 0:
+            flash('❌ لا يمكن الحذف، هذا النوع هو متطلب لنوع آخر.', 'danger')
+            conn.close()
+            return redirect(url_for('evaluation.evaluation_types_list'))
+        cursor.execute("DELETE FROM [Zktime_Copy].[dbo].[EvaluationTypes] WHERE EvaluationTypeID = ?", (type_id,))
+        conn.commit()
+        invalidate_evaluation_form_cache()
+        flash('✅ تم حذف نوع التقييم بنجاح', 'success')
+    except Exception as e:
+        conn.rollback()
+        flash(f'❌ خطأ في قاعدة البيانات: {e}', 'danger')
+    finally:
+        conn.close()
+    return redirect(url_for('evaluation.evaluation_types_list'))
+
+@bp.route('/evaluation-cycles')
+@admin_required
+def evaluation_cycles_list():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT C.CycleID, C.CycleName, C.StartDate, C.EndDate, C.IsEnabled, ET.DisplayName as EvaluationTypeName FROM [Zktime_Copy].[dbo].[EvaluationCycles] C JOIN [Zktime_Copy].[dbo].[EvaluationTypes] ET ON C.EvaluationTypeID = ET.EvaluationTypeID ORDER BY C.StartDate DESC")
+    cycles = cursor.fetchall()
+    conn.close()
+    return render_template('evaluation_cycles_list.html', cycles=cycles)
+
+@bp.route('/evaluation-cycles/add', methods=['GET', 'POST'])
+@admin_required
+def evaluation_cycles_add():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT EvaluationTypeID, DisplayName FROM [Zktime_Copy].[dbo].[EvaluationTypes] ORDER BY SortOrder")
+    all_types = cursor.fetchall()
+    cursor.execute("SELECT DEPTID, DEPTNAME FROM [Zktime_Copy].[dbo].[DEPARTMENTS] ORDER BY DEPTNAME")
+    all_depts = cursor.fetchall()
+    if request.method == 'POST':
+        try:
+            cycle_name = request.form['cycle_name']
+            type_id = request.form['type_id']
+            start_date = request.form['start_date']
+            end_date = request.form['end_date']
+            is_enabled = 'is_enabled' in request.form
+            dept_ids = request.form.getlist('dept_ids')
+            cursor.execute("INSERT INTO [Zktime_Copy].[dbo].[EvaluationCycles] (CycleName, EvaluationTypeID, StartDate, EndDate, IsEnabled) OUTPUT INSERTED.CycleID VALUES (?, ?, ?, ?, ?)", (cycle_name, type_id, start_date, end_date, is_enabled))
+            new_cycle_id = cursor.fetchone().CycleID
+            if dept_ids:
+                dept_data = [(new_cycle_id, int(dept_id)) for dept_id in dept_ids]
+                cursor.executemany("INSERT INTO [Zktime_Copy].[dbo].[CycleDepartments] (CycleID, DepartmentID) VALUES (?, ?)", dept_data)
+            rebuild_cycle_progress(cursor, new_cycle_id)
+            conn.commit()
+            flash('✅ تم إنشاء دورة التقييم بنجاح', 'success')
+            return redirect(url_for('evaluation.evaluation_cycles_list'))
+        except Exception as e:
+            conn.rollback()
+            flash(f'❌ خطأ في قاعدة البيانات: {e}', 'danger')
+        finally:
+            conn.close()
+    conn.close()
+    return render_template('evaluation_cycle_form.html', action='Add', all_types=all_types, all_depts=all_depts, cycle_depts=[])
+
+@bp.route('/evaluation-cycles/edit/<int:cycle_id>', methods=['GET', 'POST'])
+@admin_required
+def evaluation_cycles_edit(cycle_id):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT EvaluationTypeID, DisplayName FROM [Zktime_Copy].[dbo].[EvaluationTypes] ORDER BY SortOrder")
+    all_types = cursor.fetchall()
+    cursor.execute("SELECT DEPTID, DEPTNAME FROM [Zktime_Copy].[dbo].[DEPARTMENTS] ORDER BY DEPTNAME")
+    all_depts = cursor.fetchall()
+    if request.method == 'POST':
+        try:
+            cycle_name = request.form['cycle_name']
+            type_id = request.form['type_id']
+            start_date = request.form['start_date']
+            end_date = request.form['end_date']
+            is_enabled = 'is_enabled' in request.form
+            dept_ids = request.form.getlist('dept_ids')
+            cursor.execute("UPDATE [Zktime_Copy].[dbo].[EvaluationCycles] SET CycleName = ?, EvaluationTypeID = ?, StartDate = ?, EndDate = ?, IsEnabled = ? WHERE CycleID = ?", (cycle_name, type_id, start_date, end_date, is_enabled, cycle_id))
+            cursor.execute("DELETE FROM [Zktime_Copy].[dbo].[CycleDepartments] WHERE CycleID = ?", (cycle_id,))
+            if dept_ids:
+                dept_data = [(cycle_id, int(dept_id)) for dept_id in dept_ids]
+                cursor.executemany("INSERT INTO [Zktime_Copy].[dbo].[CycleDepartments] (CycleID, DepartmentID) VALUES (?, ?)", dept_data)
+            rebuild_cycle_progress(cursor, cycle_id)
+            conn.commit()
+            flash('✅ تم تحديث دورة التقييم بنجاح', 'success')
+            return redirect(url_for('evaluation.evaluation_cycles_list'))
+        except Exception as e:
+            conn.rollback()
+            flash(f'❌ خطأ في قاعدة البيانات: {e}', 'danger')
+        finally:
+            conn.close()
+    cursor.execute("SELECT * FROM [Zktime_Copy].[dbo].[EvaluationCycles] WHERE CycleID = ?", (cycle_id,))
+    cycle = cursor.fetchone()
+    if not cycle:
+        flash('❌ لم يتم العثور على الدورة', 'danger')
+        conn.close()
+        return redirect(url_for('evaluation.evaluation_cycles_list'))
+    cursor.execute("SELECT DepartmentID FROM [Zktime_Copy].[dbo].[CycleDepartments] WHERE CycleID = ?", (cycle_id,))
+    cycle_depts_rows = cursor.fetchall()
+    cycle_depts = [row.DepartmentID for row in cycle_depts_rows]
+    conn.close()
+    return render_template('evaluation_cycle_form.html', action='Edit', cycle=cycle, all_types=all_types, all_depts=all_depts, cycle_depts=cycle_depts)
+
+@bp.route('/evaluation-cycles/delete/<int:cycle_id>', methods=['POST'])
+@admin_required
+def evaluation_cycles_delete(cycle_id):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM [Zktime_Copy].[dbo].[CycleProgress] WHERE CycleID = ?", (cycle_id,))
+        cursor.execute("DELETE FROM [Zktime_Copy].[dbo].[CycleDepartments] WHERE CycleID = ?", (cycle_id,))
+        cursor.execute("DELETE FROM [Zktime_Copy].[dbo].[EvaluationCycles] WHERE CycleID = ?", (cycle_id,))
+        conn.commit()
+        flash('✅ تم حذف الدورة بنجاح', 'success')
+    except Exception as e:
+        conn.rollback()
+        flash(f'❌ خطأ في قاعدة البيانات: {e}', 'danger')
+    finally:
+        conn.close()
+    return redirect(url_for('evaluation.evaluation_cycles_list'))
+
+def get_progress_dept_scope(cursor):
+    """ None for admins (all departments), otherwise the manager's department only. """
+    if is_admin():
+        return None
+    cursor.execute("SELECT DepartmentID FROM [Zktime_Copy].[dbo].[Users] WHERE UserID = ?", (session.get('user_id'),))
+    row = cursor.fetchone()
+    return [row.DepartmentID] if row and row.DepartmentID else []
+
+@bp.route('/evaluation-cycles/progress')
+@admin_or_manager_required
+def evaluation_cycles_progress():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cycles = get_cycle_progress(cursor, get_progress_dept_scope(cursor))
+    except Exception as e:
+        print(f"Cycle Progress Error: {e}")
+        flash(f'❌ خطأ في قاعدة البيانات: {e}', 'danger')
+        cycles = []
+    finally:
+        conn.close()
+    return render_template('evaluation_cycle_progress.html', cycles=cycles, is_admin=is_admin())
+
+@bp.route('/api/evaluation-cycles/progress')
+@admin_or_manager_required
+def evaluation_cycles_progress_api():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cycles = get_cycle_progress(cursor, get_progress_dept_scope(cursor))
+        return json.jsonify({'success': True, 'cycles': cycles})
+    except Exception as e:
+        return json.jsonify({'success': False, 'error': str(e)})
+    finally:
+        conn.close()
+
+@bp.route('/evaluation-cycles/progress/rebuild', methods=['POST'])
+@admin_required
+def evaluation_cycles_progress_rebuild():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        rebuild_cycle_progress(cursor)
+        conn.commit()
+        log_system_action('Evaluations', 'Update', 'Rebuilt evaluation cycle progress counters')
+        flash('✅ تم إعادة حساب تقدم الدورات بنجاح', 'success')
+    except Exception as e:
+        conn.rollback()
+        flash(f'❌ خطأ في قاعدة البيانات: {e}', 'danger')
+    finally:
+        conn.close()
+    return redirect(url_for('evaluation.evaluation_cycles_progress'))
+
+@bp.route('/evaluation/details/<int:evaluation_id>')
+@login_required 
+def evaluation_details(evaluation_id):
+    conn = None
+    evaluation_data = None
+    details = []
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        role_id = session.get('role_id')
+        user_id = session.get('user_id')
+        cursor.execute("""
+            SELECT E.EvaluationID, E.EvaluationDate, COALESCE(ET.DisplayName, E.EvaluationType) as EvaluationType, 
+                E.OverallScore, E.OverallRating, E.ManagerComments, E.EmployeeUserID, E.EvaluatorUserID, 
+                COALESCE(EmpInfo.NAME, EmpUser.Name, EmpUser.Username) AS EmployeeName, 
+                COALESCE(Mgr.Name, Mgr.Username) AS EvaluatorName, 
+                COALESCE(EmpInfo.TITLE, EmpUser.Name, EmpUser.Username) AS EmployeeTitle, 
+                DeptEmp.DEPTNAME as EmployeeDeptName, EmpInfo.employee_class, 
+                R.RecommendationText, TC.TrainingCourseText,
+                (
+                    SELECT STUFF((
+                        SELECT '###' + TC_Sub.TrainingCourseText
+                        FROM [Zktime_Copy].[dbo].[TrainingEnrollments] TE_Sub 
+                        JOIN [Zktime_Copy].[dbo].[TrainingSessions] TS_Sub ON TE_Sub.SessionID = TS_Sub.SessionID
+                        JOIN [Zktime_Copy].[dbo].[TrainingCourses] TC_Sub ON TS_Sub.CourseID = TC_Sub.TrainingCourseID
+                        WHERE TE_Sub.EmployeeUserID = EmpInfo.USERID
+                        ORDER BY TC_Sub.TrainingCourseText
+                        FOR XML PATH('')
+                    ), 1, 3, '')
+                ) as CoursesTaken
+            FROM [Zktime_Copy].[dbo].[Evaluations] E 
+            LEFT JOIN [Zktime_Copy].[dbo].[Users] Mgr ON E.EvaluatorUserID = Mgr.UserID 
+            LEFT JOIN [Zktime_Copy].[dbo].[USERINFO] EmpInfo ON E.EmployeeUserID = EmpInfo.USERID 
+            LEFT JOIN [Zktime_Copy].[dbo].[Users] EmpUser ON E.EmployeeUserID = EmpUser.UserID 
+            LEFT JOIN [Zktime_Copy].[dbo].[DEPARTMENTS] DeptEmp ON COALESCE(EmpInfo.DEFAULTDEPTID, EmpUser.DepartmentID) = DeptEmp.DEPTID 
+            LEFT JOIN [Zktime_Copy].[dbo].[Recommendations] R ON E.RecommendationID = R.RecommendationID 
+            LEFT JOIN [Zktime_Copy].[dbo].[TrainingCourses] TC ON E.TrainingCourseID = TC.TrainingCourseID 
+            LEFT JOIN [Zktime_Copy].[dbo].[EvaluationTypes] ET ON E.EvaluationTypeID = ET.EvaluationTypeID 
+            WHERE E.EvaluationID = ?
+        """, (evaluation_id,))
+        evaluation_data = cursor.fetchone()
+        if not evaluation_data:
+            flash("Evaluation not found.", "warning")
+            return redirect(url_for('evaluation.evaluation_reports'))
+        can_view = False
+        if role_id in [1, 4]: can_view = True
+        elif role_id in [2, 3] and evaluation_data.EvaluatorUserID == user_id: can_view = True
+        elif role_id == 5 and evaluation_data.EmployeeUserID == user_id: can_view = True
+        elif role_id == 3:
+            cursor.execute("SELECT DepartmentID FROM [Zktime_Copy].[dbo].[Users] WHERE UserID = ?", (user_id,))
+            manager_dept = cursor.fetchone()
+            cursor.execute("SELECT DEFAULTDEPTID FROM [Zktime_Copy].[dbo].[USERINFO] WHERE USERID = ?", (evaluation_data.EmployeeUserID,))
+            emp_dept = cursor.fetchone()
+            if manager_dept and emp_dept and manager_dept.DepartmentID == emp_dept.DEFAULTDEPTID:
+                can_view = True
+        if not can_view:
+             flash("You do not have permission to view this evaluation.", "danger")
+             return redirect(url_for('evaluation.evaluation_reports'))
+        cursor.execute("SELECT ED.ScoreGiven, EC.CriteriaName, EC.CriteriaWeight, EC.MaxScore FROM [Zktime_Copy].[dbo].[EvaluationDetails] ED JOIN [Zktime_Copy].[dbo].[EvaluationCriteria] EC ON ED.CriteriaID = EC.CriteriaID WHERE ED.EvaluationID = ? ORDER BY EC.CriteriaID", (evaluation_id,))
+        details = cursor.fetchall()
+    except Exception as e:
+        flash(f"Error fetching evaluation details: {e}", "danger")
+        return redirect(url_for('evaluation.evaluation_reports')) 
+    finally:
+        if conn: conn.close()
+    return render_template('evaluation_details.html', eval=evaluation_data, details=details)
+
+@bp.route('/evaluation/delete/<int:evaluation_id>', methods=['POST'])
+@admin_required
+def evaluation_delete(evaluation_id):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        # نحتاج بيانات التقييم قبل الحذف لتحديث عدادات الدورة
+        cursor.execute("""
+            SELECT E.CycleID, E.EvaluatorUserID, E.EmployeeUserID, UI.DEFAULTDEPTID
+            FROM [Zktime_Copy].[dbo].[Evaluations] E
+            LEFT JOIN [Zktime_Copy].[dbo].[USERINFO] UI ON E.EmployeeUserID = UI.USERID
+            WHERE E.EvaluationID = ?
+        """, (evaluation_id,))
+        eval_row = cursor.fetchone()
+
+        # الحذف سيتم تلقائياً من جدول التفاصيل أيضاً بسبب خاصية CASCADE في قاعدة البيانات
+        cursor.execute("DELETE FROM [Zktime_Copy].[dbo].[Evaluations] WHERE EvaluationID = ?", (evaluation_id,))
+        if eval_row:
+            record_evaluation(cursor, eval_row.CycleID, eval_row.DEFAULTDEPTID, eval_row.EvaluatorUserID, eval_row.EmployeeUserID, -1)
+        conn.commit()
+        invalidate_dashboard_charts()
+        flash('✅ تم حذف تقرير التقييم بنجاح.', 'success')
+    except Exception as e:
+        conn.rollback()
+        print(f"Delete Error: {e}")
+        flash(f'❌ حدث خطأ أثناء الحذف: {e}', 'danger')
+    finally:
+        conn.close()
+    
+    # العودة لنفس الصفحة مع الحفاظ على الفلاتر إن أمكن (أو للصفحة الرئيسية للتقارير)
+    return redirect(url_for('evaluation.evaluation_reports'))
@@ -0,0 +1,907 @@
+"""
+Recruitment tracker (ATS): jobs, candidate pipeline, import and duplicates, training, history and archive.
+"""
+from flask import Blueprint, render_template, request, redirect, url_for, flash, json
+from candidate_duplicates import candidate_key_params, find_existing_candidate, find_duplicate_clusters
+from recruitment_analytics import get_recruitment_analytics, get_recruitment_kpis, get_recruitment_chart, get_recruitment_funnel, invalidate_recruitment_analytics, CHART_SQL
+from web_helpers import get_db_connection, login_required, training_required
+from datetime import datetime, timedelta
+
+bp = Blueprint('recruitment', __name__)
+
+# ========================================================
+# 🚀 RECRUITMENT TRACKER (ATS)
+# ========================================================
+
+def log_candidate_action(cursor, candidate_id, note, from_stage=None, to_stage=None, score=None):
+    """
+    Writes a CandidateLogs row and mirrors it on the candidate
+    (LastNote / LastActionDate / LastFromStage / LastToStage) so list pages
+    don't need a per-row subquery on CandidateLogs. The caller commits, then
+    calls refresh_candidate_analytics().
+    """
+    score_column, score_value = (", EvaluationScore", ", ?") if score is not None else ("", "")
+    params = [candidate_id, from_stage, to_stage] + ([score] if score is not None else []) + [note, note, from_stage, to_stage, candidate_id]
+    cursor.execute(f"""
+        SET NOCOUNT ON;
+        DECLARE @Now DATETIME = GETDATE();
+        INSERT INTO CandidateLogs (CandidateID, FromStage, ToStage{score_column}, Note, ActionDate)
+        VALUES (?, ?, ?{score_value}, ?, @Now);
+        UPDATE Candidates
+        SET LastNote = ?, LastActionDate = @Now, LastFromStage = ?, LastToStage = ?
+        WHERE CandidateID = ?;
+    """, params)
+
+def refresh_candidate_analytics():
+    """
+    Adds the funnel facts for newly committed CandidateLogs rows (so the
+    analytics pages only read) and drops the cached analytics. Only the new
+    rows are processed; the summary is rebuilt by refresh_recruitment_funnel.py.
+    A failed refresh leaves the write in place; the next one picks its rows up.
+    """
+    from recruitment_funnel import extract_new_facts
+    conn = get_db_connection()
+    try:
+        extract_new_facts(conn.cursor())
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Recruitment Funnel Error: {e}")
+    finally:
+        conn.close()
+    invalidate_recruitment_analytics()
+
+@bp.route('/recruitment/analytics')
+@login_required
+def recruitment_analytics():
+    """ KPI cards and rejection reasons; the charts and funnel tables load after the page """
+    kpis = get_recruitment_kpis(get_db_connection)
+    return render_template('recruitment/recruitment_analytics.html', **kpis)
+
+@bp.route('/recruitment/analytics/funnel-partial')
+@login_required
+def recruitment_funnel_partial():
+    try:
+        return render_template('partials/recruitment_funnel.html', **get_recruitment_funnel(get_db_connection))
+    except Exception as e:
+        print(f"Error in partial: {e}")
+        return f"<div class='alert alert-danger'>Error loading data: {e}</div>"
+
+@bp.route('/api/recruitment/analytics/charts/<name>')
+@login_required
+def recruitment_chart_api(name):
+    """ Data for one recruitment chart (stages, sources, jobs, depts, trend), cached """
+    if name not in CHART_SQL:
+        return json.jsonify({'success': False, 'error': f'Unknown chart: {name}'}), 404
+    try:
+        return json.jsonify({'success': True, **get_recruitment_chart(get_db_connection, name)})
+    except Exception as e:
+        return json.jsonify({'success': False, 'error': str(e)})
+
+@bp.route('/api/recruitment/analytics')
+@login_required
+def recruitment_analytics_api():
+    """ Chart data for lazy loading """
+    try:
+        snapshot = get_recruitment_analytics(get_db_connection)
+        return json.jsonify({
+            'success': True,
+            'charts': snapshot['analytics'],
+            'kpis': {
+                'total_candidates': snapshot['total_candidates'],
+                'open_positions': snapshot['open_positions'],
+                'total_hired': snapshot['total_hired'],
+                'avg_hire_time': snapshot['avg_hire_time']
+            },
+            'funnel': snapshot['funnel']
+        })
+    except Exception as e:
+        return json.jsonify({'success': False, 'error': str(e)})
+
+@bp.route('/recruitment/jobs')
+def recruitment_jobs():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT J.*, COALESCE(D.DEPTNAME, 'عام') AS DEPTNAME_DISPLAY, D.DEPTNAME,
+               (SELECT COUNT(*) FROM Candidates C WHERE C.JobID = J.JobID) AS TotalCandidates
+        FROM Jobs J
+        LEFT JOIN DEPARTMENTS D ON J.DepartmentID = D.DEPTID
+        ORDER BY J.PostDate DESC
+    """)
+    jobs = cursor.fetchall()
+    
+    # Get unique departments safely
+    dept_set = {job.DEPTNAME for job in jobs if job.DEPTNAME}
+    unique_departments = sorted(dept_set)
+    
+    conn.close()
+    
+    return render_template('recruitment/jobs_dashboard.html', 
+                           jobs=jobs,
+                           unique_departments=unique_departments)
+
+@bp.route('/recruitment/job/delete/<int:job_id>', methods=['POST'])
+@training_required  # أو أي decorator للتحقق من الصلاحية (مثل @admin_required)
+def job_delete(job_id):
+    """ Safely delete a job and all its related data """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # First, check if the job exists and get its title for the flash message
+    cursor.execute("SELECT JobTitle FROM Jobs WHERE JobID = ?", (job_id,))
+    job = cursor.fetchone()
+
+    if not job:
+        conn.close()
+        flash("⚠️ الوظيفة المطلوبة غير موجودة.", "warning")
+        return redirect(url_for('recruitment.recruitment_jobs'))
+
+    job_title = job[0]  # لأن fetchone() يرجع tuple في pyodbc
+
+    def table_exists(table_name):
+        """ تحقق لو الجدول موجود في قاعدة البيانات """
+        cursor.execute("SELECT COUNT(*) FROM sys.tables WHERE name = ?", (table_name,))
+        return cursor.fetchone()[0] > 0
+
+    try:
+        # قائمة الجداول الفرعية المحتملة
+        related_tables = [
+            "Candidates",
+            "JobStages",
+            "JobApplications",
+            # أضف أي جدول تاني لو عايز (مثل Interviews لو موجود)
+        ]
+
+        # احذف من كل جدول لو موجود فقط
+        for table in related_tables:
+            if table_exists(table):
+                cursor.execute(f"DELETE FROM {table} WHERE JobID = ?", (job_id,))
+
+        # أخيرًا احذف الوظيفة نفسها (الجدول Jobs لازم يكون موجود دايمًا)
+        cursor.execute("DELETE FROM Jobs WHERE JobID = ?", (job_id,))
+
+        conn.commit()
+        invalidate_recruitment_analytics()
+        flash(f"🗑️ تم حذف الوظيفة \"{job_title}\" وجميع بياناتها بنجاح.", "success")
+    except Exception as e:
+        conn.rollback()
+        flash("❌ حدث خطأ أثناء حذف الوظيفة. يرجى المحاولة مرة أخرى.", "danger")
+        
+        # أضف ده مؤقتًا عشان تشوف الخطأ في الـ console (احذفه بعد الاختبار)
+        print("="*60)
+        print(f"خطأ في حذف الوظيفة {job_id}: {str(e)}")
+        print("="*60)
+    finally:
+        conn.close()
+
+    return redirect(url_for('recruitment.recruitment_jobs'))
+
+@bp.route('/recruitment/job/<int:job_id>/pipeline')
+def job_pipeline(job_id):
+    """ The Kanban Board for a specific Job """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Get Job Info
+    cursor.execute("SELECT * FROM Jobs WHERE JobID = ?", (job_id,))
+    job = cursor.fetchone()
+
+    # Get All Candidates (LastNote is kept on the candidate row by log_candidate_action)
+    # We also order by Application Date
+    cursor.execute("""
+        SELECT C.*
+        FROM Candidates C 
+        WHERE C.JobID = ?
+        ORDER BY C.ApplicationDate DESC
+    """, (job_id,))
+    candidates = cursor.fetchall()
+
+    # Get OTHER Active Jobs for the transfer dropdown (exclude current job)
+    cursor.execute("SELECT JobID, JobTitle FROM Jobs WHERE Status = 'Open' AND JobID != ?", (job_id,))
+    other_jobs = cursor.fetchall()
+
+    conn.close()
+
+    # Define Stages
+    stages = ['New', 'Screening', 'Interview', 'Training', 'Offer', 'Hired', 'Rejected']
+    
+    return render_template('recruitment/job_pipeline.html', 
+                           job=job, 
+                           candidates=candidates, 
+                           stages=stages,
+                           other_jobs=other_jobs) # Pass active jobs to template
+
+@bp.route('/recruitment/candidate/edit', methods=['POST'])
+def edit_candidate():
+    """ Edit candidate personal details including Application Date """
+    candidate_id = request.form['candidate_id']
+    name = request.form['name']
+    phone = request.form['phone']
+    email = request.form['email']
+    national_id = request.form['national_id']
+    source = request.form['source']
+    
+    # === NEW: Get Application Date ===
+    app_date = request.form['application_date']
+    # =================================
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        # === UPDATED QUERY: Added ApplicationDate = ? ===
+        cursor.execute("""
+            UPDATE Candidates 
+            SET FullName = ?, Phone = ?, Email = ?, NationalID = ?, Source = ?, ApplicationDate = ?,
+                PhoneKey = ?, NationalIDKey = ?
+            WHERE CandidateID = ?
+        """, (name, phone, email, national_id, source, app_date, *candidate_key_params(phone, national_id), candidate_id))
+        
+        conn.commit()
+        invalidate_recruitment_analytics()
+        flash('✅ تم تحديث بيانات المرشح وتاريخ التقديم بنجاح', 'success')
+
+        existing = find_existing_candidate(cursor, phone, national_id, exclude_id=candidate_id)
+        if existing:
+            flash(f"⚠️ تنبيه: نفس الهاتف أو الرقم القومي مسجل لمرشح آخر (الاسم: {existing.FullName} - الوظيفة: {existing.JobTitle})", 'warning')
+    except Exception as e:
+        conn.rollback()
+        flash(f'❌ حدث خطأ أثناء التحديث: {e}', 'danger')
+    finally:
+        conn.close()
+    
+    return redirect(request.referrer)
+
+@bp.route('/recruitment/candidate/transfer', methods=['POST'])
+def transfer_candidate_to_job():
+    candidate_id = request.form['candidate_id']
+    new_job_id = request.form['new_job_id']
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # 1. Get Old Job Title (for logging)
+    cursor.execute("""
+        SELECT J.JobTitle, C.JobID 
+        FROM Candidates C 
+        JOIN Jobs J ON C.JobID = J.JobID 
+        WHERE C.CandidateID = ?
+    """, (candidate_id,))
+    row = cursor.fetchone()
+    old_job_title = row.JobTitle if row else "Unknown"
+    old_job_id = row.JobID
+
+    # 2. Get New Job Title
+    cursor.execute("SELECT JobTitle FROM Jobs WHERE JobID = ?", (new_job_id,))
+    new_job_title = cursor.fetchone()[0]
+
+    # 3. Update Candidate (Change JobID and reset Status to 'New')
+    cursor.execute("""
+        UPDATE Candidates 
+        SET JobID = ?, Status = 'New' 
+        WHERE CandidateID = ?
+    """, (new_job_id, candidate_id))
+
+    # 4. Log the transfer
+    log_text = f"تم النقل من وظيفة ({old_job_title}) إلى ({new_job_title})"
+    log_candidate_action(cursor, candidate_id, log_text, 'Transfer', 'New')
+
+    conn.commit()
+    conn.close()
+    refresh_candidate_analytics()
+
+    flash(f'✅ تم نقل المرشح بنجاح إلى وظيفة {new_job_title}', 'success')
+    return redirect(url_for('recruitment.job_pipeline', job_id=old_job_id))
+
+@bp.route('/recruitment/candidate/add/<int:job_id>', methods=['POST'])
+def add_candidate_to_job(job_id):
+    """ Add candidate with National ID Check and Manual Date """
+    name = request.form['name']
+    phone = request.form['phone']
+    email = request.form['email']
+    source = request.form['source']
+    national_id = request.form['national_id']
+    
+    # === NEW: Get the date from the form ===
+    app_date_str = request.form.get('application_date')
+    
+    # If for some reason it's empty, fallback to current time
+    if not app_date_str:
+        app_date = datetime.now()
+    else:
+        app_date = app_date_str 
+    # =======================================
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    # --- SMART DUPLICATE CHECK (normalized phone / national ID keys) ---
+    existing = find_existing_candidate(cursor, phone, national_id)
+    
+    if existing:
+        msg = f"⚠️ تنبيه: هذا المرشح موجود بالفعل! (الاسم: {existing.FullName} - الوظيفة: {existing.JobTitle} - الحالة: {existing.Status})"
+        flash(msg, 'warning')
+        conn.close()
+        return redirect(url_for('recruitment.job_pipeline', job_id=job_id))
+
+    # --- INSERT (Updated Query) ---
+    # Replaced GETDATE() with ? and added app_date to parameters
+    cursor.execute("""
+        INSERT INTO Candidates (JobID, FullName, Phone, Email, Source, NationalID, Status, ApplicationDate, PhoneKey, NationalIDKey)
+        VALUES (?, ?, ?, ?, ?, ?, 'New', ?, ?, ?)
+    """, (job_id, name, phone, email, source, national_id, app_date, *candidate_key_params(phone, national_id)))
+    
+    conn.commit()
+    invalidate_recruitment_analytics()
+    conn.close()
+    
+    flash('✅ تم إضافة المرشح بنجاح!', 'success')
+    return redirect(url_for('recruitment.job_pipeline', job_id=job_id))
+
+@bp.route('/recruitment/candidate/import/<int:job_id>', methods=['POST'])
+@login_required
+def import_candidates_to_job(job_id):
+    """ Bulk add candidates from a CSV / Excel file, with a per-row report (optionally a dry run) """
+    from candidate_import import import_candidates
+    file = request.files.get('candidates_file')
+    if not file or not file.filename:
+        flash('⚠️ يرجى اختيار ملف CSV أو Excel', 'warning')
+        return redirect(url_for('recruitment.job_pipeline', job_id=job_id))
+    dry_run = request.form.get('dry_run') == 'on'
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT JobID, JobTitle FROM Jobs WHERE JobID = ?", (job_id,))
+        job = cursor.fetchone()
+        if not job:
+            flash('❌ الوظيفة غير موجودة', 'danger')
+            return redirect(url_for('recruitment.recruitment_jobs'))
+
+        report = import_candidates(cursor, job_id, file.stream, file.filename)
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+            refresh_candidate_analytics()
+    except ValueError as e:
+        conn.rollback()
+        flash(f'⚠️ {e}', 'warning')
+        return redirect(url_for('recruitment.job_pipeline', job_id=job_id))
+    except Exception as e:
+        conn.rollback()
+        flash(f'❌ خطأ أثناء الاستيراد: {e}', 'danger')
+        return redirect(url_for('recruitment.job_pipeline', job_id=job_id))
+    finally:
+        conn.close()
+
+    return render_template('recruitment/candidate_import_report.html', job=job, report=report, dry_run=dry_run)
+
+@bp.route('/recruitment/duplicates')
+@login_required
+def recruitment_duplicates():
+    """ Candidates sharing a phone or national ID (after normalization), grouped """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        clusters = find_duplicate_clusters(cursor)
+    except Exception as e:
+        flash(f'❌ خطأ في قاعدة البيانات: {e}', 'danger')
+        clusters = []
+    finally:
+        conn.close()
+    return render_template('recruitment/candidate_duplicates.html', clusters=clusters)
+
+@bp.route('/recruitment/candidate/update_docs', methods=['POST'])
+def update_candidate_docs():
+    candidate_id = request.form['candidate_id']
+    
+    # Get Checkbox values (returns '1' if checked, else None)
+    doc_birth = 1 if 'doc_birth' in request.form else 0
+    doc_degree = 1 if 'doc_degree' in request.form else 0
+    doc_military = 1 if 'doc_military' in request.form else 0
+    doc_criminal = 1 if 'doc_criminal' in request.form else 0
+    doc_photo = 1 if 'doc_photo' in request.form else 0
+    doc_id = 1 if 'doc_id' in request.form else 0
+    doc_sheet = 1 if 'doc_sheet' in request.form else 0
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        UPDATE Candidates 
+        SET DocBirthCert = ?, DocDegree = ?, DocMilitary = ?, 
+            DocCriminalRecord = ?, DocPersonalPhoto = ?, DocIDCard = ?, DocInfoSheet = ?
+        WHERE CandidateID = ?
+    """, (doc_birth, doc_degree, doc_military, doc_criminal, doc_photo, doc_id, doc_sheet, candidate_id))
+    
+    conn.commit()
+    conn.close()
+    
+    flash('✅ تم تحديث ملفات المرشح بنجاح', 'success')
+    return redirect(request.referrer)
+
+@bp.route('/recruitment/waiting')
+def recruitment_waiting():
+    """ Dashboard for candidates in Waiting List with Filters & Notes """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    # 1. Get Filters
+    search_query = request.args.get('search', '').strip()
+    job_filter = request.args.get('job_id')
+
+    # 2. Build Query
+    # LastNote is the *latest* note (e.g. the one added when they were moved to 'Waiting')
+    sql = """
+        SELECT 
+            C.CandidateID, C.FullName, C.Phone, C.ApplicationDate, C.Status,
+            J.JobTitle, J.HiringManager, D.DEPTNAME, C.LastNote
+        FROM Candidates C
+        JOIN Jobs J ON C.JobID = J.JobID
+        LEFT JOIN DEPARTMENTS D ON J.DepartmentID = D.DEPTID
+        WHERE C.Status = 'Waiting'
+    """
+    
+    params = []
+
+    # 3. Apply Filters
+    if search_query:
+        sql += " AND (C.FullName LIKE ? OR C.Phone LIKE ?)"
+        params.extend([f"%{search_query}%", f"%{search_query}%"])
+    
+    if job_filter and job_filter.isdigit():
+        sql += " AND C.JobID = ?"
+        params.append(job_filter)
+
+    sql += " ORDER BY C.ApplicationDate DESC"
+
+    cursor.execute(sql, params)
+    candidates = cursor.fetchall()
+
+    # 4. Fetch Jobs for Filter Dropdown
+    cursor.execute("SELECT JobID, JobTitle FROM Jobs ORDER BY JobTitle")
+    all_jobs = cursor.fetchall()
+
+    conn.close()
+    
+    return render_template('recruitment/waiting.html', 
+                           candidates=candidates, 
+                           all_jobs=all_jobs,
+                           current_filters=request.args)
+
+@bp.route('/recruitment/resign', methods=['POST'])
+def submit_resignation():
+    candidate_id = request.form['candidate_id']
+    type_id = request.form['termination_type_id']
+    reason_id = request.form['termination_reason_id']
+    notes = request.form['notes']
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    # Get Text for Logging
+    cursor.execute("SELECT TypeText FROM TerminationTypes WHERE TypeID = ?", (type_id,))
+    type_text = cursor.fetchone()[0]
+    
+    cursor.execute("SELECT ReasonText FROM TerminationReasons WHERE ReasonID = ?", (reason_id,))
+    reason_text = cursor.fetchone()[0]
+    
+    # 1. Update Candidate Status (Generalizing status to 'Terminated' or keeping 'Resigned'?)
+    # For backward compatibility and clarity, let's stick to 'Resigned' if it's resignation, 
+    # but maybe we should use 'Terminated' or the actual Type Text?
+    # The user asked to "merge it". Let's update status to 'Terminated' or 'Resigned' 
+    # depending on what makes sense. But the Kanban only had 'Resigned'. 
+    # Let's decide to map everything to 'Resigned' status in the pipeline for now, 
+    # or better, add 'Terminated' status validation.
+    # Given the complexity, let's assume 'Resigned' acts as a catch-all "Left the company" status 
+    # in the UI, or we change the status in DB to 'Terminated' and update template to show it green/red/etc.
+    # Let's stick to 'Resigned' as the status key for now to avoid breaking other parts, 
+    # but log the specific type.
+    
+    cursor.execute("UPDATE Candidates SET Status = 'Resigned' WHERE CandidateID = ?", (candidate_id,))
+    
+    # 2. Add to Log
+    log_note = f"{type_text}: {reason_text} - {notes}"
+    log_candidate_action(cursor, candidate_id, log_note, 'Hired', 'Resigned', score=0)
+    
+    conn.commit()
+    conn.close()
+    refresh_candidate_analytics()
+    
+    flash(f'🚪 تم تسجيل {type_text} بنجاح.', 'warning')
+    return redirect(url_for('recruitment.recruitment_history'))
+
+@bp.route('/recruitment/training')
+def recruitment_training():
+    """ Dedicated Dashboard for Active Trainees with Countdown """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    # Fetch all candidates currently in 'Training'
+    cursor.execute("""
+        SELECT C.CandidateID, C.FullName, C.Phone, C.TrainingStartDate, C.TrainerName, J.JobTitle, C.NationalID 
+        FROM Candidates C
+        JOIN Jobs J ON C.JobID = J.JobID
+        WHERE C.Status = 'Training'
+        ORDER BY C.TrainingStartDate DESC
+    """)
+    rows = cursor.fetchall()
+    conn.close()
+
+    trainees = []
+    today = datetime.now().date()
+
+    for row in rows:
+        start_date = row.TrainingStartDate.date() if row.TrainingStartDate else today
+        end_date = start_date + timedelta(days=90) # 3 Months Rule
+        
+        # Calculate Progress
+        total_days = 90
+        days_passed = (today - start_date).days
+        days_left = (end_date - today).days
+        
+        # Calculate Percentage for the Bar (0% to 100%)
+        percent = (days_passed / total_days) * 100
+        if percent > 100: percent = 100
+        if percent < 0: percent = 0
+
+        # Determine Color based on urgency
+        color = "success" # Green (Early)
+        if percent > 50: color = "warning" # Yellow (Halfway)
+        if percent > 85: color = "danger"  # Red (Almost done)
+
+        trainees.append({
+        'id': row.CandidateID,
+        'name': row.FullName,
+        'job': row.JobTitle,
+        'phone': row.Phone,
+        'trainer': row.TrainerName,
+        'national_id': row.NationalID,  # <--- Add this line
+        'start_date': start_date,
+        'end_date': end_date,
+        'days_left': days_left,
+        'percent': int(percent),
+        'color': color
+    })
+
+    return render_template('recruitment/recruitment_training.html', trainees=trainees)
+
+@bp.route('/recruitment/assign_trainer', methods=['POST'])
+def assign_trainer():
+    """ Assign a trainer to a candidate """
+    candidate_id = request.form['candidate_id']
+    trainer_name = request.form['trainer_name']
+    
+    conn = get_db_connection()
+    conn.execute("UPDATE Candidates SET TrainerName = ? WHERE CandidateID = ?", (trainer_name, candidate_id))
+    conn.commit()
+    conn.close()
+    
+    flash('✅ تم تعيين المدرب بنجاح', 'success')
+    return redirect(url_for('recruitment.recruitment_training'))
+
+@bp.route('/recruitment/move_with_eval', methods=['POST'])
+def move_candidate_with_eval():
+    """ 
+    Moves candidate to a new stage AND saves the Score/Reason.
+    Also records the Start Date if moving to 'Training'.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # 1. Get Data from Modal
+    candidate_id = request.form['candidate_id']
+    new_stage = request.form['new_stage']
+    score = request.form.get('score') or 0
+    note = request.form.get('note')
+
+    # 2. Get Current Stage (for history)
+    cursor.execute("SELECT Status, JobID FROM Candidates WHERE CandidateID = ?", (candidate_id,))
+    row = cursor.fetchone()
+    current_stage = row.Status
+    job_id = row.JobID
+
+    # 3. Save to History Log
+    log_candidate_action(cursor, candidate_id, note, current_stage, new_stage, score=score)
+
+    # 4. Update Status (WITH TRAINING LOGIC)
+    # If moving TO Training, we must save the Start Date for the countdown
+    if new_stage == 'Training':
+        cursor.execute("""
+            UPDATE Candidates 
+            SET Status = ?, TrainingStartDate = GETDATE() 
+            WHERE CandidateID = ?
+        """, (new_stage, candidate_id))
+    else:
+        # Normal move for other stages
+        cursor.execute("UPDATE Candidates SET Status = ? WHERE CandidateID = ?", (new_stage, candidate_id))
+
+    conn.commit()
+    conn.close()
+    refresh_candidate_analytics()
+    
+    flash(f'✅ Candidate moved to {new_stage} successfully!', 'success')
+    
+    # If we are on the Training Dashboard, go back there. Otherwise, go to Pipeline.
+    if 'recruitment/training' in request.referrer:
+        return redirect(url_for('recruitment.recruitment_training'))
+    else:
+        return redirect(url_for('recruitment.job_pipeline', job_id=job_id))
+
+@bp.route('/recruitment/history')
+def recruitment_history():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    # آخر إجراء لكل مرشح محفوظ في جدول المرشحين نفسه (log_candidate_action)
+    cursor.execute("""
+        SELECT 
+            C.LastFromStage AS FromStage, C.LastToStage AS ToStage, C.LastNote AS Note, C.LastActionDate AS ActionDate,
+            C.CandidateID, C.FullName, C.Phone, C.Email, C.Status as CurrentStatus, C.NationalID,
+            J.JobTitle, D.DEPTNAME
+        FROM Candidates C
+        LEFT JOIN Jobs J ON C.JobID = J.JobID
+        LEFT JOIN DEPARTMENTS D ON J.DepartmentID = D.DEPTID
+        WHERE C.LastActionDate IS NOT NULL
+        ORDER BY C.LastActionDate DESC
+    """)
+    logs = cursor.fetchall()
+
+    # Fetch Termination Types and Reasons
+    try:
+        cursor.execute("SELECT * FROM TerminationTypes")
+        types = cursor.fetchall()
+        
+        cursor.execute("SELECT * FROM TerminationReasons")
+        reasons = cursor.fetchall()
+    except:
+        types = []
+        reasons = [] 
+
+
+    conn.close()
+    return render_template('recruitment/recruitment_history.html', logs=logs, types=types, reasons=reasons)
+
+@bp.route('/recruitment/job/toggle/<int:job_id>', methods=['POST'])
+@login_required  # Or @admin_required depending on your needs
+def job_toggle_status(job_id):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        # Toggle logic: If Open -> Closed, If Closed -> Open
+        cursor.execute("""
+            UPDATE Jobs 
+            SET Status = CASE WHEN Status = 'Open' THEN 'Closed' ELSE 'Open' END 
+            OUTPUT INSERTED.Status
+            WHERE JobID = ?
+        """, (job_id,))
+        
+        row = cursor.fetchone()
+        if row:
+            new_status = row[0]
+            conn.commit()
+            invalidate_recruitment_analytics()
+            return json.jsonify({'success': True, 'new_status': new_status})
+        else:
+            return json.jsonify({'success': False, 'error': 'Job not found'})
+
+    except Exception as e:
+        conn.rollback()
+        return json.jsonify({'success': False, 'error': str(e)})
+    finally:
+        conn.close()
+
+@bp.route('/recruitment/settings', methods=['GET', 'POST'])
+def recruitment_settings():
+    """ Page to manage Termination Types and Reasons """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # 1. Handle Adding a New Type
+    if request.method == 'POST' and 'new_type' in request.form:
+        new_type = request.form['new_type'].strip()
+        if new_type:
+            cursor.execute("INSERT INTO TerminationTypes (TypeText) VALUES (?)", (new_type,))
+            conn.commit()
+            flash('✅ تم إضافة نوع الإنهاء بنجاح', 'success')
+            
+    # 2. Handle Deleting a Type
+    if request.method == 'POST' and 'delete_type_id' in request.form:
+        delete_id = request.form['delete_type_id']
+        try:
+            cursor.execute("DELETE FROM TerminationTypes WHERE TypeID = ?", (delete_id,))
+            conn.commit()
+            flash('🗑️ تم حذف نوع الإنهاء', 'warning')
+        except Exception as e:
+            flash(f'❌ لا يمكن حذف هذا النوع لوجود أسباب مرتبطة به.', 'danger')
+
+    # 3. Handle Adding a New Reason
+    if request.method == 'POST' and 'new_reason' in request.form:
+        new_reason = request.form['new_reason'].strip()
+        type_id = request.form['type_id']
+        if new_reason and type_id:
+            cursor.execute("INSERT INTO TerminationReasons (ReasonText, TypeID) VALUES (?, ?)", (new_reason, type_id))
+            conn.commit()
+            flash('✅ تم إضافة السبب بنجاح', 'success')
+
+    # 4. Handle Deleting a Reason
+    if request.method == 'POST' and 'delete_reason_id' in request.form:
+        delete_id = request.form['delete_reason_id']
+        cursor.execute("DELETE FROM TerminationReasons WHERE ReasonID = ?", (delete_id,))
+        conn.commit()
+        flash('🗑️ تم حذف السبب', 'warning')
+
+    # Fetch All Data
+    cursor.execute("SELECT * FROM TerminationTypes")
+    types = cursor.fetchall()
+    
+    cursor.execute("""
+        SELECT R.*, T.TypeText 
+        FROM TerminationReasons R
+        JOIN TerminationTypes T ON R.TypeID = T.TypeID
+        ORDER BY T.TypeText, R.ReasonText
+    """)
+    reasons = cursor.fetchall()
+    
+    conn.close()
+    return render_template('recruitment/recruitment_settings.html', types=types, reasons=reasons)
+
+@bp.route('/recruitment/job/add', methods=['GET', 'POST'])
+def job_create():
+    """ 
+    Form to create a new Job Requisition.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    if request.method == 'POST':
+        # 1. Get Data from Form
+        title = request.form['title']
+        manager = request.form['manager']
+        dept_id = request.form.get('dept_id') # Can be empty
+        desc = request.form['description']
+        
+        # Handle empty department
+        if not dept_id:
+            dept_id = None
+
+        # 2. Insert into Database
+        cursor.execute("""
+            INSERT INTO Jobs (JobTitle, DepartmentID, HiringManager, Description, Status, PostDate)
+            VALUES (?, ?, ?, ?, 'Open', GETDATE())
+        """, (title, dept_id, manager, desc))
+        
+        conn.commit()
+        invalidate_recruitment_analytics()
+        conn.close()
+        
+        flash('✅ Job Requisition Created Successfully!', 'success')
+        return redirect(url_for('recruitment.recruitment_jobs'))
+
+    # GET Request: Show the form
+    cursor.execute("SELECT DEPTID, DEPTNAME FROM DEPARTMENTS ORDER BY DEPTNAME")
+    depts = cursor.fetchall()
+    conn.close()
+    
+    return render_template('job_form.html', depts=depts)
+
+# =========================================
+# =========================================
+
+@bp.route('/recruitment/archive')
+def recruitment_archive():
+    """ Displays the list of Archived Candidates """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    # Fetch archived candidates with their Job Title
+    cursor.execute("""
+        SELECT C.CandidateID, C.FullName, C.Phone, C.Email, C.ApplicationDate, 
+               J.JobTitle, D.DEPTNAME, C.HireDate, C.EndDate, C.LastNote
+        FROM Candidates C
+        LEFT JOIN Jobs J ON C.JobID = J.JobID
+        LEFT JOIN DEPARTMENTS D ON J.DepartmentID = D.DEPTID
+        WHERE C.Status = 'Archived'
+        ORDER BY C.ApplicationDate DESC
+    """)
+    candidates = cursor.fetchall()
+    
+    # Fetch Jobs for Manual Add Dropdown
+    cursor.execute("SELECT JobID, JobTitle FROM Jobs WHERE Status = 'Open'")
+    jobs = cursor.fetchall()
+    
+    conn.close()
+    
+    return render_template('recruitment/recruitment_archive.html', candidates=candidates, jobs=jobs)
+
+@bp.route('/recruitment/archive/add', methods=['POST'])
+def recruitment_archive_add():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        fullname = request.form.get('fullname')
+        phone = request.form.get('phone')
+        email = request.form.get('email') or None
+        national_id = request.form.get('national_id') or None
+        job_id = request.form.get('job_id') or None
+        note = request.form.get('note')
+        hire_date = request.form.get('hire_date') or None
+        end_date = request.form.get('end_date') or None
+
+        if not fullname:
+             flash('❌ Full Name is required', 'danger')
+        else:
+            cursor.execute("""
+               INSERT INTO Candidates (FullName, Phone, Email, NationalID, JobID, Status, ApplicationDate, HireDate, EndDate, Source, PhoneKey, NationalIDKey)
+               OUTPUT INSERTED.CandidateID
+               VALUES (?, ?, ?, ?, ?, 'Archived', GETDATE(), ?, ?, 'Manual Archive', ?, ?)
+            """, (fullname, phone, email, national_id, job_id, hire_date, end_date, *candidate_key_params(phone, national_id)))
+            
+            cid = cursor.fetchone()[0]
+            
+            if note:
+                log_candidate_action(cursor, cid, note)
+                
+            conn.commit()
+            refresh_candidate_analytics()
+            flash('✅ Candidate manually added to archive.', 'success')
+    except Exception as e:
+        conn.rollback()
+        flash(f'❌ Error adding candidate: {e}', 'danger')
+    finally:
+        conn.close()
+        
+    return redirect(url_for('recruitment.recruitment_archive'))
+
+@bp.route('/recruitment/archive_action', methods=['POST'])
+def archive_candidate():
+    """ Moves a candidate to the Archive status from anywhere """
+    candidate_id = request.form['candidate_id']
+    note = request.form.get('note', 'Moved to Archive')
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Get current status to log it properly
+    cursor.execute("SELECT Status, FullName FROM Candidates WHERE CandidateID = ?", (candidate_id,))
+    row = cursor.fetchone()
+    
+    if row:
+        old_status = row.Status
+        name = row.FullName
+
+        # Update Status to 'Archived'
+        cursor.execute("UPDATE Candidates SET Status = 'Archived' WHERE CandidateID = ?", (candidate_id,))
+
+        # Log the action
+        log_candidate_action(cursor, candidate_id, note, old_status, 'Archived')
+
+        flash(f'📦 Candidate "{name}" archived successfully.', 'success')
+
+    conn.commit()
+    conn.close()
+    refresh_candidate_analytics()
+    return redirect(request.referrer)
+
+@bp.route('/recruitment/restore', methods=['POST'])
+def restore_candidate():
+    """ Restores candidate from Archive back to 'New' """
+    candidate_id = request.form['candidate_id']
+    target_stage = 'New' # Default restore to New
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("UPDATE Candidates SET Status = ? WHERE CandidateID = ?", (target_stage, candidate_id))
+    
+    log_candidate_action(cursor, candidate_id, 'Restored from Archive', 'Archived', target_stage)
+    
+    conn.commit()
+    conn.close()
+    refresh_candidate_analytics()
+    
+    flash('♻️ Candidate restored successfully!', 'success')
+    return redirect(url_for('recruitment.recruitment_archive'))
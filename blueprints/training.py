@@ -0,0 +1,1417 @@
+"""
+Training (LMS): calendar, courses, sessions and daily schedule, enrollments, attendance and history.
+"""
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, json
+from evaluation_form import invalidate_evaluation_form_cache
+from web_helpers import get_db_connection, login_required, training_required
+from datetime import datetime
+from collections import defaultdict
+
+bp = Blueprint('training', __name__)
+
+# ===================== LMS: TRAINING MODULE =====================
+
+
+
+@bp.route('/training/calendar')
+@login_required
+def training_calendar():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    # Get courses for dropdown
+    cursor.execute("SELECT TrainingCourseID, TrainingCourseText FROM TrainingCourses")
+    courses = cursor.fetchall()
+    # Get internal instructors
+    cursor.execute("""
+    SELECT UI.USERID, UI.NAME, D.DEPTNAME
+    FROM USERINFO UI
+    LEFT JOIN DEPARTMENTS D ON UI.DEFAULTDEPTID = D.DEPTID
+    WHERE UI.IsActive = 1
+""")
+    instructors = cursor.fetchall()
+    conn.close()
+    return render_template('training_calendar.html', courses=courses, instructors=instructors)
+
+# 1. API: Get Events (Updated to include End Date)
+@bp.route('/api/training/events')
+@login_required
+def get_training_events():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT S.SessionID, S.SessionDate, S.EndDate, S.IsExternal, S.EventType,
+               TC.TrainingCourseText,
+               U.Name as IntTrainer, S.ExternalTrainerName, S.ExternalCompany
+        FROM TrainingSessions S
+        LEFT JOIN TrainingCourses TC ON S.CourseID = TC.TrainingCourseID
+        LEFT JOIN USERINFO U ON S.InstructorID = U.USERID
+        LEFT JOIN DEPARTMENTS D ON U.DEFAULTDEPTID = D.DEPTID
+
+    """)
+    rows = cursor.fetchall()
+    conn.close()
+    
+    events = []
+    for r in rows:
+        trainer = f"{r.ExternalTrainerName}" if r.IsExternal else r.IntTrainer
+        title = f"{r.TrainingCourseText} - {trainer}"
+        
+        # Color Logic
+        if r.IsExternal: color = '#e67e22' # Orange
+        elif r.EventType == 'Course': color = '#27ae60' # Green
+        else: color = '#004d7a' # Blue
+        
+        # Handle End Date for FullCalendar (It requires end date to be +1 day to show correctly)
+        start = r.SessionDate.strftime('%Y-%m-%d')
+        end = None
+        if r.EndDate:
+            # Add 1 day because FullCalendar end date is exclusive
+            end_obj = r.EndDate + datetime.timedelta(days=1)
+            end = end_obj.strftime('%Y-%m-%d')
+            
+        events.append({
+            'id': r.SessionID,
+            'title': title,
+            'start': start,
+            'end': end,  # Pass the calculated end date
+            'backgroundColor': color,
+            'url': url_for('training.training_session_detail', sid=r.SessionID)
+        })
+    return json.dumps(events)
+
+# 2. API: Add Event (Updated to save End Date)
+@bp.route('/training/add_event', methods=['POST'])
+@login_required
+def training_add_event():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        course_id = request.form['course_id']
+        
+        # Get Start and End Dates
+        start_date = request.form['start_date']
+        end_date = request.form.get('end_date') # Could be empty if single day
+        
+        # If no end date selected, make it same as start date
+        if not end_date:
+            end_date = start_date
+
+        location = request.form['location']
+        event_type = request.form.get('event_type', 'Session')
+        trainer_type = request.form['trainer_type']
+        
+        if trainer_type == 'external':
+            is_external = 1
+            instructor_id = None
+            ext_name = request.form['ext_name']
+            ext_comp = request.form['ext_company']
+        else:
+            is_external = 0
+            instructor_id = request.form['instructor_id']
+            ext_name = None
+            ext_comp = None
+
+        cursor.execute("""
+            INSERT INTO TrainingSessions 
+            (CourseID, SessionDate, EndDate, Location, IsExternal, InstructorID, ExternalTrainerName, ExternalCompany, EventType, MaxCapacity) 
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 20)
+        """, (course_id, start_date, end_date, location, is_external, instructor_id, ext_name, ext_comp, event_type))
+        
+        conn.commit()
+        flash('✅ تم جدولة التدريب بنجاح', 'success')
+    except Exception as e:
+        flash(f'Error: {e}', 'danger')
+    finally:
+        conn.close()
+    return redirect(url_for('training.training_calendar'))
+
+@bp.route('/training/grade', methods=['POST'])
+@login_required
+def training_grade():
+    enrollment_id = request.form['enrollment_id']
+    grade = request.form['grade']
+    feedback = request.form['feedback']
+    
+    status = 'Passed' if float(grade) >= 50 else 'Failed'
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        UPDATE TrainingEnrollments 
+        SET Grade = ?, PassStatus = ?, InstructorFeedback = ?, AttendanceStatus = 'Present'
+        WHERE EnrollmentID = ?
+    """, (grade, status, feedback, enrollment_id))
+    conn.commit()
+    conn.close()
+    return redirect(request.referrer)
+
+@bp.route('/training/course/edit/<int:cid>', methods=['GET', 'POST'])
+@login_required
+def training_course_edit(cid):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    if request.method == 'POST':
+        title = request.form.get('title')
+        desc = request.form.get('description')
+        
+        # Get Department ID
+        dept_id = request.form.get('department')
+        dept_id = int(dept_id) if dept_id else None
+
+        duration = request.form.get('duration') or None
+        diff = request.form.get('difficulty') or None
+        is_active = 1 if request.form.get('is_active') else 0
+        
+        # UPDATE AppliesToDeptID
+        cursor.execute("""
+            UPDATE TrainingCourses
+            SET TrainingCourseText=?, Description=?, AppliesToDeptID=?, 
+                DurationHours=?, Difficulty=?, IsActive=?
+            WHERE TrainingCourseID=?
+        """, (title, desc, dept_id, duration, diff, is_active, cid))
+        conn.commit()
+        invalidate_evaluation_form_cache()
+        conn.close()
+        
+        flash("✅ تم تحديث الدورة بنجاح", "success")
+        return redirect(url_for('training.training_courses'))
+
+    cursor.execute("SELECT * FROM TrainingCourses WHERE TrainingCourseID = ?", (cid,))
+    course = cursor.fetchone()
+    cursor.execute("SELECT DEPTID, DEPTNAME FROM DEPARTMENTS ORDER BY DEPTNAME")
+    depts = cursor.fetchall()
+    conn.close()
+    
+    return render_template('course_form.html', action="تعديل", depts=depts, course=course)
+
+@bp.route('/training/course/delete/<int:cid>', methods=['POST'])
+@login_required
+def training_course_delete(cid):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        # Check usage before delete
+        cursor.execute("SELECT COUNT(*) as cnt FROM Evaluations WHERE TrainingCourseID = ?", (cid,))
+        if cursor.fetchone().cnt > 0:
+             flash('❌ لا يمكن حذف دورة مستخدمة في تقييمات سابقة.', 'danger')
+        else:
+            cursor.execute("DELETE FROM TrainingCourses WHERE TrainingCourseID = ?", (cid,))
+            conn.commit()
+            invalidate_evaluation_form_cache()
+            flash("✅ تم حذف الدورة", "success")
+    except Exception as e:
+        conn.rollback()
+        flash(f"❌ حدث خطأ: {e}", "danger")
+    finally:
+        conn.close()
+    return redirect(url_for('training.training_courses')) # Redirects to the list
+
+@bp.route('/training/session/<int:sid>/print')
+@login_required
+def training_session_print(sid):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # 1. Session Info
+    cursor.execute("""
+        SELECT S.*, C.TrainingCourseText 
+        FROM TrainingSessions S
+        LEFT JOIN TrainingCourses C ON S.CourseID = C.TrainingCourseID
+        WHERE SessionID = ?
+    """, (sid,))
+    session_data = cursor.fetchone()
+
+    if not session_data:
+        flash("الجلسة غير موجودة.", "danger")
+        conn.close()
+        return redirect(url_for('training.training_sessions'))
+
+    # 2. Trainer Names (دعم متعدد المدربين + خارجي)
+    trainer_display = ""
+    if session_data.IsExternal:
+        trainer_display = session_data.ExternalTrainerName or "مدرب خارجي"
+        if session_data.ExternalCompany:
+            trainer_display += f" - {session_data.ExternalCompany}"
+    else:
+        if session_data.InstructorID:
+            try:
+                instructor_ids = [int(x.strip()) for x in session_data.InstructorID.split(',') if x.strip()]
+                if instructor_ids:
+                    placeholders = ','.join(['?'] * len(instructor_ids))
+                    cursor.execute(f"SELECT NAME FROM USERINFO WHERE USERID IN ({placeholders}) ORDER BY NAME", instructor_ids)
+                    names = [row.NAME for row in cursor.fetchall()]
+                    trainer_display = "، ".join(names)
+                else:
+                    trainer_display = "غير محدد"
+            except:
+                trainer_display = "خطأ في بيانات المدربين"
+        else:
+            trainer_display = "غير محدد"
+
+    # 3. Enrollments
+    cursor.execute("""
+        SELECT E.EnrollmentID, UI.NAME, UI.BADGENUMBER, D.DEPTNAME
+        FROM TrainingEnrollments E
+        LEFT JOIN USERINFO UI ON E.EmployeeUserID = UI.USERID
+        LEFT JOIN DEPARTMENTS D ON UI.DEFAULTDEPTID = D.DEPTID
+        WHERE E.SessionID = ?
+        ORDER BY UI.Name
+    """, (sid,))
+    enrollments = cursor.fetchall()
+
+    conn.close()
+
+    # === أضف التاريخ الحالي ===
+    print_date = datetime.now().strftime('%d/%m/%Y')
+
+    return render_template('training_print.html', 
+                           training_session=session_data,
+                           trainer_display=trainer_display,
+                           enrollments=enrollments,
+                           print_date=print_date)  # ← مرّر التاريخ هنا
+
+@bp.route('/training_courses/add', methods=['GET', 'POST'])
+@login_required
+def training_courses_add():
+    conn = get_db_connection(); cursor = conn.cursor()  
+    cursor.execute("SELECT DEPTID, DEPTNAME FROM DEPARTMENTS ORDER BY DEPTID"); depts = cursor.fetchall()
+    if request.method == 'POST':
+        text = request.form['text']; dept_id = request.form.get('dept_id') or None
+        cursor.execute("INSERT INTO TrainingCourses (TrainingCourseText, AppliesToDeptID) VALUES (?, ?)", (text, dept_id)); conn.commit(); conn.close()
+        invalidate_evaluation_form_cache()
+        return redirect(url_for('training.training_courses_list'))
+    conn.close()
+    return render_template('training_course_form.html', departments=depts, action='Add')
+
+@bp.route('/training/session/delete/<int:sid>', methods=['POST'])
+@login_required  # فقط الـ Admin يقدر يحذف
+def training_session_delete(sid):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        # حذف الجلسة (الحذف المتسلسل cascade هيحذف الأيام والحضور والتسجيلات تلقائيًا إذا كانت الـ FK مظبوطة)
+        cursor.execute("DELETE FROM TrainingSessions WHERE SessionID = ?", (sid,))
+        
+        if cursor.rowcount == 0:
+            flash("❌ الجلسة غير موجودة أو تم حذفها مسبقًا", "danger")
+        else:
+            conn.commit()
+            flash("✅ تم حذف الجلسة التدريبية بنجاح مع كل البيانات المرتبطة", "success")
+    except Exception as e:
+        conn.rollback()
+        flash(f"❌ حدث خطأ أثناء الحذف: {e}", "danger")
+        print(f"Delete Session Error: {e}")
+    finally:
+        conn.close()
+    
+    return redirect(url_for('training.training_sessions'))
+
+@bp.route('/training_courses')
+@login_required
+def training_courses_list():
+    conn = get_db_connection(); cursor = conn.cursor()
+    cursor.execute("SELECT TC.TrainingCourseID, TC.TrainingCourseText, D.DEPTNAME FROM TrainingCourses TC LEFT JOIN DEPARTMENTS D ON TC.AppliesToDeptID = D.DEPTID"); rows = cursor.fetchall(); conn.close()
+    return render_template('training_courses_list.html', courses=rows)
+
+# ===================== MANUAL TRAINING HISTORY ENTRY =====================
+
+@bp.route('/training/manual_history', methods=['GET', 'POST'])
+@login_required
+def training_manual_history():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    if request.method == 'POST':
+        try:
+            user_id = request.form['user_id']
+            course_id = request.form['course_id']
+            date = request.form['date']
+            grade = request.form.get('grade') or None
+            feedback = request.form.get('feedback') or 'Legacy Data'
+            
+            # 1. Create a "Ghost" Session for this past record
+            # We mark it as 'Completed' and 'Legacy' so it doesn't clutter the main calendar too much
+            cursor.execute("""
+                INSERT INTO TrainingSessions 
+                (CourseID, SessionDate, Location, Status, MaxCapacity, IsExternal, EventType)
+                VALUES (?, ?, 'Historical Record', 'Completed', 1, 0, 'History')
+            """, (course_id, date))
+            
+            # Get the ID of the session we just created
+            cursor.execute("SELECT @@IDENTITY")
+            session_id = cursor.fetchone()[0]
+
+            # 2. Enroll the employee immediately
+            status = 'Passed' if grade and float(grade) >= 50 else 'Completed'
+            
+            cursor.execute("""
+                INSERT INTO TrainingEnrollments 
+                (SessionID, EmployeeUserID, AttendanceStatus, Grade, PassStatus, InstructorFeedback)
+                VALUES (?, ?, 'Present', ?, ?, ?)
+            """, (session_id, user_id, grade, status, feedback))
+            
+            conn.commit()
+            flash('✅ تم إضافة السجل التاريخي بنجاح', 'success')
+            
+        except Exception as e:
+            conn.rollback()
+            flash(f'❌ حدث خطأ: {e}', 'danger')
+        finally:
+            conn.close()
+            
+        return redirect(url_for('training.training_manual_history'))
+
+    # GET: Fetch dropdown data
+    cursor.execute("SELECT USERID, NAME FROM USERINFO WHERE IsActive = 1 ORDER BY NAME")
+    employees = cursor.fetchall()
+    
+    cursor.execute("SELECT TrainingCourseID, TrainingCourseText FROM TrainingCourses ORDER BY TrainingCourseText")
+    courses = cursor.fetchall()
+    
+    conn.close()
+    return render_template('training_manual_history.html', employees=employees, courses=courses)
+
+# =========================================
+# SUB-SESSIONS (DAILY SCHEDULE) LOGIC
+# =========================================
+@bp.route('/training/day/add/<int:sid>', methods=['POST'])
+@login_required
+def training_day_add(sid):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        day_date = request.form.get('day_date')
+        
+        # --- 🛡️ SAFETY CHECK (New) ---
+        # Blocks dates starting with '00' (like 0025) to prevent crashes
+        if not day_date or str(day_date).startswith('00'):
+            flash("❌ خطأ: التاريخ غير صحيح. يرجى التأكد من السنة (مثلاً 2025).", "danger")
+            return redirect(url_for('training.training_session_detail', sid=sid))
+
+        # --- Handle Empty Time Fields (Convert "" to None) ---
+        start_time = request.form.get('start_time')
+        if not start_time: start_time = None
+        
+        end_time = request.form.get('end_time')
+        if not end_time: end_time = None
+        
+        topic = request.form.get('topic')
+
+        # --- Insert Data ---
+        cursor.execute("INSERT INTO TrainingSessionDays (SessionID, DayDate, StartTime, EndTime, Topic) VALUES (?, ?, ?, ?, ?)", 
+                       (sid, day_date, start_time, end_time, topic))
+        conn.commit()
+        flash("✅ تم إضافة اليوم للجدول بنجاح", "success")
+
+    except Exception as e:
+        conn.rollback()
+        flash(f"❌ خطأ أثناء الحفظ: {e}", "danger")
+    finally:
+        conn.close()
+    
+    # --- Correct Redirect ---
+    return redirect(url_for('training.training_session_detail', sid=sid))
+
+@bp.route('/training/day/delete/<int:did>', methods=['POST'])
+@login_required
+def training_day_delete(did):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM TrainingSessionDays WHERE DayID = ?", (did,))
+        conn.commit()
+        flash("✅ تم حذف اليوم من الجدول", "success")
+    except Exception as e:
+        flash(f"❌ خطأ: {e}", "danger")
+    finally:
+        conn.close()
+    return redirect(request.referrer)
+
+@bp.route('/training/attendance/save/<int:sid>', methods=['POST'])
+@login_required
+def training_attendance_save(sid):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        # 1. احذف كل سجلات الحضور السابقة لهذه الجلسة (لنبدأ من الصفر)
+        cursor.execute("DELETE FROM TrainingAttendance WHERE SessionID = ?", (sid,))
+
+        # 2. جلب عدد الأيام المجدولة لهذه الجلسة (للحساب لاحقًا)
+        cursor.execute("SELECT COUNT(*) FROM TrainingSessionDays WHERE SessionID = ?", (sid,))
+        total_days = cursor.fetchone()[0]
+
+        # 3. معالجة الـ checkboxes المرسلة
+        attendance_count = {}  # {EnrollmentID: عدد الأيام الحاضر فيها}
+
+        for key in request.form:
+            if key.startswith('attend_'):
+                # التنسيق: attend_{DayID}_{EnrollmentID}
+                parts = key.split('_')[1:]
+                if len(parts) == 2:
+                    try:
+                        day_id = int(parts[0])
+                        enrollment_id = int(parts[1])
+
+                        # إضافة السجل في جدول الحضور
+                        cursor.execute("""
+                            INSERT INTO TrainingAttendance (SessionID, DayID, EnrollmentID)
+                            VALUES (?, ?, ?)
+                        """, (sid, day_id, enrollment_id))
+
+                        # عدّ الأيام الحاضرة لكل موظف
+                        attendance_count[enrollment_id] = attendance_count.get(enrollment_id, 0) + 1
+
+                    except ValueError:
+                        continue  # تجاهل أي قيم غير صالحة
+
+        # 4. تحديث نسبة الحضور في جدول TrainingEnrollments
+        if total_days > 0:
+            for enrollment_id, present_days in attendance_count.items():
+                percent = round((present_days / total_days) * 100, 1)
+                cursor.execute("""
+                    UPDATE TrainingEnrollments
+                    SET AttendancePercent = ?
+                    WHERE EnrollmentID = ? AND SessionID = ?
+                """, (percent, enrollment_id, sid))
+        else:
+            # إذا لم تكن هناك أيام مجدولة، اجعل النسبة 0
+            cursor.execute("""
+                UPDATE TrainingEnrollments
+                SET AttendancePercent = 0
+                WHERE SessionID = ?
+            """, (sid,))
+
+        conn.commit()
+        flash("✅ تم حفظ الحضور وتحديث نسب الحضور بنجاح", "success")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"Error saving attendance: {e}")
+        flash("❌ حدث خطأ أثناء حفظ الحضور", "danger")
+
+    finally:
+        conn.close()
+
+    return redirect(url_for('training.training_session_detail', sid=sid))
+
+# =========================================
+# TRAINING COURSES (ADMIN ONLY)
+# =========================================
+
+@bp.route('/training/courses')
+@training_required
+def training_courses():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    # ADDED: WHERE TC.IsActive = 1
+    cursor.execute("""
+        SELECT TC.TrainingCourseID, TC.TrainingCourseText, TC.Description, 
+               TC.DepartmentID, TC.DurationHours, TC.Difficulty, TC.IsActive,
+               D.DEPTNAME
+        FROM TrainingCourses TC
+        LEFT JOIN DEPARTMENTS D ON TC.DepartmentID = D.DEPTID
+        WHERE TC.IsActive = 1
+        ORDER BY TC.TrainingCourseText
+    """)
+    courses = cursor.fetchall()
+    conn.close()
+    return render_template('courses_list.html', courses=courses)
+
+# =========================================
+# 2. Archive List (Stopped Only)
+# =========================================
+@bp.route('/training/courses/archive')
+@training_required
+def training_courses_archive():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    # ADDED: WHERE TC.IsActive = 0 OR TC.IsActive IS NULL
+    cursor.execute("""
+        SELECT TC.TrainingCourseID, TC.TrainingCourseText, TC.Description, 
+               TC.DepartmentID, TC.DurationHours, TC.Difficulty, TC.IsActive,
+               D.DEPTNAME
+        FROM TrainingCourses TC
+        LEFT JOIN DEPARTMENTS D ON TC.DepartmentID = D.DEPTID
+        WHERE TC.IsActive = 0 OR TC.IsActive IS NULL
+        ORDER BY TC.TrainingCourseText
+    """)
+    courses = cursor.fetchall()
+    conn.close()
+    return render_template('courses_archive.html', courses=courses)
+
+@bp.route('/training/course/add', methods=['GET', 'POST'])
+@training_required
+def training_course_add():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    if request.method == 'POST':
+        title = request.form.get('title')
+        desc = request.form.get('description')
+        
+        # Get Department ID (Handle empty value as None for "General")
+        dept_id = request.form.get('department')
+        dept_id = int(dept_id) if dept_id else None 
+
+        duration = request.form.get('duration') or None
+        diff = request.form.get('difficulty') or None
+        is_active = 1 if request.form.get('is_active') else 0
+        
+        # SAVE TO AppliesToDeptID
+        cursor.execute("""
+            INSERT INTO TrainingCourses
+            (TrainingCourseText, Description, AppliesToDeptID, DurationHours, Difficulty, IsActive, CreatedBy)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (title, desc, dept_id, duration, diff, is_active, session.get('user_id')))
+        conn.commit()
+        invalidate_evaluation_form_cache()
+        conn.close()
+        
+        flash("✅ تم إضافة الدورة بنجاح", "success")
+        return redirect(url_for('training.training_courses'))
+
+    cursor.execute("SELECT DEPTID, DEPTNAME FROM DEPARTMENTS ORDER BY DEPTNAME")
+    depts = cursor.fetchall()
+    conn.close()
+    
+    return render_template('course_form.html', action="إضافة", depts=depts, course=None)
+
+# =========================================
+# TRAINING SESSIONS (ADMIN ONLY)
+# =========================================
+
+@bp.route('/training/sessions')
+@training_required
+def training_sessions():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT S.SessionID, C.TrainingCourseText, S.SessionDate, S.EndDate,
+               S.Location, S.InstructorID, S.IsExternal,
+               S.ExternalTrainerName, S.MaxSeats,
+               (SELECT COUNT(*) FROM TrainingEnrollments WHERE SessionID = S.SessionID) AS EnrolledCount
+        FROM TrainingSessions S
+        LEFT JOIN TrainingCourses C ON S.CourseID = C.TrainingCourseID
+        ORDER BY S.SessionDate DESC
+    """)
+    sessions = cursor.fetchall()
+    # --- Fetch Pending Recommendations ---
+    cursor.execute("""
+        SELECT 
+            E.EvaluationID,
+            E.EvaluationDate,
+            U_Emp.Name AS EmployeeName,
+            U_Mgr.Name AS ManagerName,
+            TC.TrainingCourseText AS CourseName,
+            E.TrainingCourseID
+        FROM Evaluations E
+        JOIN USERINFO U_Emp ON E.EmployeeUserID = U_Emp.USERID
+        LEFT JOIN USERINFO U_Mgr ON E.EvaluatorUserID = U_Mgr.USERID
+        JOIN TrainingCourses TC ON E.TrainingCourseID = TC.TrainingCourseID
+        WHERE E.TrainingCourseID IS NOT NULL
+        AND NOT EXISTS (
+            SELECT 1 FROM TrainingEnrollments EN
+            JOIN TrainingSessions S ON EN.SessionID = S.SessionID
+            WHERE EN.EmployeeUserID = E.EmployeeUserID
+            AND S.CourseID = E.TrainingCourseID
+            AND (EN.PassStatus = 'Passed' OR EN.PassStatus IS NULL) -- Filter if passed or currently enrolled (NULL usually means active)
+        )
+    """)
+    pending_recommendations = cursor.fetchall()
+    conn.close()
+
+    return render_template('training_dashboard.html', 
+                         sessions=sessions, 
+                         recommendations=pending_recommendations)
+
+@bp.route('/training/employee_report')
+@login_required
+def training_employee_report():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # 1. Get Filters from URL
+    search = request.args.get('search', '').strip()
+    dept_id = request.args.get('dept_id')
+    course_id = request.args.get('course_id')
+    date_from = request.args.get('date_from')
+    date_to = request.args.get('date_to')
+
+    # 2. Base Filter Logic (Reused for Analytics & Main List)
+    where_clauses = ["U.IsActive = 1"]
+    params = []
+
+    if search:
+        where_clauses.append("(U.NAME LIKE ? OR U.BADGENUMBER LIKE ?)")
+        params.extend([f"%{search}%", f"%{search}%"])
+    
+    if dept_id:
+        where_clauses.append("U.DEFAULTDEPTID = ?")
+        params.append(dept_id)
+        
+    if course_id:
+        where_clauses.append("TS.CourseID = ?")
+        params.append(course_id)
+        
+    if date_from:
+        where_clauses.append("TS.SessionDate >= ?")
+        params.append(date_from)
+        
+    if date_to:
+        where_clauses.append("TS.SessionDate <= ?")
+        params.append(date_to)
+
+    where_sql = " AND ".join(where_clauses)
+    
+    # 3. Analytics Queries (Executed Separately for Reliability)
+    stats = {'total_employees': 0, 'total_courses': 0, 'pass_rate': 0, 'status_counts': {}, 'dept_counts': {}}
+
+    # A. Totals
+    q_totals = f"""
+        SELECT 
+            COUNT(DISTINCT U.USERID),
+            COUNT(TE.EnrollmentID)
+        FROM [Zktime_Copy].[dbo].[USERINFO] U
+        LEFT JOIN [Zktime_Copy].[dbo].[DEPARTMENTS] D ON U.DEFAULTDEPTID = D.DEPTID
+        LEFT JOIN [Zktime_Copy].[dbo].[TrainingEnrollments] TE ON U.USERID = TE.EmployeeUserID
+        LEFT JOIN [Zktime_Copy].[dbo].[TrainingSessions] TS ON TE.SessionID = TS.SessionID
+        LEFT JOIN [Zktime_Copy].[dbo].[TrainingCourses] TC ON TS.CourseID = TC.TrainingCourseID
+        WHERE {where_sql}
+    """
+    cursor.execute(q_totals, params)
+    totals_row = cursor.fetchone()
+    if totals_row:
+        stats['total_employees'] = totals_row[0]
+        stats['total_courses'] = totals_row[1]
+
+    # B. Pass Status Breakdown
+    q_status = f"""
+        SELECT TE.PassStatus, COUNT(*)
+        FROM [Zktime_Copy].[dbo].[USERINFO] U
+        LEFT JOIN [Zktime_Copy].[dbo].[DEPARTMENTS] D ON U.DEFAULTDEPTID = D.DEPTID
+        JOIN [Zktime_Copy].[dbo].[TrainingEnrollments] TE ON U.USERID = TE.EmployeeUserID
+        LEFT JOIN [Zktime_Copy].[dbo].[TrainingSessions] TS ON TE.SessionID = TS.SessionID
+        LEFT JOIN [Zktime_Copy].[dbo].[TrainingCourses] TC ON TS.CourseID = TC.TrainingCourseID
+        WHERE {where_sql}
+        GROUP BY TE.PassStatus
+    """
+    cursor.execute(q_status, params)
+    status_rows = cursor.fetchall()
+    
+    passed = 0
+    failed = 0
+    others = 0
+    for r in status_rows:
+        st = r[0] or 'Unknown'
+        cnt = r[1]
+        stats['status_counts'][st] = cnt
+        if st == 'Passed': passed += cnt
+        elif st == 'Failed': failed += cnt
+    # B. Pass Status Breakdown (Using LEFT JOIN + NOT NULL check for consistency)
+    q_status = f"""
+        SELECT TE.PassStatus, COUNT(*)
+        FROM [Zktime_Copy].[dbo].[USERINFO] U
+        LEFT JOIN [Zktime_Copy].[dbo].[DEPARTMENTS] D ON U.DEFAULTDEPTID = D.DEPTID
+        LEFT JOIN [Zktime_Copy].[dbo].[TrainingEnrollments] TE ON U.USERID = TE.EmployeeUserID
+        LEFT JOIN [Zktime_Copy].[dbo].[TrainingSessions] TS ON TE.SessionID = TS.SessionID
+        LEFT JOIN [Zktime_Copy].[dbo].[TrainingCourses] TC ON TS.CourseID = TC.TrainingCourseID
+        WHERE {where_sql} AND TE.EnrollmentID IS NOT NULL
+        GROUP BY TE.PassStatus
+    """
+    cursor.execute(q_status, params)
+    status_rows = cursor.fetchall()
+    
+    passed = 0
+    failed = 0
+    others = 0
+    for r in status_rows:
+        st = r[0] or 'Unknown'
+        cnt = r[1]
+        stats['status_counts'][st] = cnt
+        if st == 'Passed': passed += cnt
+        elif st == 'Failed': failed += cnt
+        else: others += cnt
+    
+    total_finished = passed + failed
+    stats['pass_rate'] = round((passed / total_finished * 100)) if total_finished > 0 else 0
+    stats['passed'] = passed
+    stats['failed'] = failed
+    stats['others'] = others
+
+    # C. Top Departments (Using LEFT JOIN + NOT NULL check)
+    q_depts = f"""
+        SELECT TOP 5 D.DEPTNAME, COUNT(TE.EnrollmentID) as Cnt
+        FROM [Zktime_Copy].[dbo].[USERINFO] U
+        LEFT JOIN [Zktime_Copy].[dbo].[DEPARTMENTS] D ON U.DEFAULTDEPTID = D.DEPTID
+        LEFT JOIN [Zktime_Copy].[dbo].[TrainingEnrollments] TE ON U.USERID = TE.EmployeeUserID
+        LEFT JOIN [Zktime_Copy].[dbo].[TrainingSessions] TS ON TE.SessionID = TS.SessionID
+        LEFT JOIN [Zktime_Copy].[dbo].[TrainingCourses] TC ON TS.CourseID = TC.TrainingCourseID
+        WHERE {where_sql} AND TE.EnrollmentID IS NOT NULL
+        GROUP BY D.DEPTNAME
+        ORDER BY Cnt DESC
+    """
+    cursor.execute(q_depts, params)
+    dept_rows = cursor.fetchall()
+    
+    for r in dept_rows:
+        dname = r[0] or 'غير محدد'
+        stats['dept_counts'][dname] = r[1]
+    
+    # --- GLOBAL ANALYTICS (Company-Wide, Unfiltered) ---
+    global_stats = {'total_employees': 0, 'total_courses': 0, 'pass_rate': 0}
+    
+    # G1. Global Totals
+    cur_global = conn.cursor()
+    cur_global.execute("""
+        SELECT COUNT(DISTINCT U.USERID), COUNT(TE.EnrollmentID)
+        FROM [Zktime_Copy].[dbo].[USERINFO] U
+        LEFT JOIN [Zktime_Copy].[dbo].[TrainingEnrollments] TE ON U.USERID = TE.EmployeeUserID
+        WHERE U.IsActive = 1
+    """)
+    g_totals = cur_global.fetchone()
+    if g_totals:
+        global_stats['total_employees'] = g_totals[0]
+        global_stats['total_courses'] = g_totals[1]
+
+    # G2. Global Pass Rate
+    cur_global.execute("""
+        SELECT TE.PassStatus, COUNT(*)
+        FROM [Zktime_Copy].[dbo].[USERINFO] U
+        LEFT JOIN [Zktime_Copy].[dbo].[TrainingEnrollments] TE ON U.USERID = TE.EmployeeUserID
+        WHERE U.IsActive = 1 AND TE.EnrollmentID IS NOT NULL
+        GROUP BY TE.PassStatus
+    """)
+    g_rows = cur_global.fetchall()
+    g_passed = 0
+    g_total_finished = 0
+    for r in g_rows:
+        gst = r[0]
+        gcnt = r[1]
+        if gst in ['Passed', 'Failed']:
+            g_total_finished += gcnt
+        if gst == 'Passed':
+            g_passed += gcnt
+            
+    global_stats['pass_rate'] = round((g_passed / g_total_finished * 100)) if g_total_finished > 0 else 0
+    
+    # 4. Main User List Query
+    query = f"""
+        SELECT 
+            U.USERID, U.BADGENUMBER, U.NAME, U.TITLE, U.pic, 
+            D.DEPTNAME,
+            TE.EnrollmentID, TE.PassStatus, TE.Grade, TE.AttendanceStatus,
+            TS.SessionDate, TS.SessionID,
+            TC.TrainingCourseText
+        FROM [Zktime_Copy].[dbo].[USERINFO] U
+        LEFT JOIN [Zktime_Copy].[dbo].[DEPARTMENTS] D ON U.DEFAULTDEPTID = D.DEPTID
+        LEFT JOIN [Zktime_Copy].[dbo].[TrainingEnrollments] TE ON U.USERID = TE.EmployeeUserID
+        LEFT JOIN [Zktime_Copy].[dbo].[TrainingSessions] TS ON TE.SessionID = TS.SessionID
+        LEFT JOIN [Zktime_Copy].[dbo].[TrainingCourses] TC ON TS.CourseID = TC.TrainingCourseID
+        WHERE {where_sql}
+        ORDER BY U.NAME, TS.SessionDate DESC
+    """
+
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    
+    # 5. Process Users
+    employees = defaultdict(lambda: {'info': None, 'courses': [], 'stats': {'total': 0, 'passed': 0, 'failed': 0}})
+    
+    for row in rows:
+        uid = row.USERID
+        if employees[uid]['info'] is None:
+            employees[uid]['info'] = {
+                'id': row.USERID,
+                'badge': row.BADGENUMBER,
+                'name': row.NAME,
+                'title': row.TITLE,
+                'dept': row.DEPTNAME,
+                'has_pic': True if row.pic else False
+            }
+        
+        if row.EnrollmentID:
+            employees[uid]['courses'].append({
+                'course_name': row.TrainingCourseText,
+                'date': row.SessionDate,
+                'status': row.PassStatus,
+                'grade': row.Grade,
+                'attendance': row.AttendanceStatus
+            })
+            employees[uid]['stats']['total'] += 1
+            if row.PassStatus == 'Passed':
+                employees[uid]['stats']['passed'] += 1
+            elif row.PassStatus == 'Failed':
+                employees[uid]['stats']['failed'] += 1
+
+    # 6. Dropdowns
+    cursor.execute("SELECT DEPTID, DEPTNAME FROM DEPARTMENTS ORDER BY DEPTNAME")
+    all_depts = cursor.fetchall()
+    
+    cursor.execute("SELECT TrainingCourseID, TrainingCourseText FROM TrainingCourses ORDER BY TrainingCourseText")
+    all_courses = cursor.fetchall()
+
+    conn.close()
+
+    return render_template('training_employee_report.html', 
+                           employees=employees, 
+                           all_depts=all_depts, 
+                           all_courses=all_courses,
+                           filters=request.args,
+                           analytics=stats,
+                           global_stats=global_stats)
+
+@bp.route('/training/session/edit/<int:sid>', methods=['GET', 'POST'])
+@training_required
+def training_session_edit(sid):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    if request.method == 'POST':
+        course_id = request.form.get('course_id')
+        session_date = request.form.get('session_date')
+        end_date = request.form.get('end_date') or None
+        location = request.form.get('location')
+        instructor = request.form.get('instructor') or None
+        is_external = 1 if request.form.get('is_external') else 0
+        ext_name = request.form.get('external_name')
+        ext_company = request.form.get('external_company')
+        max_seats = request.form.get('max_seats') or None
+
+        cursor.execute("""
+            UPDATE TrainingSessions
+            SET CourseID=?, SessionDate=?, EndDate=?, Location=?, InstructorID=?,
+                IsExternal=?, ExternalTrainerName=?, ExternalCompany=?, MaxSeats=?
+            WHERE SessionID=?
+        """, (course_id, session_date, end_date, location, instructor,
+              is_external, ext_name, ext_company, max_seats, sid))
+        conn.commit()
+        conn.close()
+        flash("✅ تم تحديث بيانات الجلسة", "success")
+        return redirect(url_for('training.training_sessions'))
+
+    # --- GET REQUEST (Updated to match Add Screen) ---
+
+    # 1. Get Session Data
+    cursor.execute("SELECT * FROM TrainingSessions WHERE SessionID = ?", (sid,))
+    s_obj = cursor.fetchone()
+    
+    # 2. Get Courses
+    cursor.execute("SELECT TrainingCourseID, TrainingCourseText FROM TrainingCourses WHERE IsActive = 1")
+    courses = cursor.fetchall()
+
+    # 3. Get Departments (For Filter)
+    cursor.execute("SELECT DEPTID, DEPTNAME FROM DEPARTMENTS ORDER BY DEPTNAME")
+    depts = cursor.fetchall()
+
+    # 4. Get Instructors (With Department ID for filtering)
+    cursor.execute("SELECT USERID, NAME, DEFAULTDEPTID FROM USERINFO WHERE IsActive = 1 ORDER BY NAME")
+    instructors = cursor.fetchall()
+    
+    conn.close()
+
+    return render_template('training_session_detail.html', action="تعديل", 
+                           courses=courses, 
+                           depts=depts,             # <--- Now passing departments
+                           instructors=instructors, # <--- Now passing rich user data
+                           training_session=s_obj)
+
+@bp.route('/training/session/add', methods=['GET', 'POST'])
+@training_required
+def training_session_add():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    if request.method == 'POST':
+        course_id = request.form.get('course_id')
+        session_date = request.form.get('session_date')
+        end_date = request.form.get('end_date') or None
+        location = request.form.get('location')
+        
+        # Multiple instructors
+        instructor_ids = request.form.getlist('instructors[]')
+        instructor_csv = ','.join(instructor_ids) if instructor_ids else None
+        
+        is_external = 1 if request.form.get('is_external') else 0
+        ext_name = request.form.get('external_name') if is_external else None
+        ext_company = request.form.get('external_company') if is_external else None
+        max_seats = request.form.get('max_seats') or None
+        
+        cursor.execute("""
+            INSERT INTO TrainingSessions
+            (CourseID, SessionDate, EndDate, Location, InstructorID, IsExternal,
+             ExternalTrainerName, ExternalCompany, MaxSeats)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (course_id, session_date, end_date, location, instructor_csv,
+              is_external, ext_name, ext_company, max_seats))
+        
+        conn.commit()
+        conn.close()
+
+        flash("✅ تم إنشاء الجلسة بنجاح.", "success")
+        return redirect(url_for('training.training_sessions'))
+
+    # GET: Load dropdown data
+    cursor.execute("SELECT TrainingCourseID, TrainingCourseText FROM TrainingCourses WHERE IsActive = 1")
+    courses = cursor.fetchall()
+
+    cursor.execute("SELECT DEPTID, DEPTNAME FROM DEPARTMENTS ORDER BY DEPTNAME")
+    depts = cursor.fetchall()
+
+    # === CHANGED: Include ALL employees (active and inactive) ===
+    cursor.execute("""
+        SELECT u.USERID, u.NAME, u.DEFAULTDEPTID, d.DEPTNAME, u.IsActive
+        FROM USERINFO u 
+        LEFT JOIN DEPARTMENTS d ON u.DEFAULTDEPTID = d.DEPTID 
+        ORDER BY u.NAME
+    """)
+    instructors = cursor.fetchall()
+
+    conn.close()
+
+    return render_template('session_form.html',
+                           action="إضافة",
+                           courses=courses,
+                           depts=depts,
+                           instructors=instructors,
+                           training_session=None,
+                           selected_instructor_ids=[])
+
+# =========================================
+# TRAINING ENROLLMENTS (ADMIN + MANAGER)
+# =========================================
+
+
+@bp.route('/training/session/<int:sid>', methods=['GET', 'POST'])
+@training_required
+def training_session_detail(sid):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # ========================
+    # 1. HANDLE POST ACTIONS
+    # ========================
+    if request.method == 'POST':
+        # A. Auto Enroll
+        if 'auto_enroll' in request.form:
+            cursor.execute("SELECT CourseID, MaxCapacity FROM TrainingSessions WHERE SessionID = ?", (sid,))
+            session_info = cursor.fetchone()
+            if session_info:
+                course_id = session_info.CourseID
+                max_cap = session_info.MaxCapacity
+                
+                cursor.execute("SELECT COUNT(*) FROM TrainingEnrollments WHERE SessionID = ? AND PassStatus != 'Canceled'", (sid,))
+                current_count = cursor.fetchone()[0]
+                
+                cursor.execute("""
+                    SELECT DISTINCT E.EmployeeUserID 
+                    FROM Evaluations E 
+                    WHERE E.TrainingCourseID = ? 
+                    AND E.EmployeeUserID NOT IN (
+                        SELECT TE.EmployeeUserID FROM TrainingEnrollments TE 
+                        JOIN TrainingSessions TS ON TE.SessionID = TS.SessionID 
+                        WHERE TS.CourseID = ? AND TE.PassStatus != 'Canceled'
+                    )
+                """, (course_id, course_id))
+                candidates = cursor.fetchall()
+                
+                for cand in candidates:
+                    status = 'Registered' if current_count < max_cap else 'Waitlist'
+                    if status == 'Registered': current_count += 1
+                    cursor.execute("INSERT INTO TrainingEnrollments (SessionID, EmployeeUserID, AttendanceStatus, PassStatus) VALUES (?, ?, ?, 'Registered')", (sid, cand.EmployeeUserID, status))
+                
+                conn.commit()
+                flash('✅ تم سحب المرشحين بنجاح', 'info')
+
+        # B. Manual Enroll
+        elif 'manual_enroll' in request.form:
+             user_id = request.form.get('user_id')
+             if user_id:
+                 cursor.execute("INSERT INTO TrainingEnrollments (SessionID, EmployeeUserID, AttendanceStatus, PassStatus) VALUES (?, ?, 'Registered', 'Registered')", (sid, user_id))
+                 conn.commit()
+                 flash('✅ تم إضافة الموظف بنجاح', 'success')
+
+        # C. Mark Attendance (Quick Actions)
+        elif 'mark_attendance' in request.form:
+            eid = request.form.get('enrollment_id')
+            status = request.form.get('status')
+            if eid and status:
+                cursor.execute("UPDATE TrainingEnrollments SET AttendanceStatus = ? WHERE EnrollmentID = ?", (status, eid))
+                conn.commit()
+                flash('✅ تم تحديث الحضور', 'success')
+        
+        conn.close()
+        return redirect(url_for('training.training_session_detail', sid=sid))
+
+    # ========================
+    # 2. GET: Fetch Session Data
+    # ========================
+    cursor.execute("""
+        SELECT S.*, TC.TrainingCourseText
+        FROM TrainingSessions S
+        LEFT JOIN TrainingCourses TC ON S.CourseID = TC.TrainingCourseID
+        WHERE S.SessionID = ?
+    """, (sid,))
+    training_session = cursor.fetchone()
+
+    if not training_session:
+        flash("❌ الجلسة غير موجودة.", "danger")
+        conn.close()
+        return redirect(url_for('training.training_sessions'))
+
+    # جلب أسماء المدربين الداخليين يدويًا (يدعم متعدد المدربين)
+    instructor_names = []
+    if training_session.InstructorID:
+        try:
+            instructor_ids = [int(x.strip()) for x in training_session.InstructorID.split(',') if x.strip()]
+            if instructor_ids:
+                placeholders = ','.join(['?'] * len(instructor_ids))
+                cursor.execute(f"SELECT NAME FROM USERINFO WHERE USERID IN ({placeholders}) ORDER BY NAME", instructor_ids)
+                instructor_names = [row.NAME for row in cursor.fetchall()]
+        except:
+            instructor_names = ["خطأ في قراءة المدربين"]
+
+    # جلب الأيام
+    cursor.execute("SELECT * FROM TrainingSessionDays WHERE SessionID = ? ORDER BY DayDate", (sid,))
+    session_days = cursor.fetchall()
+
+    # جلب التسجيلات مع استبعاد الملغاة (Canceled)
+    # جلب التسجيلات مع استبعاد الملغاة (Canceled)
+    cursor.execute("""
+        SELECT TE.*, UI.NAME, UI.BADGENUMBER, D.DEPTNAME
+        FROM TrainingEnrollments TE
+        LEFT JOIN USERINFO UI ON TE.EmployeeUserID = UI.USERID
+        LEFT JOIN DEPARTMENTS D ON UI.DEFAULTDEPTID = D.DEPTID
+        WHERE TE.SessionID = ? AND (TE.PassStatus IS NULL OR TE.PassStatus != 'Canceled')
+        ORDER BY UI.NAME
+    """, (sid,))
+    enrollments = cursor.fetchall()
+
+    # جلب الحضور فقط للتسجيلات النشطة (غير الملغاة)
+    # جلب الحضور فقط للتسجيلات النشطة
+    cursor.execute("""
+        SELECT TA.DayID, TA.EnrollmentID 
+        FROM TrainingAttendance TA
+        JOIN TrainingEnrollments TE ON TA.EnrollmentID = TE.EnrollmentID
+        WHERE TA.SessionID = ? AND (TE.PassStatus IS NULL OR TE.PassStatus != 'Canceled')
+    """, (sid,))
+    attendance_set = {(row.DayID, row.EnrollmentID) for row in cursor.fetchall()}
+
+    # جلب كل الموظفين للإضافة اليدوية
+    cursor.execute("SELECT USERID, NAME FROM USERINFO WHERE IsActive = 1 ORDER BY NAME")
+    all_employees = cursor.fetchall()
+
+    conn.close()
+
+    return render_template('training_session_detail.html',
+                           training_session=training_session,
+                           instructor_names=instructor_names,
+                           session_days=session_days,
+                           enrollments=enrollments,
+                           attendance_set=attendance_set,
+                           all_employees=all_employees)
+
+@bp.route('/training/enrollment/cancel/<int:eid>', methods=['POST'])
+@training_required
+def training_enrollment_cancel(eid):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        # Safe Delete: Mark as Canceled instead of DELETE
+        # This preserves the record for history but hides it from the active session list
+        cursor.execute("""
+            UPDATE TrainingEnrollments 
+            SET PassStatus = 'Canceled', 
+                AttendanceStatus = 'Excused',
+                Grade = NULL
+            WHERE EnrollmentID = ?
+        """, (eid,))
+        
+        conn.commit()
+        flash("✅ تم إلغاء تسجيل الموظف بنجاح (تم حفظه في الأرشيف كـ ملغى)", "success")
+        
+    except Exception as e:
+        conn.rollback()
+        flash(f"❌ حدث خطأ: {e}", "danger")
+    finally:
+        conn.close()
+    
+    # Return to the same page
+    return redirect(request.referrer)
+
+@bp.route('/training/session/<int:sid>/enroll', methods=['GET', 'POST'])
+@training_required
+def training_enroll(sid):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    if request.method == 'POST':
+        employee_ids = request.form.getlist('employee_ids')
+        count = 0
+        for emp_id in employee_ids:
+            try:
+                emp_id = int(emp_id)
+                # Check if already enrolled
+                cursor.execute("SELECT COUNT(*) FROM TrainingEnrollments WHERE SessionID=? AND EmployeeUserID=?", (sid, emp_id))
+                if cursor.fetchone()[0] == 0:
+                    cursor.execute("INSERT INTO TrainingEnrollments (EmployeeUserID, SessionID, AttendanceStatus) VALUES (?, ?, 'Registered')", (emp_id, sid))
+                    count += 1
+            except Exception as e:
+                print(f"Error enrolling {emp_id}: {e}")
+        
+        conn.commit()
+        conn.close()
+        if count > 0:
+            flash(f"✅ تم تسجيل {count} موظف بنجاح", "success")
+        else:
+            flash("⚠️ لم يتم تسجيل أي موظف جديد (ربما مسجلين بالفعل)", "warning")
+        return redirect(url_for('training.training_enroll', sid=sid))
+
+    # --- GET REQUEST ---
+    role_id = session.get('role_id')
+    manager_id = session.get('user_id')
+
+    # 1. Get Session & Course Info (To find recommendations)
+    cursor.execute("SELECT CourseID, MaxCapacity FROM TrainingSessions WHERE SessionID = ?", (sid,))
+    session_info = cursor.fetchone()
+    recommended_ids = []
+    
+    if session_info:
+        course_id = session_info.CourseID
+        # Find employees recommended for this SPECIFIC course
+        # logic: Recommended in Evaluations AND NOT (Enrolled/Passed previously)
+        cursor.execute("""
+            SELECT DISTINCT E.EmployeeUserID 
+            FROM Evaluations E
+            WHERE E.TrainingCourseID = ?
+            AND NOT EXISTS (
+                SELECT 1 FROM TrainingEnrollments EN
+                JOIN TrainingSessions S ON EN.SessionID = S.SessionID
+                WHERE EN.EmployeeUserID = E.EmployeeUserID
+                AND S.CourseID = E.TrainingCourseID
+                AND (EN.PassStatus = 'Passed') -- Only exclude if they actually PASSED.
+            )
+        """, (course_id,))
+        recommended_ids = [row.EmployeeUserID for row in cursor.fetchall()]
+
+    # 2. Get Departments
+    if role_id == 1 or role_id == 6:
+        cursor.execute("SELECT DEPTID, DEPTNAME FROM DEPARTMENTS ORDER BY DEPTNAME")
+    else:
+        cursor.execute("SELECT DepartmentID FROM Users WHERE UserID = ?", (manager_id,))
+        dept_row = cursor.fetchone()
+        if dept_row and dept_row.DepartmentID:
+            cursor.execute("SELECT DEPTID, DEPTNAME FROM DEPARTMENTS WHERE DEPTID = ?", (dept_row.DepartmentID,))
+        else:
+            cursor.execute("SELECT DEPTID, DEPTNAME FROM DEPARTMENTS WHERE 1=0")
+    
+    depts = cursor.fetchall()
+
+    # 3. Get Employees (Not yet enrolled in this session)
+    if role_id == 1 or role_id == 6:
+        cursor.execute("""
+            SELECT u.USERID, u.NAME, COALESCE(u.DEFAULTDEPTID, 0) AS DEFAULTDEPTID, u.IsActive
+            FROM USERINFO u
+            LEFT JOIN TrainingEnrollments te ON u.USERID = te.EmployeeUserID AND te.SessionID = ?
+            WHERE te.EnrollmentID IS NULL
+            ORDER BY u.NAME
+        """, (sid,))
+    else:
+        cursor.execute("SELECT DepartmentID FROM Users WHERE UserID = ?", (manager_id,))
+        dept_row = cursor.fetchone()
+        if dept_row and dept_row.DepartmentID:
+            cursor.execute("""
+                SELECT u.USERID, u.NAME, u.DEFAULTDEPTID, u.IsActive
+                FROM USERINFO u
+                LEFT JOIN TrainingEnrollments te ON u.USERID = te.EmployeeUserID AND te.SessionID = ?
+                WHERE u.DEFAULTDEPTID = ? AND te.EnrollmentID IS NULL
+                ORDER BY u.NAME
+            """, (sid, dept_row.DepartmentID))
+        else:
+            cursor.execute("SELECT USERID, NAME, DEFAULTDEPTID, IsActive FROM USERINFO WHERE 1=0")
+
+    employees = cursor.fetchall()
+    conn.close()
+
+    # Pass 'recommended_ids' to the template
+    # Pass 'recommended_ids' to the template
+    return render_template('enroll_form.html', 
+                           employees=employees, 
+                           depts=depts, 
+                           sid=sid, 
+                           recommended_ids=recommended_ids,
+                           # Now both Admin (1) and Training Manager (6) have full control
+                           is_admin=(role_id == 1 or role_id == 6))
+
+@bp.route('/training/enrollment/update/<int:eid>', methods=['POST'])
+@training_required
+def training_enrollment_update(eid):
+    # 1. Get form data
+    grade = request.form.get('grade')
+    if grade == '' or grade is None: 
+        grade = None
+    else: 
+        try: 
+            grade = float(grade)
+        except ValueError: 
+            grade = None
+
+    pass_status = request.form.get('pass_status') or None
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # ======================================================
+    # CRITICAL STEP: Get the SessionID BEFORE doing anything else
+    # This ensures we know exactly where to go back to.
+    # ======================================================
+    cursor.execute("SELECT SessionID FROM TrainingEnrollments WHERE EnrollmentID = ?", (eid,))
+    row = cursor.fetchone()
+    
+    # If the enrollment doesn't exist, we must go to the main list (Safety)
+    if not row:
+        conn.close()
+        flash("❌ لم يتم العثور على سجل الطالب", "danger")
+        return redirect(url_for('training.training_sessions'))
+
+    session_id = row.SessionID
+
+    try:
+        # 2. Now attempt the update
+        cursor.execute("""
+            UPDATE TrainingEnrollments
+            SET Grade = ?, PassStatus = ?
+            WHERE EnrollmentID = ?
+        """, (grade, pass_status, eid))
+
+        conn.commit()
+        flash("✅ تم تحديث النتيجة بنجاح", "success")
+
+    except Exception as e:
+        conn.rollback()
+        # Even if there is an error, we can still go back to the correct page now!
+        flash(f"❌ حدث خطأ أثناء التحديث: {e}", "danger")
+
+    finally:
+        conn.close()
+
+    # 3. Redirect explicitly to the Session Detail Page
+    return redirect(url_for('training.training_session_detail', sid=session_id))
+
+@bp.route('/training/session/<int:sid>/bulk_update_grades', methods=['POST'])
+@training_required
+def training_session_bulk_update_grades(sid):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    # 1. Get all enrollment IDs for this session so we know what to look for
+    cursor.execute("SELECT EnrollmentID FROM TrainingEnrollments WHERE SessionID = ?", (sid,))
+    rows = cursor.fetchall()
+    
+    try:
+        for row in rows:
+            eid = row.EnrollmentID
+            # We expect inputs named like "grade_101" and "pass_status_101"
+            grade_key = f"grade_{eid}"
+            status_key = f"pass_status_{eid}"
+            
+            # Only update if this student is in the submitted form
+            if grade_key in request.form:
+                raw_grade = request.form.get(grade_key)
+                pass_status = request.form.get(status_key) or None
+                
+                # Safe conversion for Grade
+                grade = None
+                if raw_grade and raw_grade.strip():
+                    try: 
+                        grade = float(raw_grade)
+                    except ValueError: 
+                        grade = None
+                
+                cursor.execute("""
+                    UPDATE TrainingEnrollments
+                    SET Grade = ?, PassStatus = ?
+                    WHERE EnrollmentID = ?
+                """, (grade, pass_status, eid))
+                
+        conn.commit()
+        flash("✅ تم حفظ جميع التغييرات بنجاح", "success")
+        
+    except Exception as e:
+        conn.rollback()
+        flash(f"❌ حدث خطأ أثناء الحفظ: {e}", "danger")
+    finally:
+        conn.close()
+
+    return redirect(url_for('training.training_session_detail', sid=sid))
+
+@bp.route('/training/enrollment/delete/<int:eid>', methods=['POST'])
+@training_required
+def training_enrollment_delete(eid):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM TrainingEnrollments WHERE EnrollmentID = ?", (eid,))
+        conn.commit()
+        flash("✅ تم حذف الموظف من الجلسة بنجاح", "success")
+    except Exception as e:
+        conn.rollback()
+        flash(f"❌ حدث خطأ أثناء الحذف: {e}", "danger")
+    finally:
+        conn.close()
+    
+    # Return to the same page
+    return redirect(request.referrer)
+
+@bp.route('/training/history/add', methods=['GET', 'POST'])
+@training_required
+def training_history_add():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    if request.method == 'POST':
+        user_id = request.form.get('user_id')
+        course_id = request.form.get('course_id')
+        date_str = request.form.get('date')
+        grade = request.form.get('grade') or None
+        feedback = request.form.get('feedback')
+
+        if not user_id or not course_id or not date_str:
+            flash("❌ يرجى ملء جميع الحقول المطلوبة", "danger")
+        else:
+            try:
+                # 1. Create a "Fake/Historical" Session for this record
+                # We use a special location 'Historical Record' to distinguish it
+                cursor.execute("""
+                    INSERT INTO TrainingSessions (CourseID, SessionDate, Location, IsExternal, ExternalTrainerName)
+                    VALUES (?, ?, 'سجل تاريخي', 1, 'Manual Entry')
+                """, (course_id, date_str))
+                
+                # Get the ID of the session we just made
+                cursor.execute("SELECT @@IDENTITY") 
+                fake_session_id = cursor.fetchone()[0]
+
+                # 2. Enroll the user in it immediately with 'Passed' status
+                cursor.execute("""
+                    INSERT INTO TrainingEnrollments (SessionID, EmployeeUserID, Grade, PassStatus, ManagerComments)
+                    VALUES (?, ?, ?, 'Passed', ?)
+                """, (fake_session_id, user_id, grade, feedback))
+                
+                conn.commit()
+                flash("✅ تم إضافة السجل التاريخي بنجاح", "success")
+                return redirect(url_for('training.training_history_add'))
+                
+            except Exception as e:
+                conn.rollback()
+                flash(f"❌ حدث خطأ: {e}", "danger")
+
+    # GET Request: Load data for dropdowns
+    cursor.execute("SELECT USERID, NAME FROM USERINFO WHERE IsActive=1 ORDER BY NAME")
+    employees = cursor.fetchall()
+    
+    cursor.execute("SELECT TrainingCourseID, TrainingCourseText FROM TrainingCourses WHERE IsActive=1")
+    courses = cursor.fetchall()
+    
+    conn.close()
+    return render_template('training_manual_history.html', employees=employees, courses=courses)
@@ -0,0 +1,31 @@
+import argparse
+import os
+import time
+from static_assets import build_assets, DIST_DIR, brotli
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def main():
+    parser = argparse.ArgumentParser(description="Build fingerprinted, precompressed static assets into static/dist (run on every deploy).")
+    parser.add_argument('--static', default=os.path.join(HERE, 'static'))
+    parser.add_argument('--templates', default=os.path.join(HERE, 'templates'))
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    manifest, missing = build_assets(args.static, args.templates)
+
+    dist = os.path.join(args.static, DIST_DIR)
+    sizes = {'plain': 0, 'gz': 0, 'br': 0}
+    for root, _, files in os.walk(dist):
+        for file in files:
+            kind = file.rsplit('.', 1)[-1] if file.endswith(('.gz', '.br')) else 'plain'
+            sizes[kind] += os.path.getsize(os.path.join(root, file))
+
+    print(f"Built {len(manifest)} assets into {dist} in {time.perf_counter() - started:.2f}s")
+    print(f"  plain {sizes['plain'] / 1024:.0f} KB, gzip {sizes['gz'] / 1024:.0f} KB, brotli {sizes['br'] / 1024:.0f} KB"
+          f"{'' if brotli else ' (pip install brotli for .br files)'}")
+    for name in missing:
+        print(f"  ! referenced but not found: static/{name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Invalidation of the in-process caches across gunicorn workers.
+
+Each worker keeps its own copy of the cached reference lists / charts /
+analytics, so clearing a dict only helps the worker that handled the
+write. When CACHE_INVALIDATION_DIR is set (gunicorn.conf.py does it),
+invalidate_*() also touches one marker file per cache there, and every
+lookup treats data loaded before the file's mtime as stale. One stat()
+per lookup; without the variable (dev server, waitress: one process)
+both calls do nothing.
+"""
+import os
+
+
+def _marker(name):
+    directory = os.environ.get('CACHE_INVALIDATION_DIR')
+    return os.path.join(directory, name) if directory else None
+
+
+def mark_invalidated(name):
+    """ Tells every worker that data of cache `name` loaded before now is stale. """
+    path = _marker(name)
+    if path is None:
+        return
+    try:
+        with open(path, 'a'):
+            pass
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def invalidated_since(name, loaded_at):
+    """ True when cache `name` was invalidated (by any worker) at or after loaded_at. """
+    path = _marker(name)
+    if path is None:
+        return False
+    try:
+        return os.stat(path).st_mtime >= loaded_at
+    except OSError:
+        return False
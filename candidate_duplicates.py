@@ -0,0 +1,170 @@
+"""
+Candidate duplicate detection.
+
+Phones and national IDs are compared on normalized keys (digits only, Arabic
+digits folded to ASCII, Egyptian +20 / 0020 prefix folded to the local 0),
+stored in the indexed Candidates.PhoneKey / NationalIDKey columns. The app
+writes the keys whenever it writes a candidate (candidate_key_params), and
+create_candidate_duplicate_keys.py back-fills existing rows.
+
+- find_existing_candidate(): single check for the add form, two index seeks.
+- DuplicateIndex: in-memory hash index over all candidates for O(1) checks
+  while importing many rows.
+- find_duplicate_clusters(): scans every candidate and groups the ones
+  sharing a phone or national ID (union-find).
+"""
+
+ARABIC_DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹', '01234567890123456789')
+
+MIN_PHONE_DIGITS = 7
+
+# Widths of Candidates.PhoneKey / NationalIDKey; longer digit runs are not a phone / ID, so no key is stored
+MAX_PHONE_DIGITS = 20
+MAX_NATIONAL_ID_DIGITS = 30
+
+LOAD_KEYS_SQL = """
+    SELECT C.CandidateID, C.FullName, C.Phone, C.NationalID, C.Status, C.ApplicationDate,
+           C.PhoneKey, C.NationalIDKey, J.JobTitle
+    FROM Candidates C
+    LEFT JOIN Jobs J ON C.JobID = J.JobID
+    WHERE C.PhoneKey IS NOT NULL OR C.NationalIDKey IS NOT NULL
+"""
+
+
+def _digits(value):
+    if value is None:
+        return ''
+    return ''.join(ch for ch in str(value).translate(ARABIC_DIGITS) if ch.isdigit())
+
+
+def normalize_phone(phone):
+    digits = _digits(phone)
+    if digits.startswith('0020'):
+        digits = '0' + digits[4:]
+    elif digits.startswith('20') and len(digits) == 12:
+        digits = '0' + digits[2:]
+    return digits if MIN_PHONE_DIGITS <= len(digits) <= MAX_PHONE_DIGITS else None
+
+
+def normalize_national_id(national_id):
+    digits = _digits(national_id)
+    return digits if 0 < len(digits) <= MAX_NATIONAL_ID_DIGITS else None
+
+
+def candidate_key_params(phone, national_id):
+    """ (PhoneKey, NationalIDKey) to store next to a candidate's raw values. """
+    return normalize_phone(phone), normalize_national_id(national_id)
+
+
+def find_existing_candidate(cursor, phone, national_id, exclude_id=None):
+    """
+    Returns the first candidate sharing the normalized phone or national ID,
+    or None. UNION of two equality lookups so each side can seek its index.
+    """
+    phone_key, nid_key = candidate_key_params(phone, national_id)
+    if not phone_key and not nid_key:
+        return None
+
+    parts, params = [], []
+    for column, key in (('NationalIDKey', nid_key), ('PhoneKey', phone_key)):
+        if key:
+            parts.append(f"SELECT CandidateID FROM Candidates WHERE {column} = ?")
+            params.append(key)
+
+    exclude_sql = ""
+    if exclude_id:
+        exclude_sql = "WHERE M.CandidateID <> ?"
+        params.append(exclude_id)
+
+    cursor.execute(f"""
+        SELECT TOP 1 C.CandidateID, C.FullName, C.Status, J.JobTitle
+        FROM ({' UNION '.join(parts)}) M
+        JOIN Candidates C ON C.CandidateID = M.CandidateID
+        LEFT JOIN Jobs J ON C.JobID = J.JobID
+        {exclude_sql}
+        ORDER BY C.CandidateID
+    """, params)
+    return cursor.fetchone()
+
+
+class DuplicateIndex:
+    """ In-memory phone / national ID hash index over the Candidates table. """
+
+    def __init__(self):
+        self.by_phone = {}
+        self.by_national_id = {}
+        self.candidates = {}
+
+    @classmethod
+    def load(cls, cursor):
+        index = cls()
+        cursor.execute(LOAD_KEYS_SQL)
+        for row in cursor.fetchall():
+            index.add(row.CandidateID, row.PhoneKey, row.NationalIDKey, {
+                'id': row.CandidateID, 'name': row.FullName, 'phone': row.Phone,
+                'national_id': row.NationalID, 'status': row.Status, 'job': row.JobTitle,
+                'application_date': row.ApplicationDate
+            })
+        return index
+
+    def add(self, candidate_id, phone_key, nid_key, info=None):
+        if phone_key:
+            self.by_phone.setdefault(phone_key, []).append(candidate_id)
+        if nid_key:
+            self.by_national_id.setdefault(nid_key, []).append(candidate_id)
+        self.candidates[candidate_id] = info or {'id': candidate_id}
+
+    def find(self, phone, national_id):
+        """ Candidate info dict of the first match on normalized keys, or None. """
+        phone_key, nid_key = candidate_key_params(phone, national_id)
+        for ids in (self.by_national_id.get(nid_key) if nid_key else None,
+                    self.by_phone.get(phone_key) if phone_key else None):
+            if ids:
+                return self.candidates.get(ids[0])
+        return None
+
+
+def find_duplicate_clusters(cursor):
+    """
+    Groups all candidates that share a normalized phone or national ID,
+    directly or through another candidate. Returns clusters (largest first),
+    each a dict with the shared keys and the candidates in it.
+    """
+    index = DuplicateIndex.load(cursor)
+
+    parent = {cid: cid for cid in index.candidates}
+
+    def find(cid):
+        while parent[cid] != cid:
+            parent[cid] = parent[parent[cid]]
+            cid = parent[cid]
+        return cid
+
+    def union(ids):
+        root = find(ids[0])
+        for other in ids[1:]:
+            other_root = find(other)
+            if other_root != root:
+                parent[other_root] = root
+
+    shared = []
+    for kind, bucket in (('phone', index.by_phone), ('national_id', index.by_national_id)):
+        for key, ids in bucket.items():
+            if len(ids) > 1:
+                union(ids)
+                shared.append((kind, key, ids[0]))
+
+    clusters = {}
+    for cid, info in index.candidates.items():
+        clusters.setdefault(find(cid), []).append(info)
+
+    keys_by_root = {}
+    for kind, key, member in shared:
+        keys_by_root.setdefault(find(member), []).append({'type': kind, 'key': key})
+
+    result = [
+        {'keys': keys_by_root.get(root, []), 'candidates': sorted(members, key=lambda c: c['id'])}
+        for root, members in clusters.items() if len(members) > 1
+    ]
+    result.sort(key=lambda c: len(c['candidates']), reverse=True)
+    return result
@@ -0,0 +1,228 @@
+"""
+Bulk candidate import from CSV / Excel.
+
+The file is read in chunks of CHUNK_ROWS (CSV is streamed with pandas'
+chunksize; Excel has to be parsed whole, then sliced). For each chunk:
+
+- headers are mapped to the candidate fields (Arabic or English names),
+- phone / national ID keys are normalized with vectorized string ops (same
+  rules as candidate_duplicates.normalize_phone / normalize_national_id),
+- rows are checked against existing candidates through one DuplicateIndex
+  loaded up front (a single query) and against earlier rows of the file,
+- new rows go into a #temp staging table with fast_executemany, and one MERGE
+  inserts them into Candidates (with the Last* activity columns already set)
+  and writes their CandidateLogs rows.
+
+Everything runs in the caller's transaction; the caller commits (or rolls
+back for a dry run). The report lists what happened to every row.
+"""
+import os
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from candidate_duplicates import ARABIC_DIGITS, MIN_PHONE_DIGITS, MAX_PHONE_DIGITS, MAX_NATIONAL_ID_DIGITS, DuplicateIndex
+
+CHUNK_ROWS = 500
+
+IMPORT_NOTE = 'Bulk import'
+
+# Accepted header names per field (compared lower-cased and stripped)
+COLUMN_ALIASES = {
+    'name': ['name', 'full name', 'fullname', 'الاسم', 'اسم المرشح'],
+    'phone': ['phone', 'mobile', 'الهاتف', 'الموبايل', 'رقم الهاتف'],
+    'national_id': ['national id', 'nationalid', 'national_id', 'الرقم القومي'],
+    'email': ['email', 'e-mail', 'البريد الإلكتروني', 'البريد'],
+    'source': ['source', 'المصدر'],
+    'application_date': ['application date', 'applicationdate', 'date', 'تاريخ التقديم']
+}
+REQUIRED_FIELDS = ['name', 'phone']
+
+ROW_INSERTED = 'inserted'
+ROW_DUPLICATE = 'duplicate'
+ROW_INVALID = 'invalid'
+
+STAGING_SQL = """
+    CREATE TABLE #CandidateImport (
+        RowNo INT NOT NULL PRIMARY KEY,
+        FullName NVARCHAR(200), Phone NVARCHAR(50), Email NVARCHAR(200), Source NVARCHAR(100),
+        NationalID NVARCHAR(50), ApplicationDate DATETIME, PhoneKey NVARCHAR(20), NationalIDKey NVARCHAR(30)
+    );
+"""
+
+# MERGE (ON 1 = 0) instead of INSERT ... SELECT so OUTPUT can return the staging RowNo next to the new ID
+APPLY_SQL = """
+    SET NOCOUNT ON;
+    DECLARE @Now DATETIME = GETDATE();
+    DECLARE @Imported TABLE (RowNo INT, CandidateID INT);
+
+    MERGE INTO Candidates AS T
+    USING #CandidateImport AS S ON 1 = 0
+    WHEN NOT MATCHED THEN
+        INSERT (JobID, FullName, Phone, Email, Source, NationalID, Status, ApplicationDate, PhoneKey, NationalIDKey,
+                LastNote, LastActionDate, LastFromStage, LastToStage)
+        VALUES (?, S.FullName, S.Phone, S.Email, S.Source, S.NationalID, 'New', S.ApplicationDate, S.PhoneKey, S.NationalIDKey,
+                ?, @Now, NULL, 'New')
+    OUTPUT S.RowNo, INSERTED.CandidateID INTO @Imported;
+
+    INSERT INTO CandidateLogs (CandidateID, FromStage, ToStage, Note, ActionDate)
+    SELECT CandidateID, NULL, 'New', ?, @Now FROM @Imported;
+
+    TRUNCATE TABLE #CandidateImport;
+
+    SELECT RowNo, CandidateID FROM @Imported;
+"""
+
+
+def read_candidate_chunks(stream, filename, chunk_rows=CHUNK_ROWS):
+    """ Yields DataFrames of at most chunk_rows rows, all values as strings. """
+    ext = os.path.splitext(filename or '')[1].lower()
+    if ext == '.csv':
+        yield from pd.read_csv(stream, dtype=str, chunksize=chunk_rows, encoding='utf-8-sig', skip_blank_lines=True)
+    elif ext in ('.xlsx', '.xls'):
+        frame = pd.read_excel(stream, dtype=str)
+        for start in range(0, len(frame), chunk_rows):
+            yield frame.iloc[start:start + chunk_rows]
+    else:
+        raise ValueError('صيغة الملف غير مدعومة (CSV أو Excel فقط)')
+
+
+def map_columns(columns):
+    """ {file column: field} for the recognised headers. """
+    lookup = {alias: field for field, aliases in COLUMN_ALIASES.items() for alias in aliases}
+    return {col: lookup[str(col).strip().lower()] for col in columns if str(col).strip().lower() in lookup}
+
+
+def _clean_text(value):
+    if value is None or pd.isna(value):
+        return None
+    return str(value).strip() or None
+
+
+def _digit_keys(series):
+    return series.fillna('').astype(str).str.translate(ARABIC_DIGITS).str.replace(r'\D+', '', regex=True)
+
+
+def phone_keys(series):
+    """ Vectorized normalize_phone. """
+    digits = _digit_keys(series)
+    digits = digits.mask(digits.str.startswith('0020'), '0' + digits.str[4:])
+    digits = digits.mask(digits.str.startswith('20') & (digits.str.len() == 12), '0' + digits.str[2:])
+    return digits.where(digits.str.len().between(MIN_PHONE_DIGITS, MAX_PHONE_DIGITS))
+
+
+def national_id_keys(series):
+    """ Vectorized normalize_national_id. """
+    digits = _digit_keys(series)
+    return digits.where(digits.str.len().between(1, MAX_NATIONAL_ID_DIGITS))
+
+
+def prepare_chunk(frame, first_row_no, default_date):
+    """ Renames / cleans a raw chunk and adds RowNo (file line), PhoneKey, NationalIDKey. """
+    frame = frame.rename(columns=map_columns(frame.columns))
+    frame = frame.loc[:, ~frame.columns.duplicated()]
+    for field in COLUMN_ALIASES:
+        if field not in frame.columns:
+            frame[field] = None
+    frame = frame[list(COLUMN_ALIASES)].copy()
+
+    for field in ('name', 'phone', 'national_id', 'email', 'source'):
+        frame[field] = frame[field].map(_clean_text)
+
+    frame['RowNo'] = range(first_row_no, first_row_no + len(frame))
+    frame['PhoneKey'] = phone_keys(frame['phone'])
+    frame['NationalIDKey'] = national_id_keys(frame['national_id'])
+
+    dates = pd.to_datetime(frame['application_date'], errors='coerce')
+    frame['bad_date'] = frame['application_date'].notna() & dates.isna()
+    frame['application_date'] = dates.fillna(pd.Timestamp(default_date))
+    frame['source'] = frame['source'].fillna('Other')
+    return frame
+
+
+def import_candidates(cursor, job_id, stream, filename, chunk_rows=CHUNK_ROWS):
+    """
+    Imports the file's candidates into job_id. Returns the report:
+    {'total', 'inserted', 'duplicates', 'invalid', 'seconds', 'rows': [{row, name, phone, status, message, candidate_id}]}
+    """
+    started = time.perf_counter()
+    index = DuplicateIndex.load(cursor)
+    cursor.execute(STAGING_SQL)
+
+    report_rows = []
+    counts = {ROW_INSERTED: 0, ROW_DUPLICATE: 0, ROW_INVALID: 0}
+    now = datetime.now()
+    next_row_no = 2  # line 1 is the header
+    headers_checked = False
+
+    for raw in read_candidate_chunks(stream, filename, chunk_rows):
+        if not headers_checked:
+            if not set(REQUIRED_FIELDS) <= set(map_columns(raw.columns).values()):
+                raise ValueError('الملف لا يحتوي على أعمدة الاسم والهاتف')
+            headers_checked = True
+
+        frame = prepare_chunk(raw, next_row_no, now)
+        next_row_no += len(frame)
+        frame = frame[frame[['name', 'phone', 'national_id', 'email']].notna().any(axis=1)]
+
+        invalid = frame['name'].isna() | frame['PhoneKey'].isna() | frame['bad_date']
+        existing_ids = frame['NationalIDKey'].map(lambda k: index.by_national_id.get(k, [None])[0])
+        existing_ids = existing_ids.where(existing_ids.notna(), frame['PhoneKey'].map(lambda k: index.by_phone.get(k, [None])[0]))
+        # Earlier valid rows of this chunk (rows of previous chunks are already in the index)
+        valid_phone = frame['PhoneKey'].where(~invalid)
+        valid_nid = frame['NationalIDKey'].where(~invalid)
+        repeated = (valid_phone.notna() & valid_phone.duplicated()) | (valid_nid.notna() & valid_nid.duplicated())
+        duplicate = ~invalid & (existing_ids.notna() | repeated)
+        new_rows = frame[~invalid & ~duplicate]
+
+        for rec in frame[invalid].itertuples(index=False):
+            name = _clean_text(rec.name)
+            message = 'الاسم مطلوب' if name is None else ('تاريخ التقديم غير صحيح' if rec.bad_date else 'رقم الهاتف غير صحيح')
+            report_rows.append({'row': rec.RowNo, 'name': name, 'phone': _clean_text(rec.phone),
+                                'status': ROW_INVALID, 'message': message, 'candidate_id': None})
+        for rec, match in zip(frame[duplicate].itertuples(index=False), existing_ids[duplicate]):
+            info = index.candidates.get(match) if pd.notna(match) else None
+            message = f"موجود بالفعل: {info['name']} ({info.get('job') or '-'})" if info else 'مكرر داخل الملف'
+            report_rows.append({'row': rec.RowNo, 'name': rec.name, 'phone': rec.phone,
+                                'status': ROW_DUPLICATE, 'message': message,
+                                'candidate_id': int(match) if pd.notna(match) else None})
+        counts[ROW_INVALID] += int(invalid.sum())
+        counts[ROW_DUPLICATE] += int(duplicate.sum())
+
+        if new_rows.empty:
+            continue
+
+        params = [
+            (int(r.RowNo), r.name, r.phone, r.email, r.source, r.national_id,
+             r.application_date.to_pydatetime(), r.PhoneKey, _clean_text(r.NationalIDKey))
+            for r in new_rows.itertuples(index=False)
+        ]
+        cursor.fast_executemany = True
+        cursor.executemany("""
+            INSERT INTO #CandidateImport (RowNo, FullName, Phone, Email, Source, NationalID, ApplicationDate, PhoneKey, NationalIDKey)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, params)
+        cursor.fast_executemany = False
+
+        cursor.execute(APPLY_SQL, (job_id, IMPORT_NOTE, IMPORT_NOTE))
+        imported = {row.RowNo: row.CandidateID for row in cursor.fetchall()}
+
+        for r in new_rows.itertuples(index=False):
+            candidate_id = imported.get(r.RowNo)
+            index.add(candidate_id, r.PhoneKey, _clean_text(r.NationalIDKey),
+                      {'id': candidate_id, 'name': r.name, 'phone': r.phone, 'job': None})
+            report_rows.append({'row': r.RowNo, 'name': r.name, 'phone': r.phone,
+                                'status': ROW_INSERTED, 'message': '', 'candidate_id': candidate_id})
+        counts[ROW_INSERTED] += len(new_rows)
+
+    cursor.execute("DROP TABLE #CandidateImport")
+    report_rows.sort(key=lambda r: r['row'])
+    return {
+        'total': len(report_rows),
+        'inserted': counts[ROW_INSERTED],
+        'duplicates': counts[ROW_DUPLICATE],
+        'invalid': counts[ROW_INVALID],
+        'seconds': round(time.perf_counter() - started, 2),
+        'rows': report_rows
+    }
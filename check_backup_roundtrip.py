@@ -0,0 +1,74 @@
+"""
+Round trip of the app-owned USERINFO columns through app_backup (backup, lose
+them the way a USERINFO reload would, restore) on a throwaway SQLite
+stand-in database:
+
+    python check_backup_roundtrip.py
+
+The other tables are read through SQL Server's catalog (table_info), so
+their round trip needs SQL Server.
+"""
+import os
+import sys
+import tempfile
+
+import sqlite_backend
+from app_backup import run_backup, run_restore
+from create_sqlite_db import create_sqlite_db
+
+# USERID, BADGENUMBER, IsActive, employee_class
+EMPLOYEES = [
+    (1, '1001', 1, 'A,B'),
+    (2, '1002_A', 0, 'C'),
+    (3, '1003', None, None),
+]
+
+SELECT_SQL = "SELECT USERID, BADGENUMBER, IsActive, employee_class FROM [Zktime_Copy].[dbo].[USERINFO] ORDER BY USERID"
+
+
+def check_backup_roundtrip():
+    problems = []
+    directory = tempfile.mkdtemp(prefix='check-backup-')
+    path = os.path.join(directory, 'check.sqlite3')
+    create_sqlite_db(path)
+    conn = sqlite_backend.connect(path)
+    cursor = conn.cursor()
+    try:
+        for uid, badge, active, classes in EMPLOYEES:
+            cursor.execute("""
+                INSERT INTO [Zktime_Copy].[dbo].[USERINFO] (USERID, BADGENUMBER, NAME, IsActive, employee_class)
+                VALUES (?, ?, ?, ?, ?)
+            """, (uid, badge, f'موظف {uid}', active, classes))
+        conn.commit()
+
+        root = os.path.join(directory, 'backups')
+        manifest = run_backup(conn, root, tables=['USERINFO'], log=lambda message: None)
+        if manifest['tables']['USERINFO']['rows'] != len(EMPLOYEES):
+            problems.append(f"backed up {manifest['tables']['USERINFO']['rows']} USERINFO rows, expected {len(EMPLOYEES)}")
+
+        # A reload from the attendance database: original badges, everyone active, no classes
+        cursor.execute("UPDATE [Zktime_Copy].[dbo].[USERINFO] SET BADGENUMBER = REPLACE(BADGENUMBER, '_A', ''), IsActive = 1, employee_class = NULL")
+        cursor.execute("UPDATE [Zktime_Copy].[dbo].[USERINFO] SET NAME = 'من المصدر' WHERE USERID = 1")
+        conn.commit()
+
+        run_restore(conn, root, tables=['USERINFO'], log=lambda message: None)
+        cursor.execute(SELECT_SQL)
+        restored = [tuple(r) for r in cursor.fetchall()]
+        if restored != EMPLOYEES:
+            problems.append(f"restored {restored}, expected {EMPLOYEES}")
+
+        cursor.execute("SELECT NAME FROM [Zktime_Copy].[dbo].[USERINFO] WHERE USERID = 1")
+        if cursor.fetchone().NAME != 'من المصدر':
+            problems.append("the restore overwrote a column that is not backed up (NAME)")
+    finally:
+        conn.close()
+
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if not problems:
+        print("OK: class, IsActive and archived badges survive a backup / restore round trip.")
+    return not problems
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_backup_roundtrip() else 1)
@@ -0,0 +1,72 @@
+"""
+Checks that employees archived by a bulk import (deactivate missing) count as
+leavers, on a throwaway SQLite stand-in database:
+
+    python check_employee_import.py
+"""
+import io
+import os
+import sys
+import tempfile
+from datetime import date
+
+import sqlite_backend
+from create_sqlite_db import create_sqlite_db
+from employee_import import import_employees
+from workforce_analytics import load_workforce, leave_events, tenures
+
+EMPLOYEES = [
+    (1, '1001', 'موظف باق', '2020-01-05'),
+    (2, '1002', 'موظف غادر', '2021-03-10'),
+]
+
+
+def check_employee_import():
+    problems = []
+    directory = tempfile.mkdtemp(prefix='check-import-')
+    path = os.path.join(directory, 'check.sqlite3')
+    create_sqlite_db(path)
+    conn = sqlite_backend.connect(path)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("INSERT INTO DEPARTMENTS (DEPTID, DEPTNAME, SUPDEPTID) VALUES (1, 'الإدارة', 0)")
+        for uid, badge, name, hired in EMPLOYEES:
+            cursor.execute("""
+                SET IDENTITY_INSERT [Zktime_Copy].[dbo].[USERINFO] ON;
+                INSERT INTO [Zktime_Copy].[dbo].[USERINFO] (USERID, BADGENUMBER, NAME, DEFAULTDEPTID, HIREDDAY, IsActive)
+                VALUES (?, ?, ?, 1, ?, 1);
+                SET IDENTITY_INSERT [Zktime_Copy].[dbo].[USERINFO] OFF;
+            """, (uid, badge, name, hired))
+        conn.commit()
+
+        # The file only lists the first employee; the second is archived
+        stream = io.BytesIO(f"BADGENUMBER,NAME\n{EMPLOYEES[0][1]},{EMPLOYEES[0][2]}\n".encode('utf-8'))
+        result = import_employees(cursor, stream, 'employees.csv', dry_run=False, deactivate_missing=True, admin_user_id=1)
+        conn.commit()
+        if [row['USERID'] for row in result['deactivations']] != [2]:
+            problems.append(f"expected USERID 2 to be deactivated, got {result['deactivations']}")
+
+        cursor.execute("SELECT IsActive, BADGENUMBER FROM [Zktime_Copy].[dbo].[USERINFO] WHERE USERID = 2")
+        row = cursor.fetchone()
+        if (row.IsActive, row.BADGENUMBER) != (0, '1002_A'):
+            problems.append(f"USERID 2 not archived in USERINFO: {tuple(row)}")
+
+        data = load_workforce(cursor)
+        leavers = leave_events(data)
+        if list(leavers['EmployeeID']) != [2] or leavers['Date'].iloc[0].date() != date.today():
+            problems.append(f"USERID 2 is not a leaver today: {leavers.to_dict('records')}")
+        tenure = tenures(data).set_index('EmployeeID')
+        if 2 not in tenure.index or tenure.loc[2, 'End'].date() != date.today():
+            problems.append("USERID 2 is missing from the headcount history")
+    finally:
+        conn.close()
+
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if not problems:
+        print("OK: the archived employee is a leaver and stays in the headcount history.")
+    return not problems
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_employee_import() else 1)
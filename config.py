@@ -1,3 +1,5 @@
+import os
+
 CONNECTION_STRING = (
     "DRIVER={ODBC Driver 17 for SQL Server};"
     "SERVER=192.168.50.5,1433;"
@@ -10,3 +12,8 @@ CONNECTION_STRING = (
     "Command Timeout=30;"
     "MARS_Connection=yes;"
 )
+
+# "sqlserver" (default) or "sqlite": the stand-in database of sqlite_backend.py
+# for offline development and benchmarks (create it with create_sqlite_db.py)
+DB_BACKEND = os.environ.get('DB_BACKEND', 'sqlserver')
+SQLITE_PATH = os.environ.get('SQLITE_PATH', 'local_dev.sqlite3')
@@ -0,0 +1,57 @@
+import pyodbc
+from config import CONNECTION_STRING
+
+def create_candidate_activity_columns():
+    conn = pyodbc.connect(CONNECTION_STRING)
+    cursor = conn.cursor()
+
+    # Latest CandidateLogs row mirrored on the candidate (maintained by log_candidate_action in app.py)
+    columns_sql = """
+    IF COL_LENGTH('dbo.Candidates', 'LastNote') IS NULL
+        ALTER TABLE [dbo].[Candidates] ADD [LastNote] [nvarchar](max) NULL
+    IF COL_LENGTH('dbo.Candidates', 'LastActionDate') IS NULL
+        ALTER TABLE [dbo].[Candidates] ADD [LastActionDate] [datetime] NULL
+    IF COL_LENGTH('dbo.Candidates', 'LastFromStage') IS NULL
+        ALTER TABLE [dbo].[Candidates] ADD [LastFromStage] [nvarchar](50) NULL
+    IF COL_LENGTH('dbo.Candidates', 'LastToStage') IS NULL
+        ALTER TABLE [dbo].[Candidates] ADD [LastToStage] [nvarchar](50) NULL
+    PRINT 'Candidate activity columns ready.'
+    """
+
+    index_sql = """
+    IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_Candidates_LastActionDate' AND object_id = OBJECT_ID(N'[dbo].[Candidates]'))
+    BEGIN
+        CREATE NONCLUSTERED INDEX IX_Candidates_LastActionDate ON [dbo].[Candidates] ([LastActionDate] DESC)
+        PRINT 'Index IX_Candidates_LastActionDate created.'
+    END
+    """
+
+    # Back-fill from the log (same "latest" rule the pages used: ActionDate, then LogID)
+    backfill_sql = """
+    WITH Latest AS (
+        SELECT L.CandidateID, L.Note, L.ActionDate, L.FromStage, L.ToStage,
+               ROW_NUMBER() OVER (PARTITION BY L.CandidateID ORDER BY L.ActionDate DESC, L.LogID DESC) AS rn
+        FROM [dbo].[CandidateLogs] L
+    )
+    UPDATE C
+    SET C.LastNote = L.Note, C.LastActionDate = L.ActionDate,
+        C.LastFromStage = L.FromStage, C.LastToStage = L.ToStage
+    FROM [dbo].[Candidates] C
+    JOIN Latest L ON L.CandidateID = C.CandidateID AND L.rn = 1
+    """
+
+    try:
+        cursor.execute(columns_sql)
+        conn.commit()
+        cursor.execute(index_sql)
+        cursor.execute(backfill_sql)
+        print(f"Candidates back-filled: {cursor.rowcount}")
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Error creating columns: {e}")
+
+    conn.close()
+
+if __name__ == "__main__":
+    create_candidate_activity_columns()
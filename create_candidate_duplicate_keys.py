@@ -0,0 +1,69 @@
+import pyodbc
+from config import CONNECTION_STRING
+from candidate_duplicates import candidate_key_params, find_duplicate_clusters, MAX_PHONE_DIGITS, MAX_NATIONAL_ID_DIGITS
+
+BACKFILL_CHUNK_SIZE = 1000
+
+def create_candidate_duplicate_keys():
+    conn = pyodbc.connect(CONNECTION_STRING)
+    cursor = conn.cursor()
+
+    # Normalized phone / national ID (maintained by the app through candidate_key_params)
+    columns_sql = f"""
+    IF COL_LENGTH('dbo.Candidates', 'PhoneKey') IS NULL
+        ALTER TABLE [dbo].[Candidates] ADD [PhoneKey] [nvarchar]({MAX_PHONE_DIGITS}) NULL
+    IF COL_LENGTH('dbo.Candidates', 'NationalIDKey') IS NULL
+        ALTER TABLE [dbo].[Candidates] ADD [NationalIDKey] [nvarchar]({MAX_NATIONAL_ID_DIGITS}) NULL
+    PRINT 'Candidate duplicate key columns ready.'
+    """
+
+    # The normalizers cap keys at MAX_*_DIGITS; columns created narrower would truncate / reject them
+    width_sql = """
+    SELECT COL_LENGTH('dbo.Candidates', 'PhoneKey') / 2, COL_LENGTH('dbo.Candidates', 'NationalIDKey') / 2
+    """
+
+    index_sql = """
+    IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_Candidates_PhoneKey' AND object_id = OBJECT_ID(N'[dbo].[Candidates]'))
+    BEGIN
+        CREATE NONCLUSTERED INDEX IX_Candidates_PhoneKey ON [dbo].[Candidates] ([PhoneKey]) WHERE [PhoneKey] IS NOT NULL
+        PRINT 'Index IX_Candidates_PhoneKey created.'
+    END
+    IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_Candidates_NationalIDKey' AND object_id = OBJECT_ID(N'[dbo].[Candidates]'))
+    BEGIN
+        CREATE NONCLUSTERED INDEX IX_Candidates_NationalIDKey ON [dbo].[Candidates] ([NationalIDKey]) WHERE [NationalIDKey] IS NOT NULL
+        PRINT 'Index IX_Candidates_NationalIDKey created.'
+    END
+    """
+
+    try:
+        cursor.execute(columns_sql)
+        conn.commit()
+        phone_width, nid_width = cursor.execute(width_sql).fetchone()
+        if phone_width < MAX_PHONE_DIGITS or nid_width < MAX_NATIONAL_ID_DIGITS:
+            raise RuntimeError(f"Candidates.PhoneKey / NationalIDKey are nvarchar({phone_width}) / nvarchar({nid_width}), "
+                               f"need at least {MAX_PHONE_DIGITS} / {MAX_NATIONAL_ID_DIGITS}")
+        cursor.execute(index_sql)
+        conn.commit()
+
+        # Back-fill in Python: the normalization (Arabic digits, +20 prefix) is not expressible as a computed column
+        cursor.execute("SELECT CandidateID, Phone, NationalID FROM [dbo].[Candidates]")
+        rows = [(*candidate_key_params(r.Phone, r.NationalID), r.CandidateID) for r in cursor.fetchall()]
+
+        cursor.fast_executemany = True
+        for start in range(0, len(rows), BACKFILL_CHUNK_SIZE):
+            cursor.executemany("UPDATE [dbo].[Candidates] SET PhoneKey = ?, NationalIDKey = ? WHERE CandidateID = ?",
+                               rows[start:start + BACKFILL_CHUNK_SIZE])
+            conn.commit()
+        cursor.fast_executemany = False
+        print(f"Candidates back-filled: {len(rows)}")
+
+        clusters = find_duplicate_clusters(cursor)
+        print(f"Duplicate groups found: {len(clusters)} ({sum(len(c['candidates']) for c in clusters)} candidates)")
+    except Exception as e:
+        conn.rollback()
+        print(f"Error creating duplicate keys: {e}")
+
+    conn.close()
+
+if __name__ == "__main__":
+    create_candidate_duplicate_keys()
@@ -0,0 +1,82 @@
+import pyodbc
+from config import CONNECTION_STRING
+from cycle_progress import rebuild_cycle_progress
+
+def create_cycle_progress_table():
+    conn = pyodbc.connect(CONNECTION_STRING)
+    cursor = conn.cursor()
+
+    table_sql = """
+    IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[CycleProgress]') AND type in (N'U'))
+    BEGIN
+        CREATE TABLE [dbo].[CycleProgress](
+            [CycleID] [int] NOT NULL,
+            [DepartmentID] [int] NOT NULL,
+            [EvaluatorUserID] [int] NOT NULL DEFAULT 0,
+            [EligibleCount] [int] NOT NULL DEFAULT 0,
+            [EvaluatedCount] [int] NOT NULL DEFAULT 0,
+            [UpdatedAt] [datetime] DEFAULT GETDATE(),
+            PRIMARY KEY CLUSTERED ([CycleID] ASC, [DepartmentID] ASC, [EvaluatorUserID] ASC)
+        )
+        CREATE NONCLUSTERED INDEX IX_CycleProgress_Department ON [dbo].[CycleProgress] ([DepartmentID])
+        PRINT 'Table CycleProgress created successfully.'
+    END
+    ELSE
+    BEGIN
+        PRINT 'Table CycleProgress already exists.'
+    END
+    """
+
+    # Evaluations are linked to their cycle so the counters can be rebuilt
+    column_sql = """
+    IF COL_LENGTH('dbo.Evaluations', 'CycleID') IS NULL
+    BEGIN
+        ALTER TABLE [dbo].[Evaluations] ADD [CycleID] [int] NULL
+        PRINT 'Column Evaluations.CycleID added.'
+    END
+    """
+
+    index_sql = """
+    IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_Evaluations_Cycle_Employee' AND object_id = OBJECT_ID(N'[dbo].[Evaluations]'))
+    BEGIN
+        CREATE NONCLUSTERED INDEX IX_Evaluations_Cycle_Employee
+        ON [dbo].[Evaluations] ([CycleID], [EmployeeUserID]) INCLUDE ([EvaluatorUserID])
+        PRINT 'Index IX_Evaluations_Cycle_Employee created.'
+    END
+    """
+
+    # Existing evaluations are matched to the cycle that was open on their date
+    backfill_sql = """
+    UPDATE E
+    SET E.CycleID = (
+        SELECT TOP 1 C.CycleID
+        FROM [dbo].[EvaluationCycles] C
+        LEFT JOIN [dbo].[USERINFO] UI ON UI.USERID = E.EmployeeUserID
+        WHERE C.EvaluationTypeID = E.EvaluationTypeID
+          AND CAST(E.EvaluationDate AS DATE) BETWEEN C.StartDate AND C.EndDate
+          AND (NOT EXISTS (SELECT 1 FROM [dbo].[CycleDepartments] CD WHERE CD.CycleID = C.CycleID)
+               OR EXISTS (SELECT 1 FROM [dbo].[CycleDepartments] CD WHERE CD.CycleID = C.CycleID AND CD.DepartmentID = UI.DEFAULTDEPTID))
+        ORDER BY C.StartDate DESC
+    )
+    FROM [dbo].[Evaluations] E
+    WHERE E.CycleID IS NULL
+    """
+
+    try:
+        cursor.execute(table_sql)
+        cursor.execute(column_sql)
+        conn.commit()
+        cursor.execute(index_sql)
+        cursor.execute(backfill_sql)
+        print(f"Evaluations linked to cycles: {cursor.rowcount}")
+        rebuild_cycle_progress(cursor)
+        conn.commit()
+        print("Cycle progress counters rebuilt for all enabled cycles.")
+    except Exception as e:
+        conn.rollback()
+        print(f"Error creating table: {e}")
+
+    conn.close()
+
+if __name__ == "__main__":
+    create_cycle_progress_table()
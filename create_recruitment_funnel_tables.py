@@ -0,0 +1,82 @@
+import pyodbc
+from config import CONNECTION_STRING
+from recruitment_funnel import refresh_recruitment_funnel
+
+def create_recruitment_funnel_tables():
+    conn = pyodbc.connect(CONNECTION_STRING)
+    cursor = conn.cursor()
+
+    facts_sql = """
+    IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[CandidateStageFacts]') AND type in (N'U'))
+    BEGIN
+        CREATE TABLE [dbo].[CandidateStageFacts](
+            [LogID] [int] NOT NULL PRIMARY KEY,
+            [CandidateID] [int] NOT NULL,
+            [JobID] [int] NULL,
+            [DepartmentID] [int] NULL,
+            [Stage] [nvarchar](50) NOT NULL,
+            [NextStage] [nvarchar](50) NOT NULL,
+            [EnteredAt] [datetime] NULL,
+            [ExitedAt] [datetime] NOT NULL,
+            [DaysInStage] [decimal](10, 2) NULL
+        )
+        CREATE NONCLUSTERED INDEX IX_CandidateStageFacts_Job ON [dbo].[CandidateStageFacts] ([JobID], [Stage])
+        PRINT 'Table CandidateStageFacts created successfully.'
+    END
+    ELSE
+    BEGIN
+        PRINT 'Table CandidateStageFacts already exists.'
+    END
+    """
+
+    summary_sql = """
+    IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[RecruitmentFunnelSummary]') AND type in (N'U'))
+    BEGIN
+        CREATE TABLE [dbo].[RecruitmentFunnelSummary](
+            [ScopeType] [nvarchar](20) NOT NULL,
+            [ScopeID] [int] NOT NULL,
+            [Stage] [nvarchar](50) NOT NULL,
+            [StageOrder] [int] NOT NULL,
+            [Reached] [int] NOT NULL,
+            [Advanced] [int] NOT NULL,
+            [DroppedOff] [int] NOT NULL,
+            [ConversionRate] [decimal](5, 1) NOT NULL,
+            [MedianDays] [decimal](10, 1) NULL,
+            [P90Days] [decimal](10, 1) NULL,
+            [RefreshedAt] [datetime] DEFAULT GETDATE(),
+            PRIMARY KEY CLUSTERED ([ScopeType] ASC, [ScopeID] ASC, [Stage] ASC)
+        )
+        PRINT 'Table RecruitmentFunnelSummary created successfully.'
+    END
+    ELSE
+    BEGIN
+        PRINT 'Table RecruitmentFunnelSummary already exists.'
+    END
+    """
+
+    # The extraction filters CandidateLogs by LogID and candidate
+    index_sql = """
+    IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_CandidateLogs_Candidate_Date' AND object_id = OBJECT_ID(N'[dbo].[CandidateLogs]'))
+    BEGIN
+        CREATE NONCLUSTERED INDEX IX_CandidateLogs_Candidate_Date
+        ON [dbo].[CandidateLogs] ([CandidateID], [ActionDate], [LogID]) INCLUDE ([FromStage], [ToStage])
+        PRINT 'Index IX_CandidateLogs_Candidate_Date created.'
+    END
+    """
+
+    try:
+        cursor.execute(facts_sql)
+        cursor.execute(summary_sql)
+        cursor.execute(index_sql)
+        conn.commit()
+        new_facts = refresh_recruitment_funnel(cursor, force=True)
+        conn.commit()
+        print(f"Funnel facts extracted: {new_facts}")
+    except Exception as e:
+        conn.rollback()
+        print(f"Error creating tables: {e}")
+
+    conn.close()
+
+if __name__ == "__main__":
+    create_recruitment_funnel_tables()
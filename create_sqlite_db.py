@@ -0,0 +1,385 @@
+"""
+Creates the SQLite stand-in database (sqlite_backend.py) with the tables of
+Zktime_Copy that the app uses, plus the reference rows it expects: the six
+roles, the employee classes, the termination types and an admin / admin login.
+
+    python create_sqlite_db.py                      creates SQLITE_PATH (config.py)
+    python create_sqlite_db.py --path bench.sqlite3 --reset
+
+Then run the app with DB_BACKEND=sqlite; generate_data.py fills it with data.
+Identity columns are INTEGER PRIMARY KEY; text columns compare
+case-insensitively (COLLATE NOCASE) as they do on SQL Server.
+"""
+import argparse
+import os
+import sqlite3
+
+from config import SQLITE_PATH
+
+SCHEMA_SQL = """
+CREATE TABLE Roles (
+    RoleID INTEGER PRIMARY KEY,
+    RoleName TEXT COLLATE NOCASE NOT NULL
+);
+
+CREATE TABLE DEPARTMENTS (
+    DEPTID INTEGER PRIMARY KEY,
+    DEPTNAME TEXT COLLATE NOCASE NOT NULL,
+    SUPDEPTID INTEGER
+);
+
+CREATE TABLE POSITIONS (
+    PositionID INTEGER PRIMARY KEY,
+    PositionName TEXT COLLATE NOCASE NOT NULL,
+    DeptID INTEGER
+);
+
+CREATE TABLE EmployeeClasses (
+    ClassID INTEGER PRIMARY KEY,
+    ClassName TEXT COLLATE NOCASE NOT NULL UNIQUE,
+    DisplayName TEXT COLLATE NOCASE
+);
+
+CREATE TABLE USERINFO (
+    USERID INTEGER PRIMARY KEY,
+    BADGENUMBER TEXT COLLATE NOCASE,
+    SSN TEXT COLLATE NOCASE,
+    NAME TEXT COLLATE NOCASE,
+    GENDER TEXT COLLATE NOCASE,
+    TITLE TEXT COLLATE NOCASE,
+    BIRTHDAY DATETIME,
+    HIREDDAY DATETIME,
+    STREET TEXT COLLATE NOCASE,
+    OPHONE TEXT COLLATE NOCASE,
+    MOBILE TEXT COLLATE NOCASE,
+    DEFAULTDEPTID INTEGER,
+    PositionID INTEGER,
+    employee_class TEXT COLLATE NOCASE DEFAULT 'لم تضاف',
+    IsActive INTEGER DEFAULT 1,
+    pic BLOB
+);
+CREATE INDEX IX_USERINFO_BADGENUMBER ON USERINFO (BADGENUMBER);
+CREATE INDEX IX_USERINFO_DEFAULTDEPTID ON USERINFO (DEFAULTDEPTID);
+
+CREATE TABLE Users (
+    UserID INTEGER PRIMARY KEY,
+    Username TEXT COLLATE NOCASE NOT NULL UNIQUE,
+    PasswordHash TEXT NOT NULL,
+    RoleID INTEGER,
+    Name TEXT COLLATE NOCASE,
+    DepartmentID INTEGER,
+    employee_class TEXT COLLATE NOCASE
+);
+
+CREATE TABLE EmployeeArchive (
+    ArchiveID INTEGER PRIMARY KEY,
+    UserID INTEGER,
+    Name TEXT COLLATE NOCASE,
+    ArchivedSSN TEXT COLLATE NOCASE,
+    ArchivedDeptID INTEGER,
+    ArchivedPosID INTEGER,
+    HiredDay DATETIME,
+    EndDay DATETIME,
+    ArchiveReasonID INTEGER,
+    ArchiveComment TEXT COLLATE NOCASE,
+    AdminUserID INTEGER
+);
+
+CREATE TABLE TerminationTypes (
+    TypeID INTEGER PRIMARY KEY,
+    TypeText TEXT COLLATE NOCASE NOT NULL
+);
+
+CREATE TABLE TerminationReasons (
+    ReasonID INTEGER PRIMARY KEY,
+    TypeID INTEGER NOT NULL,
+    ReasonText TEXT COLLATE NOCASE NOT NULL
+);
+
+CREATE TABLE EvaluationTypes (
+    EvaluationTypeID INTEGER PRIMARY KEY,
+    TypeName TEXT COLLATE NOCASE NOT NULL,
+    DisplayName TEXT COLLATE NOCASE,
+    IsRepeatable INTEGER DEFAULT 0,
+    PrerequisiteTypeID INTEGER,
+    SortOrder INTEGER DEFAULT 0
+);
+
+CREATE TABLE EvaluationCycles (
+    CycleID INTEGER PRIMARY KEY,
+    CycleName TEXT COLLATE NOCASE NOT NULL,
+    EvaluationTypeID INTEGER,
+    StartDate DATE,
+    EndDate DATE,
+    IsEnabled INTEGER DEFAULT 1
+);
+
+CREATE TABLE CycleDepartments (
+    CycleID INTEGER NOT NULL,
+    DepartmentID INTEGER NOT NULL,
+    PRIMARY KEY (CycleID, DepartmentID)
+);
+
+CREATE TABLE CycleProgress (
+    CycleID INTEGER NOT NULL,
+    DepartmentID INTEGER NOT NULL,
+    EvaluatorUserID INTEGER NOT NULL DEFAULT 0,
+    EligibleCount INTEGER NOT NULL DEFAULT 0,
+    EvaluatedCount INTEGER NOT NULL DEFAULT 0,
+    UpdatedAt DATETIME DEFAULT (datetime('now', 'localtime')),
+    PRIMARY KEY (CycleID, DepartmentID, EvaluatorUserID)
+);
+
+CREATE TABLE Recommendations (
+    RecommendationID INTEGER PRIMARY KEY,
+    RecommendationText TEXT COLLATE NOCASE NOT NULL,
+    AppliesToDeptID TEXT COLLATE NOCASE
+);
+
+CREATE TABLE EvaluationCriteria (
+    CriteriaID INTEGER PRIMARY KEY,
+    CriteriaName TEXT COLLATE NOCASE NOT NULL,
+    CriteriaWeight REAL,
+    MaxScore INTEGER,
+    AppliesToDeptID TEXT COLLATE NOCASE,
+    employee_class TEXT COLLATE NOCASE
+);
+
+CREATE TABLE Evaluations (
+    EvaluationID INTEGER PRIMARY KEY,
+    EmployeeUserID INTEGER NOT NULL,
+    EvaluatorUserID INTEGER NOT NULL,
+    EvaluationDate DATETIME DEFAULT (datetime('now', 'localtime')),
+    EvaluationType TEXT COLLATE NOCASE,
+    EvaluationTypeID INTEGER,
+    OverallScore REAL,
+    OverallRating TEXT COLLATE NOCASE,
+    ManagerComments TEXT COLLATE NOCASE,
+    RecommendationID INTEGER,
+    TrainingCourseID INTEGER,
+    CycleID INTEGER,
+    SessionID INTEGER,
+    EnrollmentID INTEGER
+);
+CREATE INDEX IX_Evaluations_Employee ON Evaluations (EmployeeUserID, EvaluationDate);
+CREATE INDEX IX_Evaluations_Cycle_Employee ON Evaluations (CycleID, EmployeeUserID);
+CREATE INDEX IX_Evaluations_Date ON Evaluations (EvaluationDate);
+
+CREATE TABLE EvaluationDetails (
+    DetailID INTEGER PRIMARY KEY,
+    EvaluationID INTEGER NOT NULL,
+    CriteriaID INTEGER NOT NULL,
+    ScoreGiven INTEGER
+);
+CREATE INDEX IX_EvaluationDetails_Evaluation ON EvaluationDetails (EvaluationID);
+
+CREATE TABLE TrainingCourses (
+    TrainingCourseID INTEGER PRIMARY KEY,
+    TrainingCourseText TEXT COLLATE NOCASE NOT NULL,
+    Description TEXT COLLATE NOCASE,
+    AppliesToDeptID TEXT COLLATE NOCASE,
+    DepartmentID INTEGER,
+    DurationHours REAL,
+    Difficulty TEXT COLLATE NOCASE,
+    IsActive INTEGER DEFAULT 1,
+    CreatedBy INTEGER
+);
+
+CREATE TABLE TrainingSessions (
+    SessionID INTEGER PRIMARY KEY,
+    CourseID INTEGER NOT NULL,
+    SessionDate DATETIME,
+    EndDate DATETIME,
+    Location TEXT COLLATE NOCASE,
+    InstructorID TEXT COLLATE NOCASE,
+    IsExternal INTEGER DEFAULT 0,
+    ExternalTrainerName TEXT COLLATE NOCASE,
+    ExternalCompany TEXT COLLATE NOCASE,
+    EventType TEXT COLLATE NOCASE,
+    MaxCapacity INTEGER,
+    MaxSeats INTEGER,
+    Status TEXT COLLATE NOCASE
+);
+CREATE INDEX IX_TrainingSessions_Course ON TrainingSessions (CourseID);
+
+CREATE TABLE TrainingSessionDays (
+    DayID INTEGER PRIMARY KEY,
+    SessionID INTEGER NOT NULL,
+    DayDate DATE,
+    StartTime TEXT,
+    EndTime TEXT,
+    Topic TEXT COLLATE NOCASE
+);
+CREATE INDEX IX_TrainingSessionDays_Session ON TrainingSessionDays (SessionID);
+
+CREATE TABLE TrainingEnrollments (
+    EnrollmentID INTEGER PRIMARY KEY,
+    SessionID INTEGER,
+    TrainingCourseID INTEGER,
+    EmployeeUserID INTEGER NOT NULL,
+    EnrollmentDate DATETIME DEFAULT (datetime('now', 'localtime')),
+    AttendanceStatus TEXT COLLATE NOCASE,
+    AttendancePercent REAL,
+    PassStatus TEXT COLLATE NOCASE,
+    Grade REAL,
+    InstructorFeedback TEXT COLLATE NOCASE,
+    ManagerComments TEXT COLLATE NOCASE,
+    EvaluatorUserID INTEGER,
+    EvaluationID INTEGER,
+    EvaluationDate DATETIME
+);
+CREATE INDEX IX_TrainingEnrollments_Session ON TrainingEnrollments (SessionID);
+CREATE INDEX IX_TrainingEnrollments_Employee ON TrainingEnrollments (EmployeeUserID);
+
+CREATE TABLE TrainingAttendance (
+    AttendanceID INTEGER PRIMARY KEY,
+    SessionID INTEGER NOT NULL,
+    DayID INTEGER NOT NULL,
+    EnrollmentID INTEGER NOT NULL
+);
+CREATE INDEX IX_TrainingAttendance_Session ON TrainingAttendance (SessionID, EnrollmentID);
+
+CREATE TABLE Jobs (
+    JobID INTEGER PRIMARY KEY,
+    JobTitle TEXT COLLATE NOCASE NOT NULL,
+    DepartmentID INTEGER,
+    HiringManager TEXT COLLATE NOCASE,
+    Description TEXT COLLATE NOCASE,
+    Status TEXT COLLATE NOCASE DEFAULT 'Open',
+    PostDate DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE Candidates (
+    CandidateID INTEGER PRIMARY KEY,
+    JobID INTEGER,
+    FullName TEXT COLLATE NOCASE NOT NULL,
+    Phone TEXT COLLATE NOCASE,
+    Email TEXT COLLATE NOCASE,
+    Source TEXT COLLATE NOCASE,
+    NationalID TEXT COLLATE NOCASE,
+    Status TEXT COLLATE NOCASE DEFAULT 'New',
+    ApplicationDate DATETIME DEFAULT (datetime('now', 'localtime')),
+    HireDate DATETIME,
+    EndDate DATETIME,
+    TrainerName TEXT COLLATE NOCASE,
+    TrainingStartDate DATETIME,
+    DocIDCard INTEGER DEFAULT 0,
+    DocBirthCert INTEGER DEFAULT 0,
+    DocCriminalRecord INTEGER DEFAULT 0,
+    DocDegree INTEGER DEFAULT 0,
+    DocInfoSheet INTEGER DEFAULT 0,
+    DocMilitary INTEGER DEFAULT 0,
+    DocPersonalPhoto INTEGER DEFAULT 0,
+    LastNote TEXT COLLATE NOCASE,
+    LastActionDate DATETIME,
+    LastFromStage TEXT COLLATE NOCASE,
+    LastToStage TEXT COLLATE NOCASE,
+    PhoneKey TEXT,
+    NationalIDKey TEXT
+);
+CREATE INDEX IX_Candidates_Job ON Candidates (JobID);
+CREATE INDEX IX_Candidates_LastActionDate ON Candidates (LastActionDate);
+CREATE INDEX IX_Candidates_PhoneKey ON Candidates (PhoneKey);
+CREATE INDEX IX_Candidates_NationalIDKey ON Candidates (NationalIDKey);
+
+CREATE TABLE CandidateLogs (
+    LogID INTEGER PRIMARY KEY,
+    CandidateID INTEGER NOT NULL,
+    FromStage TEXT COLLATE NOCASE,
+    ToStage TEXT COLLATE NOCASE,
+    EvaluationScore REAL,
+    Note TEXT COLLATE NOCASE,
+    ActionDate DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IX_CandidateLogs_Candidate_Date ON CandidateLogs (CandidateID, ActionDate, LogID);
+
+CREATE TABLE CandidateStageFacts (
+    LogID INTEGER PRIMARY KEY,
+    CandidateID INTEGER NOT NULL,
+    JobID INTEGER,
+    DepartmentID INTEGER,
+    Stage TEXT COLLATE NOCASE NOT NULL,
+    NextStage TEXT COLLATE NOCASE NOT NULL,
+    EnteredAt DATETIME,
+    ExitedAt DATETIME NOT NULL,
+    DaysInStage REAL
+);
+
+CREATE TABLE RecruitmentFunnelSummary (
+    ScopeType TEXT COLLATE NOCASE NOT NULL,
+    ScopeID INTEGER NOT NULL,
+    Stage TEXT COLLATE NOCASE NOT NULL,
+    StageOrder INTEGER NOT NULL,
+    Reached INTEGER NOT NULL,
+    Advanced INTEGER NOT NULL,
+    DroppedOff INTEGER NOT NULL,
+    ConversionRate REAL NOT NULL,
+    MedianDays REAL,
+    P90Days REAL,
+    RefreshedAt DATETIME DEFAULT (datetime('now', 'localtime')),
+    PRIMARY KEY (ScopeType, ScopeID, Stage)
+);
+
+CREATE TABLE AppLogs (
+    LogID INTEGER PRIMARY KEY,
+    UserID INTEGER,
+    Username TEXT COLLATE NOCASE,
+    Module TEXT COLLATE NOCASE,
+    ActionType TEXT COLLATE NOCASE,
+    Description TEXT COLLATE NOCASE,
+    Timestamp DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IX_AppLogs_Timestamp ON AppLogs (Timestamp);
+
+CREATE TABLE UserInfoSyncState (
+    USERID INTEGER PRIMARY KEY,
+    RowHash BLOB NOT NULL,
+    SyncedAt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE SyncCheckpoints (
+    SyncName TEXT COLLATE NOCASE PRIMARY KEY,
+    LastKey INTEGER NOT NULL DEFAULT 0,
+    LastStatus TEXT NOT NULL,
+    UpdatedAt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime')),
+    LastCompletedAt DATETIME,
+    Inserted INTEGER NOT NULL DEFAULT 0,
+    Updated INTEGER NOT NULL DEFAULT 0,
+    Removed INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# RoleIDs the code checks (web_helpers, layout.html)
+ROLES = [(1, 'Admin'), (2, 'Police Officer'), (3, 'Manager'), (4, 'Employee'), (5, 'Recruitment'), (6, 'Training')]
+EMPLOYEE_CLASSES = [('A', 'A'), ('B', 'B'), ('C', 'C'), ('مشرف', 'مشرف'), ('مدير', 'مدير')]
+TERMINATION_TYPES = [(1, 'استقالة'), (2, 'إنهاء خدمة')]
+
+
+def create_sqlite_db(path, reset=False):
+    if os.path.exists(path):
+        if not reset:
+            print(f"{path} already exists (use --reset to recreate it).")
+            return
+        os.remove(path)
+
+    conn = sqlite3.connect(path)
+    try:
+        # WAL lets the benchmarks' reader threads run while one request writes
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(SCHEMA_SQL)
+        conn.executemany("INSERT INTO Roles (RoleID, RoleName) VALUES (?, ?)", ROLES)
+        conn.executemany("INSERT INTO EmployeeClasses (ClassName, DisplayName) VALUES (?, ?)", EMPLOYEE_CLASSES)
+        conn.executemany("INSERT INTO TerminationTypes (TypeID, TypeText) VALUES (?, ?)", TERMINATION_TYPES)
+        conn.execute("INSERT INTO Users (Username, PasswordHash, RoleID, Name) VALUES ('admin', 'admin', 1, 'Admin')")
+        conn.commit()
+        print(f"Created {path} (login: admin / admin).")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the SQLite stand-in database.")
+    parser.add_argument('--path', default=SQLITE_PATH)
+    parser.add_argument('--reset', action='store_true', help="Delete and recreate an existing file")
+    args = parser.parse_args()
+    create_sqlite_db(args.path, args.reset)
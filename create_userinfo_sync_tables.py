@@ -0,0 +1,57 @@
+import pyodbc
+from config import CONNECTION_STRING
+
+def create_userinfo_sync_tables():
+    conn = pyodbc.connect(CONNECTION_STRING)
+    cursor = conn.cursor()
+
+    # Hash of the synced columns per employee as of the last sync (see userinfo_sync.py)
+    state_sql = """
+    IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[UserInfoSyncState]') AND type in (N'U'))
+    BEGIN
+        CREATE TABLE [dbo].[UserInfoSyncState](
+            [USERID] [int] NOT NULL PRIMARY KEY,
+            [RowHash] [varbinary](32) NOT NULL,
+            [SyncedAt] [datetime] NOT NULL DEFAULT GETDATE()
+        )
+        PRINT 'Table UserInfoSyncState created successfully.'
+    END
+    ELSE
+    BEGIN
+        PRINT 'Table UserInfoSyncState already exists.'
+    END
+    """
+
+    # One row per sync job: where an interrupted run resumes, and the last run's counts
+    checkpoint_sql = """
+    IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[SyncCheckpoints]') AND type in (N'U'))
+    BEGIN
+        CREATE TABLE [dbo].[SyncCheckpoints](
+            [SyncName] [nvarchar](50) NOT NULL PRIMARY KEY,
+            [LastKey] [int] NOT NULL DEFAULT 0,
+            [LastStatus] [nvarchar](20) NOT NULL,
+            [UpdatedAt] [datetime] NOT NULL DEFAULT GETDATE(),
+            [LastCompletedAt] [datetime] NULL,
+            [Inserted] [int] NOT NULL DEFAULT 0,
+            [Updated] [int] NOT NULL DEFAULT 0,
+            [Removed] [int] NOT NULL DEFAULT 0
+        )
+        PRINT 'Table SyncCheckpoints created successfully.'
+    END
+    ELSE
+    BEGIN
+        PRINT 'Table SyncCheckpoints already exists.'
+    END
+    """
+
+    try:
+        cursor.execute(state_sql)
+        cursor.execute(checkpoint_sql)
+        conn.commit()
+    except Exception as e:
+        print(f"Error creating tables: {e}")
+
+    conn.close()
+
+if __name__ == "__main__":
+    create_userinfo_sync_tables()
@@ -0,0 +1,236 @@
+"""
+Evaluation cycle progress counters.
+
+Each enabled EvaluationCycle gets one row per covered department in the
+CycleProgress table (EvaluatorUserID = 0) plus one row per evaluator who has
+evaluated someone in that department. The rows hold EligibleCount (active
+employees in the department) and EvaluatedCount (distinct employees evaluated),
+so the progress page never has to scan Evaluations.
+
+The counters are kept up to date by the routes that change them
+(new_evaluation, evaluation_delete, userinfo_archive, userinfo_restore and the
+cycle admin screens). rebuild_cycle_progress() recomputes everything from
+scratch and is what create_cycle_progress_table.py runs.
+"""
+from datetime import datetime
+
+DEPARTMENT_ROW = 0  # EvaluatorUserID used for the department total row
+
+# Departments covered by each enabled cycle. A cycle without CycleDepartments
+# rows is open for every department (same rule as get_available_evaluation_types).
+CYCLE_SCOPE_CTE = """
+    WITH CycleScope AS (
+        SELECT C.CycleID, CD.DepartmentID
+        FROM [Zktime_Copy].[dbo].[EvaluationCycles] C
+        JOIN [Zktime_Copy].[dbo].[CycleDepartments] CD ON C.CycleID = CD.CycleID
+        WHERE C.IsEnabled = 1 {cycle_filter}
+        UNION
+        SELECT C.CycleID, D.DEPTID
+        FROM [Zktime_Copy].[dbo].[EvaluationCycles] C
+        CROSS JOIN [Zktime_Copy].[dbo].[DEPARTMENTS] D
+        WHERE C.IsEnabled = 1 {cycle_filter}
+          AND NOT EXISTS (SELECT 1 FROM [Zktime_Copy].[dbo].[CycleDepartments] X WHERE X.CycleID = C.CycleID)
+    )
+"""
+
+
+def find_active_cycle_id(cursor, evaluation_type_id, dept_id, today=None):
+    """ Returns the open cycle an evaluation of this type belongs to, or None. """
+    today = today or datetime.now().date()
+    cursor.execute("""
+        SELECT TOP 1 C.CycleID
+        FROM [Zktime_Copy].[dbo].[EvaluationCycles] C
+        WHERE C.IsEnabled = 1 AND C.EvaluationTypeID = ? AND ? BETWEEN C.StartDate AND C.EndDate
+          AND (NOT EXISTS (SELECT 1 FROM [Zktime_Copy].[dbo].[CycleDepartments] CD WHERE CD.CycleID = C.CycleID)
+               OR EXISTS (SELECT 1 FROM [Zktime_Copy].[dbo].[CycleDepartments] CD WHERE CD.CycleID = C.CycleID AND CD.DepartmentID = ?))
+        ORDER BY C.StartDate DESC
+    """, (evaluation_type_id, today, dept_id))
+    row = cursor.fetchone()
+    return row.CycleID if row else None
+
+
+def rebuild_cycle_progress(cursor, cycle_id=None):
+    """
+    Recomputes the counters for one cycle (or all enabled cycles) in three
+    set-based statements. The caller commits.
+    """
+    if cycle_id is None:
+        scope_cte = CYCLE_SCOPE_CTE.format(cycle_filter="")
+        scope_params = []
+        cursor.execute("DELETE FROM [Zktime_Copy].[dbo].[CycleProgress]")
+    else:
+        scope_cte = CYCLE_SCOPE_CTE.format(cycle_filter="AND C.CycleID = ?")
+        scope_params = [cycle_id, cycle_id]
+        cursor.execute("DELETE FROM [Zktime_Copy].[dbo].[CycleProgress] WHERE CycleID = ?", (cycle_id,))
+
+    # 1. Department rows
+    cursor.execute(scope_cte + """
+        INSERT INTO [Zktime_Copy].[dbo].[CycleProgress]
+            (CycleID, DepartmentID, EvaluatorUserID, EligibleCount, EvaluatedCount, UpdatedAt)
+        SELECT S.CycleID, S.DepartmentID, 0,
+               COALESCE(Elig.Cnt, 0), COALESCE(Done.Cnt, 0), GETDATE()
+        FROM CycleScope S
+        LEFT JOIN (
+            SELECT DEFAULTDEPTID, COUNT(*) AS Cnt
+            FROM [Zktime_Copy].[dbo].[USERINFO]
+            WHERE IsActive = 1 OR IsActive IS NULL
+            GROUP BY DEFAULTDEPTID
+        ) Elig ON Elig.DEFAULTDEPTID = S.DepartmentID
+        LEFT JOIN (
+            SELECT E.CycleID, UI.DEFAULTDEPTID, COUNT(DISTINCT E.EmployeeUserID) AS Cnt
+            FROM [Zktime_Copy].[dbo].[Evaluations] E
+            JOIN [Zktime_Copy].[dbo].[USERINFO] UI ON E.EmployeeUserID = UI.USERID
+            WHERE E.CycleID IS NOT NULL AND (UI.IsActive = 1 OR UI.IsActive IS NULL)
+            GROUP BY E.CycleID, UI.DEFAULTDEPTID
+        ) Done ON Done.CycleID = S.CycleID AND Done.DEFAULTDEPTID = S.DepartmentID
+    """, scope_params)
+
+    # 2. Evaluator rows (eligible count is copied from the department row)
+    cursor.execute(scope_cte + """
+        INSERT INTO [Zktime_Copy].[dbo].[CycleProgress]
+            (CycleID, DepartmentID, EvaluatorUserID, EligibleCount, EvaluatedCount, UpdatedAt)
+        SELECT S.CycleID, S.DepartmentID, E.EvaluatorUserID,
+               MAX(Dept.EligibleCount), COUNT(DISTINCT E.EmployeeUserID), GETDATE()
+        FROM CycleScope S
+        JOIN [Zktime_Copy].[dbo].[Evaluations] E ON E.CycleID = S.CycleID
+        JOIN [Zktime_Copy].[dbo].[USERINFO] UI ON E.EmployeeUserID = UI.USERID AND UI.DEFAULTDEPTID = S.DepartmentID
+        JOIN [Zktime_Copy].[dbo].[CycleProgress] Dept
+             ON Dept.CycleID = S.CycleID AND Dept.DepartmentID = S.DepartmentID AND Dept.EvaluatorUserID = 0
+        WHERE E.EvaluatorUserID IS NOT NULL AND (UI.IsActive = 1 OR UI.IsActive IS NULL)
+        GROUP BY S.CycleID, S.DepartmentID, E.EvaluatorUserID
+    """, scope_params)
+
+
+def record_evaluation(cursor, cycle_id, dept_id, evaluator_id, employee_id, delta):
+    """
+    Applies one inserted (delta=1) or deleted (delta=-1) evaluation to the
+    counters. Must run after the Evaluations write, on the same transaction,
+    so the "first/last evaluation of this employee" checks see it.
+    """
+    if not cycle_id or dept_id is None:
+        return
+
+    cursor.execute("""
+        SELECT COUNT(*) AS EmployeeTotal,
+               SUM(CASE WHEN EvaluatorUserID = ? THEN 1 ELSE 0 END) AS EvaluatorTotal
+        FROM [Zktime_Copy].[dbo].[Evaluations]
+        WHERE CycleID = ? AND EmployeeUserID = ?
+    """, (evaluator_id, cycle_id, employee_id))
+    row = cursor.fetchone()
+    employee_total = row.EmployeeTotal or 0
+    evaluator_total = row.EvaluatorTotal or 0
+
+    # Only the first evaluation (or the removal of the last one) changes a distinct count
+    boundary = 1 if delta > 0 else 0
+
+    if employee_total == boundary:
+        cursor.execute("""
+            UPDATE [Zktime_Copy].[dbo].[CycleProgress]
+            SET EvaluatedCount = EvaluatedCount + ?, UpdatedAt = GETDATE()
+            WHERE CycleID = ? AND DepartmentID = ? AND EvaluatorUserID = 0
+        """, (delta, cycle_id, dept_id))
+
+    if evaluator_id and evaluator_total == boundary:
+        cursor.execute("""
+            UPDATE [Zktime_Copy].[dbo].[CycleProgress]
+            SET EvaluatedCount = EvaluatedCount + ?, UpdatedAt = GETDATE()
+            WHERE CycleID = ? AND DepartmentID = ? AND EvaluatorUserID = ?;
+
+            IF @@ROWCOUNT = 0 AND ? > 0
+                INSERT INTO [Zktime_Copy].[dbo].[CycleProgress]
+                    (CycleID, DepartmentID, EvaluatorUserID, EligibleCount, EvaluatedCount, UpdatedAt)
+                SELECT CycleID, DepartmentID, ?, EligibleCount, 1, GETDATE()
+                FROM [Zktime_Copy].[dbo].[CycleProgress]
+                WHERE CycleID = ? AND DepartmentID = ? AND EvaluatorUserID = 0;
+        """, (delta, cycle_id, dept_id, evaluator_id, delta, evaluator_id, cycle_id, dept_id))
+
+
+def record_employee_status(cursor, employee_id, dept_id, delta):
+    """
+    Applies an archive (delta=-1) or restore (delta=1) of one employee to every
+    enabled cycle covering their department, including the evaluated counts of
+    any cycle they were already evaluated in.
+    """
+    if dept_id is None:
+        return
+
+    cursor.execute("""
+        UPDATE CP
+        SET EligibleCount = CP.EligibleCount + ?,
+            EvaluatedCount = CP.EvaluatedCount + CASE WHEN EXISTS (
+                SELECT 1 FROM [Zktime_Copy].[dbo].[Evaluations] E
+                WHERE E.CycleID = CP.CycleID AND E.EmployeeUserID = ?
+                  AND (CP.EvaluatorUserID = 0 OR E.EvaluatorUserID = CP.EvaluatorUserID)
+            ) THEN ? ELSE 0 END,
+            UpdatedAt = GETDATE()
+        FROM [Zktime_Copy].[dbo].[CycleProgress] CP
+        WHERE CP.DepartmentID = ?
+    """, (delta, employee_id, delta, dept_id))
+
+
+def get_cycle_progress(cursor, dept_ids=None):
+    """
+    Reads the counters for the progress page. Returns a list of cycles, each
+    with its department rows and the evaluator rows nested under them.
+    """
+    where_sql = "1=1"
+    params = []
+    if dept_ids is not None:
+        if not dept_ids:
+            return []
+        where_sql = f"CP.DepartmentID IN ({','.join(['?'] * len(dept_ids))})"
+        params.extend(dept_ids)
+
+    cursor.execute(f"""
+        SELECT CP.CycleID, C.CycleName, C.StartDate, C.EndDate, ET.DisplayName AS EvaluationTypeName,
+               CP.DepartmentID, D.DEPTNAME, CP.EvaluatorUserID, COALESCE(U.Name, U.Username) AS EvaluatorName,
+               CP.EligibleCount, CP.EvaluatedCount, CP.UpdatedAt
+        FROM [Zktime_Copy].[dbo].[CycleProgress] CP
+        JOIN [Zktime_Copy].[dbo].[EvaluationCycles] C ON CP.CycleID = C.CycleID
+        LEFT JOIN [Zktime_Copy].[dbo].[EvaluationTypes] ET ON C.EvaluationTypeID = ET.EvaluationTypeID
+        LEFT JOIN [Zktime_Copy].[dbo].[DEPARTMENTS] D ON CP.DepartmentID = D.DEPTID
+        LEFT JOIN [Zktime_Copy].[dbo].[Users] U ON CP.EvaluatorUserID = U.UserID
+        WHERE {where_sql}
+        ORDER BY C.StartDate DESC, CP.CycleID, D.DEPTNAME, CP.EvaluatorUserID
+    """, params)
+    rows = cursor.fetchall()
+
+    cycles = {}
+    for row in rows:
+        cycle = cycles.setdefault(row.CycleID, {
+            'id': row.CycleID,
+            'name': row.CycleName,
+            'type': row.EvaluationTypeName,
+            'start_date': row.StartDate.strftime('%Y-%m-%d') if row.StartDate else None,
+            'end_date': row.EndDate.strftime('%Y-%m-%d') if row.EndDate else None,
+            'eligible': 0, 'evaluated': 0,
+            'departments': {}
+        })
+        dept = cycle['departments'].setdefault(row.DepartmentID, {
+            'id': row.DepartmentID, 'name': row.DEPTNAME or 'غير محدد',
+            'eligible': 0, 'evaluated': 0, 'percent': 0, 'evaluators': []
+        })
+
+        if row.EvaluatorUserID == DEPARTMENT_ROW:
+            dept['eligible'] = row.EligibleCount
+            dept['evaluated'] = row.EvaluatedCount
+            dept['percent'] = _percent(row.EvaluatedCount, row.EligibleCount)
+            cycle['eligible'] += row.EligibleCount
+            cycle['evaluated'] += row.EvaluatedCount
+        else:
+            dept['evaluators'].append({
+                'id': row.EvaluatorUserID, 'name': row.EvaluatorName or 'غير معروف',
+                'eligible': row.EligibleCount, 'evaluated': row.EvaluatedCount,
+                'percent': _percent(row.EvaluatedCount, row.EligibleCount)
+            })
+
+    result = []
+    for cycle in cycles.values():
+        cycle['percent'] = _percent(cycle['evaluated'], cycle['eligible'])
+        cycle['departments'] = list(cycle['departments'].values())
+        result.append(cycle)
+    return result
+
+
+def _percent(done, total):
+    return round(done * 100.0 / total, 1) if total else 0
@@ -0,0 +1,95 @@
+"""
+Cached chart data for the dashboard, one JSON endpoint per chart.
+
+The dashboard page only renders the KPI cards and lists; each chart fetches
+its data from /api/dashboard/charts/<name> after the page is shown. Every
+chart is cached in-process per scope (the whole company, or one manager's
+department) for CHART_TTL_SECONDS. Routes that write evaluations call
+invalidate_dashboard_charts() so the next request recomputes. Turnover comes
+from workforce_analytics, which keeps its own cache.
+"""
+import time
+
+from app_metrics import record_cache_lookup
+from cache_invalidation import mark_invalidated, invalidated_since
+
+CHART_TTL_SECONDS = 60
+
+_chart_cache = {}
+
+# {scope} is "1=1" for the whole company, or "UI.DEFAULTDEPTID = ?" for a manager
+EVALUATION_CHART_SQL = {
+    'ratings': """
+        SELECT OverallRating, COUNT(*) as count
+        FROM [Zktime_Copy].[dbo].[Evaluations] E
+        LEFT JOIN [Zktime_Copy].[dbo].[USERINFO] UI ON E.EmployeeUserID = UI.USERID
+        WHERE {scope} AND OverallRating IS NOT NULL
+        GROUP BY OverallRating
+    """,
+    'types': """
+        SELECT COALESCE(ET.DisplayName, E.EvaluationType, 'غير محدد') as label, COUNT(*) as count
+        FROM [Zktime_Copy].[dbo].[Evaluations] E
+        LEFT JOIN [Zktime_Copy].[dbo].[USERINFO] UI ON E.EmployeeUserID = UI.USERID
+        LEFT JOIN [Zktime_Copy].[dbo].[EvaluationTypes] ET ON E.EvaluationTypeID = ET.EvaluationTypeID
+        WHERE {scope}
+        GROUP BY COALESCE(ET.DisplayName, E.EvaluationType, 'غير محدد') ORDER BY count DESC
+    """,
+    'score_ranges': """
+        SELECT CASE WHEN OverallScore >= 90 THEN 'ممتاز (90-100)' WHEN OverallScore >= 80 THEN 'جيد جدا (80-89)'
+               WHEN OverallScore >= 70 THEN 'جيد (70-79)' WHEN OverallScore >= 60 THEN 'مقبول (60-69)' ELSE 'ضعيف (أقل من 60)' END as label,
+               COUNT(*) as count
+        FROM [Zktime_Copy].[dbo].[Evaluations] E
+        LEFT JOIN [Zktime_Copy].[dbo].[USERINFO] UI ON E.EmployeeUserID = UI.USERID
+        WHERE {scope} AND OverallScore IS NOT NULL
+        GROUP BY CASE WHEN OverallScore >= 90 THEN 'ممتاز (90-100)' WHEN OverallScore >= 80 THEN 'جيد جدا (80-89)'
+                 WHEN OverallScore >= 70 THEN 'جيد (70-79)' WHEN OverallScore >= 60 THEN 'مقبول (60-69)' ELSE 'ضعيف (أقل من 60)' END
+        ORDER BY MIN(OverallScore) DESC
+    """,
+}
+
+CHART_NAMES = list(EVALUATION_CHART_SQL) + ['turnover']
+
+
+def invalidate_dashboard_charts():
+    """ Drops every cached chart; called after evaluation writes. """
+    _chart_cache.clear()
+    mark_invalidated('dashboard_charts')
+
+
+def build_evaluation_chart(conn, name, dept_id=None):
+    scope, params = ("1=1", []) if dept_id is None else ("UI.DEFAULTDEPTID = ?", [dept_id])
+    cursor = conn.cursor()
+    cursor.execute(EVALUATION_CHART_SQL[name].format(scope=scope), params)
+    rows = cursor.fetchall()
+    return {'labels': [str(row[0]) for row in rows], 'data': [int(row.count) for row in rows]}
+
+
+def get_dashboard_chart(get_connection, name, dept_id=None):
+    """
+    Chart data for the whole company (dept_id None) or one department.
+    Evaluation charts return {labels, data}; turnover returns the
+    workforce_analytics turnover summary (the manager's department subtree).
+    """
+    if name not in CHART_NAMES:
+        raise ValueError(f"Unknown chart: {name}")
+    if name == 'turnover':
+        from workforce_analytics import get_turnover_chart_data
+        return get_turnover_chart_data(get_connection, dept_id)
+
+    key = (name, dept_id)
+    cached = _chart_cache.get(key)
+    hit = (cached is not None and time.time() - cached[0] < CHART_TTL_SECONDS
+           and not invalidated_since('dashboard_charts', cached[0]))
+    record_cache_lookup('dashboard_charts', hit)
+    if hit:
+        return cached[1]
+
+    started = time.time()
+    conn = get_connection()
+    try:
+        data = build_evaluation_chart(conn, name, dept_id)
+    finally:
+        conn.close()
+
+    _chart_cache[key] = (started, data)
+    return data
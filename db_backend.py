@@ -0,0 +1,18 @@
+"""
+Opens the app's database connection: SQL Server through pyodbc, or the local
+SQLite stand-in (sqlite_backend.py) when DB_BACKEND=sqlite. Both return an
+object with the pyodbc connection / cursor / row interface the blueprints use.
+"""
+from config import CONNECTION_STRING, DB_BACKEND, SQLITE_PATH
+
+if DB_BACKEND == 'sqlite':
+    import sqlite_backend
+else:
+    import pyodbc
+    pyodbc.pooling = True
+
+
+def connect():
+    if DB_BACKEND == 'sqlite':
+        return sqlite_backend.connect(SQLITE_PATH)
+    return pyodbc.connect(CONNECTION_STRING)
@@ -0,0 +1,273 @@
+"""
+Bulk employee import / update for USERINFO from Excel or CSV.
+
+Instead of the full DELETE + IDENTITY_INSERT reload, the file is diffed
+against USERINFO with pandas and only the differences are written:
+
+- inserts: file rows whose USERID / BADGENUMBER is not in USERINFO,
+- updates: matched rows where a column present in the file differs
+  (blank cells never overwrite existing values),
+- deactivations (optional): active employees missing from the file, archived
+  the same way userinfo_archive does it (IsActive = 0, badge + '_A' and an
+  EmployeeArchive row ending today, so they count as leavers).
+
+Rows are matched on USERID when the file has it, otherwise on BADGENUMBER.
+diff_employees() only reads, so it doubles as the dry-run preview;
+apply_employee_diff() stages the rows in a temp table with fast_executemany
+and applies each kind with one set-based statement. The caller commits.
+"""
+import os
+import time
+
+import pandas as pd
+
+from cycle_progress import rebuild_cycle_progress
+from evaluation_form import NO_CLASS
+
+# USERINFO column -> accepted header names (compared lower-cased and stripped)
+COLUMN_ALIASES = {
+    'USERID': ['userid', 'user id'],
+    'BADGENUMBER': ['badgenumber', 'badge', 'كود الموظف', 'رقم البصمة', 'الكود'],
+    'NAME': ['name', 'الاسم'],
+    'SSN': ['ssn', 'national id', 'الرقم القومي'],
+    'GENDER': ['gender', 'النوع'],
+    'TITLE': ['title', 'الوظيفة', 'المسمى الوظيفي'],
+    'DEFAULTDEPTID': ['defaultdeptid', 'deptid', 'department id', 'كود القسم'],
+    'HIREDDAY': ['hiredday', 'hire date', 'تاريخ التعيين'],
+    'employee_class': ['employee_class', 'class', 'الفئة']
+}
+TEXT_COLUMNS = ['BADGENUMBER', 'NAME', 'SSN', 'GENDER', 'TITLE', 'employee_class']
+UPDATE_COLUMNS = ['BADGENUMBER', 'NAME', 'SSN', 'GENDER', 'TITLE', 'DEFAULTDEPTID', 'HIREDDAY', 'employee_class']
+REQUIRED_COLUMNS = ['BADGENUMBER', 'NAME']
+
+ACTION_INSERT = 'I'
+ACTION_UPDATE = 'U'
+ACTION_DEACTIVATE = 'D'
+
+ARCHIVE_COMMENT = 'غير موجود في ملف استيراد الموظفين'
+
+CURRENT_SQL = """
+    SELECT USERID, BADGENUMBER, NAME, SSN, GENDER, TITLE, DEFAULTDEPTID, HIREDDAY, employee_class, IsActive
+    FROM [Zktime_Copy].[dbo].[USERINFO]
+"""
+
+STAGING_SQL = """
+    CREATE TABLE #EmployeeImport (
+        Action CHAR(1) NOT NULL, USERID INT NULL,
+        BADGENUMBER NVARCHAR(24), NAME NVARCHAR(100), SSN NVARCHAR(50), GENDER NVARCHAR(10), TITLE NVARCHAR(100),
+        DEFAULTDEPTID INT, HIREDDAY DATETIME, employee_class NVARCHAR(200)
+    );
+"""
+
+APPLY_SQL = """
+    SET NOCOUNT ON;
+
+    UPDATE U
+    SET BADGENUMBER = COALESCE(S.BADGENUMBER, U.BADGENUMBER), NAME = COALESCE(S.NAME, U.NAME),
+        SSN = COALESCE(S.SSN, U.SSN), GENDER = COALESCE(S.GENDER, U.GENDER), TITLE = COALESCE(S.TITLE, U.TITLE),
+        DEFAULTDEPTID = COALESCE(S.DEFAULTDEPTID, U.DEFAULTDEPTID), HIREDDAY = COALESCE(S.HIREDDAY, U.HIREDDAY),
+        employee_class = COALESCE(S.employee_class, U.employee_class)
+    FROM [Zktime_Copy].[dbo].[USERINFO] U
+    JOIN #EmployeeImport S ON S.USERID = U.USERID AND S.Action = 'U';
+
+    INSERT INTO [Zktime_Copy].[dbo].[EmployeeArchive]
+        (UserID, Name, ArchivedSSN, ArchivedDeptID, ArchivedPosID, HiredDay, EndDay, ArchiveComment, AdminUserID)
+    SELECT U.USERID, U.NAME, U.SSN, U.DEFAULTDEPTID, U.PositionID, U.HIREDDAY, GETDATE(), ?, ?
+    FROM [Zktime_Copy].[dbo].[USERINFO] U
+    JOIN #EmployeeImport S ON S.USERID = U.USERID AND S.Action = 'D';
+
+    UPDATE U
+    SET IsActive = 0, BADGENUMBER = LEFT(U.BADGENUMBER + '_A', 24)
+    FROM [Zktime_Copy].[dbo].[USERINFO] U
+    JOIN #EmployeeImport S ON S.USERID = U.USERID AND S.Action = 'D';
+
+    INSERT INTO [Zktime_Copy].[dbo].[USERINFO]
+        (BADGENUMBER, SSN, NAME, GENDER, TITLE, DEFAULTDEPTID, HIREDDAY, employee_class)
+    SELECT BADGENUMBER, SSN, NAME, GENDER, TITLE, DEFAULTDEPTID, HIREDDAY, COALESCE(employee_class, ?)
+    FROM #EmployeeImport WHERE Action = 'I';
+
+    DROP TABLE #EmployeeImport;
+"""
+
+
+def read_employee_file(stream, filename):
+    """ The file as a DataFrame with USERINFO column names; unknown columns are dropped. """
+    ext = os.path.splitext(filename or '')[1].lower()
+    if ext == '.csv':
+        frame = pd.read_csv(stream, dtype=str, encoding='utf-8-sig')
+    elif ext in ('.xlsx', '.xls'):
+        frame = pd.read_excel(stream, dtype=str)
+    else:
+        raise ValueError('صيغة الملف غير مدعومة (CSV أو Excel فقط)')
+
+    lookup = {alias: column for column, aliases in COLUMN_ALIASES.items() for alias in aliases}
+    renamed = {col: lookup[str(col).strip().lower()] for col in frame.columns if str(col).strip().lower() in lookup}
+    frame = frame[list(renamed)].rename(columns=renamed)
+    frame = frame.loc[:, ~frame.columns.duplicated()]
+
+    missing = [col for col in REQUIRED_COLUMNS if col not in frame.columns]
+    if missing:
+        raise ValueError(f"الملف لا يحتوي على الأعمدة المطلوبة: {', '.join(missing)}")
+    return normalize_frame(frame)
+
+
+def normalize_frame(frame):
+    """ Same types on both sides of the diff: stripped text (blank = NULL), Int64 ids, day-precision dates. """
+    frame = frame.copy()
+    for col in TEXT_COLUMNS:
+        if col in frame.columns:
+            text = frame[col].astype('string').str.strip()
+            frame[col] = text.mask(text == '')
+    for col in ('USERID', 'DEFAULTDEPTID'):
+        if col in frame.columns:
+            frame[col] = pd.to_numeric(frame[col], errors='coerce').astype('Int64')
+    if 'HIREDDAY' in frame.columns:
+        frame['HIREDDAY'] = pd.to_datetime(frame['HIREDDAY'], errors='coerce').dt.normalize()
+    return frame
+
+
+def load_current_employees(cursor):
+    cursor.execute(CURRENT_SQL)
+    rows = [tuple(r) for r in cursor.fetchall()]
+    columns = ['USERID', 'BADGENUMBER', 'NAME', 'SSN', 'GENDER', 'TITLE', 'DEFAULTDEPTID', 'HIREDDAY', 'employee_class', 'IsActive']
+    return normalize_frame(pd.DataFrame.from_records(rows, columns=columns))
+
+
+def _value(v):
+    """ pandas scalar -> plain Python value for pyodbc / templates. """
+    if v is None or pd.isna(v):
+        return None
+    if isinstance(v, pd.Timestamp):
+        return v.to_pydatetime()
+    if hasattr(v, 'item'):
+        return v.item()
+    return v
+
+
+def diff_employees(current, incoming, deactivate_missing=False):
+    """
+    Compares the file with USERINFO. Returns
+    {'inserts': [rows], 'updates': [{'USERID', 'BADGENUMBER', 'NAME', 'changes': {col: (old, new)}, 'values': row}],
+     'deactivations': [rows], 'invalid': [{'row', 'BADGENUMBER', 'message'}], 'unchanged': n}
+    """
+    incoming = incoming.copy()
+    incoming['RowNo'] = range(2, len(incoming) + 2)  # file line, header is line 1
+    file_badges = set(incoming['BADGENUMBER'].dropna())
+    compare = [col for col in UPDATE_COLUMNS if col in incoming.columns]
+
+    invalid = []
+    no_badge = incoming['BADGENUMBER'].isna() & (incoming['USERID'].isna() if 'USERID' in incoming.columns else True)
+    repeated = incoming['BADGENUMBER'].notna() & incoming['BADGENUMBER'].duplicated(keep=False)
+    for rec in incoming[no_badge | repeated].itertuples(index=False):
+        invalid.append({'row': rec.RowNo, 'BADGENUMBER': _value(rec.BADGENUMBER),
+                        'message': 'كود الموظف مطلوب' if pd.isna(rec.BADGENUMBER) else 'كود الموظف مكرر في الملف'})
+    incoming = incoming[~(no_badge | repeated)]
+
+    # Resolve the USERID of every file row: given explicitly, or through the badge
+    by_badge = current.dropna(subset=['BADGENUMBER']).drop_duplicates('BADGENUMBER').set_index('BADGENUMBER')['USERID']
+    resolved = incoming['BADGENUMBER'].map(by_badge).astype('Int64')
+    if 'USERID' in incoming.columns:
+        resolved = incoming['USERID'].where(incoming['USERID'].notna(), resolved)
+    incoming['MatchedID'] = resolved.where(resolved.isin(current['USERID']))
+
+    unknown_ids = incoming['USERID'].notna() & incoming['MatchedID'].isna() if 'USERID' in incoming.columns else None
+    if unknown_ids is not None and unknown_ids.any():
+        for rec in incoming[unknown_ids].itertuples(index=False):
+            invalid.append({'row': rec.RowNo, 'BADGENUMBER': _value(rec.BADGENUMBER), 'message': 'USERID غير موجود'})
+        incoming = incoming[~unknown_ids]
+
+    new_rows = incoming[incoming['MatchedID'].isna()]
+    for rec in new_rows[new_rows['NAME'].isna()].itertuples(index=False):
+        invalid.append({'row': rec.RowNo, 'BADGENUMBER': _value(rec.BADGENUMBER), 'message': 'الاسم مطلوب للموظف الجديد'})
+    new_rows = new_rows[new_rows['NAME'].notna()]
+    inserts = [{col: _value(getattr(rec, col)) for col in compare} for rec in new_rows.itertuples(index=False)]
+
+    # Column-by-column comparison on the matched rows (blank file cells are "no change")
+    matched = incoming[incoming['MatchedID'].notna()].merge(
+        current, left_on='MatchedID', right_on='USERID', suffixes=('', '_cur'), how='inner')
+    changed_any = pd.Series(False, index=matched.index)
+    changed = {}
+    for col in compare:
+        new, old = matched[col], matched[f'{col}_cur']
+        differs = new.notna() & (old.isna() | (new.astype('string') != old.astype('string')))
+        changed[col] = differs.fillna(False)
+        changed_any |= changed[col]
+
+    updates = []
+    for i in matched.index[changed_any]:
+        rec = matched.loc[i]
+        changes = {col: (_value(rec[f'{col}_cur']), _value(rec[col])) for col in compare if changed[col][i]}
+        updates.append({
+            'USERID': int(rec['MatchedID']), 'BADGENUMBER': _value(rec['BADGENUMBER_cur']), 'NAME': _value(rec['NAME_cur']),
+            'changes': changes, 'values': {col: new for col, (old, new) in changes.items()}
+        })
+
+    deactivations = []
+    if deactivate_missing:
+        active = current[current['IsActive'].isna() | (current['IsActive'] != 0)]
+        gone = active[~active['USERID'].isin(matched['MatchedID']) & ~active['BADGENUMBER'].isin(file_badges)]
+        deactivations = [{col: _value(getattr(rec, col)) for col in ('USERID', 'BADGENUMBER', 'NAME', 'DEFAULTDEPTID')}
+                         for rec in gone.itertuples(index=False)]
+
+    return {
+        'inserts': inserts,
+        'updates': updates,
+        'deactivations': deactivations,
+        'invalid': invalid,
+        'unchanged': int(len(matched) - changed_any.sum())
+    }
+
+
+def apply_employee_diff(cursor, diff, admin_user_id=None):
+    """
+    Writes a diff from diff_employees() in one round of set-based statements.
+    admin_user_id is recorded on the EmployeeArchive rows of deactivations.
+    """
+    staged = []
+    for row in diff['inserts']:
+        staged.append((ACTION_INSERT, None) + tuple(row.get(col) for col in UPDATE_COLUMNS))
+    for row in diff['updates']:
+        staged.append((ACTION_UPDATE, row['USERID']) + tuple(row['values'].get(col) for col in UPDATE_COLUMNS))
+    for row in diff['deactivations']:
+        staged.append((ACTION_DEACTIVATE, row['USERID']) + (None,) * len(UPDATE_COLUMNS))
+    if not staged:
+        return
+
+    cursor.execute(STAGING_SQL)
+    cursor.fast_executemany = True
+    cursor.executemany(f"""
+        INSERT INTO #EmployeeImport (Action, USERID, {', '.join(UPDATE_COLUMNS)})
+        VALUES (?, ?, {', '.join('?' for _ in UPDATE_COLUMNS)})
+    """, staged)
+    cursor.fast_executemany = False
+    cursor.execute(APPLY_SQL, (ARCHIVE_COMMENT, admin_user_id, NO_CLASS))
+
+    # Department moves, new hires and deactivations all change eligible counts
+    if diff['inserts'] or diff['deactivations'] or any('DEFAULTDEPTID' in u['changes'] for u in diff['updates']):
+        rebuild_cycle_progress(cursor)
+
+
+def import_employees(cursor, stream, filename, dry_run=True, deactivate_missing=False, admin_user_id=None):
+    """ Reads, diffs and (unless dry_run) applies the file. Returns the diff plus 'timings' in seconds. """
+    timings = {}
+    started = time.perf_counter()
+    incoming = read_employee_file(stream, filename)
+    timings['read'] = time.perf_counter() - started
+
+    step = time.perf_counter()
+    current = load_current_employees(cursor)
+    timings['load'] = time.perf_counter() - step
+
+    step = time.perf_counter()
+    diff = diff_employees(current, incoming, deactivate_missing)
+    timings['diff'] = time.perf_counter() - step
+
+    if not dry_run:
+        step = time.perf_counter()
+        apply_employee_diff(cursor, diff, admin_user_id)
+        timings['apply'] = time.perf_counter() - step
+
+    timings['total'] = time.perf_counter() - started
+    diff['timings'] = {name: round(seconds, 3) for name, seconds in timings.items()}
+    diff['file_rows'] = len(incoming)
+    return diff
@@ -0,0 +1,46 @@
+import pyodbc
+from config import CONNECTION_STRING
+from app_backup import table_info, STRATEGY_CHANGES
+
+# Tables whose rows are edited or deleted in place; the logs (app_backup.APPEND_ONLY_TABLES) use
+# the key watermark instead. Untracked tables are copied in full by every backup.
+TRACKED_TABLES = [
+    'Roles', 'Users', 'EmployeeClasses', 'EvaluationTypes', 'EvaluationCriteria', 'Recommendations',
+    'EvaluationCycles', 'CycleDepartments', 'Evaluations', 'EvaluationDetails',
+    'TrainingCourses', 'TrainingSessions', 'TrainingSessionDays', 'TrainingEnrollments', 'TrainingAttendance',
+    'Jobs', 'Candidates', 'TerminationTypes', 'TerminationReasons', 'EmployeeArchive'
+]
+
+def enable_backup_change_tracking(retention_days=30):
+    conn = pyodbc.connect(CONNECTION_STRING, autocommit=True)
+    cursor = conn.cursor()
+
+    # Retention must be longer than the gap between two backups, or the next one falls back to a full copy
+    database_sql = f"""
+    IF NOT EXISTS (SELECT * FROM sys.change_tracking_databases WHERE database_id = DB_ID())
+    BEGIN
+        ALTER DATABASE CURRENT SET CHANGE_TRACKING = ON (CHANGE_RETENTION = {int(retention_days)} DAYS, AUTO_CLEANUP = ON)
+        PRINT 'Change tracking enabled on the database.'
+    END
+    """
+
+    try:
+        cursor.execute(database_sql)
+        for table in TRACKED_TABLES:
+            info = table_info(cursor, table)
+            if info is None:
+                print(f"{table}: not found")
+            elif not info['key']:
+                print(f"{table}: no single int primary key, will be copied in full by every backup")
+            elif info['strategy'] != STRATEGY_CHANGES:
+                cursor.execute(f"ALTER TABLE [dbo].[{table}] ENABLE CHANGE_TRACKING")
+                print(f"{table}: change tracking enabled")
+            else:
+                print(f"{table}: already tracked")
+    except Exception as e:
+        print(f"Error enabling change tracking: {e}")
+
+    conn.close()
+
+if __name__ == "__main__":
+    enable_backup_change_tracking()
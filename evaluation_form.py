@@ -0,0 +1,309 @@
+"""
+Data loading for the new evaluation form (/evaluation/new/<badge>).
+
+load_evaluation_form() sends everything the form needs as a single batch and
+reads the result sets back with nextset(), so opening the form is one round
+trip. The reference lists (evaluation type rules, criteria, recommendations
+and active training courses) are the same for every employee; they are kept
+in a small in-process cache and only appended to the batch when the cache is
+cold. Routes that edit those tables call invalidate_evaluation_form_cache().
+"""
+import time
+from datetime import datetime
+
+from app_metrics import record_cache_lookup
+from cache_invalidation import mark_invalidated, invalidated_since
+
+REFERENCE_TTL_SECONDS = 300
+NO_CLASS = 'لم تضاف'
+
+_reference_cache = {'loaded_at': 0, 'data': None}
+
+# Sets @EmpID from the badge number (normal employee or a manager being evaluated by HR)
+EMPLOYEE_ID_SQL = """
+    SELECT @EmpID = UI.USERID FROM [Zktime_Copy].[dbo].[USERINFO] UI WHERE UI.BADGENUMBER = @Badge;
+"""
+MANAGER_ID_SQL = """
+    SELECT @EmpID = U.UserID
+    FROM [Zktime_Copy].[dbo].[Users] U
+    INNER JOIN [Zktime_Copy].[dbo].[USERINFO] UI ON U.UserID = UI.USERID
+    WHERE UI.BADGENUMBER = @Badge AND U.RoleID = 3;
+"""
+
+EMPLOYEE_ROW_SQL = """
+    SELECT UI.USERID, UI.NAME, UI.DEFAULTDEPTID, UI.TITLE, D.DEPTNAME, UI.employee_class
+    FROM [Zktime_Copy].[dbo].[USERINFO] UI
+    LEFT JOIN [dbo].[DEPARTMENTS] D ON UI.DEFAULTDEPTID = D.DEPTID
+    WHERE UI.USERID = @EmpID;
+"""
+MANAGER_ROW_SQL = """
+    SELECT U.UserID AS USERID, COALESCE(U.Name, U.Username) AS NAME, UI.DEFAULTDEPTID,
+           'Manager' AS TITLE, COALESCE(D.DEPTNAME, 'غير محدد') AS DEPTNAME, UI.employee_class
+    FROM [Zktime_Copy].[dbo].[Users] U
+    LEFT JOIN [dbo].[DEPARTMENTS] D ON U.DepartmentID = D.DEPTID
+    INNER JOIN [Zktime_Copy].[dbo].[USERINFO] UI ON U.UserID = UI.USERID
+    WHERE U.UserID = @EmpID;
+"""
+
+EMPLOYEE_BATCH_SQL = """
+    SET NOCOUNT ON;
+    DECLARE @EvaluatorID INT = ?, @Badge NVARCHAR(50) = ?, @Today DATE = ?;
+    DECLARE @ManagerDept INT, @EmpID INT;
+
+    SELECT @ManagerDept = DepartmentID FROM [Zktime_Copy].[dbo].[Users] WHERE UserID = @EvaluatorID;
+    {employee_id_sql}
+
+    -- 1. Evaluator department
+    SELECT @ManagerDept AS DepartmentID;
+
+    -- 2. Target employee
+    {employee_row_sql}
+
+    -- 3. Training history (session/attendance counts pre-aggregated for this employee only)
+    SELECT
+        TC.TrainingCourseText AS CourseName,
+        TS.SessionDate AS StartDate,
+        TE.PassStatus AS Status,
+        TE.Grade,
+        TE.InstructorFeedback AS TrainerNotes,
+        TS.IsExternal,
+        TS.ExternalTrainerName,
+        TS.InstructorID,
+        COALESCE(SD.Cnt, 0) AS TotalSessions,
+        COALESCE(AT.Cnt, 0) AS SessionsAttended
+    FROM TrainingEnrollments TE
+    JOIN TrainingSessions TS ON TE.SessionID = TS.SessionID
+    JOIN TrainingCourses TC ON TS.CourseID = TC.TrainingCourseID
+    LEFT JOIN (
+        SELECT SessionID, COUNT(*) AS Cnt
+        FROM TrainingSessionDays
+        WHERE SessionID IN (SELECT SessionID FROM TrainingEnrollments WHERE EmployeeUserID = @EmpID)
+        GROUP BY SessionID
+    ) SD ON SD.SessionID = TS.SessionID
+    LEFT JOIN (
+        SELECT SessionID, EnrollmentID, COUNT(*) AS Cnt
+        FROM TrainingAttendance
+        WHERE EnrollmentID IN (SELECT EnrollmentID FROM TrainingEnrollments WHERE EmployeeUserID = @EmpID)
+        GROUP BY SessionID, EnrollmentID
+    ) AT ON AT.SessionID = TS.SessionID AND AT.EnrollmentID = TE.EnrollmentID
+    WHERE TE.EmployeeUserID = @EmpID
+    ORDER BY TS.SessionDate DESC;
+
+    -- 4. Names of the instructors referenced by that history (InstructorID is a CSV list)
+    SELECT U.UserID, U.Name
+    FROM Users U
+    WHERE EXISTS (
+        SELECT 1
+        FROM TrainingEnrollments TE
+        JOIN TrainingSessions TS ON TE.SessionID = TS.SessionID
+        WHERE TE.EmployeeUserID = @EmpID
+          AND ',' + REPLACE(CAST(TS.InstructorID AS NVARCHAR(400)), ' ', '') + ',' LIKE '%,' + CAST(U.UserID AS NVARCHAR(20)) + ',%'
+    );
+
+    -- 5. Evaluation types the employee already completed
+    SELECT DISTINCT EvaluationTypeID FROM [Zktime_Copy].[dbo].[Evaluations] WHERE EmployeeUserID = @EmpID;
+
+    -- 6. Open cycles
+    SELECT C.CycleID, C.EvaluationTypeID, C.StartDate, CD.DepartmentID
+    FROM [Zktime_Copy].[dbo].[EvaluationCycles] C
+    LEFT JOIN [Zktime_Copy].[dbo].[CycleDepartments] CD ON C.CycleID = CD.CycleID
+    WHERE C.IsEnabled = 1 AND @Today BETWEEN C.StartDate AND C.EndDate;
+"""
+
+REFERENCE_BATCH_SQL = """
+    SELECT * FROM [Zktime_Copy].[dbo].[EvaluationTypes] ORDER BY SortOrder;
+    SELECT CriteriaID, CriteriaName, CriteriaWeight, MaxScore, AppliesToDeptID, employee_class FROM [Zktime_Copy].[dbo].[EvaluationCriteria] ORDER BY CriteriaID;
+    SELECT RecommendationID, RecommendationText, AppliesToDeptID FROM [Zktime_Copy].[dbo].[Recommendations] ORDER BY RecommendationText;
+    SELECT TrainingCourseID, TrainingCourseText, AppliesToDeptID FROM [Zktime_Copy].[dbo].[TrainingCourses] WHERE IsActive = 1 ORDER BY TrainingCourseText;
+"""
+
+
+def invalidate_evaluation_form_cache():
+    """ Drops the cached reference lists; the next form load refetches them. """
+    _reference_cache['data'] = None
+    _reference_cache['loaded_at'] = 0
+    mark_invalidated('evaluation_form')
+
+
+def cached_reference():
+    """ The cached reference lists, or None when they must be (re)loaded. """
+    data = _reference_cache['data']
+    loaded_at = _reference_cache['loaded_at']
+    hit = data is not None and time.time() - loaded_at < REFERENCE_TTL_SECONDS and not invalidated_since('evaluation_form', loaded_at)
+    record_cache_lookup('evaluation_form', hit)
+    return data if hit else None
+
+
+def read_reference_sets(cursor, queried_at):
+    """
+    Reads the four REFERENCE_BATCH_SQL result sets that follow the current one
+    in a batch and refreshes the cache with them. queried_at is when the batch
+    was sent, so an invalidation while it ran still counts.
+    """
+    reference = {
+        'types': cursor.fetchall() if cursor.nextset() else [],
+        'criteria': cursor.fetchall() if cursor.nextset() else [],
+        'recommendations': cursor.fetchall() if cursor.nextset() else [],
+        'training_courses': cursor.fetchall() if cursor.nextset() else []
+    }
+    _reference_cache['data'] = reference
+    _reference_cache['loaded_at'] = queried_at
+    return reference
+
+
+def load_evaluation_form(cursor, evaluator_user_id, badgenumber, manager_target=False, today=None):
+    """
+    Fetches everything the evaluation form needs in one round trip.
+    Returns a dict; 'employee' is None when the badge does not resolve.
+    """
+    today = today or datetime.now().date()
+    reference = cached_reference()
+
+    sql = EMPLOYEE_BATCH_SQL.format(
+        employee_id_sql=MANAGER_ID_SQL if manager_target else EMPLOYEE_ID_SQL,
+        employee_row_sql=MANAGER_ROW_SQL if manager_target else EMPLOYEE_ROW_SQL
+    )
+    if reference is None:
+        sql += REFERENCE_BATCH_SQL
+
+    queried_at = time.time()
+    cursor.execute(sql, (evaluator_user_id, badgenumber, today))
+
+    row = cursor.fetchone()
+    manager_dept_id = row.DepartmentID if row else None
+    employee = cursor.fetchone() if cursor.nextset() else None
+    training_rows = cursor.fetchall() if cursor.nextset() else []
+    instructors = {r.UserID: r.Name for r in cursor.fetchall()} if cursor.nextset() else {}
+    completed_ids = {r.EvaluationTypeID for r in cursor.fetchall()} if cursor.nextset() else set()
+    active_cycles = cursor.fetchall() if cursor.nextset() else []
+
+    if reference is None:
+        reference = read_reference_sets(cursor, queried_at)
+
+    return {
+        'manager_dept_id': manager_dept_id,
+        'employee': employee,
+        'training_history': build_training_history(training_rows, instructors),
+        'completed_ids': completed_ids,
+        'active_cycles': active_cycles,
+        'reference': reference
+    }
+
+
+def build_training_history(rows, instructors):
+    history = []
+    for row in rows:
+        # تحديد اسم المدرب (سواء خارجي أو داخلي متعدد)
+        if row.IsExternal:
+            trainers_str = row.ExternalTrainerName or "مدرب خارجي"
+        elif row.InstructorID:
+            try:
+                ids = [int(x.strip()) for x in str(row.InstructorID).split(',') if x.strip().isdigit()]
+                trainers_str = "، ".join(instructors.get(uid, 'غير معروف') for uid in ids)
+            except Exception:
+                trainers_str = "خطأ في البيانات"
+        else:
+            trainers_str = "غير محدد"
+
+        history.append({
+            'CourseName': row.CourseName,
+            'StartDate': row.StartDate,
+            'Status': row.Status,
+            'Grade': row.Grade,
+            'TrainerNotes': row.TrainerNotes,
+            'Trainers': trainers_str,
+            'TotalSessions': row.TotalSessions,
+            'SessionsAttended': row.SessionsAttended
+        })
+    return history
+
+
+def employee_class_of(employee):
+    return employee.employee_class if employee and employee.employee_class else NO_CLASS
+
+
+def filter_criteria(all_criteria, class_string, dept_id):
+    """
+    Criteria for an employee: class must match one of the employee's classes
+    (same substring rule as the old LIKE query) and AppliesToDeptID, a CSV of
+    department ids, must be empty or contain the employee's department.
+    """
+    classes = [c.strip().casefold() for c in class_string.split(',') if c.strip()] if class_string != NO_CLASS else []
+
+    result = []
+    for c in all_criteria:
+        crit_class = (c.employee_class or '').casefold()
+        if classes:
+            if not any(cls in crit_class for cls in classes):
+                continue
+        elif c.employee_class != NO_CLASS:
+            continue
+
+        if c.AppliesToDeptID:
+            try:
+                allowed_depts = [int(x.strip()) for x in str(c.AppliesToDeptID).split(',') if x.strip()]
+            except ValueError:
+                continue
+            if dept_id not in allowed_depts:
+                continue
+        result.append(c)
+    return result
+
+
+def filter_by_department(rows, dept_id):
+    """ Recommendations / training courses: general rows plus the department's own. """
+    return [r for r in rows if r.AppliesToDeptID is None or r.AppliesToDeptID == dept_id]
+
+
+def build_available_evaluation_types(all_types_rules, completed_eval_ids, active_cycles, manager_dept_id):
+    """ Applies prerequisite, repeatability and open-cycle rules to every evaluation type. """
+    # { type_id: [list of dept_ids] } - an empty list means "all departments"
+    open_cycle_depts = {}
+    for cycle in active_cycles:
+        depts = open_cycle_depts.setdefault(cycle.EvaluationTypeID, [])
+        if cycle.DepartmentID:
+            depts.append(cycle.DepartmentID)
+
+    available_eval_list = []
+    for rule in all_types_rules:
+        eval_id = rule.EvaluationTypeID
+        prereq_id = rule.PrerequisiteTypeID
+
+        prereq_met = (prereq_id is None) or (prereq_id in completed_eval_ids)
+        repeat_met = rule.IsRepeatable or (eval_id not in completed_eval_ids)
+
+        if eval_id in open_cycle_depts:
+            linked_depts = open_cycle_depts[eval_id]
+            is_open = not linked_depts or manager_dept_id in linked_depts
+        else:
+            # No cycle exists = open if other rules pass (sequential non-timed)
+            is_open = True
+
+        if prereq_met and repeat_met and is_open:
+            available_eval_list.append({'id': eval_id, 'name': rule.DisplayName, 'disabled': False, 'note': '(متاح)'})
+        else:
+            note = ''
+            if not prereq_met:
+                prereq_name = next((t.DisplayName for t in all_types_rules if t.EvaluationTypeID == prereq_id), '')
+                note = f'(متوقف على: {prereq_name})'
+            elif not repeat_met: note = '(تم إكماله)'
+            elif not is_open: note = '(خارج دورة التقييم)'
+            available_eval_list.append({'id': eval_id, 'name': rule.DisplayName, 'disabled': True, 'note': note})
+
+    return available_eval_list
+
+
+def pick_cycle_id(active_cycles, evaluation_type_id, dept_id):
+    """ Same rule as cycle_progress.find_active_cycle_id, applied to the already loaded cycles. """
+    candidates = {}
+    for cycle in active_cycles:
+        if cycle.EvaluationTypeID != evaluation_type_id:
+            continue
+        entry = candidates.setdefault(cycle.CycleID, {'start': cycle.StartDate, 'depts': []})
+        if cycle.DepartmentID:
+            entry['depts'].append(cycle.DepartmentID)
+
+    matching = [(c['start'], cid) for cid, c in candidates.items() if not c['depts'] or dept_id in c['depts']]
+    if not matching:
+        return None
+    return max(matching)[1]
@@ -0,0 +1,29 @@
+import argparse
+import time
+import db_backend
+from analytics_snapshot import export_snapshot, FACTS, SNAPSHOT_DIR
+
+def export_analytics_snapshot(root=SNAPSHOT_DIR, facts=None):
+    conn = db_backend.connect()
+
+    try:
+        started = time.perf_counter()
+        print(f"Exporting analytics snapshot to {root}")
+        info = export_snapshot(conn, root, facts=facts)
+        print(f"Done: {sum(info[name]['rows'] for name in facts or FACTS)} rows in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        print(f"Error exporting analytics snapshot: {e}")
+
+    conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the analytics fact tables to Parquet (run from a scheduled task, e.g. nightly).")
+    parser.add_argument('--dir', default=SNAPSHOT_DIR, help="Snapshot directory (default: ANALYTICS_SNAPSHOT_DIR or ./analytics_snapshot)")
+    parser.add_argument('--facts', help=f"Comma separated facts to export (default: all of {', '.join(FACTS)})")
+    args = parser.parse_args()
+
+    facts = [f.strip() for f in args.facts.split(',')] if args.facts else None
+    unknown = [f for f in facts or [] if f not in FACTS]
+    if unknown:
+        parser.error(f"Unknown facts: {', '.join(unknown)}")
+    export_analytics_snapshot(args.dir, facts)
@@ -0,0 +1,612 @@
+"""
+Synthetic data generator for scale testing.
+
+Fills the schema with realistic data at a chosen size: a department
+hierarchy, employees (USERINFO) with Arabic names, national IDs and classes,
+manager / HR / trainer / recruiter logins, evaluation criteria, cycles and
+evaluations with their details, training courses, sessions, days,
+enrollments and attendance, jobs, candidates with their stage logs, archived
+employees and activity logs.
+
+    python generate_data.py --employees 100000 --enrollments 2000000
+    python generate_data.py --sqlite local_dev.sqlite3 --employees 5000
+
+Without --sqlite the rows go to the database get_db_connection() uses
+(config.CONNECTION_STRING, or SQLITE_PATH with DB_BACKEND=sqlite); --sqlite
+writes to a stand-in file and creates it first if needed. Run it against a
+copy of the database, never production.
+
+The same --seed and --today give the same data. New rows get IDs above the
+current maximum of each table (IDENTITY_INSERT on SQL Server), so the
+generator can add to a database that already has data; criteria and
+evaluation types are only created when their tables are empty. Rows are
+sent with executemany (fast_executemany) in batches of --batch-size, one
+commit per batch. At the end the cycle progress counters and the
+recruitment funnel tables are rebuilt.
+
+Generated logins share the password "password" (managers mgr<DEPTID>,
+hr<USERID>, trainer<USERID>, recruiter<USERID>).
+"""
+import argparse
+import math
+import os
+import random
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from candidate_duplicates import candidate_key_params
+from create_sqlite_db import create_sqlite_db
+from cycle_progress import rebuild_cycle_progress
+from evaluation_form import NO_CLASS, filter_criteria
+from recruitment_funnel import FUNNEL_STAGES, refresh_recruitment_funnel
+from scoring import get_rating_from_score, weighted_percentage
+
+BATCH_SIZE = 10000
+PASSWORD = 'password'
+BADGE_BASE = 500000  # badge = BADGE_BASE + USERID, away from the real badge ranges
+
+MALE_NAMES = [
+    'محمد', 'أحمد', 'محمود', 'مصطفى', 'علي', 'حسن', 'حسين', 'إبراهيم', 'يوسف', 'عمر', 'خالد', 'طارق',
+    'عمرو', 'كريم', 'هشام', 'وليد', 'ياسر', 'سامح', 'شريف', 'عادل', 'أيمن', 'أشرف', 'حازم', 'رامي',
+    'إسلام', 'سيد', 'عبدالله', 'عبدالرحمن', 'عبدالعزيز', 'صلاح', 'جمال', 'مجدي', 'نبيل', 'ماجد', 'فادي',
+    'هاني', 'تامر', 'باسم', 'مينا', 'بيتر', 'جورج', 'سمير', 'فتحي', 'رضا', 'سعيد', 'إيهاب', 'وائل',
+    'أسامة', 'زياد', 'ماهر', 'منصور', 'عصام', 'حمدي', 'شادي', 'أنور', 'رأفت', 'عاطف', 'فاروق', 'زكريا',
+]
+FEMALE_NAMES = [
+    'فاطمة', 'مريم', 'نورهان', 'آية', 'سارة', 'منى', 'هبة', 'دينا', 'ريهام', 'رانيا', 'إيمان', 'أسماء',
+    'مروة', 'شيماء', 'ياسمين', 'نهى', 'سلمى', 'هدى', 'نادية', 'سمر', 'ندى', 'رحاب', 'عبير', 'غادة',
+    'إسراء', 'دعاء', 'بسمة', 'أميرة', 'ولاء', 'نسمة', 'مها', 'لمياء', 'رشا', 'حنان', 'سماح', 'جيهان',
+    'ميرنا', 'مارينا', 'كريستين', 'هالة', 'سهير', 'ليلى', 'زينب', 'خديجة', 'رقية', 'نيرة', 'جنى', 'ملك',
+]
+FAMILY_NAMES = [
+    'السيد', 'عبدالحميد', 'الشافعي', 'المصري', 'النجار', 'الحداد', 'الشريف', 'عبدالفتاح', 'البدوي', 'سليمان',
+    'رمضان', 'عثمان', 'فؤاد', 'حجازي', 'الجمال', 'منصور', 'العشري', 'الدسوقي', 'الطنطاوي', 'شاهين',
+    'عبدالسلام', 'يونس', 'حمزة', 'زهران', 'القاضي', 'الفقي', 'غنيم', 'عوض', 'بدران', 'الخولي',
+]
+DEPARTMENT_NAMES = [
+    'الموارد البشرية', 'الشؤون المالية', 'المبيعات', 'التسويق', 'تكنولوجيا المعلومات', 'المشتريات',
+    'المخازن', 'الإنتاج', 'الجودة', 'الصيانة', 'خدمة العملاء', 'الشؤون القانونية', 'الأمن',
+    'النقل والحركة', 'التدريب', 'التوظيف', 'الشؤون الإدارية', 'البحث والتطوير',
+]
+BRANCHES = ['القاهرة', 'الجيزة', 'الإسكندرية', 'المنصورة', 'طنطا', 'أسيوط', 'الزقازيق', 'بورسعيد', 'السويس', 'المنيا', 'سوهاج', 'الغردقة']
+UNIT_NAMES = ['وحدة العمليات', 'وحدة التخطيط', 'وحدة المتابعة', 'وحدة الدعم', 'وحدة التقارير', 'الوردية الأولى', 'الوردية الثانية']
+POSITION_NAMES = ['موظف', 'أخصائي', 'أخصائي أول', 'مشرف', 'رئيس قسم', 'مساعد إداري', 'فني', 'منسق', 'محلل', 'مراقب']
+# (class, share of employees)
+CLASS_SHARES = [('A', 0.40), ('B', 0.30), ('C', 0.20), ('مشرف', 0.07), ('مدير', 0.03)]
+CRITERIA_NAMES = ['الالتزام بالمواعيد', 'جودة العمل', 'التعاون مع الزملاء', 'المبادرة', 'الالتزام باللوائح',
+                  'حل المشكلات', 'التواصل', 'إدارة الوقت', 'القيادة', 'تطوير الفريق']
+EVALUATION_COMMENTS = ['أداء متميز ويستحق التقدير', 'ملتزم ومتعاون', 'يحتاج إلى تحسين الالتزام بالمواعيد',
+                       'أداء جيد مع إمكانية للتطور', 'يُنصح بحضور دورات تدريبية', 'مستوى مقبول', None, None]
+COURSE_TOPICS = ['Excel المتقدم', 'مهارات التواصل', 'السلامة والصحة المهنية', 'خدمة العملاء', 'إدارة الوقت',
+                 'القيادة الإدارية', 'الإسعافات الأولية', 'مهارات البيع', 'أساسيات المحاسبة', 'اللغة الإنجليزية',
+                 'إدارة المشروعات', 'مكافحة الحرائق', 'الجودة الشاملة', 'أمن المعلومات', 'العمل الجماعي']
+COURSE_LEVELS = ['', ' - مستوى متقدم', ' - مستوى أساسي', ' - ورشة عمل']
+LOCATIONS = ['قاعة التدريب الرئيسية', 'قاعة الاجتماعات', 'مركز التدريب - الجيزة', 'أونلاين', 'موقع العمل']
+EXTERNAL_COMPANIES = ['مركز الخبراء للتدريب', 'أكاديمية النخبة', 'بيت الخبرة للاستشارات', 'مؤسسة التطوير المهني']
+JOB_TITLES = ['محاسب', 'مندوب مبيعات', 'أخصائي موارد بشرية', 'مطور برمجيات', 'فني صيانة', 'مراقب جودة',
+              'أمين مخزن', 'موظف خدمة عملاء', 'سائق', 'فرد أمن', 'مسؤول مشتريات', 'أخصائي تسويق']
+SOURCES = ['LinkedIn', 'Referral', 'Facebook', 'Website', 'Other']
+# Chance of moving on from each funnel stage; otherwise rejected or still waiting
+STAGE_ADVANCE = {'New': 0.75, 'Screening': 0.6, 'Interview': 0.55, 'Training': 0.8, 'Offer': 0.85}
+STAGE_NOTES = {'Screening': 'تمت مراجعة السيرة الذاتية', 'Interview': 'تم تحديد موعد المقابلة',
+               'Training': 'بدأ فترة التدريب', 'Offer': 'تم إرسال العرض الوظيفي', 'Hired': 'تم التعيين',
+               'Rejected': 'غير مناسب للوظيفة'}
+GOVERNORATE_CODES = ['01', '02', '03', '04', '11', '12', '13', '14', '15', '16', '17', '18', '19', '21', '22', '23', '24', '25', '26', '27', '28', '29', '31', '32', '33', '34', '35', '88']
+
+
+# --- Writing ---
+
+class Writer:
+    """ Batched executemany inserts with explicit IDs, one commit per batch. """
+
+    def __init__(self, conn, batch_size, sqlite):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.cursor.fast_executemany = True
+        self.batch_size = batch_size
+        self.sqlite = sqlite
+        self.counts = Counter()
+        self._identity = {}
+
+    def next_id(self, table, column):
+        self.cursor.execute(f"SELECT ISNULL(MAX({column}), 0) + 1 FROM [Zktime_Copy].[dbo].[{table}]")
+        return int(self.cursor.fetchone()[0])
+
+    def _identity_column(self, table):
+        if self.sqlite:
+            return None  # INTEGER PRIMARY KEY takes explicit values
+        if table not in self._identity:
+            self.cursor.execute("SELECT name FROM sys.identity_columns WHERE object_id = OBJECT_ID(?)", (f"dbo.{table}",))
+            row = self.cursor.fetchone()
+            self._identity[table] = row[0].casefold() if row else None
+        return self._identity[table]
+
+    def insert(self, table, columns, rows):
+        """ rows: any iterable of tuples; sent in batches. """
+        sql = (f"INSERT INTO [Zktime_Copy].[dbo].[{table}] ({', '.join(columns)}) "
+               f"VALUES ({', '.join('?' * len(columns))})")
+        # Explicit IDs need IDENTITY_INSERT; rows without the ID column let the identity assign it
+        identity = self._identity_column(table) in {c.casefold() for c in columns}
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._flush(table, sql, batch, identity)
+                batch = []
+        if batch:
+            self._flush(table, sql, batch, identity)
+
+    def _flush(self, table, sql, batch, identity):
+        # IDENTITY_INSERT can only be on for one table per session at a time
+        if identity:
+            self.cursor.execute(f"SET IDENTITY_INSERT [Zktime_Copy].[dbo].[{table}] ON")
+        try:
+            self.cursor.executemany(sql, batch)
+        finally:
+            if identity:
+                self.cursor.execute(f"SET IDENTITY_INSERT [Zktime_Copy].[dbo].[{table}] OFF")
+        self.conn.commit()
+        self.counts[table] += len(batch)
+
+
+# --- Helpers ---
+
+def _arabic_name(rng, gender):
+    first = rng.choice(MALE_NAMES if gender == 'M' else FEMALE_NAMES)
+    parts = [first, rng.choice(MALE_NAMES), rng.choice(MALE_NAMES)]
+    if rng.random() < 0.6:
+        parts.append(rng.choice(FAMILY_NAMES))
+    return ' '.join(parts)
+
+
+def _national_id(rng, birthday, gender):
+    """ 14-digit Egyptian national ID: century, YYMMDD, governorate, serial (odd = male), check digit. """
+    century = '2' if birthday.year < 2000 else '3'
+    serial = rng.randrange(0, 1000) * 10 + rng.choice((1, 3, 5, 7, 9) if gender == 'M' else (0, 2, 4, 6, 8))
+    return f"{century}{birthday:%y%m%d}{rng.choice(GOVERNORATE_CODES)}{serial:04d}{rng.randrange(10)}"
+
+
+def _phone(rng):
+    return f"01{rng.choice('0125')}{rng.randrange(10 ** 8):08d}"
+
+
+def _random_date(rng, start, end):
+    """ datetime between start and end (dates or datetimes) with a working-hours time. """
+    days = max((end - start).days, 0)
+    day = start + timedelta(days=rng.randint(0, days))
+    return datetime(day.year, day.month, day.day, rng.randint(8, 16), rng.randint(0, 59), rng.randint(0, 59))
+
+
+def _pick_class(rng):
+    value = rng.random()
+    for class_name, share in CLASS_SHARES:
+        value -= share
+        if value < 0:
+            return class_name
+    return CLASS_SHARES[0][0]
+
+
+def _split(total, parts, rng):
+    """ total split into `parts` uneven non-negative counts that add up to total. """
+    weights = [rng.uniform(0.5, 1.5) for _ in range(parts)]
+    scale = total / sum(weights)
+    counts = [int(w * scale) for w in weights]
+    for i in rng.sample(range(parts), total - sum(counts)):
+        counts[i] += 1
+    return counts
+
+
+# --- Generators ---
+
+def generate_organization(w, rng, args, today):
+    """ Departments, positions, employees and the logins linked to them. """
+    first_dept = w.next_id('DEPARTMENTS', 'DEPTID')
+    top_count = min(len(DEPARTMENT_NAMES), max(1, math.ceil(args.departments / 4)))
+    departments = []  # (DEPTID, DEPTNAME, SUPDEPTID)
+    for i in range(args.departments):
+        dept_id = first_dept + i
+        if i < top_count:
+            departments.append((dept_id, DEPARTMENT_NAMES[i], None))
+        else:
+            parent = rng.choice(departments)
+            if parent[2] is None:
+                name = f"{parent[1]} - فرع {rng.choice(BRANCHES)}"
+            else:
+                name = f"{parent[1]} - {rng.choice(UNIT_NAMES)}"
+            departments.append((dept_id, name, parent[0]))
+    w.insert('DEPARTMENTS', ('DEPTID', 'DEPTNAME', 'SUPDEPTID'), departments)
+
+    position_id = w.next_id('POSITIONS', 'PositionID')
+    positions = {}  # DEPTID -> [PositionID]
+    position_rows = []
+    for dept_id, _, _ in departments:
+        for name in rng.sample(POSITION_NAMES, rng.randint(3, 6)):
+            position_rows.append((position_id, name, dept_id))
+            positions.setdefault(dept_id, []).append(position_id)
+            position_id += 1
+    w.insert('POSITIONS', ('PositionID', 'PositionName', 'DeptID'), position_rows)
+
+    # USERID doubles as Users.UserID for the logins, so start above both tables
+    first_user = max(w.next_id('USERINFO', 'USERID'), w.next_id('Users', 'UserID'))
+    dept_ids = [d[0] for d in departments]
+    dept_weights = [rng.uniform(0.3, 1.7) for _ in dept_ids]
+    employees = []  # dicts kept for the later generators
+    rows = []
+    for i in range(args.employees):
+        user_id = first_user + i
+        gender = 'M' if rng.random() < 0.7 else 'F'
+        # The first employee of each department is its manager
+        dept_id = dept_ids[i] if i < len(dept_ids) else rng.choices(dept_ids, dept_weights)[0]
+        employee_class = 'مدير' if i < len(dept_ids) else _pick_class(rng)
+        birthday = datetime(rng.randint(today.year - 60, today.year - 23), rng.randint(1, 12), rng.randint(1, 28))
+        hired = _random_date(rng, max(birthday.date() + timedelta(days=21 * 365), today - timedelta(days=25 * 365)), today - timedelta(days=30))
+        hired = hired.replace(hour=0, minute=0, second=0)
+        employees.append({'id': user_id, 'dept': dept_id, 'class': employee_class, 'hired': hired, 'active': True})
+        rows.append((user_id, str(BADGE_BASE + user_id), _national_id(rng, birthday, gender), _arabic_name(rng, gender),
+                     gender, rng.choice(POSITION_NAMES), birthday, hired, _phone(rng), dept_id,
+                     rng.choice(positions[dept_id]), employee_class, 1))
+    w.insert('USERINFO', ('USERID', 'BADGENUMBER', 'SSN', 'NAME', 'GENDER', 'TITLE', 'BIRTHDAY', 'HIREDDAY',
+                          'MOBILE', 'DEFAULTDEPTID', 'PositionID', 'employee_class', 'IsActive'), rows)
+
+    names = {row[0]: row[3] for row in rows}
+    managers = {e['dept']: e['id'] for e in employees[:len(dept_ids)]}
+    logins = [(user_id, f"mgr{dept_id}", PASSWORD, 3, names[user_id], dept_id) for dept_id, user_id in managers.items()]
+    staff = rng.sample(employees[len(dept_ids):], min(len(employees) - len(dept_ids), 3 * args.staff_logins))
+    roles = {'hr': [], 'trainer': [], 'recruiter': []}
+    for n, e in enumerate(staff):
+        prefix, role_id = [('hr', 2), ('trainer', 6), ('recruiter', 5)][n % 3]
+        roles[prefix].append(e['id'])
+        logins.append((e['id'], f"{prefix}{e['id']}", PASSWORD, role_id, names[e['id']], e['dept']))
+    w.insert('Users', ('UserID', 'Username', 'PasswordHash', 'RoleID', 'Name', 'DepartmentID'), logins)
+
+    return {'departments': departments, 'employees': employees, 'names': names, 'managers': managers, 'roles': roles}
+
+
+def generate_archive(w, rng, args, org, today):
+    """ Archives a share of the employees the way userinfo_archive does. """
+    w.cursor.execute("SELECT ReasonID FROM [Zktime_Copy].[dbo].[TerminationReasons]")
+    reason_ids = [r[0] for r in w.cursor.fetchall()] or [None]
+    managers = set(org['managers'].values())
+    leavers = [e for e in org['employees'] if e['id'] not in managers and rng.random() < args.turnover]
+    archive_id = w.next_id('EmployeeArchive', 'ArchiveID')
+    rows = []
+    for n, e in enumerate(leavers):
+        e['active'] = False
+        e['left'] = _random_date(rng, e['hired'].date() + timedelta(days=30), today)
+        rows.append((archive_id + n, e['id'], org['names'][e['id']], e['dept'], e['hired'], e['left'],
+                     rng.choice(reason_ids), 'بيانات تجريبية'))
+    w.insert('EmployeeArchive', ('ArchiveID', 'UserID', 'Name', 'ArchivedDeptID', 'HiredDay', 'EndDay',
+                                 'ArchiveReasonID', 'ArchiveComment'), rows)
+    for i in range(0, len(leavers), w.batch_size):
+        w.cursor.executemany("UPDATE [Zktime_Copy].[dbo].[USERINFO] SET IsActive = 0, BADGENUMBER = ? WHERE USERID = ?",
+                             [(f"{BADGE_BASE + e['id']}_A", e['id']) for e in leavers[i:i + w.batch_size]])
+        w.conn.commit()
+
+
+def generate_reference(w, rng):
+    """ Evaluation types and criteria (only when their tables are empty); returns both. """
+    w.cursor.execute("SELECT COUNT(*) FROM [Zktime_Copy].[dbo].[EvaluationTypes]")
+    if not w.cursor.fetchone()[0]:
+        w.insert('EvaluationTypes', ('EvaluationTypeID', 'TypeName', 'DisplayName', 'IsRepeatable', 'SortOrder'),
+                 [(1, 'Annual', 'التقييم السنوي', 1, 1), (2, 'Probation', 'تقييم فترة الاختبار', 0, 0)])
+    w.cursor.execute("SELECT EvaluationTypeID FROM [Zktime_Copy].[dbo].[EvaluationTypes] WHERE IsRepeatable = 1 ORDER BY SortOrder, EvaluationTypeID")
+    row = w.cursor.fetchone()
+    if row is None:
+        w.cursor.execute("SELECT MIN(EvaluationTypeID) FROM [Zktime_Copy].[dbo].[EvaluationTypes]")
+        row = w.cursor.fetchone()
+    type_id = row[0]
+
+    w.cursor.execute("SELECT COUNT(*) FROM [Zktime_Copy].[dbo].[EvaluationCriteria]")
+    if not w.cursor.fetchone()[0]:
+        criteria_id = w.next_id('EvaluationCriteria', 'CriteriaID')
+        rows = []
+        for class_name, _ in CLASS_SHARES:
+            names = rng.sample(CRITERIA_NAMES, 5)
+            for name in names:
+                rows.append((criteria_id, name, rng.choice((10, 15, 20, 25)), rng.choice((5, 10)), class_name))
+                criteria_id += 1
+        w.insert('EvaluationCriteria', ('CriteriaID', 'CriteriaName', 'CriteriaWeight', 'MaxScore', 'employee_class'), rows)
+    w.cursor.execute("SELECT CriteriaID, CriteriaWeight, MaxScore, AppliesToDeptID, employee_class FROM [Zktime_Copy].[dbo].[EvaluationCriteria]")
+    criteria = w.cursor.fetchall()
+    return type_id, criteria
+
+
+def generate_evaluations(w, rng, args, org, today):
+    """ One cycle per half year going back from today; a share of the employees evaluated in each. """
+    type_id, all_criteria = generate_reference(w, rng)
+    cycle_id = w.next_id('EvaluationCycles', 'CycleID')
+    cycles = []
+    for n in range(args.cycles, 0, -1):
+        start = date(today.year, 1 if today.month <= 6 else 7, 1)
+        for _ in range(n - 1):
+            start = date(start.year - 1, 7, 1) if start.month == 1 else date(start.year, 1, 1)
+        end = date(start.year, 6, 30) if start.month == 1 else date(start.year, 12, 31)
+        half = 'الأول' if start.month == 1 else 'الثاني'
+        cycles.append((cycle_id, f"تقييم النصف {half} {start.year}", type_id, start, end, 1 if n == 1 else 0))
+        cycle_id += 1
+    w.insert('EvaluationCycles', ('CycleID', 'CycleName', 'EvaluationTypeID', 'StartDate', 'EndDate', 'IsEnabled'), cycles)
+
+    criteria_for = {}
+    hr_users = org['roles']['hr'] or list(org['managers'].values())
+    manager_ids = set(org['managers'].values())
+
+    def evaluations():
+        evaluation_id = w.next_id('Evaluations', 'EvaluationID')
+        for cycle_id, _, _, start, end, _ in cycles:
+            last_day = min(end, today)
+            for e in org['employees']:
+                if e['hired'].date() > end or ('left' in e and e['left'].date() < start) or rng.random() >= args.evaluated:
+                    continue
+                key = (e['class'], e['dept'])
+                if key not in criteria_for:
+                    criteria_for[key] = filter_criteria(all_criteria, e['class'] or NO_CLASS, e['dept'])
+                criteria = criteria_for[key]
+                if not criteria:
+                    continue
+                # Managers are evaluated by HR, everyone else by their department's manager
+                evaluator = rng.choice(hr_users) if e['id'] in manager_ids else org['managers'][e['dept']]
+                level = e.setdefault('level', rng.uniform(0.6, 0.97))
+                max_scores = [c.MaxScore or 10 for c in criteria]
+                scores = [max(1, min(m, round(rng.gauss(level, 0.12) * m))) for m in max_scores]
+                score = round(weighted_percentage(scores, max_scores, [c.CriteriaWeight or 0 for c in criteria]), 2)
+                yield ((evaluation_id, e['id'], evaluator, _random_date(rng, start, last_day), type_id, score,
+                        get_rating_from_score(score), rng.choice(EVALUATION_COMMENTS), cycle_id),
+                       [(evaluation_id, c.CriteriaID, s) for c, s in zip(criteria, scores)])
+                evaluation_id += 1
+
+    # Evaluations and their details go out together, one batch of evaluations at a time
+    batch = []
+    for item in evaluations():
+        batch.append(item)
+        if len(batch) >= w.batch_size:
+            _write_evaluations(w, batch)
+            batch = []
+    if batch:
+        _write_evaluations(w, batch)
+
+
+def _write_evaluations(w, batch):
+    w.insert('Evaluations', ('EvaluationID', 'EmployeeUserID', 'EvaluatorUserID', 'EvaluationDate', 'EvaluationTypeID',
+                             'OverallScore', 'OverallRating', 'ManagerComments', 'CycleID'), [e for e, _ in batch])
+    w.insert('EvaluationDetails', ('EvaluationID', 'CriteriaID', 'ScoreGiven'), [d for _, details in batch for d in details])
+
+
+def generate_training(w, rng, args, org, today):
+    """ Courses, sessions with their days, enrollments and day-by-day attendance. """
+    course_id = w.next_id('TrainingCourses', 'TrainingCourseID')
+    dept_ids = [d[0] for d in org['departments']]
+    courses = []
+    for n in range(args.courses):
+        name = COURSE_TOPICS[n % len(COURSE_TOPICS)] + COURSE_LEVELS[(n // len(COURSE_TOPICS)) % len(COURSE_LEVELS)]
+        if n >= len(COURSE_TOPICS) * len(COURSE_LEVELS):
+            name += f" ({n // (len(COURSE_TOPICS) * len(COURSE_LEVELS)) + 1})"
+        courses.append((course_id + n, name, f"برنامج تدريبي في {name}", rng.choice(dept_ids) if rng.random() < 0.4 else None,
+                        rng.choice((6, 12, 18, 24, 30)), rng.choice(('مبتدئ', 'متوسط', 'متقدم')), 1))
+    w.insert('TrainingCourses', ('TrainingCourseID', 'TrainingCourseText', 'Description', 'DepartmentID', 'DurationHours',
+                                 'Difficulty', 'IsActive'), courses)
+
+    session_count = args.sessions or max(1, math.ceil(args.enrollments / 20))
+    session_id = w.next_id('TrainingSessions', 'SessionID')
+    day_id = w.next_id('TrainingSessionDays', 'DayID')
+    trainers = org['roles']['trainer'] or [e['id'] for e in org['employees'][:10]]
+    sessions, days = [], {}
+    first_day = today - timedelta(days=2 * 365)
+    for n in range(session_count):
+        sid = session_id + n
+        start = _random_date(rng, first_day, today + timedelta(days=60)).replace(hour=9, minute=0, second=0)
+        length = rng.choice((1, 1, 2, 3, 5))
+        end = (start + timedelta(days=length - 1)).replace(hour=15)
+        external = rng.random() < 0.25
+        sessions.append((sid, rng.choice(courses)[0], start, end, rng.choice(LOCATIONS), None if external else str(rng.choice(trainers)),
+                         1 if external else 0, _arabic_name(rng, 'M') if external else None,
+                         rng.choice(EXTERNAL_COMPANIES) if external else None, rng.choice(('Course', 'Course', 'Session')),
+                         rng.randint(15, 40), 'Completed' if end.date() < today else 'Scheduled'))
+        days[sid] = []
+        for d in range(length):
+            days[sid].append((day_id, sid, (start + timedelta(days=d)).date(), '09:00', '15:00', f"اليوم {d + 1}"))
+            day_id += 1
+    w.insert('TrainingSessions', ('SessionID', 'CourseID', 'SessionDate', 'EndDate', 'Location', 'InstructorID', 'IsExternal',
+                                  'ExternalTrainerName', 'ExternalCompany', 'EventType', 'MaxCapacity', 'Status'), sessions)
+    w.insert('TrainingSessionDays', ('DayID', 'SessionID', 'DayDate', 'StartTime', 'EndTime', 'Topic'),
+             (d for sid in days for d in days[sid]))
+
+    enrollment_id = w.next_id('TrainingEnrollments', 'EnrollmentID')
+    employee_ids = [e['id'] for e in org['employees'] if e['active']] or [e['id'] for e in org['employees']]
+    enrollments, attendance = [], []
+    for session, count in zip(sessions, _split(args.enrollments, len(sessions), rng)):
+        sid, course, start, end = session[:4]
+        completed = session[-1] == 'Completed'
+        for employee in rng.sample(employee_ids, min(count, len(employee_ids))):
+            present = 0
+            if completed:
+                pass_status = rng.choices(('Passed', 'Failed', 'Excuse', 'Canceled'), (75, 12, 8, 5))[0]
+                if pass_status in ('Passed', 'Failed'):
+                    for day in days[sid]:
+                        if rng.random() < 0.92:
+                            attendance.append((sid, day[0], enrollment_id))
+                            present += 1
+                grade = round(rng.uniform(50, 100) if pass_status == 'Passed' else rng.uniform(20, 49), 1) if pass_status in ('Passed', 'Failed') else None
+                enrollments.append((enrollment_id, sid, course, employee, start - timedelta(days=rng.randint(3, 30)),
+                                    'Present' if present else 'Excused', round(present / len(days[sid]) * 100, 1), pass_status, grade))
+            else:
+                enrollments.append((enrollment_id, sid, course, employee, min(start, datetime.combine(today, datetime.min.time())) - timedelta(days=rng.randint(0, 20)),
+                                    'Registered', None, None, None))
+            enrollment_id += 1
+        if len(enrollments) >= w.batch_size:
+            _write_enrollments(w, enrollments, attendance)
+            enrollments, attendance = [], []
+    _write_enrollments(w, enrollments, attendance)
+
+
+def _write_enrollments(w, enrollments, attendance):
+    w.insert('TrainingEnrollments', ('EnrollmentID', 'SessionID', 'TrainingCourseID', 'EmployeeUserID', 'EnrollmentDate',
+                                     'AttendanceStatus', 'AttendancePercent', 'PassStatus', 'Grade'), enrollments)
+    w.insert('TrainingAttendance', ('SessionID', 'DayID', 'EnrollmentID'), attendance)
+
+
+def generate_recruitment(w, rng, args, org, today):
+    """ Jobs, candidates walking the funnel stages and their CandidateLogs. """
+    job_id = w.next_id('Jobs', 'JobID')
+    jobs = []
+    for n in range(args.jobs):
+        dept_id, dept_name, _ = rng.choice(org['departments'])
+        posted = _random_date(rng, today - timedelta(days=2 * 365), today - timedelta(days=7))
+        jobs.append((job_id + n, rng.choice(JOB_TITLES), dept_id, org['names'][org['managers'][dept_id]],
+                     f"مطلوب للعمل في {dept_name}", 'Open' if posted.date() > today - timedelta(days=120) else rng.choice(('Open', 'Closed')), posted))
+    w.insert('Jobs', ('JobID', 'JobTitle', 'DepartmentID', 'HiringManager', 'Description', 'Status', 'PostDate'), jobs)
+
+    candidate_id = w.next_id('Candidates', 'CandidateID')
+    now = datetime.combine(today, datetime.min.time()).replace(hour=17)
+    trainers = [org['names'][i] for i in org['roles']['trainer']] or [None]
+
+    def candidates():
+        for n in range(args.candidates):
+            cid = candidate_id + n
+            job = rng.choice(jobs)
+            gender = 'M' if rng.random() < 0.65 else 'F'
+            birthday = datetime(rng.randint(today.year - 40, today.year - 20), rng.randint(1, 12), rng.randint(1, 28))
+            phone, national_id = _phone(rng), _national_id(rng, birthday, gender)
+            applied = _random_date(rng, job[6], min(job[6] + timedelta(days=90), now))
+            stage, moment, logs = 'New', applied, []
+            hire_date = training_start = None
+            while stage in STAGE_ADVANCE:
+                moment = moment + timedelta(days=rng.randint(1, 14), hours=rng.randint(0, 6))
+                if moment > now:
+                    break
+                chance = rng.random()
+                if chance < STAGE_ADVANCE[stage]:
+                    next_stage = FUNNEL_STAGES[FUNNEL_STAGES.index(stage) + 1]
+                elif chance < STAGE_ADVANCE[stage] + (1 - STAGE_ADVANCE[stage]) * 0.8:
+                    next_stage = 'Rejected'
+                else:
+                    break  # still waiting in this stage
+                score = rng.randint(40, 100) if stage == 'Interview' else None
+                logs.append((cid, stage, next_stage, score, STAGE_NOTES[next_stage], moment))
+                if next_stage == 'Training':
+                    training_start = moment
+                elif next_stage == 'Hired':
+                    hire_date = moment
+                stage = next_stage
+            later = FUNNEL_STAGES.index(stage) >= FUNNEL_STAGES.index('Training') if stage in FUNNEL_STAGES else False
+            docs = [1 if later or rng.random() < 0.3 else 0 for _ in range(7)]
+            last = logs[-1] if logs else None
+            yield ((cid, job[0], _arabic_name(rng, gender), phone, f"candidate{cid}@example.com", rng.choice(SOURCES), national_id,
+                    stage, applied, hire_date, rng.choice(trainers) if training_start else None, training_start, *docs,
+                    last[4] if last else None, last[5] if last else None, last[1] if last else None, last[2] if last else None,
+                    *candidate_key_params(phone, national_id)), logs)
+
+    batch = []
+    for item in candidates():
+        batch.append(item)
+        if len(batch) >= w.batch_size:
+            _write_candidates(w, batch)
+            batch = []
+    if batch:
+        _write_candidates(w, batch)
+
+
+def _write_candidates(w, batch):
+    w.insert('Candidates', ('CandidateID', 'JobID', 'FullName', 'Phone', 'Email', 'Source', 'NationalID', 'Status',
+                            'ApplicationDate', 'HireDate', 'TrainerName', 'TrainingStartDate', 'DocIDCard', 'DocBirthCert',
+                            'DocCriminalRecord', 'DocDegree', 'DocInfoSheet', 'DocMilitary', 'DocPersonalPhoto',
+                            'LastNote', 'LastActionDate', 'LastFromStage', 'LastToStage', 'PhoneKey', 'NationalIDKey'),
+             [c for c, _ in batch])
+    w.insert('CandidateLogs', ('CandidateID', 'FromStage', 'ToStage', 'EvaluationScore', 'Note', 'ActionDate'),
+             [log for _, logs in batch for log in logs])
+
+
+def generate_app_logs(w, rng, args, org, today):
+    logins = [(user_id, f"mgr{dept_id}") for dept_id, user_id in org['managers'].items()]
+    for prefix, ids in org['roles'].items():
+        logins += [(user_id, f"{prefix}{user_id}") for user_id in ids]
+    actions = [
+        ('Access', 'Login', lambda: 'تم تسجيل الدخول بنجاح'),
+        ('Evaluations', 'Create', lambda: f"Batch evaluation of {rng.randint(2, 30)} employees (type 1)"),
+        ('Users', 'Archive', lambda: f"Archived User ID {rng.choice(org['employees'])['id']}. ReasonID: 1"),
+        ('Users', 'Edit', lambda: f"Updated User ID {rng.choice(org['employees'])['id']}"),
+        ('Training', 'Enroll', lambda: f"Enrolled employees in session {rng.randint(1, 1000)}"),
+        ('Recruitment', 'Update', lambda: 'تم تحديث حالة المرشح'),
+    ]
+    first = today - timedelta(days=365)
+
+    def rows():
+        for _ in range(args.app_logs):
+            user_id, username = rng.choice(logins)
+            module, action, description = rng.choices(actions, (50, 10, 2, 15, 10, 13))[0]
+            yield (user_id, username, module, action, description(), _random_date(rng, first, today))
+    w.insert('AppLogs', ('UserID', 'Username', 'Module', 'ActionType', 'Description', 'Timestamp'), rows())
+
+
+def refresh_derived(w):
+    """ The tables the app keeps up to date itself: cycle progress and the recruitment funnel. """
+    rebuild_cycle_progress(w.cursor)
+    w.conn.commit()
+    refresh_recruitment_funnel(w.cursor, force=True)
+    w.conn.commit()
+
+
+def _timed(name, step, *args):
+    started = time.perf_counter()
+    result = step(*args)
+    print(f"{name:<13} {time.perf_counter() - started:7.1f}s")
+    return result
+
+
+def _connect(args):
+    if args.sqlite:
+        import sqlite_backend
+        if not os.path.exists(args.sqlite):
+            create_sqlite_db(args.sqlite)
+        return sqlite_backend.connect(args.sqlite), True
+    from config import DB_BACKEND
+    from db_backend import connect
+    return connect(), DB_BACKEND == 'sqlite'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the database with synthetic data for scale testing.")
+    parser.add_argument('--sqlite', metavar='PATH', help="Write to this SQLite stand-in file (created if missing)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--today', type=date.fromisoformat, default=date.today(), help="Reference date, YYYY-MM-DD (default: today)")
+    parser.add_argument('--employees', type=int, default=1000)
+    parser.add_argument('--departments', type=int, default=30)
+    parser.add_argument('--staff-logins', type=int, default=5, help="HR, trainer and recruiter logins each")
+    parser.add_argument('--turnover', type=float, default=0.05, help="Share of employees archived")
+    parser.add_argument('--cycles', type=int, default=4, help="Half-year evaluation cycles")
+    parser.add_argument('--evaluated', type=float, default=0.8, help="Share of employees evaluated per cycle")
+    parser.add_argument('--courses', type=int, default=40)
+    parser.add_argument('--sessions', type=int, help="Default: one per 20 enrollments")
+    parser.add_argument('--enrollments', type=int, default=10000)
+    parser.add_argument('--jobs', type=int, default=40)
+    parser.add_argument('--candidates', type=int, default=3000)
+    parser.add_argument('--app-logs', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    if args.employees < args.departments:
+        parser.error("--employees must be at least --departments (each department gets a manager)")
+
+    rng = random.Random(args.seed)
+    conn, sqlite = _connect(args)
+    w = Writer(conn, args.batch_size, sqlite)
+    started = time.perf_counter()
+    try:
+        org = _timed('organization', generate_organization, w, rng, args, args.today)
+        for name, step in [('archive', generate_archive), ('evaluations', generate_evaluations), ('training', generate_training),
+                           ('recruitment', generate_recruitment), ('app logs', generate_app_logs)]:
+            _timed(name, step, w, rng, args, org, args.today)
+        _timed('derived', refresh_derived, w)
+    except Exception as e:
+        conn.rollback()
+        print(f"Error generating data: {e}")
+        raise SystemExit(1)
+    finally:
+        conn.close()
+
+    for table, count in w.counts.items():
+        print(f"  {table:<22} {count:>10,}")
+    print(f"Generated {sum(w.counts.values()):,} rows in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+gunicorn settings (Linux):  gunicorn -c gunicorn.conf.py wsgi:application
+
+Every value can be overridden with an environment variable of the same name
+in upper case with a GUNICORN_ prefix, e.g. GUNICORN_WORKERS=4.
+"""
+import multiprocessing
+import os
+import tempfile
+
+
+def _env(name, default):
+    return type(default)(os.environ.get(f'GUNICORN_{name.upper()}', default))
+
+
+bind = _env('bind', '0.0.0.0:8080')
+
+# Processes x threads; requests mostly wait on SQL Server, so a few threads per worker pay off
+workers = _env('workers', multiprocessing.cpu_count() * 2 + 1)
+worker_class = 'gthread'
+threads = _env('threads', 4)
+
+# Import app.py once in the master and fork it, so workers start fast and share memory
+preload_app = True
+
+# A request running longer than this (e.g. a stuck query) gets its worker restarted
+timeout = _env('timeout', 120)
+# Time given to in-flight requests on HUP (reload) / TERM before workers are killed
+graceful_timeout = _env('graceful_timeout', 30)
+keepalive = _env('keepalive', 5)
+
+# Recycle workers now and then so in-process caches and any leak can't grow forever
+max_requests = _env('max_requests', 2000)
+max_requests_jitter = _env('max_requests_jitter', 200)
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-')
+errorlog = '-'
+
+# /metrics adds up the workers' counters from this directory (app_metrics.py).
+# It has to exist before the app (and prometheus_client) is imported, which
+# preload_app does before any server hook runs; a fresh one per start keeps
+# values of an earlier run from being added in.
+if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='evaluation-metrics-')
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+# Each worker caches reference lists / charts / analytics in-process; an
+# invalidate_*() in one worker touches a marker file here that the others
+# check on every lookup (cache_invalidation.py), so no worker serves data
+# older than the last committed write.
+if 'CACHE_INVALIDATION_DIR' not in os.environ:
+    os.environ['CACHE_INVALIDATION_DIR'] = tempfile.mkdtemp(prefix='evaluation-caches-')
+os.makedirs(os.environ['CACHE_INVALIDATION_DIR'], exist_ok=True)
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
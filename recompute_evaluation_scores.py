@@ -0,0 +1,43 @@
+import argparse
+import time
+import pyodbc
+from config import CONNECTION_STRING
+from scoring import recompute_scores, RECOMPUTE_CHUNK_SIZE
+
+def recompute_evaluation_scores(criteria_ids=None, chunk_size=RECOMPUTE_CHUNK_SIZE, dry_run=False, show=20):
+    conn = pyodbc.connect(CONNECTION_STRING)
+    cursor = conn.cursor()
+
+    try:
+        started = time.perf_counter()
+        report = recompute_scores(cursor, criteria_ids=criteria_ids, chunk_size=chunk_size, dry_run=dry_run)
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+        elapsed = time.perf_counter() - started
+
+        print(f"Evaluations checked: {report['checked']}")
+        print(f"Scores changed:      {report['changed']}")
+        print(f"Ratings changed:     {report['rating_changed']}")
+        print(f"Elapsed:             {elapsed:.2f}s{' (dry run, nothing written)' if dry_run else ''}")
+
+        for change in report['changes'][:show]:
+            print(f"  #{change['id']}: {change['old_score']} ({change['old_rating']}) -> {change['new_score']} ({change['new_rating']})")
+        if len(report['changes']) > show:
+            print(f"  ... {len(report['changes']) - show} more")
+    except Exception as e:
+        conn.rollback()
+        print(f"Error recomputing scores: {e}")
+
+    conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute OverallScore/OverallRating from EvaluationDetails and the current criteria.")
+    parser.add_argument('--criteria', help="Comma separated CriteriaIDs; only evaluations using them are re-scored (default: all)")
+    parser.add_argument('--chunk-size', type=int, default=RECOMPUTE_CHUNK_SIZE)
+    parser.add_argument('--dry-run', action='store_true', help="Report the changes without writing them")
+    args = parser.parse_args()
+
+    criteria_ids = [int(x) for x in args.criteria.split(',') if x.strip()] if args.criteria else None
+    recompute_evaluation_scores(criteria_ids, args.chunk_size, args.dry_run)
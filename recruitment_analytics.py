@@ -0,0 +1,181 @@
+"""
+Cached figures for the recruitment analytics page.
+
+The page is split into parts that are computed and cached separately, so the
+HTML only waits for the KPI cards:
+
+- KPIs and recent rejection reasons: one small batch, rendered with the page;
+- each chart (stages, sources, jobs, depts, trend): its own query, served as
+  JSON from /api/recruitment/analytics/charts/<name>;
+- the funnel conversion / time-in-stage tables (recruitment_funnel, pandas),
+  loaded into the page as an HTML partial. They are only read here and
+  rebuilt by refresh_recruitment_funnel.py from a scheduled task.
+
+Every part is kept in-process for a short TTL. Routes that write candidates
+or jobs call invalidate_recruitment_analytics() so the next view recomputes.
+get_recruitment_analytics() still returns everything at once for
+/api/recruitment/analytics.
+"""
+import time
+
+from app_metrics import record_cache_lookup
+from cache_invalidation import mark_invalidated, invalidated_since
+
+ANALYTICS_TTL_SECONDS = 60
+
+_analytics_cache = {}
+
+KPI_BATCH_SQL = """
+    SET NOCOUNT ON;
+
+    -- Summary Cards (KPIs) and Average Time to Hire (Days)
+    SELECT
+        (SELECT COUNT(*) FROM Candidates) AS TotalCandidates,
+        (SELECT COUNT(*) FROM Jobs WHERE Status = 'Open') AS OpenPositions,
+        (SELECT COUNT(*) FROM Candidates WHERE Status = 'Hired') AS TotalHired,
+        (SELECT AVG(DATEDIFF(day, C.ApplicationDate, L.ActionDate))
+         FROM CandidateLogs L
+         JOIN Candidates C ON L.CandidateID = C.CandidateID
+         WHERE L.ToStage = 'Hired') AS AvgHireTime;
+
+    -- Recent Rejection Reasons (from Logs)
+    SELECT TOP 5 L.Note, J.JobTitle, D.DEPTNAME, L.ActionDate
+    FROM CandidateLogs L
+    JOIN Candidates C ON L.CandidateID = C.CandidateID
+    JOIN Jobs J ON C.JobID = J.JobID
+    LEFT JOIN DEPARTMENTS D ON J.DepartmentID = D.DEPTID
+    WHERE L.ToStage = 'Rejected' AND L.Note IS NOT NULL
+    ORDER BY L.ActionDate DESC;
+"""
+
+CHART_SQL = {
+    # Pipeline Stages (Funnel)
+    'stages': "SELECT Status AS Label, COUNT(*) as cnt FROM Candidates GROUP BY Status",
+    # Sourcing Channels (Pie Chart)
+    'sources': "SELECT Source AS Label, COUNT(*) as cnt FROM Candidates WHERE Source IS NOT NULL GROUP BY Source",
+    # Top Jobs by Applicants (Bar Chart)
+    'jobs': """
+        SELECT TOP 5 J.JobTitle AS Label, COUNT(C.CandidateID) as cnt
+        FROM Jobs J
+        LEFT JOIN Candidates C ON J.JobID = C.JobID
+        GROUP BY J.JobTitle
+        ORDER BY cnt DESC
+    """,
+    # Department Performance (Total vs Hired vs Rejected)
+    'depts': """
+        SELECT
+            COALESCE(D.DEPTNAME, 'General') as DeptName,
+            COUNT(C.CandidateID) as Total,
+            SUM(CASE WHEN C.Status = 'Hired' THEN 1 ELSE 0 END) as Hired,
+            SUM(CASE WHEN C.Status = 'Rejected' THEN 1 ELSE 0 END) as Rejected
+        FROM Jobs J
+        LEFT JOIN Candidates C ON J.JobID = C.JobID
+        LEFT JOIN DEPARTMENTS D ON J.DepartmentID = D.DEPTID
+        GROUP BY D.DEPTNAME
+    """,
+    # Monthly Applicant Trend (Last 6 Months); CONVERT avoids the per-row cost of FORMAT()
+    'trend': """
+        SELECT CONVERT(char(7), ApplicationDate, 120) as Label, COUNT(*) as cnt
+        FROM Candidates
+        WHERE ApplicationDate >= DATEADD(month, -6, GETDATE())
+        GROUP BY CONVERT(char(7), ApplicationDate, 120)
+        ORDER BY Label
+    """,
+}
+
+
+def invalidate_recruitment_analytics():
+    """ Drops every cached part; called after candidate / job writes. """
+    _analytics_cache.clear()
+    mark_invalidated('recruitment_analytics')
+
+
+def _cached(key, get_connection, build):
+    """ Cached value of build(conn) for key, recomputed (one connection) when older than the TTL. """
+    cached = _analytics_cache.get(key)
+    hit = (cached is not None and time.time() - cached[0] < ANALYTICS_TTL_SECONDS
+           and not invalidated_since('recruitment_analytics', cached[0]))
+    record_cache_lookup('recruitment_analytics', hit)
+    if hit:
+        return cached[1]
+
+    started = time.time()
+    conn = get_connection()
+    try:
+        data = build(conn)
+    finally:
+        conn.close()
+
+    _analytics_cache[key] = (started, data)
+    return data
+
+
+def get_recruitment_kpis(get_connection):
+    """ KPI card values and the recent rejection reasons. """
+    return _cached('kpis', get_connection, build_recruitment_kpis)
+
+
+def get_recruitment_chart(get_connection, name):
+    """ Data for one chart in CHART_SQL. """
+    if name not in CHART_SQL:
+        raise ValueError(f"Unknown chart: {name}")
+    return _cached(('chart', name), get_connection, lambda conn: build_recruitment_chart(conn, name))
+
+
+def get_recruitment_funnel(get_connection):
+    """ Funnel conversion / time in stage, and the stage with the biggest drop-off. """
+    return _cached('funnel', get_connection, build_recruitment_funnel)
+
+
+def get_recruitment_analytics(get_connection):
+    """ Everything the page shows, from the same cached parts. """
+    return {
+        **get_recruitment_kpis(get_connection),
+        'analytics': {name: get_recruitment_chart(get_connection, name) for name in CHART_SQL},
+        **get_recruitment_funnel(get_connection)
+    }
+
+
+def build_recruitment_kpis(conn):
+    cursor = conn.cursor()
+    cursor.execute(KPI_BATCH_SQL)
+    kpis = cursor.fetchone()
+    rejection_logs = cursor.fetchall() if cursor.nextset() else []
+
+    return {
+        'total_candidates': kpis.TotalCandidates if kpis else 0,
+        'open_positions': kpis.OpenPositions if kpis else 0,
+        'total_hired': kpis.TotalHired if kpis else 0,
+        'avg_hire_time': int(kpis.AvgHireTime or 0) if kpis else 0,
+        'rejection_logs': rejection_logs
+    }
+
+
+def build_recruitment_chart(conn, name):
+    cursor = conn.cursor()
+    cursor.execute(CHART_SQL[name])
+    rows = cursor.fetchall()
+
+    if name == 'depts':
+        return {
+            'labels': [row.DeptName for row in rows],
+            'total': [row.Total for row in rows],
+            'hired': [row.Hired for row in rows],
+            'rejected': [row.Rejected for row in rows]
+        }
+    return {'labels': [row.Label for row in rows], 'data': [row.cnt for row in rows]}
+
+
+def build_recruitment_funnel(conn):
+    # recruitment_funnel uses pandas; imported here so the app starts without it
+    from recruitment_funnel import get_funnel_summary, biggest_drop_off
+
+    cursor = conn.cursor()
+    # Funnel conversion / time-in-stage (precomputed by the scheduled refresh_recruitment_funnel.py)
+    try:
+        funnel = get_funnel_summary(cursor)
+    except Exception as e:
+        print(f"Recruitment Funnel Error: {e}")
+        funnel = {'overall': [], 'departments': [], 'jobs': []}
+
+    return {'funnel': funnel, 'funnel_drop_off': biggest_drop_off(funnel['overall'])}
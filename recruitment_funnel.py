@@ -0,0 +1,195 @@
+"""
+Recruitment funnel / time-in-stage engine.
+
+CandidateStageFacts holds one row per stage transition in CandidateLogs,
+derived with LAG() over each candidate's log: the stage that was left, the
+stage that was entered, when the candidate entered the left stage (previous
+log or ApplicationDate) and how many days they spent there. Only log rows
+newer than the last processed LogID are added, so a refresh costs a window
+pass over the candidates that actually have new activity.
+
+RecruitmentFunnelSummary holds the precomputed facts the analytics page
+shows, per job, per department and overall: how many candidates reached each
+funnel stage, how many advanced / dropped off from it, the conversion rate
+and the median / p90 days spent in it. Rebuilding it reads every fact, so the
+app only extracts new facts when it writes CandidateLogs; the summary is
+rebuilt by refresh_recruitment_funnel.py from a scheduled task (and by the
+create / generate scripts).
+"""
+import pandas as pd
+
+FUNNEL_STAGES = ['New', 'Screening', 'Interview', 'Training', 'Offer', 'Hired']
+DROP_OFF_STAGES = ['Rejected', 'Archived']
+
+SCOPE_ALL = 'All'
+SCOPE_DEPARTMENT = 'Department'
+SCOPE_JOB = 'Job'
+
+EXTRACT_FACTS_SQL = """
+    SET NOCOUNT ON;
+    DECLARE @Watermark INT = (SELECT COALESCE(MAX(LogID), 0) FROM CandidateStageFacts);
+
+    WITH Transitions AS (
+        SELECT L.LogID, L.CandidateID, L.FromStage, L.ToStage, L.ActionDate,
+               LAG(L.ActionDate) OVER (PARTITION BY L.CandidateID ORDER BY L.ActionDate, L.LogID) AS PrevActionDate,
+               LAG(L.ToStage) OVER (PARTITION BY L.CandidateID ORDER BY L.ActionDate, L.LogID) AS PrevToStage
+        FROM CandidateLogs L
+        WHERE L.ToStage IS NOT NULL
+          AND L.CandidateID IN (SELECT CandidateID FROM CandidateLogs WHERE LogID > @Watermark)
+    )
+    INSERT INTO CandidateStageFacts
+        (LogID, CandidateID, JobID, DepartmentID, Stage, NextStage, EnteredAt, ExitedAt, DaysInStage)
+    SELECT T.LogID, T.CandidateID, C.JobID, J.DepartmentID,
+           COALESCE(T.FromStage, T.PrevToStage, 'New'), T.ToStage,
+           COALESCE(T.PrevActionDate, C.ApplicationDate), T.ActionDate,
+           CASE WHEN COALESCE(T.PrevActionDate, C.ApplicationDate) IS NULL THEN NULL
+                ELSE DATEDIFF(minute, COALESCE(T.PrevActionDate, C.ApplicationDate), T.ActionDate) / 1440.0 END
+    FROM Transitions T
+    JOIN Candidates C ON T.CandidateID = C.CandidateID
+    LEFT JOIN Jobs J ON C.JobID = J.JobID
+    WHERE T.LogID > @Watermark;
+
+    SELECT @@ROWCOUNT AS NewFacts;
+"""
+
+LOAD_FACTS_SQL = """
+    SELECT CandidateID, JobID, DepartmentID, Stage, NextStage, DaysInStage FROM CandidateStageFacts;
+    SELECT C.CandidateID, C.JobID, J.DepartmentID FROM Candidates C LEFT JOIN Jobs J ON C.JobID = J.JobID;
+"""
+
+
+def extract_new_facts(cursor):
+    """ Adds facts for CandidateLogs rows past the last processed LogID. The caller commits. Returns the count. """
+    cursor.execute(EXTRACT_FACTS_SQL)
+    row = cursor.fetchone()
+    return row.NewFacts if row else 0
+
+
+def refresh_recruitment_funnel(cursor, force=False):
+    """
+    Adds facts for new CandidateLogs rows and, if any were added (or force),
+    rebuilds the summary table. The caller commits. Returns the new fact count.
+    """
+    new_facts = extract_new_facts(cursor)
+    if new_facts or force:
+        rebuild_funnel_summary(cursor)
+    return new_facts
+
+
+def rebuild_funnel_summary(cursor):
+    """ Recomputes RecruitmentFunnelSummary from every fact and candidate. The caller commits. """
+    cursor.execute(LOAD_FACTS_SQL)
+    facts = pd.DataFrame.from_records([tuple(r) for r in cursor.fetchall()],
+                                      columns=['CandidateID', 'JobID', 'DepartmentID', 'Stage', 'NextStage', 'DaysInStage'])
+    candidates = pd.DataFrame.from_records([tuple(r) for r in cursor.fetchall()] if cursor.nextset() else [],
+                                           columns=['CandidateID', 'JobID', 'DepartmentID'])
+    rows = summarize_funnel(facts, candidates)
+
+    cursor.execute("DELETE FROM RecruitmentFunnelSummary")
+    if rows:
+        cursor.fast_executemany = True
+        cursor.executemany("""
+            INSERT INTO RecruitmentFunnelSummary
+                (ScopeType, ScopeID, Stage, StageOrder, Reached, Advanced, DroppedOff, ConversionRate, MedianDays, P90Days, RefreshedAt)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, GETDATE())
+        """, rows)
+        cursor.fast_executemany = False
+
+
+def summarize_funnel(facts, candidates):
+    """
+    Turns the facts into summary rows for every scope (overall, department, job).
+    Every candidate counts as having reached 'New'.
+    """
+    stage_order = {stage: i for i, stage in enumerate(FUNNEL_STAGES)}
+    facts = facts.copy()
+    facts['StageRank'] = facts['Stage'].map(stage_order)
+    facts['NextRank'] = facts['NextStage'].map(stage_order)
+    facts['DaysInStage'] = pd.to_numeric(facts['DaysInStage'], errors='coerce')
+
+    # (candidate, stage) pairs reached: application, every stage left and every stage entered
+    reached = pd.concat([
+        candidates.assign(Stage='New'),
+        facts[['CandidateID', 'JobID', 'DepartmentID', 'Stage']],
+        facts[['CandidateID', 'JobID', 'DepartmentID', 'NextStage']].rename(columns={'NextStage': 'Stage'})
+    ], ignore_index=True)
+    advanced = facts[facts['NextRank'] > facts['StageRank']]
+    dropped = facts[facts['NextStage'].isin(DROP_OFF_STAGES)]
+
+    rows = []
+    for scope_type, key in ((SCOPE_ALL, None), (SCOPE_DEPARTMENT, 'DepartmentID'), (SCOPE_JOB, 'JobID')):
+        keys = [key, 'Stage'] if key else ['Stage']
+
+        def distinct_candidates(frame):
+            frame = frame if key is None else frame[frame[key].notna()]
+            return frame.drop_duplicates(keys + ['CandidateID']).groupby(keys).size()
+
+        summary = pd.DataFrame({
+            'Reached': distinct_candidates(reached),
+            'Advanced': distinct_candidates(advanced),
+            'DroppedOff': distinct_candidates(dropped)
+        })
+        timed = facts if key is None else facts[facts[key].notna()]
+        timed = timed[timed['DaysInStage'].notna()].groupby(keys)['DaysInStage']
+        summary = summary.join(pd.DataFrame({'MedianDays': timed.median(), 'P90Days': timed.quantile(0.9)}), how='left')
+        summary = summary.fillna({'Reached': 0, 'Advanced': 0, 'DroppedOff': 0}).reset_index()
+        summary = summary[summary['Stage'].isin(FUNNEL_STAGES)]
+
+        for rec in summary.itertuples(index=False):
+            reached_count = int(rec.Reached)
+            rows.append((
+                scope_type,
+                int(getattr(rec, key)) if key else 0,
+                rec.Stage,
+                stage_order[rec.Stage],
+                reached_count,
+                int(rec.Advanced),
+                int(rec.DroppedOff),
+                round(rec.Advanced * 100.0 / reached_count, 1) if reached_count else 0.0,
+                None if pd.isna(rec.MedianDays) else round(float(rec.MedianDays), 1),
+                None if pd.isna(rec.P90Days) else round(float(rec.P90Days), 1)
+            ))
+    return rows
+
+
+def get_funnel_summary(cursor):
+    """
+    Reads the summary for the analytics page:
+    {'overall': [stage rows], 'departments': [{'name', 'stages'}], 'jobs': [{'name', 'stages'}],
+     'refreshed_at': when the summary was last rebuilt}
+    """
+    cursor.execute("""
+        SELECT S.ScopeType, S.ScopeID, S.Stage, S.StageOrder, S.Reached, S.Advanced, S.DroppedOff,
+               S.ConversionRate, S.MedianDays, S.P90Days, S.RefreshedAt,
+               CASE S.ScopeType WHEN 'Department' THEN D.DEPTNAME WHEN 'Job' THEN J.JobTitle END AS ScopeName
+        FROM RecruitmentFunnelSummary S
+        LEFT JOIN DEPARTMENTS D ON S.ScopeType = 'Department' AND S.ScopeID = D.DEPTID
+        LEFT JOIN Jobs J ON S.ScopeType = 'Job' AND S.ScopeID = J.JobID
+        ORDER BY S.ScopeType, ScopeName, S.StageOrder
+    """)
+
+    result = {'overall': [], 'departments': {}, 'jobs': {}, 'refreshed_at': None}
+    for row in cursor.fetchall():
+        if row.RefreshedAt and (result['refreshed_at'] is None or row.RefreshedAt > result['refreshed_at']):
+            result['refreshed_at'] = row.RefreshedAt
+        stage = {
+            'stage': row.Stage, 'reached': row.Reached, 'advanced': row.Advanced, 'dropped': row.DroppedOff,
+            'conversion': row.ConversionRate, 'median_days': row.MedianDays, 'p90_days': row.P90Days
+        }
+        if row.ScopeType == SCOPE_ALL:
+            result['overall'].append(stage)
+        else:
+            bucket = result['departments'] if row.ScopeType == SCOPE_DEPARTMENT else result['jobs']
+            bucket.setdefault(row.ScopeID, {'id': row.ScopeID, 'name': row.ScopeName or 'عام', 'stages': []})['stages'].append(stage)
+
+    result['departments'] = list(result['departments'].values())
+    result['jobs'] = list(result['jobs'].values())
+    return result
+
+
+def biggest_drop_off(stages):
+    """ The stage losing the largest share of the candidates that reached it. """
+    candidates = [s for s in stages if s['reached'] and s['stage'] != FUNNEL_STAGES[-1]]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda s: s['dropped'] / s['reached'])
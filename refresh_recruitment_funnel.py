@@ -0,0 +1,25 @@
+import argparse
+import time
+import db_backend
+from recruitment_funnel import refresh_recruitment_funnel
+
+def run_refresh():
+    conn = db_backend.connect()
+    cursor = conn.cursor()
+
+    try:
+        started = time.perf_counter()
+        # The app extracts new facts on every candidate write, so the summary is always rebuilt here
+        new_facts = refresh_recruitment_funnel(cursor, force=True)
+        conn.commit()
+        print(f"New funnel facts: {new_facts}")
+        print(f"Summary rebuilt in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        conn.rollback()
+        print(f"Error refreshing the recruitment funnel: {e}")
+
+    conn.close()
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(description="Rebuild the recruitment funnel summary (run from a scheduled task, e.g. hourly).").parse_args()
+    run_refresh()
@@ -0,0 +1,222 @@
+"""
+On-demand profiling of single requests, for admins.
+
+An admin adds ?_profile=1 to a URL (or sends the header "X-Profile: 1"); the
+request then runs under cProfile and tracemalloc and is saved to PROFILE_DIR:
+
+- <id>.prof: the raw cProfile stats (python -m pstats, snakeviz, ...);
+- <id>.json: route, endpoint, query parameters, user, status, the time split
+  into SQL / Jinja / Python (from sql_instrumentation), peak memory, the
+  slowest statements and the top functions by own and cumulative time.
+
+The response carries an X-Profile-Id header; /admin/profiles lists the saved
+profiles. Only the newest PROFILE_KEEP are kept.
+
+cProfile slows Python code down (often 1.5-2x), so the Python share is
+overstated. One request is profiled at a time; a second ?_profile=1 request
+while one is running is served without profiling ("X-Profile: busy").
+tracemalloc counts every thread, so the peak includes requests running at the
+same time. Streamed responses are only profiled up to the first byte.
+"""
+import cProfile
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+from flask import g, request, session
+
+from sql_instrumentation import current_request_stats
+from web_helpers import is_admin
+
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'))
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 50))
+
+# Functions / statements kept in the .json summary
+TOP_FUNCTIONS = 30
+TOP_STATEMENTS = 10
+
+_PROFILE_ID = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{6}$")
+_profile_lock = threading.Lock()
+
+
+def _requested():
+    return request.args.get('_profile') == '1' or request.headers.get('X-Profile') == '1'
+
+
+def _profile_path(profile_id, ext):
+    return os.path.join(PROFILE_DIR, f"{profile_id}.{ext}")
+
+
+def _function_label(func):
+    filename, line, name = func
+    if filename == '~':  # built-ins, e.g. <method 'execute' of 'pyodbc.Cursor' objects>
+        return name
+    parts = filename.replace('\\', '/').split('/')
+    return f"{'/'.join(parts[-2:])}:{line}({name})"
+
+
+def _top_functions(stats, key):
+    # stats.stats: {(file, line, name): (primitive calls, calls, own time, cumulative time, callers)}
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][key], reverse=True)[:TOP_FUNCTIONS]
+    return [{'function': _function_label(func), 'calls': calls, 'own_ms': tt * 1000, 'cumulative_ms': ct * 1000}
+            for func, (_, calls, tt, ct, _) in rows]
+
+
+# --- Capture ---
+
+def _start_profile():
+    if not _requested() or not is_admin():
+        return
+    if not _profile_lock.acquire(blocking=False):
+        g.profile_busy = True
+        return
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    g.profile = {
+        'profiler': profiler,
+        'started_tracing': started_tracing,
+        'memory_before': tracemalloc.get_traced_memory()[0],
+        'started': time.perf_counter(),
+    }
+    profiler.enable()
+
+
+def _stop_profile(profile):
+    """ Stops the profiler and tracemalloc and frees the lock; returns (current, peak) bytes. """
+    profile['profiler'].disable()
+    try:
+        current, peak = tracemalloc.get_traced_memory()
+        if profile['started_tracing']:
+            tracemalloc.stop()
+        return current, peak
+    finally:
+        _profile_lock.release()
+
+
+def _summary(profile_id, profile, response, memory):
+    elapsed = time.perf_counter() - profile['started']
+    current, peak = memory
+    sql = current_request_stats()
+    db_seconds = sql.db_seconds if sql else 0.0
+    template_seconds = sql.template_seconds if sql else 0.0
+    stats = pstats.Stats(profile['profiler'])
+
+    return {
+        'id': profile_id,
+        'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint,
+        'args': {k: v for k, v in request.args.items(multi=True) if k != '_profile'},
+        # Field names only: form values can be passwords
+        'form_fields': sorted(request.form.keys()),
+        'user': session.get('username'),
+        'status': response.status_code,
+        'total_ms': elapsed * 1000,
+        'sql_ms': db_seconds * 1000,
+        'queries': len(sql.statements) if sql else 0,
+        'template_ms': template_seconds * 1000,
+        'python_ms': max(elapsed - db_seconds - template_seconds, 0.0) * 1000,
+        'peak_memory': peak - profile['memory_before'],
+        'retained_memory': current - profile['memory_before'],
+        'function_calls': stats.total_calls,
+        'statements': [{'sql': fp, 'count': count, 'ms': seconds * 1000, 'rows': rows}
+                       for fp, (count, seconds, rows) in list(sql.by_fingerprint().items())[:TOP_STATEMENTS]] if sql else [],
+        'by_own_time': _top_functions(stats, 2),
+        'by_cumulative_time': _top_functions(stats, 3),
+    }
+
+
+def _prune():
+    ids = sorted(f[:-5] for f in os.listdir(PROFILE_DIR) if f.endswith('.json'))
+    for profile_id in ids[:-PROFILE_KEEP]:
+        delete_profile(profile_id)
+
+
+def _finish_profile(response):
+    if g.pop('profile_busy', False):
+        response.headers['X-Profile'] = 'busy'
+        return response
+    profile = g.pop('profile', None)
+    if profile is None:
+        return response
+
+    memory = _stop_profile(profile)
+    profile_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile['profiler'].dump_stats(_profile_path(profile_id, 'prof'))
+    with open(_profile_path(profile_id, 'json'), 'w', encoding='utf-8') as f:
+        json.dump(_summary(profile_id, profile, response, memory), f, ensure_ascii=False, indent=1)
+    _prune()
+
+    response.headers['X-Profile-Id'] = profile_id
+    return response
+
+
+def _abandon_profile(exc):
+    # The request failed before _finish_profile ran (e.g. an exception in debug mode)
+    profile = g.pop('profile', None)
+    if profile is not None:
+        _stop_profile(profile)
+
+
+# --- Saved profiles ---
+
+def list_profiles():
+    """ Summaries of the saved profiles, newest first, without the function tables. """
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if name.endswith('.json'):
+            summary = load_profile(name[:-5])
+            if summary:
+                for key in ('by_own_time', 'by_cumulative_time', 'statements'):
+                    summary.pop(key, None)
+                profiles.append(summary)
+    return profiles
+
+
+def load_profile(profile_id):
+    """ The saved summary, or None for an unknown (or malformed) id. """
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(_profile_path(profile_id, 'json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def profile_stats_path(profile_id):
+    """ Path of the raw .prof file, or None. """
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    path = _profile_path(profile_id, 'prof')
+    return path if os.path.exists(path) else None
+
+
+def delete_profile(profile_id):
+    if not _PROFILE_ID.match(profile_id):
+        return
+    for ext in ('json', 'prof'):
+        try:
+            os.remove(_profile_path(profile_id, ext))
+        except FileNotFoundError:
+            pass
+
+
+def init_profiling(app):
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.teardown_request(_abandon_profile)
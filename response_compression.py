@@ -0,0 +1,113 @@
+"""
+Response compression for the dynamic pages (HTML, JSON, CSV).
+
+init_compression(app) registers an after_request hook that compresses the
+response body with the best encoding the browser accepts (brotli when the
+brotli package is installed, else gzip):
+
+- only text mimetypes in COMPRESSIBLE_MIMETYPES, and bodies of at least
+  MIN_COMPRESS_BYTES (small bodies fit in one packet anyway);
+- responses that already carry a Content-Encoding (the precompressed
+  static/dist files) and send_file passthrough responses are left alone;
+- streamed responses are compressed chunk by chunk and flushed after every
+  chunk, so the browser still gets each part as soon as it is produced;
+- a view decorated with @no_compression is never compressed.
+
+Dynamic pages are compressed at a moderate level (GZIP_LEVEL / BROTLI_QUALITY):
+the top levels cost several times the CPU for a few percent fewer bytes.
+"""
+import zlib
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip is offered
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'text/javascript', 'text/xml',
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml'
+}
+MIN_COMPRESS_BYTES = 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def no_compression(fn):
+    """ Route opt-out; put it under @bp.route (the login / role decorators keep the flag). """
+    fn.compress_response = False
+    return fn
+
+
+def _encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def _compressor(encoding):
+    """ (compress(chunk), flush(), finish()) for one response body. """
+    if encoding == 'br':
+        c = brotli.Compressor(quality=BROTLI_QUALITY)
+        return c.process, c.flush, c.finish
+    c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # 16+: gzip header / trailer
+    return c.compress, lambda: c.flush(zlib.Z_SYNC_FLUSH), c.flush
+
+
+def compress_bytes(data, encoding):
+    compress, _, finish = _compressor(encoding)
+    return compress(data) + finish()
+
+
+def _compress_stream(chunks, encoding):
+    compress, flush, finish = _compressor(encoding)
+    for chunk in chunks:
+        if chunk:
+            yield compress(chunk) + flush()
+    yield finish()
+
+
+def _route_allows_compression():
+    view = current_app.view_functions.get(request.endpoint) if request.endpoint else None
+    return getattr(view, 'compress_response', True)
+
+
+def compress_response(response):
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'Content-Encoding' in response.headers or response.direct_passthrough):
+        return response
+
+    # The body depends on Accept-Encoding from here on, whichever way it goes
+    response.vary.add('Accept-Encoding')
+    if not _route_allows_compression():
+        return response
+
+    encoding = request.accept_encodings.best_match(_encodings())
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        original = response.response
+        response.response = _compress_stream(response.iter_encoded(), encoding)
+        if hasattr(original, 'close'):
+            response.call_on_close(original.close)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < MIN_COMPRESS_BYTES:
+            return response
+        compressed = compress_bytes(data, encoding)
+        if len(compressed) >= len(data):
+            return response
+        response.set_data(compressed)
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)  # same content, different bytes
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
@@ -0,0 +1,165 @@
+"""
+Evaluation scoring engine.
+
+An evaluation's OverallScore is the weighted percentage of its details:
+
+    sum((ScoreGiven / MaxScore) * CriteriaWeight) / sum(CriteriaWeight) * 100
+
+weighted_percentage() applies it to one evaluation (new_evaluation),
+weighted_percentages() to a grid sharing one criteria set (batch evaluation),
+compute_scores() to any number of stored evaluations with a pandas group-by,
+and recompute_scores() re-scores stored evaluations after a criterion's
+weight or max score changes (criteria_edit, recompute_evaluation_scores.py).
+pandas is imported inside the functions using it, so the web app only needs
+numpy to score new evaluations.
+"""
+import numpy as np
+
+# (lower bound, rating) - checked from the top
+RATING_BANDS = [(90, 'ممتاز'), (80, 'جيد جدا'), (70, 'جيد'), (60, 'مقبول')]
+LOWEST_RATING = 'ضعيف'
+
+RECOMPUTE_CHUNK_SIZE = 1000
+
+
+def get_rating_from_score(score):
+    if score is None: return 'N/A'
+    for lower_bound, rating in RATING_BANDS:
+        if score >= lower_bound:
+            return rating
+    return LOWEST_RATING
+
+
+def ratings_for_scores(scores):
+    """ Vectorized get_rating_from_score for a Series/array of scores. """
+    scores = np.asarray(scores, dtype=float)
+    return np.select([scores >= bound for bound, _ in RATING_BANDS],
+                     [rating for _, rating in RATING_BANDS], default=LOWEST_RATING)
+
+
+def weighted_percentages(score_matrix, max_scores, weights):
+    """
+    Overall percentages for many evaluations sharing one criteria set:
+    score_matrix is (evaluations x criteria), max_scores/weights are per criterion.
+    """
+    scores = np.atleast_2d(np.asarray(score_matrix, dtype=float))
+    max_scores = np.asarray(max_scores, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    total_weight = weights.sum()
+    if total_weight <= 0:
+        return np.zeros(scores.shape[0])
+    safe_max = np.where(max_scores > 0, max_scores, 1.0)
+    ratios = np.where(max_scores > 0, scores / safe_max, 0.0)
+    return ratios @ weights / total_weight * 100
+
+
+def weighted_percentage(scores, max_scores, weights):
+    """ Overall percentage for one evaluation from parallel score/max/weight sequences. """
+    return float(weighted_percentages([scores], max_scores, weights)[0])
+
+
+def compute_scores(details):
+    """
+    details: DataFrame with EvaluationID, ScoreGiven, MaxScore, CriteriaWeight
+    (one row per EvaluationDetails row). Returns a DataFrame indexed by
+    EvaluationID with OverallScore and OverallRating.
+    """
+    import pandas as pd
+
+    if details.empty:
+        return pd.DataFrame(columns=['OverallScore', 'OverallRating'], index=pd.Index([], name='EvaluationID'))
+
+    score = details['ScoreGiven'].astype(float)
+    max_score = details['MaxScore'].astype(float)
+    weight = details['CriteriaWeight'].astype(float)
+
+    frame = pd.DataFrame({
+        'EvaluationID': details['EvaluationID'],
+        'Weighted': (score / max_score.where(max_score > 0)).fillna(0) * weight,
+        'Weight': weight
+    })
+    totals = frame.groupby('EvaluationID', sort=True)[['Weighted', 'Weight']].sum()
+
+    result = pd.DataFrame(index=totals.index)
+    result['OverallScore'] = np.where(totals['Weight'] > 0, totals['Weighted'] / totals['Weight'].where(totals['Weight'] > 0) * 100, 0.0)
+    result['OverallRating'] = ratings_for_scores(result['OverallScore'])
+    return result
+
+
+def _affected_evaluation_ids(cursor, criteria_ids):
+    if criteria_ids:
+        placeholders = ','.join(['?'] * len(criteria_ids))
+        cursor.execute(f"""
+            SELECT DISTINCT EvaluationID FROM [Zktime_Copy].[dbo].[EvaluationDetails]
+            WHERE CriteriaID IN ({placeholders}) ORDER BY EvaluationID
+        """, list(criteria_ids))
+    else:
+        cursor.execute("SELECT EvaluationID FROM [Zktime_Copy].[dbo].[Evaluations] ORDER BY EvaluationID")
+    return [row.EvaluationID for row in cursor.fetchall()]
+
+
+def _load_chunk(cursor, evaluation_ids):
+    import pandas as pd
+
+    placeholders = ','.join(['?'] * len(evaluation_ids))
+    cursor.execute(f"""
+        SELECT ED.EvaluationID, ED.ScoreGiven, EC.MaxScore, EC.CriteriaWeight
+        FROM [Zktime_Copy].[dbo].[EvaluationDetails] ED
+        JOIN [Zktime_Copy].[dbo].[EvaluationCriteria] EC ON ED.CriteriaID = EC.CriteriaID
+        WHERE ED.EvaluationID IN ({placeholders});
+
+        SELECT EvaluationID, OverallScore, OverallRating
+        FROM [Zktime_Copy].[dbo].[Evaluations]
+        WHERE EvaluationID IN ({placeholders});
+    """, list(evaluation_ids) * 2)
+    details = pd.DataFrame.from_records([tuple(r) for r in cursor.fetchall()],
+                                        columns=['EvaluationID', 'ScoreGiven', 'MaxScore', 'CriteriaWeight'])
+    current = []
+    if cursor.nextset():
+        current = [tuple(r) for r in cursor.fetchall()]
+    current = pd.DataFrame.from_records(current, columns=['EvaluationID', 'OldScore', 'OldRating']).set_index('EvaluationID')
+    return details, current
+
+
+def recompute_scores(cursor, criteria_ids=None, chunk_size=RECOMPUTE_CHUNK_SIZE, dry_run=False):
+    """
+    Re-scores every evaluation that uses one of criteria_ids (all evaluations
+    when None) in chunks, writing back only the ones whose score or rating
+    changed. The caller commits. Returns a report dict.
+    """
+    import pandas as pd
+
+    evaluation_ids = _affected_evaluation_ids(cursor, criteria_ids)
+    report = {'checked': len(evaluation_ids), 'changed': 0, 'rating_changed': 0, 'changes': []}
+
+    # Parameter count per chunk stays well under SQL Server's 2100 limit
+    chunk_size = max(1, min(chunk_size, 1000))
+
+    for start in range(0, len(evaluation_ids), chunk_size):
+        chunk = evaluation_ids[start:start + chunk_size]
+        details, current = _load_chunk(cursor, chunk)
+        scores = compute_scores(details).join(current, how='inner')
+
+        old_score = scores['OldScore'].astype(float)
+        changed = scores[old_score.isna() | ((scores['OverallScore'] - old_score).abs() > 0.005) | (scores['OverallRating'] != scores['OldRating'])]
+        if changed.empty:
+            continue
+
+        report['changed'] += len(changed)
+        report['rating_changed'] += int((changed['OverallRating'] != changed['OldRating']).sum())
+        for evaluation_id, row in changed.iterrows():
+            report['changes'].append({
+                'id': int(evaluation_id),
+                'old_score': None if pd.isna(row.OldScore) else round(float(row.OldScore), 2),
+                'new_score': round(float(row.OverallScore), 2),
+                'old_rating': row.OldRating,
+                'new_rating': row.OverallRating
+            })
+
+        if not dry_run:
+            params = [(float(row.OverallScore), row.OverallRating, int(evaluation_id)) for evaluation_id, row in changed.iterrows()]
+            cursor.fast_executemany = True
+            cursor.executemany("UPDATE [Zktime_Copy].[dbo].[Evaluations] SET OverallScore = ?, OverallRating = ? WHERE EvaluationID = ?", params)
+            cursor.fast_executemany = False
+
+    return report
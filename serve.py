@@ -0,0 +1,62 @@
+"""
+Production server (waitress): multi-threaded, no debugger, no reloader.
+
+Settings come from the command line or the environment (WAITRESS_*), e.g.
+
+    python serve.py --port 8080 --threads 16
+
+Waitress runs one process with a pool of worker threads; each request opens
+its own pyodbc connection, so threads scale until SQL Server or the GIL-bound
+template rendering becomes the limit. For several processes on Linux use
+gunicorn.conf.py instead.
+"""
+import argparse
+import logging
+import os
+
+from waitress import create_server
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the evaluation system with waitress.")
+    parser.add_argument('--host', default=os.environ.get('WAITRESS_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=env_int('WAITRESS_PORT', 8080))
+    parser.add_argument('--threads', type=int, default=env_int('WAITRESS_THREADS', 8),
+                        help="Worker threads handling requests (default 8)")
+    parser.add_argument('--connection-limit', type=int, default=env_int('WAITRESS_CONNECTION_LIMIT', 200),
+                        help="Open connections accepted before new ones wait (default 200)")
+    parser.add_argument('--channel-timeout', type=int, default=env_int('WAITRESS_CHANNEL_TIMEOUT', 120),
+                        help="Seconds an inactive connection (including keep-alive) is kept open (default 120)")
+    parser.add_argument('--backlog', type=int, default=env_int('WAITRESS_BACKLOG', 1024))
+    parser.add_argument('--url-prefix', default=os.environ.get('WAITRESS_URL_PREFIX', ''),
+                        help="Mount the app under a path, e.g. /hr when behind a reverse proxy")
+    args = parser.parse_args()
+
+    # Imported here so --help works without a database driver
+    from wsgi import application
+
+    logging.basicConfig()  # as waitress.serve() does, so its warnings are shown
+    server = create_server(application,
+                           host=args.host,
+                           port=args.port,
+                           threads=args.threads,
+                           connection_limit=args.connection_limit,
+                           channel_timeout=args.channel_timeout,
+                           backlog=args.backlog,
+                           url_prefix=args.url_prefix,
+                           ident='EvaluationSystem')
+
+    # /metrics reports the requests waiting for a worker thread
+    from app_metrics import set_task_dispatcher
+    set_task_dispatcher(server.task_dispatcher)
+
+    print(f"Serving on http://{args.host}:{args.port} with {args.threads} threads")
+    server.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""
+Per-request SQL instrumentation.
+
+get_db_connection() wraps each pyodbc connection opened during a request in
+InstrumentedConnection. Its cursors record every statement in the request's
+RequestStats (flask.g):
+
+- the statement fingerprint: the SQL with comments dropped, literals and
+  "?, ?, ?" lists collapsed and whitespace normalized;
+- the parameter count;
+- the time spent in execute plus fetch / nextset (SQL Server streams batch
+  results, so later result sets are computed during nextset);
+- rows fetched and result sets read.
+
+init_sql_instrumentation(app) also times template rendering and adds a
+Server-Timing header to every response:
+
+    Server-Timing: db;dur=41.2;desc="17 queries", template;dur=8.5, total;dur=63.0
+
+Browser dev tools show this header in the Network > Timing tab. Requests slower
+than SLOW_REQUEST_MS are logged with their most expensive statements. A
+fingerprint executed N_PLUS_ONE_THRESHOLD times or more in one request (a
+query inside a Python loop) is logged as a possible N+1.
+
+Connections opened outside a request (CLI scripts, background jobs) are
+returned unwrapped.
+"""
+import os
+import re
+import time
+from collections import defaultdict
+from functools import lru_cache
+
+from flask import before_render_template, current_app, g, has_request_context, request, template_rendered
+
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 1000))
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 10))
+
+# Statements listed in the slow request log
+SLOW_LOG_STATEMENTS = 5
+
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING_LITERAL = re.compile(r"N?'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """ Normalized statement text: same query shape, same fingerprint. """
+    sql = _COMMENT.sub(' ', sql)
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('?, ...', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def _param_count(params):
+    # pyodbc takes either execute(sql, (a, b)) or execute(sql, a, b)
+    if len(params) == 1 and isinstance(params[0], (list, tuple)):
+        return len(params[0])
+    return len(params)
+
+
+class Statement:
+    __slots__ = ('fingerprint', 'params', 'seconds', 'rows', 'result_sets')
+
+    def __init__(self, sql, params):
+        self.fingerprint = fingerprint(sql)
+        self.params = params
+        self.seconds = 0.0
+        self.rows = 0
+        self.result_sets = 1
+
+
+class RequestStats:
+    """ SQL and template timings of one request. """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = []
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.connections_opened = 0
+        self.connections_closed = 0
+        self._template_started = []
+
+    def add_db_time(self, statement, seconds):
+        self.db_seconds += seconds
+        if statement is not None:
+            statement.seconds += seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def by_fingerprint(self):
+        """ {fingerprint: (executions, seconds, rows)}, most expensive first. """
+        totals = defaultdict(lambda: [0, 0.0, 0])
+        for s in self.statements:
+            t = totals[s.fingerprint]
+            t[0] += 1
+            t[1] += s.seconds
+            t[2] += s.rows
+        return dict(sorted(((k, tuple(v)) for k, v in totals.items()), key=lambda item: item[1][1], reverse=True))
+
+    def repeated_statements(self, threshold=N_PLUS_ONE_THRESHOLD):
+        return {fp: totals for fp, totals in self.by_fingerprint().items() if totals[0] >= threshold}
+
+
+def current_request_stats():
+    """ RequestStats of the current request, or None outside a request. """
+    return g.get('sql_stats') if has_request_context() else None
+
+
+class InstrumentedCursor:
+    """ Proxy for a pyodbc cursor; anything not overridden goes to the real cursor. """
+
+    def __init__(self, cursor, stats):
+        object.__setattr__(self, '_cursor', cursor)
+        object.__setattr__(self, '_stats', stats)
+        object.__setattr__(self, '_statement', None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)  # e.g. fast_executemany
+
+    def _timed(self, statement, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self._stats.add_db_time(statement, time.perf_counter() - started)
+
+    def _start(self, sql, param_count):
+        statement = Statement(sql, param_count)
+        self._stats.statements.append(statement)
+        object.__setattr__(self, '_statement', statement)
+        return statement
+
+    def execute(self, sql, *params):
+        statement = self._start(sql, _param_count(params))
+        self._timed(statement, self._cursor.execute, sql, *params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        statement = self._start(sql, sum(len(p) for p in seq_of_params))
+        self._timed(statement, self._cursor.executemany, sql, seq_of_params)
+        return self
+
+    def _count(self, rows):
+        if self._statement is not None:
+            self._statement.rows += rows
+
+    def fetchone(self):
+        row = self._timed(self._statement, self._cursor.fetchone)
+        self._count(0 if row is None else 1)
+        return row
+
+    def fetchval(self):
+        value = self._timed(self._statement, self._cursor.fetchval)
+        self._count(0 if value is None else 1)
+        return value
+
+    def fetchall(self):
+        rows = self._timed(self._statement, self._cursor.fetchall)
+        self._count(len(rows))
+        return rows
+
+    def fetchmany(self, size=None):
+        rows = self._timed(self._statement, self._cursor.fetchmany, *([] if size is None else [size]))
+        self._count(len(rows))
+        return rows
+
+    def nextset(self):
+        more = self._timed(self._statement, self._cursor.nextset)
+        if more and self._statement is not None:
+            self._statement.result_sets += 1
+        return more
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self):
+        self._cursor.close()
+
+
+class InstrumentedConnection:
+    """ Proxy for a pyodbc connection whose cursors record into the request's stats. """
+
+    def __init__(self, conn, stats):
+        object.__setattr__(self, '_conn', conn)
+        object.__setattr__(self, '_stats', stats)
+        object.__setattr__(self, '_closed', False)
+        stats.connections_opened += 1
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    def cursor(self):
+        return InstrumentedCursor(self._conn.cursor(), self._stats)
+
+    def execute(self, sql, *params):
+        return self.cursor().execute(sql, *params)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            self._conn.commit()
+        finally:
+            self._stats.add_db_time(None, time.perf_counter() - started)
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+        if not self._closed:
+            object.__setattr__(self, '_closed', True)
+            self._stats.connections_closed += 1
+
+
+def instrument_connection(conn):
+    stats = current_request_stats()
+    return InstrumentedConnection(conn, stats) if stats is not None else conn
+
+
+# --- Request hooks ---
+
+def _start_request():
+    g.sql_stats = RequestStats()
+
+
+def _template_starting(sender, template, context, **extra):
+    stats = current_request_stats()
+    if stats is not None:
+        stats._template_started.append(time.perf_counter())
+
+
+def _template_done(sender, template, context, **extra):
+    stats = current_request_stats()
+    if stats is not None and stats._template_started:
+        stats.template_seconds += time.perf_counter() - stats._template_started.pop()
+
+
+def server_timing(stats):
+    return (f'db;dur={stats.db_seconds * 1000:.1f};desc="{len(stats.statements)} queries", '
+            f'template;dur={stats.template_seconds * 1000:.1f}, '
+            f'total;dur={stats.elapsed() * 1000:.1f}')
+
+
+def _log_request(stats, response):
+    elapsed_ms = stats.elapsed() * 1000
+    route = f"{request.method} {request.full_path.rstrip('?')}"
+
+    for fp, (count, seconds, rows) in stats.repeated_statements().items():
+        current_app.logger.warning("Possible N+1 in %s (%s): %d executions, %.1f ms, %d rows: %s",
+                                   request.endpoint, route, count, seconds * 1000, rows, fp[:300])
+
+    if elapsed_ms >= SLOW_REQUEST_MS:
+        lines = [f"  {count} x {seconds * 1000:.1f} ms, {rows} rows: {fp[:200]}"
+                 for fp, (count, seconds, rows) in list(stats.by_fingerprint().items())[:SLOW_LOG_STATEMENTS]]
+        current_app.logger.warning("Slow request %s -> %s: %.0f ms total, %.0f ms in %d queries, %.0f ms templates\n%s",
+                                   route, response.status_code, elapsed_ms, stats.db_seconds * 1000,
+                                   len(stats.statements), stats.template_seconds * 1000, "\n".join(lines))
+
+
+def _finish_request(response):
+    stats = current_request_stats()
+    if stats is None:
+        return response
+    response.headers['Server-Timing'] = server_timing(stats)
+    _log_request(stats, response)
+    return response
+
+
+def init_sql_instrumentation(app):
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    before_render_template.connect(_template_starting, app)
+    template_rendered.connect(_template_done, app)
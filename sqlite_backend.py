@@ -0,0 +1,907 @@
+"""
+SQLite stand-in for the SQL Server database, for offline development and
+benchmarks on a machine without SQL Server.
+
+With DB_BACKEND=sqlite (config.py) get_db_connection() returns
+connect(SQLITE_PATH): a connection with the parts of the pyodbc interface the
+app uses (cursor, execute, fetchone / fetchall / fetchmany / fetchval,
+nextset, rowcount, description, rows with attribute access). Each statement is
+translated from T-SQL on the way in; create the database file with
+create_sqlite_db.py.
+
+Translated:
+
+- [Zktime_Copy].[dbo].[Table], dbo.Table -> Table; [Column] -> "Column"; N'...' -> '...'
+- TOP n -> LIMIT n; OFFSET a ROWS FETCH NEXT b ROWS ONLY -> LIMIT b OFFSET a
+- INSERT / UPDATE ... OUTPUT INSERTED.col -> RETURNING col
+- GETDATE(), DATEADD, DATEDIFF, CAST / CONVERT, FORMAT, ISNULL, LEN, LEFT,
+  RIGHT, YEAR / MONTH / DAY, CONCAT, CHARINDEX, SUBSTRING, OBJECT_ID
+- STUFF((SELECT '#' + x ... FOR XML PATH('')), 1, n, '') -> group_concat(x, '#')
+- '...' + x string concatenation (a + next to a string literal) -> ||
+- UPDATE alias SET ... FROM Table alias JOIN ... and DELETE alias FROM ...
+- WITH -> WITH RECURSIVE (recursive CTEs need the keyword in SQLite)
+- batches: DECLARE / SET @var / SELECT @var = ..., IF <condition> <statement>,
+  @@ROWCOUNT, @@IDENTITY, SCOPE_IDENTITY(), #temp tables, TRUNCATE TABLE.
+  Every statement that returns rows is one result set for nextset().
+
+MERGE, table variables and HASHBYTES raise NotSupportedError: the candidate import
+and the USERINFO sync still need SQL Server.
+
+Dates are stored as ISO text ('YYYY-MM-DD HH:MM:SS') and come back as
+datetime / date objects, as pyodbc returns them. cursor.description carries
+pyodbc's Python type codes, taken from each column's first non-NULL value
+(int / float / str / bytes / datetime / date; str for all-NULL columns).
+DECIMAL columns are stored as REAL, so they report float instead of Decimal. Text columns are declared
+COLLATE NOCASE to match SQL Server's case-insensitive collation.
+"""
+import os
+import re
+import sqlite3
+from datetime import date, datetime, time
+from decimal import Decimal
+from functools import lru_cache
+
+NotSupportedError = sqlite3.NotSupportedError
+
+_TOKEN = re.compile(r"""
+      (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<string>N?'(?:[^']|'')*')
+    | (?P<bracket>\[[^\]]*\])
+    | (?P<quoted>"[^"]*")
+    | (?P<var>@@?\w+)
+    | (?P<temp>\#\#?\w+)
+    | (?P<word>[A-Za-z_][\w$]*)
+    | (?P<number>\d+(?:\.\d+)?)
+    | (?P<param>\?)
+    | (?P<space>\s+)
+    | (?P<op><>|!=|<=|>=|\|\||.)
+""", re.S | re.X)
+
+# Qualifiers dropped from [Zktime_Copy].[dbo].[Table], tempdb..#Temp
+_SCHEMA_NAMES = {'zktime_copy', 'dbo', 'tempdb'}
+
+_TABLE_HINTS = {'NOLOCK', 'READPAST', 'UPDLOCK', 'ROWLOCK', 'HOLDLOCK', 'TABLOCK', 'NOWAIT'}
+
+# SET options with no SQLite equivalent
+_IGNORED_SET_OPTIONS = {'NOCOUNT', 'XACT_ABORT', 'IDENTITY_INSERT', 'ANSI_NULLS', 'QUOTED_IDENTIFIER', 'ARITHABORT'}
+
+_STATEMENT_KEYWORDS = {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'SET', 'DROP', 'CREATE', 'TRUNCATE', 'WITH', 'DECLARE'}
+
+_NOW = "datetime('now', 'localtime')"
+
+# DATEADD / DATEDIFF units -> (SQLite modifier, multiplier)
+_DATE_UNITS = {
+    'year': ('years', 1), 'yy': ('years', 1), 'yyyy': ('years', 1),
+    'quarter': ('months', 3), 'qq': ('months', 3), 'q': ('months', 3),
+    'month': ('months', 1), 'mm': ('months', 1), 'm': ('months', 1),
+    'week': ('days', 7), 'wk': ('days', 7), 'ww': ('days', 7),
+    'day': ('days', 1), 'dd': ('days', 1), 'd': ('days', 1), 'dayofyear': ('days', 1), 'dy': ('days', 1), 'y': ('days', 1),
+    'hour': ('hours', 1), 'hh': ('hours', 1),
+    'minute': ('minutes', 1), 'mi': ('minutes', 1), 'n': ('minutes', 1),
+    'second': ('seconds', 1), 'ss': ('seconds', 1), 's': ('seconds', 1),
+}
+_SECONDS_PER_UNIT = {'hours': 3600, 'minutes': 60, 'seconds': 1}
+
+# CONVERT(varchar, date, style) styles
+_CONVERT_STYLES = {
+    120: '%Y-%m-%d %H:%M:%S', 20: '%Y-%m-%d %H:%M:%S', 121: '%Y-%m-%d %H:%M:%f', 21: '%Y-%m-%d %H:%M:%f',
+    23: '%Y-%m-%d', 126: '%Y-%m-%dT%H:%M:%f', 112: '%Y%m%d', 108: '%H:%M:%S',
+    101: '%m/%d/%Y', 103: '%d/%m/%Y', 111: '%Y/%m/%d',
+}
+
+# FORMAT(date, '...') .NET patterns, longest first
+_FORMAT_PATTERNS = [('yyyy', '%Y'), ('MM', '%m'), ('dd', '%d'), ('HH', '%H'), ('mm', '%M'), ('ss', '%S'), ('yy', '%y')]
+
+_DATETIME_TEXT = re.compile(r"\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}:\d{2}(?:\.\d{1,6})?)?")
+
+
+# --- Tokens ---
+
+def _tokenize(sql):
+    """ Tokens as (kind, text) with comments and schema qualifiers dropped and ? numbered :p1, :p2 ... """
+    tokens = []
+    params = 0
+    for m in _TOKEN.finditer(sql):
+        kind, text = m.lastgroup, m.group()
+        if kind == 'comment':
+            kind, text = 'space', ' '
+        elif kind == 'string' and text[0] in 'Nn':
+            text = text[1:]
+        elif kind == 'bracket':
+            kind, text = 'word', text[1:-1]
+            if text.lower() not in _SCHEMA_NAMES:
+                kind, text = 'quoted', f'"{text}"'
+        elif kind == 'param':
+            params += 1
+            text = f':p{params}'
+        tokens.append((kind, text))
+
+    # Zktime_Copy.dbo.Table / tempdb..#Temp -> Table / #Temp
+    out = []
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        if kind == 'word' and text.lower() in _SCHEMA_NAMES and i + 1 < len(tokens) and tokens[i + 1][1] == '.':
+            i += 1
+            while i < len(tokens) and tokens[i][1] == '.':
+                i += 1
+            continue
+        out.append(tokens[i])
+        i += 1
+    return out
+
+
+def _is_word(token, *words):
+    return token[0] == 'word' and token[1].upper() in words
+
+
+def _next(tokens, i):
+    """ Index of the next non-space token at or after i (len(tokens) if none). """
+    while i < len(tokens) and tokens[i][0] == 'space':
+        i += 1
+    return i
+
+
+def _prev(tokens, i):
+    while i >= 0 and tokens[i][0] == 'space':
+        i -= 1
+    return i
+
+
+def _close(tokens, i):
+    """ Index of the ) matching the ( at i. """
+    depth = 0
+    for j in range(i, len(tokens)):
+        if tokens[j][1] == '(':
+            depth += 1
+        elif tokens[j][1] == ')':
+            depth -= 1
+            if depth == 0:
+                return j
+    raise sqlite3.OperationalError("Unbalanced parentheses in statement")
+
+
+def _top_level(tokens):
+    """ Yields (index, token) of the tokens outside parentheses. """
+    depth = 0
+    for i, token in enumerate(tokens):
+        if token[1] == '(':
+            depth += 1
+        elif token[1] == ')':
+            depth -= 1
+        elif depth == 0:
+            yield i, token
+
+
+def _find_word(tokens, words, start=0):
+    for i, token in _top_level(tokens):
+        if i >= start and _is_word(token, *words):
+            return i
+    return None
+
+
+def _split(tokens, separator):
+    """ Splits on a top-level separator token (',' or ';'). """
+    parts, start = [], 0
+    for i, token in _top_level(tokens):
+        if token[1] == separator:
+            parts.append(tokens[start:i])
+            start = i + 1
+    parts.append(tokens[start:])
+    return parts
+
+
+def _text(tokens):
+    return ''.join(text for _, text in tokens).strip()
+
+
+def _words(tokens):
+    return [text.upper() for kind, text in tokens if kind == 'word']
+
+
+# --- Expressions ---
+
+def _sqlite_type(type_tokens):
+    name = _words(type_tokens)[0] if _words(type_tokens) else ''
+    if name in ('DATE',):
+        return 'date'
+    if name in ('DATETIME', 'DATETIME2', 'SMALLDATETIME', 'DATETIMEOFFSET'):
+        return 'datetime'
+    if name in ('CHAR', 'VARCHAR', 'NCHAR', 'NVARCHAR', 'TEXT', 'NTEXT', 'UNIQUEIDENTIFIER'):
+        return 'TEXT'
+    if name in ('INT', 'INTEGER', 'BIGINT', 'SMALLINT', 'TINYINT', 'BIT'):
+        return 'INTEGER'
+    if name in ('FLOAT', 'REAL', 'DECIMAL', 'NUMERIC', 'MONEY', 'SMALLMONEY'):
+        return 'REAL'
+    if name in ('VARBINARY', 'BINARY', 'IMAGE'):
+        return 'BLOB'
+    raise NotSupportedError(f"Type not supported by the SQLite backend: {_text(type_tokens)}")
+
+
+def _cast(value, type_tokens):
+    target = _sqlite_type(type_tokens)
+    if target in ('date', 'datetime'):
+        return f"{target}({value})"
+    return f"CAST({value} AS {target})"
+
+
+def _type_length(type_tokens):
+    numbers = [text for kind, text in type_tokens if kind == 'number']
+    return int(numbers[0]) if numbers else None
+
+
+def _literal(tokens):
+    text = _text(tokens)
+    if not (text.startswith("'") and text.endswith("'")):
+        raise NotSupportedError(f"Expected a string literal, got: {text}")
+    return text[1:-1].replace("''", "'")
+
+
+def _date_unit(tokens):
+    unit = _text(tokens).lower()
+    if unit not in _DATE_UNITS:
+        raise NotSupportedError(f"Date part not supported by the SQLite backend: {unit}")
+    return _DATE_UNITS[unit]
+
+
+def _fn_cast(args):
+    # CAST(x AS type) arrives as one argument
+    tokens = args[0]
+    as_index = None
+    for i, token in _top_level(tokens):
+        if _is_word(token, 'AS'):
+            as_index = i
+    return _cast(_expr(tokens[:as_index]), tokens[as_index + 1:])
+
+
+def _fn_convert(args):
+    type_tokens, value = args[0], _expr(args[1])
+    target = _sqlite_type(type_tokens)
+    if len(args) > 2 and target == 'TEXT':
+        style = int(_text(args[2]))
+        if style in _CONVERT_STYLES:
+            formatted = f"strftime('{_CONVERT_STYLES[style]}', {value})"
+            length = _type_length(type_tokens)
+            return f"substr({formatted}, 1, {length})" if length else formatted
+    return _cast(value, type_tokens)
+
+
+def _fn_dateadd(args):
+    modifier, multiplier = _date_unit(args[0])
+    amount = _expr(args[1])
+    if multiplier != 1:
+        amount = f"({amount}) * {multiplier}"
+    return f"datetime({_expr(args[2])}, ({amount}) || ' {modifier}')"
+
+
+def _fn_datediff(args):
+    modifier, multiplier = _date_unit(args[0])
+    start, end = _expr(args[1]), _expr(args[2])
+    if modifier == 'years':
+        return f"(CAST(strftime('%Y', {end}) AS INTEGER) - CAST(strftime('%Y', {start}) AS INTEGER))"
+    if modifier == 'months':
+        months = (f"((CAST(strftime('%Y', {end}) AS INTEGER) - CAST(strftime('%Y', {start}) AS INTEGER)) * 12"
+                  f" + CAST(strftime('%m', {end}) AS INTEGER) - CAST(strftime('%m', {start}) AS INTEGER))")
+        return months if multiplier == 1 else f"({months} / {multiplier})"
+    if modifier == 'days':
+        days = f"CAST(julianday(date({end})) - julianday(date({start})) AS INTEGER)"
+        return days if multiplier == 1 else f"({days} / {multiplier})"
+    # hour / minute / second: boundaries crossed, as SQL Server counts them
+    seconds = _SECONDS_PER_UNIT[modifier]
+    return (f"(CAST(strftime('%s', {end}) AS INTEGER) / {seconds}"
+            f" - CAST(strftime('%s', {start}) AS INTEGER) / {seconds})")
+
+
+def _fn_format(args):
+    pattern = _literal(args[1])
+    for dotnet, strftime in _FORMAT_PATTERNS:
+        pattern = pattern.replace(dotnet, strftime)
+    return f"strftime('{pattern}', {_expr(args[0])})"
+
+
+def _fn_object_id(args):
+    name = _literal(args[0]).split('.')[-1].strip('[]')
+    if name.startswith('#'):
+        return f"(SELECT 1 FROM sqlite_temp_master WHERE name = 'temp_{name.lstrip('#')}')"
+    return f"(SELECT 1 FROM sqlite_master WHERE name = '{name}')"
+
+
+def _fn_stuff(args):
+    """ STUFF((SELECT sep + x FROM ... FOR XML PATH('')), 1, n, '') is the pre-2017 string aggregate. """
+    first = args[0]
+    i = _next(first, 0)
+    if i < len(first) and first[i][1] == '(':
+        inner = first[i + 1:_close(first, i)]
+        for_index = _find_word(inner, ['FOR'])
+        select_index = _next(inner, 0)
+        if for_index is not None and _is_word(inner[select_index], 'SELECT'):
+            separator = _next(inner, select_index + 1)
+            plus = _next(inner, separator + 1)
+            from_index = _find_word(inner, ['FROM'])
+            if inner[separator][0] == 'string' and inner[plus][1] == '+' and from_index is not None:
+                value = _expr(inner[plus + 1:from_index])
+                rest = _expr(inner[from_index:for_index])
+                return f"(SELECT group_concat({value}, {inner[separator][1]}) {rest})"
+    value, start, length, insert = (_expr(a) for a in args)
+    return f"(substr({value}, 1, ({start}) - 1) || {insert} || substr({value}, ({start}) + ({length})))"
+
+
+def _fn_concat(args):
+    return '(' + ' || '.join(f"COALESCE(CAST({_expr(a)} AS TEXT), '')" for a in args) + ')'
+
+
+def _fn_unsupported(name):
+    def handler(args):
+        raise NotSupportedError(f"{name} is not supported by the SQLite backend")
+    return handler
+
+
+_FUNCTIONS = {
+    'CAST': _fn_cast,
+    'TRY_CAST': _fn_cast,
+    'CONVERT': _fn_convert,
+    'DATEADD': _fn_dateadd,
+    'DATEDIFF': _fn_datediff,
+    'FORMAT': _fn_format,
+    'OBJECT_ID': _fn_object_id,
+    'STUFF': _fn_stuff,
+    'CONCAT': _fn_concat,
+    'GETDATE': lambda args: _NOW,
+    'SYSDATETIME': lambda args: _NOW,
+    'GETUTCDATE': lambda args: "datetime('now')",
+    'SYSUTCDATETIME': lambda args: "datetime('now')",
+    'SCOPE_IDENTITY': lambda args: "last_insert_rowid()",
+    'NEWID': lambda args: "lower(hex(randomblob(16)))",
+    'ISNULL': lambda args: f"COALESCE({_expr(args[0])}, {_expr(args[1])})",
+    'LEN': lambda args: f"length(rtrim({_expr(args[0])}))",
+    'LEFT': lambda args: f"substr({_expr(args[0])}, 1, {_expr(args[1])})",
+    'RIGHT': lambda args: f"substr({_expr(args[0])}, -({_expr(args[1])}))",
+    'SUBSTRING': lambda args: f"substr({_expr(args[0])}, {_expr(args[1])}, {_expr(args[2])})",
+    'CHARINDEX': lambda args: f"instr({_expr(args[1])}, {_expr(args[0])})",
+    'YEAR': lambda args: f"CAST(strftime('%Y', {_expr(args[0])}) AS INTEGER)",
+    'MONTH': lambda args: f"CAST(strftime('%m', {_expr(args[0])}) AS INTEGER)",
+    'DAY': lambda args: f"CAST(strftime('%d', {_expr(args[0])}) AS INTEGER)",
+    'HASHBYTES': _fn_unsupported('HASHBYTES'),
+}
+
+
+def _expr(tokens):
+    """
+    Translates one scope: a statement, or the inside of a pair of parentheses.
+    TOP and OUTPUT move to the end of their scope as LIMIT / RETURNING.
+    """
+    out = []
+    limit = None
+    returning = None
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        upper = text.upper() if kind == 'word' else None
+
+        if text == '(':
+            end = _close(tokens, i)
+            out.append('(' + _expr(tokens[i + 1:end]) + ')')
+            i = end + 1
+            continue
+
+        if kind == 'word':
+            after = _next(tokens, i + 1)
+            is_call = after < len(tokens) and tokens[after][1] == '('
+
+            if is_call and upper in _FUNCTIONS:
+                end = _close(tokens, after)
+                out.append(_FUNCTIONS[upper](_split(tokens[after + 1:end], ',')))
+                i = end + 1
+                continue
+
+            if upper == 'TOP':
+                if after < len(tokens) and tokens[after][1] == '(':
+                    end = _close(tokens, after)
+                    limit = _expr(tokens[after + 1:end])
+                else:
+                    end = after
+                    limit = tokens[after][1]
+                i = end + 1
+                if _is_word(tokens[_next(tokens, i)], 'PERCENT'):
+                    raise NotSupportedError("TOP ... PERCENT is not supported by the SQLite backend")
+                continue
+
+            if upper == 'OFFSET':
+                rows = _find_word(tokens, ['ROWS', 'ROW'], i)
+                fetch = _find_word(tokens, ['FETCH'], rows)
+                offset = _expr(tokens[i + 1:rows])
+                if fetch is None:
+                    out.append(f"LIMIT -1 OFFSET {offset}")
+                    i = rows + 1
+                    continue
+                fetch_rows = _find_word(tokens, ['ROWS', 'ROW'], fetch)
+                count = _expr(tokens[_next(tokens, fetch + 1) + 1:fetch_rows])  # skip NEXT / FIRST
+                out.append(f"LIMIT {count} OFFSET {offset}")
+                i = _next(tokens, fetch_rows + 1) + 1  # skip ONLY
+                continue
+
+            if upper == 'OUTPUT':
+                end = _find_word(tokens, ['VALUES', 'SELECT', 'FROM', 'WHERE', 'DEFAULT'], i + 1)
+                end = len(tokens) if end is None else end
+                columns = tokens[i + 1:end]
+                if _find_word(columns, ['INTO']) is not None:
+                    raise NotSupportedError("OUTPUT ... INTO is not supported by the SQLite backend")
+                columns = [t for j, t in enumerate(columns)
+                           if not _is_word(t, 'INSERTED', 'DELETED')
+                           and not (t[1] == '.' and j > 0 and _is_word(columns[_prev(columns, j - 1)], 'INSERTED', 'DELETED'))]
+                returning = _expr(columns)
+                i = end
+                continue
+
+            if upper == 'WITH' and is_call:
+                end = _close(tokens, after)
+                if set(_words(tokens[after + 1:end])) <= _TABLE_HINTS:
+                    i = end + 1
+                    continue
+
+            if upper == 'CURRENT_TIMESTAMP':
+                out.append(_NOW)
+                i += 1
+                continue
+
+            if upper == 'IDENTITY' and is_call:  # CREATE TABLE #t (ID INT IDENTITY(1,1))
+                i = _close(tokens, after) + 1
+                continue
+
+        if kind == 'var':
+            name = text.upper()
+            if name == '@@ROWCOUNT':
+                out.append(':v__rowcount')
+            elif name == '@@IDENTITY':
+                out.append('last_insert_rowid()')
+            elif text.startswith('@@'):
+                raise NotSupportedError(f"{text} is not supported by the SQLite backend")
+            else:
+                out.append(f':v_{text[1:]}')
+            i += 1
+            continue
+
+        if kind == 'temp':
+            out.append('temp_' + text.lstrip('#'))
+            i += 1
+            continue
+
+        if text == '+':
+            before, after = _prev(tokens, i - 1), _next(tokens, i + 1)
+            if (before >= 0 and tokens[before][0] == 'string') or (after < len(tokens) and tokens[after][0] == 'string'):
+                out.append('||')
+                i += 1
+                continue
+
+        out.append(text)
+        i += 1
+
+    sql = ''.join(out).strip()
+    if limit is not None:
+        sql += f" LIMIT {limit}"
+    if returning is not None:
+        sql += f" RETURNING {returning}"
+    return sql
+
+
+# --- Statements ---
+
+def _table_refs(tokens):
+    """ FROM a A [INNER] JOIN b B ON ... -> ([(table tokens, alias)], [ON condition tokens]). """
+    refs, conditions = [], []
+    parts, start = [], 0
+    for i, token in _top_level(tokens):
+        if _is_word(token, 'JOIN'):
+            kind = _words(tokens[start:i])
+            if 'LEFT' in kind or 'RIGHT' in kind or 'FULL' in kind or 'OUTER' in kind:
+                raise NotSupportedError("UPDATE / DELETE ... FROM with an outer join is not supported by the SQLite backend")
+            parts.append(tokens[start:i])
+            start = i + 1
+    parts.append(tokens[start:])
+
+    for n, part in enumerate(parts):
+        on = _find_word(part, ['ON'])
+        ref = part if on is None else part[:on]
+        if on is not None:
+            conditions.append(part[on + 1:])
+        words = [t for t in ref if t[0] != 'space' and not _is_word(t, 'INNER', 'AS')]
+        alias = words[-1][1] if len(words) > 1 and words[-1][0] in ('word', 'quoted') and words[-2][1] != '.' else None
+        table = words[:-1] if alias else words
+        refs.append((table, alias))
+    return refs, conditions
+
+
+def _join_conditions(conditions):
+    return ' AND '.join(f"({_text(c)})" for c in conditions if _text(c))
+
+
+def _rewrite_update_from(tokens):
+    """ UPDATE A SET ... FROM Table A JOIN B ON ... WHERE w -> UPDATE Table AS A SET ... FROM B WHERE ... """
+    target = _next(tokens, _next(tokens, 0) + 1)
+    set_index = _find_word(tokens, ['SET'])
+    from_index = _find_word(tokens, ['FROM'], set_index or 0)
+    if set_index is None or from_index is None:
+        return tokens
+    where_index = _find_word(tokens, ['WHERE'], from_index)
+    end = len(tokens) if where_index is None else where_index
+    name = tokens[target][1]
+
+    refs, conditions = _table_refs(tokens[from_index + 1:end])
+    target_ref = next(((t, a) for t, a in refs if a == name or (a is None and _text(t) == name)), None)
+    if target_ref is None:
+        raise NotSupportedError(f"UPDATE target {name} not found in its FROM clause")
+    others = [(t, a) for t, a in refs if (t, a) != target_ref]
+
+    sql = f"UPDATE {_text(target_ref[0])} AS {target_ref[1] or name} {_text(tokens[set_index:from_index])}"
+    if others:
+        sql += " FROM " + ", ".join(f"{_text(t)} AS {a}" if a else _text(t) for t, a in others)
+    where = [c for c in [_join_conditions(conditions), _text(tokens[where_index + 1:]) if where_index is not None else ''] if c]
+    if where:
+        sql += " WHERE " + " AND ".join(f"({w})" for w in where)
+    return _tokenize(sql)
+
+
+def _rewrite_delete_from(tokens):
+    """ DELETE A FROM Table A JOIN B ON ... WHERE w -> DELETE FROM Table AS A WHERE EXISTS (SELECT 1 FROM B WHERE ...) """
+    target = _next(tokens, _next(tokens, 0) + 1)
+    if _is_word(tokens[target], 'FROM'):
+        return tokens
+    from_index = _find_word(tokens, ['FROM'])
+    where_index = _find_word(tokens, ['WHERE'], from_index)
+    end = len(tokens) if where_index is None else where_index
+    name = tokens[target][1]
+
+    refs, conditions = _table_refs(tokens[from_index + 1:end])
+    target_ref = next(((t, a) for t, a in refs if a == name or (a is None and _text(t) == name)), None)
+    if target_ref is None:
+        raise NotSupportedError(f"DELETE target {name} not found in its FROM clause")
+    others = [(t, a) for t, a in refs if (t, a) != target_ref]
+
+    sql = f"DELETE FROM {_text(target_ref[0])} AS {target_ref[1] or name}"
+    where = []
+    if others:
+        tables = ", ".join(f"{_text(t)} AS {a}" if a else _text(t) for t, a in others)
+        condition = _join_conditions(conditions)
+        where.append(f"EXISTS (SELECT 1 FROM {tables}" + (f" WHERE {condition})" if condition else ")"))
+    if where_index is not None:
+        where.append(_text(tokens[where_index + 1:]))
+    if where:
+        sql += " WHERE " + " AND ".join(f"({w})" for w in where)
+    return _tokenize(sql)
+
+
+def _declare(tokens):
+    """ DECLARE @A INT = x, @B DATE -> [(name, SELECT for the value or None)] """
+    variables = []
+    for part in _split(tokens[_next(tokens, 0) + 1:], ','):
+        i = _next(part, 0)
+        if part[i][0] != 'var':
+            raise NotSupportedError(f"Unexpected DECLARE: {_text(part)}")
+        name = part[i][1][1:]
+        eq = next((j for j, t in _top_level(part) if t[1] == '='), None)
+        type_tokens = part[i + 1:eq if eq is not None else len(part)]
+        if _is_word(type_tokens[_next(type_tokens, 0)], 'TABLE'):
+            raise NotSupportedError("Table variables are not supported by the SQLite backend")
+        value = None
+        if eq is not None:
+            target = _sqlite_type(type_tokens)
+            value = "SELECT " + (_expr(part[eq + 1:]) if target == 'BLOB' else _cast(_expr(part[eq + 1:]), type_tokens))
+        variables.append((name, value))
+    return ('declare', tuple(variables))
+
+
+def _select_assign(tokens):
+    """ SELECT @A = x, @B = y FROM ... -> ('assign', SELECT x, y FROM ..., (A, B)) """
+    select = _next(tokens, 0)
+    from_index = _find_word(tokens, ['FROM'])
+    end = len(tokens) if from_index is None else from_index
+    names, columns = [], []
+    for part in _split(tokens[select + 1:end], ','):
+        i = _next(part, 0)
+        eq = _next(part, i + 1)
+        names.append(part[i][1][1:])
+        columns.append(_expr(part[eq + 1:]))
+    rest = _expr(tokens[end:]) if from_index is not None else ''
+    return ('assign', f"SELECT {', '.join(columns)} {rest}".strip(), tuple(names))
+
+
+def _statement(tokens):
+    """ One T-SQL statement -> a step: ('exec', sql), ('declare', ...), ('assign', ...) or ('if', condition, step). """
+    first = _next(tokens, 0)
+    if first == len(tokens):
+        return None
+    keyword = tokens[first][1].upper() if tokens[first][0] == 'word' else ''
+    second = _next(tokens, first + 1)
+    second_token = tokens[second] if second < len(tokens) else ('space', '')
+
+    if keyword == 'SET':
+        if second_token[0] == 'var':
+            eq = _next(tokens, second + 1)
+            return ('declare', ((second_token[1][1:], "SELECT " + _expr(tokens[eq + 1:])),))
+        if second_token[1].upper() in _IGNORED_SET_OPTIONS:
+            return None
+    if keyword == 'DECLARE':
+        return _declare(tokens[first:])
+    if keyword == 'SELECT' and second_token[0] == 'var' and tokens[_next(tokens, second + 1)][1] == '=':
+        return _select_assign(tokens[first:])
+    if keyword == 'IF':
+        body = next((i for i, t in _top_level(tokens) if i > first and _is_word(t, *_STATEMENT_KEYWORDS)), None)
+        if body is None:
+            raise NotSupportedError(f"IF without a statement: {_text(tokens)}")
+        return ('if', f"SELECT CASE WHEN {_expr(tokens[first + 1:body])} THEN 1 ELSE 0 END", _statement(tokens[body:]))
+    if keyword == 'MERGE':
+        raise NotSupportedError("MERGE is not supported by the SQLite backend")
+    if keyword == 'TRUNCATE':
+        tokens = _tokenize("DELETE FROM ") + tokens[_next(tokens, second + 1):]
+    elif keyword == 'UPDATE':
+        tokens = _rewrite_update_from(tokens[first:])
+    elif keyword == 'DELETE':
+        tokens = _rewrite_delete_from(tokens[first:])
+    elif keyword == 'CREATE' and _is_word(second_token, 'TABLE') and tokens[_next(tokens, second + 1)][0] == 'temp':
+        tokens = tokens[:second] + [('word', 'TEMP'), ('space', ' ')] + tokens[second:]
+    elif keyword == 'WITH' and not _is_word(second_token, 'RECURSIVE'):
+        tokens = tokens[:second] + [('word', 'RECURSIVE'), ('space', ' ')] + tokens[second:]
+    return ('exec', _expr(tokens))
+
+
+@lru_cache(maxsize=1024)
+def translate(sql):
+    """ T-SQL batch -> tuple of steps run by Cursor.execute. """
+    steps = []
+    for statement in _split(_tokenize(sql), ';'):
+        step = _statement(statement)
+        if step is not None:
+            steps.append(step)
+    return tuple(steps)
+
+
+# --- pyodbc-style connection ---
+
+def _param(value):
+    if isinstance(value, datetime):
+        return value.isoformat(' ')
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, bytearray):
+        return bytes(value)
+    return value
+
+
+def _bind(params):
+    # pyodbc takes execute(sql, (a, b)) or execute(sql, a, b)
+    if len(params) == 1 and isinstance(params[0], (list, tuple)):
+        params = params[0]
+    return {f'p{n}': _param(value) for n, value in enumerate(params, 1)}
+
+
+def _value(value):
+    # Dates are ISO text in SQLite; pyodbc returns date / datetime objects
+    if isinstance(value, str) and 10 <= len(value) <= 26 and value[4:5] == '-' and _DATETIME_TEXT.fullmatch(value):
+        if len(value) == 10:
+            return date.fromisoformat(value)
+        return datetime.fromisoformat(value)
+    return value
+
+
+class Row:
+    """ Result row like pyodbc.Row: row[0], row.ColumnName, unpacking, len(). """
+    __slots__ = ('_values', '_columns', 'cursor_description')
+
+    def __init__(self, values, columns, description):
+        object.__setattr__(self, '_values', values)
+        object.__setattr__(self, '_columns', columns)
+        object.__setattr__(self, 'cursor_description', description)
+
+    def __getattr__(self, name):
+        try:
+            return self._values[self._columns[name]]
+        except KeyError:
+            index = self._columns.get(name.lower())
+            if index is None:
+                raise AttributeError(name) from None
+            return self._values[index]
+
+    def __setattr__(self, name, value):
+        index = self._columns.get(name, self._columns.get(name.lower()))
+        if index is None:
+            raise AttributeError(name)
+        self._values[index] = value
+
+    def __getitem__(self, index):
+        return self._values[index]
+
+    def __setitem__(self, index, value):
+        self._values[index] = value
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return repr(tuple(self._values))
+
+
+def _type_code(values, index):
+    # SQLite has no column types in a result; the first non-NULL value stands in for pyodbc's type code
+    for row in values:
+        if row[index] is not None:
+            return type(row[index])
+    return str
+
+
+class _ResultSet:
+    def __init__(self, sqlite_cursor, rows):
+        values = [[_value(v) for v in row] for row in rows]
+        self.description = tuple((d[0], _type_code(values, i), None, None, None, None, True)
+                                 for i, d in enumerate(sqlite_cursor.description))
+        columns = {}
+        for index, column in enumerate(self.description):
+            columns.setdefault(column[0], index)
+            columns.setdefault(column[0].lower(), index)
+        self.rows = [Row(row, columns, self.description) for row in values]
+        self.position = 0
+
+
+class Cursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.fast_executemany = False  # accepted for pyodbc compatibility
+        self.rowcount = -1
+        self._results = []
+        self._current = None
+
+    @property
+    def description(self):
+        return self._current.description if self._current else None
+
+    def _run(self, step, values):
+        kind = step[0]
+        db = self.connection._db
+        if kind == 'exec':
+            changes = db.total_changes
+            cursor = db.execute(step[1], values)
+            if cursor.description:
+                rows = cursor.fetchall()
+                self._results.append(_ResultSet(cursor, rows))
+                values['v__rowcount'] = len(rows)
+                if cursor.rowcount >= 0:  # INSERT / UPDATE ... RETURNING
+                    self.rowcount = cursor.rowcount
+            elif cursor.rowcount < 0 and step[1].lstrip().upper().startswith('WITH'):
+                # sqlite3 reports -1 for WITH ... INSERT / UPDATE / DELETE
+                self.rowcount = values['v__rowcount'] = db.total_changes - changes
+            else:
+                self.rowcount = values['v__rowcount'] = cursor.rowcount
+        elif kind == 'declare':
+            for name, select in step[1]:
+                values[f'v_{name}'] = db.execute(select, values).fetchone()[0] if select else None
+        elif kind == 'assign':
+            rows = db.execute(step[1], values).fetchall()
+            if rows:  # as in SQL Server, no row leaves the variables unchanged
+                for name, value in zip(step[2], rows[-1]):
+                    values[f'v_{name}'] = value
+            values['v__rowcount'] = len(rows)
+        elif kind == 'if':
+            if db.execute(step[1], values).fetchone()[0] and step[2] is not None:
+                self._run(step[2], values)
+
+    def execute(self, sql, *params):
+        self._results = []
+        self._current = None
+        self.rowcount = -1
+        values = _bind(params)
+        values['v__rowcount'] = 0
+        for step in translate(sql):
+            self._run(step, values)
+        if self._results:
+            self._current = self._results.pop(0)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        steps = translate(sql)
+        if len(steps) == 1 and steps[0][0] == 'exec':
+            cursor = self.connection._db.executemany(steps[0][1], [_bind((p,)) for p in seq_of_params])
+            self.rowcount = cursor.rowcount
+        else:
+            for params in seq_of_params:
+                self.execute(sql, params)
+        self._results, self._current = [], None
+
+    def fetchone(self):
+        if self._current is None or self._current.position >= len(self._current.rows):
+            return None
+        row = self._current.rows[self._current.position]
+        self._current.position += 1
+        return row
+
+    def fetchval(self):
+        row = self.fetchone()
+        return None if row is None else row[0]
+
+    def fetchmany(self, size=1):
+        rows = []
+        while len(rows) < size:
+            row = self.fetchone()
+            if row is None:
+                break
+            rows.append(row)
+        return rows
+
+    def fetchall(self):
+        if self._current is None:
+            return []
+        rows = self._current.rows[self._current.position:]
+        self._current.position = len(self._current.rows)
+        return rows
+
+    def nextset(self):
+        if not self._results:
+            self._current = None
+            return False
+        self._current = self._results.pop(0)
+        return True
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def close(self):
+        self._results, self._current = [], None
+
+
+class Connection:
+    def __init__(self, db):
+        self._db = db
+
+    @property
+    def autocommit(self):
+        return self._db.isolation_level is None
+
+    @autocommit.setter
+    def autocommit(self, value):
+        self._db.isolation_level = None if value else ''
+
+    def cursor(self):
+        return Cursor(self)
+
+    def execute(self, sql, *params):
+        return self.cursor().execute(sql, *params)
+
+    def commit(self):
+        self._db.commit()
+
+    def rollback(self):
+        self._db.rollback()
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Like pyodbc: commit on success; the connection stays open
+        if exc_type is None:
+            self.commit()
+
+
+def connect(path):
+    if path != ':memory:' and not os.path.exists(path):
+        raise FileNotFoundError(f"{path} does not exist; create it with: python create_sqlite_db.py")
+    db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    return Connection(db)
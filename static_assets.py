@@ -0,0 +1,207 @@
+"""
+Static asset pipeline.
+
+build_assets() (run by build_assets.py at deploy time) collects only the
+static files the templates reference with url_for('static', filename=...)
+plus whatever those stylesheets pull in with url(...), and copies them to
+static/dist/ under content-hashed names (bootstrap.min.3f2a9c1d07.css). CSS
+url(...) references are rewritten to the hashed names, and source map
+comments are dropped because the .map files are not shipped. Text assets
+also get precompressed .gz and, when the brotli package is installed, .br
+copies. static/dist/manifest.json maps each original name to its hashed
+path.
+
+init_static_assets(app) loads the manifest. url_for('static', ...) then
+returns the hashed path for every asset in it. Those files are served from
+the .br / .gz copy the browser accepts, with a one-year
+"Cache-Control: immutable", so repeat page loads don't even revalidate.
+Without a manifest (development) nothing changes.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+from flask import request, send_file
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional: without it only .gz copies are built and served
+    brotli = None
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Already-compressed formats (images, woff2) gain nothing from gzip / brotli
+COMPRESSIBLE_EXTENSIONS = {'.js', '.css', '.svg', '.json', '.txt', '.ttf', '.eot', '.otf', '.ico'}
+MIN_COMPRESS_BYTES = 1024
+
+STATIC_REFERENCE = re.compile(r"""url_for\(\s*['"]static['"]\s*,\s*filename\s*=\s*['"]([^'"]+)['"]\s*\)""")
+CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+SOURCE_MAP_COMMENT = re.compile(r"/[*/]# sourceMappingURL=[^\n]*?(\*/)?$", re.M)
+
+
+# --- Build ---
+
+def find_template_assets(template_dir):
+    """ Static filenames referenced literally from the templates. """
+    names = set()
+    for root, _, files in os.walk(template_dir):
+        for file in files:
+            if file.endswith('.html'):
+                with open(os.path.join(root, file), encoding='utf-8') as f:
+                    names.update(STATIC_REFERENCE.findall(f.read()))
+    return sorted(names)
+
+
+def _compress(path, data):
+    if os.path.splitext(path)[1].lower() not in COMPRESSIBLE_EXTENSIONS or len(data) < MIN_COMPRESS_BYTES:
+        return
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        with open(path + '.gz', 'wb') as f:
+            f.write(gz)
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data):
+            with open(path + '.br', 'wb') as f:
+                f.write(br)
+
+
+class _Builder:
+    def __init__(self, static_dir, dist_dir):
+        self.static_dir = static_dir
+        self.dist_dir = dist_dir
+        self.manifest = {}
+        self.missing = []
+
+    def add(self, name):
+        """ Copies static/<name> into dist under its hashed name; returns that name (relative to static/) or None. """
+        name = posixpath.normpath(name).lstrip('/')
+        if name in self.manifest:
+            return self.manifest[name]
+        source = os.path.join(self.static_dir, *name.split('/'))
+        if not os.path.isfile(source):
+            self.missing.append(name)
+            return None
+
+        with open(source, 'rb') as f:
+            data = f.read()
+        if name.endswith('.css'):
+            data = self._rewrite_css(name, data.decode('utf-8')).encode('utf-8')
+        elif name.endswith('.js'):
+            data = SOURCE_MAP_COMMENT.sub('', data.decode('utf-8')).encode('utf-8')
+
+        stem, ext = posixpath.splitext(name)
+        hashed = f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+        target = os.path.join(self.dist_dir, *hashed.split('/'))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(data)
+        _compress(target, data)
+
+        self.manifest[name] = f"{DIST_DIR}/{hashed}"
+        return self.manifest[name]
+
+    def _rewrite_css(self, name, css):
+        base = posixpath.dirname(name)
+
+        def replace(match):
+            url = match.group(2).strip()
+            if url.startswith(('data:', 'http:', 'https:', '//', '#', '/')):
+                return match.group(0)
+            path, suffix = re.match(r"([^?#]*)(.*)", url).groups()
+            hashed = self.add(posixpath.join(base, path))
+            if hashed is None:
+                return match.group(0)
+            # dist/ mirrors static/'s layout, so the stylesheet ends up in dist/<its folder>
+            relative = posixpath.relpath(hashed, posixpath.dirname(f"{DIST_DIR}/{name}"))
+            return f"url({match.group(1)}{relative}{suffix}{match.group(1)})"
+
+        return SOURCE_MAP_COMMENT.sub('', CSS_URL.sub(replace, css))
+
+
+def build_assets(static_dir, template_dir):
+    """ Rebuilds static/dist from the templates' references. Returns (manifest, missing names). """
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    staging = dist_dir + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    builder = _Builder(static_dir, staging)
+    for name in find_template_assets(template_dir):
+        builder.add(name)
+    with open(os.path.join(staging, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(builder.manifest, f, indent=1, sort_keys=True)
+
+    previous = dist_dir + '.old'
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.isdir(dist_dir):
+        os.rename(dist_dir, previous)
+    os.rename(staging, dist_dir)
+    shutil.rmtree(previous, ignore_errors=True)
+    return builder.manifest, builder.missing
+
+
+# --- Serving ---
+
+def load_manifest(static_dir):
+    path = os.path.join(static_dir, DIST_DIR, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _send_dist_file(static_dir, filename):
+    path = safe_join(static_dir, filename)
+    if path is None or not os.path.isfile(path):
+        return None
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    response = None
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[encoding] and os.path.isfile(path + suffix):
+            response = send_file(path + suffix, mimetype=mimetype, conditional=True)
+            response.headers['Content-Encoding'] = encoding
+            break
+    if response is None:
+        response = send_file(path, mimetype=mimetype, conditional=True)
+
+    response.vary.add('Accept-Encoding')
+    response.cache_control.no_cache = None  # send_file's default when no max_age is given
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
+
+def init_static_assets(app):
+    """ Points url_for('static') at the built assets and serves them precompressed. Returns the manifest. """
+    manifest = load_manifest(app.static_folder)
+    if not manifest:
+        return manifest
+
+    @app.url_defaults
+    def fingerprinted_static(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    default_static = app.view_functions['static']
+
+    def static(filename):
+        if filename.startswith(DIST_DIR + '/'):
+            response = _send_dist_file(app.static_folder, filename)
+            if response is not None:
+                return response
+        return default_static(filename=filename)
+
+    app.view_functions['static'] = static
+    return manifest
@@ -0,0 +1,42 @@
+import argparse
+import pyodbc
+from config import CONNECTION_STRING
+from userinfo_sync import sync_userinfo, BATCH_SIZE
+
+def run_sync(batch_size=BATCH_SIZE, dry_run=False, deactivate_removed=False, full=False, show=20):
+    conn = pyodbc.connect(CONNECTION_STRING)
+
+    try:
+        report = sync_userinfo(conn, batch_size=batch_size, dry_run=dry_run,
+                               deactivate_removed=deactivate_removed, full=full)
+
+        print(f"Inserted:  {report['inserted']}")
+        print(f"Updated:   {report['updated']}")
+        print(f"Unchanged: {report['unchanged']}")
+        print(f"Removed from source: {report['removed']}{' (archived)' if deactivate_removed and not dry_run else ''}")
+        print(f"USERID collisions (not written): {report['collisions']}")
+        print(f"Elapsed:   {report['seconds']:.2f}s in {report['batches']} batch(es){' (dry run, nothing written)' if dry_run else ''}")
+
+        for uid in report['removed_ids'][:show]:
+            print(f"  USERID {uid} is no longer in the attendance database")
+        if len(report['removed_ids']) > show:
+            print(f"  ... {len(report['removed_ids']) - show} more")
+        for uid in report['collision_ids'][:show]:
+            print(f"  USERID {uid} belongs to a different employee added in the app; resolve it by hand")
+        if len(report['collision_ids']) > show:
+            print(f"  ... {len(report['collision_ids']) - show} more")
+    except Exception as e:
+        conn.rollback()
+        print(f"Error syncing USERINFO (the next run resumes from the last checkpoint): {e}")
+
+    conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy new / changed employees from Zktime.USERINFO into Zktime_Copy.USERINFO.")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--dry-run', action='store_true', help="Report the delta without writing it")
+    parser.add_argument('--deactivate-removed', action='store_true', help="Archive (IsActive = 0) employees missing from the source")
+    parser.add_argument('--full', action='store_true', help="Forget stored hashes and compare every row again")
+    args = parser.parse_args()
+
+    run_sync(args.batch_size, args.dry_run, args.deactivate_removed, args.full)
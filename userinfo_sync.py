@@ -0,0 +1,251 @@
+"""
+Incremental USERINFO sync from the attendance database (Zktime) into Zktime_Copy.
+
+Replaces the biweekly "disable constraints, DELETE FROM USERINFO, re-insert
+everything" procedure. Each run walks the source in USERID order, BATCH_SIZE
+rows at a time:
+
+- the source computes a SHA-256 per row over SYNCED_COLUMNS (HASHBYTES, so
+  only USERID + 32 bytes per employee cross the wire),
+- the hashes are compared with the ones stored in UserInfoSyncState at the
+  last sync; only new or changed rows are copied, with one set-based
+  UPDATE / IDENTITY_INSERT batch joined to the source,
+- copy rows that came from an earlier sync (they have a UserInfoSyncState
+  hash) and are missing from the source are reported and, if asked, archived
+  (IsActive = 0); they are never deleted, because evaluations, training and
+  UserPlaces rows reference them. Employees added in the app have no hash
+  and are never reported as removed,
+- a source USERID that is taken in the copy by a different employee (an
+  app-added row without a hash and with another BADGENUMBER) is reported as
+  a collision and not written.
+
+App-owned columns (employee_class, IsActive, pic) are never written by the
+sync except IsActive for removed rows, and archived rows keep their BADGENUMBER
+(the '_A' suffix userinfo_archive gives them). After every batch the
+transaction is committed together with the SyncCheckpoints row, so an
+interrupted run resumes after the last committed USERID.
+"""
+import time
+
+from cycle_progress import rebuild_cycle_progress
+
+SYNC_NAME = 'USERINFO'
+
+SOURCE_TABLE = '[Zktime].[dbo].[USERINFO]'
+TARGET_TABLE = '[Zktime_Copy].[dbo].[USERINFO]'
+
+BATCH_SIZE = 2000
+
+# Columns owned by the attendance system (same list as the old reload, minus USERID, PHOTO and the app-owned columns)
+SYNCED_COLUMNS = [
+    'BADGENUMBER', 'SSN', 'NAME', 'GENDER', 'TITLE', 'PAGER', 'BIRTHDAY', 'HIREDDAY', 'STREET', 'OPHONE',
+    'VERIFICATIONMETHOD', 'DEFAULTDEPTID', 'ATT', 'INLATE', 'OUTEARLY', 'OVERTIME', 'SEP', 'HOLIDAY', 'MINZU',
+    'LUNCHDURATION', 'privilege', 'InheritDeptSch', 'InheritDeptSchClass', 'AutoSchPlan', 'MinAutoSchInterval',
+    'RegisterOT', 'InheritDeptRule', 'EMPRIVILEGE', 'CardNo', 'FaceGroup', 'AccGroup', 'UseAccGroupTZ',
+    'VerifyCode', 'Expires', 'ValidCount', 'ValidTimeBegin', 'ValidTimeEnd', 'TimeZone1', 'TimeZone2',
+    'TimeZone3', 'SECURITYFLAGS', 'PASSWORD', 'STATE', 'ZIP', 'CITY', 'MVerifyPass', 'NOTES', 'IDCardNo',
+    'Pin1', 'FPHONE', 'InheritDeptId', 'IDCardValidTime', 'OvertimeDailyEligible', 'MaxOvertimeDailyHours',
+    'OvertimeMonthlyEligible', 'MaxOvertimeMonthlyHours', 'WorkShiftHours', 'PositionID', 'Comsys_Employee_Code'
+]
+# Converted with style 121 in the hash so seconds are not lost to CONCAT's default date format
+DATE_COLUMNS = {'BIRTHDAY', 'HIREDDAY', 'ValidTimeBegin', 'ValidTimeEnd', 'IDCardValidTime'}
+
+# PHOTO (image) can't go through HASHBYTES; it is copied with new rows only
+INSERT_ONLY_COLUMNS = ['PHOTO']
+
+
+def row_hash_sql(alias='S'):
+    parts = []
+    for col in SYNCED_COLUMNS:
+        expr = f"CONVERT(nvarchar(30), {alias}.[{col}], 121)" if col in DATE_COLUMNS else f"{alias}.[{col}]"
+        parts.append(expr)
+    separated = ", N'|', ".join(parts)
+    return f"HASHBYTES('SHA2_256', CONCAT({separated}))"
+
+
+def _update_expr(col):
+    if col == 'BADGENUMBER':
+        # Archived rows keep their '_A' badge (userinfo_archive)
+        return "[BADGENUMBER] = CASE WHEN C.IsActive = 0 THEN C.[BADGENUMBER] ELSE S.[BADGENUMBER] END"
+    return f"[{col}] = S.[{col}]"
+
+
+SOURCE_HASHES_SQL = f"""
+    SELECT TOP (?) S.USERID, S.BADGENUMBER, {row_hash_sql()} AS RowHash
+    FROM {SOURCE_TABLE} S
+    WHERE S.USERID > ?
+    ORDER BY S.USERID
+"""
+
+STAGING_SQL = """
+    IF OBJECT_ID('tempdb..#SyncRows') IS NOT NULL DROP TABLE #SyncRows;
+    CREATE TABLE #SyncRows (USERID INT NOT NULL PRIMARY KEY, Action CHAR(1) NOT NULL, RowHash VARBINARY(32) NULL);
+"""
+
+APPLY_SQL = f"""
+    SET NOCOUNT ON;
+
+    UPDATE C
+    SET {', '.join(_update_expr(col) for col in SYNCED_COLUMNS)}
+    FROM {TARGET_TABLE} C
+    JOIN #SyncRows R ON R.USERID = C.USERID AND R.Action = 'U'
+    JOIN {SOURCE_TABLE} S ON S.USERID = C.USERID;
+
+    -- Added in the app since the batch was read: left alone, reported as a collision by the next run
+    DELETE R FROM #SyncRows R
+    JOIN {TARGET_TABLE} C ON C.USERID = R.USERID
+    WHERE R.Action = 'I';
+
+    SET IDENTITY_INSERT {TARGET_TABLE} ON;
+    INSERT INTO {TARGET_TABLE} (USERID, {', '.join(f'[{col}]' for col in SYNCED_COLUMNS + INSERT_ONLY_COLUMNS)})
+    SELECT S.USERID, {', '.join(f'S.[{col}]' for col in SYNCED_COLUMNS + INSERT_ONLY_COLUMNS)}
+    FROM {SOURCE_TABLE} S
+    JOIN #SyncRows R ON R.USERID = S.USERID AND R.Action = 'I';
+    SET IDENTITY_INSERT {TARGET_TABLE} OFF;
+
+    UPDATE C SET IsActive = 0
+    FROM {TARGET_TABLE} C
+    JOIN #SyncRows R ON R.USERID = C.USERID AND R.Action = 'D';
+
+    MERGE [Zktime_Copy].[dbo].[UserInfoSyncState] AS T
+    USING (SELECT USERID, RowHash FROM #SyncRows WHERE Action IN ('I', 'U')) AS R ON T.USERID = R.USERID
+    WHEN MATCHED THEN UPDATE SET RowHash = R.RowHash, SyncedAt = GETDATE()
+    WHEN NOT MATCHED THEN INSERT (USERID, RowHash, SyncedAt) VALUES (R.USERID, R.RowHash, GETDATE());
+
+    DELETE T FROM [Zktime_Copy].[dbo].[UserInfoSyncState] T
+    JOIN #SyncRows R ON R.USERID = T.USERID AND R.Action = 'D';
+
+    TRUNCATE TABLE #SyncRows;
+"""
+
+
+def read_checkpoint(cursor):
+    """ USERID to resume after (0 when the last run completed or there was none). """
+    cursor.execute("SELECT LastKey, LastStatus FROM [Zktime_Copy].[dbo].[SyncCheckpoints] WHERE SyncName = ?", (SYNC_NAME,))
+    row = cursor.fetchone()
+    if row and row.LastStatus == 'running':
+        return row.LastKey or 0
+    return 0
+
+
+def write_checkpoint(cursor, last_key, status, counts=None):
+    counts = counts or {}
+    cursor.execute("""
+        MERGE [Zktime_Copy].[dbo].[SyncCheckpoints] AS T
+        USING (SELECT ? AS SyncName) AS S ON T.SyncName = S.SyncName
+        WHEN MATCHED THEN UPDATE SET LastKey = ?, LastStatus = ?, UpdatedAt = GETDATE(),
+            LastCompletedAt = CASE WHEN ? = 'complete' THEN GETDATE() ELSE T.LastCompletedAt END,
+            Inserted = ?, Updated = ?, Removed = ?
+        WHEN NOT MATCHED THEN INSERT (SyncName, LastKey, LastStatus, UpdatedAt, LastCompletedAt, Inserted, Updated, Removed)
+            VALUES (S.SyncName, ?, ?, GETDATE(), CASE WHEN ? = 'complete' THEN GETDATE() END, ?, ?, ?);
+    """, (SYNC_NAME, last_key, status, status, counts.get('inserted', 0), counts.get('updated', 0), counts.get('removed', 0),
+          last_key, status, status, counts.get('inserted', 0), counts.get('updated', 0), counts.get('removed', 0)))
+
+
+def same_employee(copy_badge, source_badge):
+    """ The copy's badge is the source's, possibly with the archive suffix (cut to 24 characters like userinfo_archive). """
+    copy_badge, source_badge = (copy_badge or '').strip(), (source_badge or '').strip()
+    return copy_badge == source_badge or copy_badge == f"{source_badge}_A"[:24]
+
+
+def diff_batch(source_rows, stored_hashes, target_badges, full=False):
+    """
+    Classifies one key range. source_rows: {USERID: (hash, BADGENUMBER)},
+    stored_hashes: {USERID: hash} from UserInfoSyncState, target_badges:
+    {USERID: BADGENUMBER} of the copy. full=True updates every synced row.
+    Returns (inserts, updates, removed, collisions): inserts / updates are
+    [(USERID, hash)], removed and collisions are [USERID].
+
+    A copy row without a stored hash was either loaded by the old full reload
+    (same employee: adopted as an update) or added in the app (another badge:
+    a collision). Only rows with a stored hash can be removed.
+    """
+    inserts, updates, collisions = [], [], []
+    for uid, (row_hash, badge) in source_rows.items():
+        if uid not in target_badges:
+            inserts.append((uid, row_hash))
+        elif uid not in stored_hashes and not same_employee(target_badges[uid], badge):
+            collisions.append(uid)
+        elif full or stored_hashes.get(uid) != row_hash:
+            updates.append((uid, row_hash))
+    removed = sorted(uid for uid in target_badges if uid not in source_rows and uid in stored_hashes)
+    return inserts, updates, removed, sorted(collisions)
+
+
+def sync_userinfo(conn, batch_size=BATCH_SIZE, dry_run=False, deactivate_removed=False, full=False, log=print):
+    """
+    Runs (or resumes) a sync. full=True ignores the stored hashes and the
+    checkpoint, so every row is copied again. Returns the counts and timing.
+    """
+    cursor = conn.cursor()
+    started = time.perf_counter()
+    counts = {'inserted': 0, 'updated': 0, 'removed': 0, 'collisions': 0, 'unchanged': 0, 'batches': 0}
+    removed_ids, collision_ids = [], []
+
+    # The stored hashes are kept: they also mark which rows came from the sync
+    if full and not dry_run:
+        write_checkpoint(cursor, 0, 'running')
+        conn.commit()
+
+    after = read_checkpoint(cursor)
+    if after:
+        log(f"Resuming after USERID {after}")
+    if not dry_run:
+        write_checkpoint(cursor, after, 'running')
+        conn.commit()
+        cursor.execute(STAGING_SQL)
+
+    while True:
+        cursor.execute(SOURCE_HASHES_SQL, (batch_size, after))
+        source_rows = {row.USERID: (bytes(row.RowHash), row.BADGENUMBER) for row in cursor.fetchall()}
+        last_batch = len(source_rows) < batch_size
+        upper = max(source_rows) if source_rows and not last_batch else None
+
+        # Same key range on the copy side; the last batch is open-ended so trailing removed rows are seen
+        range_sql, range_params = ("USERID > ? AND USERID <= ?", (after, upper)) if upper else ("USERID > ?", (after,))
+        cursor.execute(f"SELECT USERID, RowHash FROM [Zktime_Copy].[dbo].[UserInfoSyncState] WHERE {range_sql}", range_params)
+        stored_hashes = {row.USERID: bytes(row.RowHash) for row in cursor.fetchall()}
+        cursor.execute(f"SELECT USERID, BADGENUMBER, IsActive FROM {TARGET_TABLE} WHERE {range_sql}", range_params)
+        target_rows = cursor.fetchall()
+        target_badges = {row.USERID: row.BADGENUMBER for row in target_rows}
+        active_ids = {row.USERID for row in target_rows if row.IsActive != 0}
+
+        inserts, updates, removed, collisions = diff_batch(source_rows, stored_hashes, target_badges, full)
+        removed = [uid for uid in removed if uid in active_ids]
+
+        counts['inserted'] += len(inserts)
+        counts['updated'] += len(updates)
+        counts['removed'] += len(removed)
+        counts['collisions'] += len(collisions)
+        counts['unchanged'] += len(source_rows) - len(inserts) - len(updates) - len(collisions)
+        counts['batches'] += 1
+        removed_ids.extend(removed)
+        collision_ids.extend(collisions)
+
+        if not dry_run:
+            staged = [(uid, 'I', h) for uid, h in inserts] + [(uid, 'U', h) for uid, h in updates]
+            if deactivate_removed:
+                staged += [(uid, 'D', None) for uid in removed]
+            if staged:
+                cursor.fast_executemany = True
+                cursor.executemany("INSERT INTO #SyncRows (USERID, Action, RowHash) VALUES (?, ?, ?)", staged)
+                cursor.fast_executemany = False
+                cursor.execute(APPLY_SQL)
+            after = upper or after
+            write_checkpoint(cursor, 0 if last_batch else after, 'complete' if last_batch else 'running', counts)
+            conn.commit()
+        else:
+            after = upper or after
+
+        log(f"Batch {counts['batches']}: +{len(inserts)} ~{len(updates)} -{len(removed)} !{len(collisions)} (up to USERID {upper or 'end'})")
+        if last_batch:
+            break
+
+    if not dry_run and (counts['inserted'] or counts['updated'] or (deactivate_removed and counts['removed'])):
+        rebuild_cycle_progress(cursor)
+        conn.commit()
+
+    counts['removed_ids'] = removed_ids
+    counts['collision_ids'] = collision_ids
+    counts['seconds'] = round(time.perf_counter() - started, 2)
+    return counts
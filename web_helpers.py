@@ -0,0 +1,174 @@
+"""
+Shared web helpers: database connection, activity logging, role checks, the
+login / role decorators and the Jinja date filters, used by every blueprint.
+"""
+from flask import redirect, url_for, flash, session
+from db_backend import connect
+from sql_instrumentation import instrument_connection
+from datetime import datetime
+from functools import wraps
+import os
+
+# ========== DATABASE CONNECTION ==========
+
+def get_db_connection():
+    # Inside a request the connection records its statements for Server-Timing / slow request logs
+    return instrument_connection(connect())
+
+def log_system_action(module, action_type, description, user_id=None, username=None):
+    """
+    Helper to log actions to AppLogs table.
+    """
+    try:
+        if not user_id and 'user_id' in session:
+            user_id = session['user_id']
+        if not username and 'username' in session:
+            username = session['username']
+            
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO AppLogs (UserID, Username, Module, ActionType, Description, Timestamp)
+            VALUES (?, ?, ?, ?, ?, GETDATE())
+        """, (user_id, username, module, action_type, description))
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"Logging Error: {e}")
+
+def is_admin():
+    return session.get('role_id') in [1, 2]  # Admin + Police Officer يشوفوا كل شيء
+
+def is_manager():
+    return session.get('role_id') == 3  # Manager RoleID = 3
+
+def admin_or_manager_required(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if 'user_id' not in session:
+            return redirect(url_for('auth.login'))
+        if not (is_admin() or is_manager()):
+            flash('Access denied. Admins or Managers only.', 'danger')
+            return redirect(url_for('dashboard.dashboard'))
+        return fn(*args, **kwargs)
+    return wrapper
+
+def login_required(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if 'user_id' not in session:
+            return redirect(url_for('auth.login'))
+        return fn(*args, **kwargs)
+    return wrapper
+
+def admin_required(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if 'user_id' not in session:
+            return redirect(url_for('auth.login'))
+        if not is_admin():
+            flash('Access denied. Admins only.', 'danger')
+            return redirect(url_for('dashboard.dashboard'))
+        return fn(*args, **kwargs)
+    return wrapper
+
+def training_required(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if 'user_id' not in session:
+            return redirect(url_for('auth.login'))
+        if session.get('role_id') not in [1,5, 6]:
+            flash('⚠️ غير مسموح لك بالدخول إلى نظام التدريب.', 'danger')
+            return redirect(url_for('dashboard.dashboard'))
+        return fn(*args, **kwargs)
+    return wrapper
+
+def resize_logo(input_path, output_path, max_size=(250, 250)):
+    from PIL import Image
+    try:
+        with Image.open(input_path) as img:
+            # Convert to RGBA if it's not (preserves transparency)
+            img = img.convert("RGBA")
+            
+            # Calculate new size maintaining aspect ratio
+            img.thumbnail(max_size, Image.Resampling.LANCZOS)
+            
+            # Save as optimized PNG
+            img.save(output_path, "PNG", optimize=True)
+            
+            original_size = os.path.getsize(input_path) / (1024 * 1024)
+            new_size = os.path.getsize(output_path) / 1024
+            
+            print(f"✅ Success!")
+            print(f"Original: {original_size:.2f} MB")
+            print(f"New:      {new_size:.2f} KB")
+            print(f"Saved to: {output_path}")
+            
+    except Exception as e:
+        print(f"Error: {e}")
+
+def get_employee_class(user_id):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT employee_class FROM [Zktime_Copy].[dbo].[USERINFO] WHERE USERID = ?", (user_id,))
+    result = cursor.fetchone()
+    conn.close()
+    return result.employee_class if result and result.employee_class else 'لم تضاف'
+
+def get_all_classes():
+    """Helper to fetch all employee classes from DB"""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT ClassID, ClassName, DisplayName FROM [Zktime_Copy].[dbo].[EmployeeClasses] ORDER BY ClassName")
+        classes = cursor.fetchall()
+        conn.close()
+        return classes
+    except Exception as e:
+        print(f"Error fetching classes: {e}")
+        return []
+
+# ========== FILTERS ==========
+
+def date_format_arabic(value, format='%Y-%m-%d'):
+    if value == 'now':
+        date_obj = datetime.now()
+    elif isinstance(value, str):
+        try:
+            date_obj = datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            return value
+    else:
+        date_obj = value
+
+    months = {
+        1: "يناير", 2: "فبراير", 3: "مارس", 4: "أبريل",
+        5: "مايو", 6: "يونيو", 7: "يوليو", 8: "أغسطس",
+        9: "سبتمبر", 10: "أكتوبر", 11: "نوفمبر", 12: "ديسمبر"
+    }
+
+    day = date_obj.day
+    month = months[date_obj.month]
+    year = date_obj.year
+
+    return f"{day} {month} {year}"
+
+def format_date(value, format='%Y-%m-%d'):
+    """Format a date whether it's a string or datetime object."""
+    if value is None:
+        return ''
+    
+    # If it's already a datetime/date object, format it
+    if hasattr(value, 'strftime'):
+        return value.strftime(format)
+    
+    # If it's a string, try to parse it to ensure it looks right
+    if isinstance(value, str):
+        # If it's already a string, usually just return it, or strip time if needed
+        try:
+            # Quick cleanup if string looks like '2025-10-01 00:00:00'
+            return value.split(' ')[0] 
+        except:
+            return value
+            
+    return str(value)
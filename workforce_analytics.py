@@ -0,0 +1,343 @@
+"""
+In-process workforce analytics (turnover and headcount) for the dashboard.
+
+Hire / end dates of every employee (USERINFO + EmployeeArchive) are loaded
+into a few small DataFrames once per WORKFORCE_TTL_SECONDS and every figure
+(hires, leavers, net change, department / position turnover, rolling
+turnover rate) is computed from memory with vectorized pandas operations,
+for any scope: the whole company or a manager's department subtree.
+Routes that add, archive, restore or import employees call
+invalidate_workforce_analytics() so the next view reloads.
+
+Counting rules:
+- a hire is a USERINFO row with a hire date (DEFAULTDEPTID <> -1), or an
+  archive row whose employee no longer exists in USERINFO (each employee is
+  counted once, archived employees keep their USERINFO row),
+- a leaver is an archive row with an EndDay, in its ArchivedDeptID,
+- dates before 1901 are placeholders and are ignored.
+
+Headcount as of a date comes from one tenure per employee (hire date, end
+date, department); the tenures become a sorted array of +1 / -1 events whose
+cumulative sum is the headcount after each event, so any date is answered
+with a binary search (np.searchsorted) instead of a query.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from app_metrics import record_cache_lookup
+from cache_invalidation import mark_invalidated, invalidated_since
+
+WORKFORCE_TTL_SECONDS = 300
+
+# Months in the rolling turnover rate window / months shown on the chart
+ROLLING_MONTHS = 12
+RATE_MONTHS_SHOWN = 24
+
+# Largest headcount series served in one request (about ten years of days)
+MAX_HEADCOUNT_POINTS = 3700
+
+MIN_VALID_DATE = pd.Timestamp('1901-01-01')
+
+_workforce_cache = {'loaded_at': 0, 'data': None}
+
+WORKFORCE_BATCH_SQL = """
+    SET NOCOUNT ON;
+
+    SELECT USERID AS EmployeeID, HIREDDAY AS HireDate, DEFAULTDEPTID AS DeptID, PositionID, IsActive
+    FROM [Zktime_Copy].[dbo].[USERINFO]
+    WHERE DEFAULTDEPTID <> -1;
+
+    SELECT UserID AS EmployeeID, HiredDay AS HireDate, EndDay AS EndDate, ArchivedDeptID AS DeptID, ArchivedPosID AS PositionID
+    FROM [Zktime_Copy].[dbo].[EmployeeArchive];
+
+    SELECT DEPTID, DEPTNAME, SUPDEPTID FROM [Zktime_Copy].[dbo].[DEPARTMENTS];
+
+    SELECT PositionID, PositionName FROM [Zktime_Copy].[dbo].[POSITIONS];
+"""
+
+
+def invalidate_workforce_analytics():
+    """ Drops the cached frames; called after employee writes. """
+    _workforce_cache['data'] = None
+    _workforce_cache['loaded_at'] = 0
+    mark_invalidated('workforce')
+
+
+def get_workforce(get_connection):
+    """ Returns the cached frames, loading them (one connection, one batch) when stale. """
+    data = _workforce_cache['data']
+    loaded_at = _workforce_cache['loaded_at']
+    hit = data is not None and time.time() - loaded_at < WORKFORCE_TTL_SECONDS and not invalidated_since('workforce', loaded_at)
+    record_cache_lookup('workforce', hit)
+    if hit:
+        return data
+
+    started = time.time()
+    conn = get_connection()
+    try:
+        data = load_workforce(conn.cursor())
+    finally:
+        conn.close()
+
+    _workforce_cache['data'] = data
+    _workforce_cache['loaded_at'] = started
+    return data
+
+
+def _frame(rows, columns):
+    return pd.DataFrame.from_records([tuple(r) for r in rows], columns=columns)
+
+
+def _dates(series):
+    dates = pd.to_datetime(series, errors='coerce')
+    return dates.where(dates >= MIN_VALID_DATE)
+
+
+def load_workforce(cursor):
+    cursor.execute(WORKFORCE_BATCH_SQL)
+    employees = _frame(cursor.fetchall(), ['EmployeeID', 'HireDate', 'DeptID', 'PositionID', 'IsActive'])
+    archive = _frame(cursor.fetchall() if cursor.nextset() else [], ['EmployeeID', 'HireDate', 'EndDate', 'DeptID', 'PositionID'])
+    departments = cursor.fetchall() if cursor.nextset() else []
+    positions = cursor.fetchall() if cursor.nextset() else []
+
+    employees['HireDate'] = _dates(employees['HireDate'])
+    archive['HireDate'] = _dates(archive['HireDate'])
+    archive['EndDate'] = _dates(archive['EndDate'])
+
+    children = {}
+    for d in departments:
+        if d.SUPDEPTID is not None and d.SUPDEPTID != d.DEPTID:
+            children.setdefault(d.SUPDEPTID, []).append(d.DEPTID)
+
+    return {
+        'employees': employees,
+        'archive': archive,
+        'dept_names': {d.DEPTID: d.DEPTNAME for d in departments},
+        'dept_children': children,
+        'position_names': {p.PositionID: p.PositionName for p in positions},
+        'summaries': {},
+        'headcount': {}
+    }
+
+
+def department_subtree(data, dept_id):
+    """ dept_id and all departments below it. """
+    subtree, pending = {dept_id}, [dept_id]
+    while pending:
+        for child in data['dept_children'].get(pending.pop(), []):
+            if child not in subtree:
+                subtree.add(child)
+                pending.append(child)
+    return subtree
+
+
+def hire_events(data, dept_ids=None):
+    """ One row per hired employee: EmployeeID, Date, DeptID, PositionID. """
+    employees, archive = data['employees'], data['archive']
+    current = employees[employees['HireDate'].notna()]
+    legacy = archive[archive['HireDate'].notna() & ~archive['EmployeeID'].isin(employees['EmployeeID'])]
+    legacy = legacy.drop_duplicates('EmployeeID')
+    hires = pd.concat([current[['EmployeeID', 'HireDate', 'DeptID', 'PositionID']],
+                       legacy[['EmployeeID', 'HireDate', 'DeptID', 'PositionID']]], ignore_index=True)
+    hires = hires.rename(columns={'HireDate': 'Date'})
+    if dept_ids is not None:
+        hires = hires[hires['DeptID'].isin(dept_ids)]
+    return hires
+
+
+def leave_events(data, dept_ids=None):
+    """ One row per archive entry with an end date: EmployeeID, Date, DeptID, PositionID. """
+    archive = data['archive']
+    leaves = archive[archive['EndDate'].notna()][['EmployeeID', 'EndDate', 'DeptID', 'PositionID']]
+    leaves = leaves.rename(columns={'EndDate': 'Date'})
+    if dept_ids is not None:
+        leaves = leaves[leaves['DeptID'].isin(dept_ids)]
+    return leaves
+
+
+def _ranked(counts, names):
+    """ (labels, data) of a value_counts() Series, largest first, ids mapped to names. """
+    counts = counts.sort_values(ascending=False, kind='stable')
+    labels = [names.get(key) or 'غير محدد' for key in counts.index]
+    return labels, [int(v) for v in counts.values]
+
+
+def rolling_turnover_rate(hires, leaves, window=ROLLING_MONTHS):
+    """
+    Monthly series of leavers over the last `window` months as a percentage of
+    the average month-end headcount over the same months. Headcount is the
+    running total of hires minus leavers.
+    """
+    if hires.empty and leaves.empty:
+        return pd.Series(dtype='float64')
+    monthly_hires = hires['Date'].dt.to_period('M').value_counts()
+    monthly_leaves = leaves['Date'].dt.to_period('M').value_counts()
+    observed = monthly_hires.index.union(monthly_leaves.index)
+    months = pd.period_range(observed.min(), max(observed.max(), pd.Timestamp.today().to_period('M')), freq='M')
+    monthly_hires = monthly_hires.reindex(months, fill_value=0)
+    monthly_leaves = monthly_leaves.reindex(months, fill_value=0)
+
+    headcount = (monthly_hires - monthly_leaves).cumsum()
+    average = headcount.rolling(window, min_periods=1).mean()
+    rate = monthly_leaves.rolling(window, min_periods=1).sum() * 100.0 / average.where(average > 0)
+    return rate.fillna(0).round(1)
+
+
+def turnover_summary(data, dept_ids=None):
+    """ Turnover chart data for a scope (None = whole company), memoized until the frames reload. """
+    scope = tuple(sorted(dept_ids)) if dept_ids is not None else None
+    summary = data['summaries'].get(scope)
+    if summary is not None:
+        return summary
+
+    hires = hire_events(data, dept_ids)
+    leaves = leave_events(data, dept_ids)
+
+    hires_by_year = hires['Date'].dt.year.value_counts()
+    left_by_year = leaves['Date'].dt.year.value_counts()
+    years = hires_by_year.index.union(left_by_year.index).sort_values()
+    hires_by_year = hires_by_year.reindex(years, fill_value=0)
+    left_by_year = left_by_year.reindex(years, fill_value=0)
+
+    # Department / position turnover counts every archive entry in scope, dated or not
+    archived = data['archive']
+    if dept_ids is not None:
+        archived = archived[archived['DeptID'].isin(dept_ids)]
+    dept_labels, dept_data = _ranked(archived['DeptID'].value_counts(dropna=False), data['dept_names'])
+    pos_labels, pos_data = _ranked(archived['PositionID'].value_counts(dropna=False), data['position_names'])
+
+    rate = rolling_turnover_rate(hires, leaves).tail(RATE_MONTHS_SHOWN)
+
+    summary = {
+        'turnover_years': [int(y) for y in years],
+        'hires_data': [int(v) for v in hires_by_year.values],
+        'left_data': [int(v) for v in left_by_year.values],
+        'net_data': [int(v) for v in (hires_by_year - left_by_year).values],
+        'dept_turnover_labels': dept_labels,
+        'dept_turnover_data': dept_data,
+        'pos_turnover_labels': pos_labels,
+        'pos_turnover_data': pos_data,
+        'turnover_rate_labels': [str(m) for m in rate.index],
+        'turnover_rate_data': [float(v) for v in rate.values]
+    }
+    data['summaries'][scope] = summary
+    return summary
+
+
+def get_turnover_chart_data(get_connection, dept_id=None):
+    """ Turnover chart data for the whole company, or for dept_id and its sub-departments. """
+    data = get_workforce(get_connection)
+    dept_ids = department_subtree(data, dept_id) if dept_id is not None else None
+    return turnover_summary(data, dept_ids)
+
+
+# --- Headcount ---
+
+def tenures(data):
+    """
+    One row per employee: EmployeeID, Start, End (NaT while employed), DeptID.
+    Archived USERINFO employees end on their latest archive EndDay; archived
+    ones without an end date can't be placed in time and are left out.
+    """
+    employees, archive = data['employees'], data['archive']
+    last_end = archive.groupby('EmployeeID')['EndDate'].max()
+
+    current = employees[employees['HireDate'].notna()]
+    archived = current['IsActive'].eq(0)
+    # reindex rather than map: map() can't take an empty datetime Series (no archive rows yet)
+    ends = pd.Series(last_end.reindex(current['EmployeeID']).to_numpy(), index=current.index).where(archived)
+    current = current.assign(Start=current['HireDate'], End=ends)
+    current = current[~archived | current['End'].notna()]
+
+    legacy = archive[archive['HireDate'].notna() & archive['EndDate'].notna()
+                     & ~archive['EmployeeID'].isin(employees['EmployeeID'])]
+    legacy = legacy.sort_values('EndDate').drop_duplicates('EmployeeID', keep='last')
+    legacy = legacy.assign(Start=legacy['HireDate'], End=legacy['EndDate'])
+
+    columns = ['EmployeeID', 'Start', 'End', 'DeptID']
+    return pd.concat([current[columns], legacy[columns]], ignore_index=True)
+
+
+def build_headcount_index(tenure_frame):
+    """ Sorted event dates and the headcount after each one. An employee still counts on their end day. """
+    starts = tenure_frame['Start'].to_numpy(dtype='datetime64[D]')
+    ends = tenure_frame['End'].dropna().to_numpy(dtype='datetime64[D]') + np.timedelta64(1, 'D')
+    dates = np.concatenate([starts, ends])
+    deltas = np.concatenate([np.ones(len(starts), dtype=np.int32), -np.ones(len(ends), dtype=np.int32)])
+    order = np.argsort(dates, kind='stable')
+    return {'dates': dates[order], 'running': np.cumsum(deltas[order])}
+
+
+def headcount_at(index, when):
+    """ Headcount on each date in `when` (scalar or array of dates). """
+    when = np.asarray(when, dtype='datetime64[D]')
+    position = np.searchsorted(index['dates'], when, side='right') - 1
+    running = index['running']
+    if not len(running):
+        return np.zeros(when.shape, dtype=np.int64)
+    return np.where(position >= 0, running[np.maximum(position, 0)], 0)
+
+
+def headcount_indexes(data, dept_ids=None):
+    """ (scope index, {DeptID: index}) for a scope, memoized until the frames reload. """
+    scope = tuple(sorted(dept_ids)) if dept_ids is not None else None
+    cached = data['headcount'].get(scope)
+    if cached is not None:
+        return cached
+
+    frame = tenures(data)
+    if dept_ids is not None:
+        frame = frame[frame['DeptID'].isin(dept_ids)]
+    per_department = {dept: build_headcount_index(group) for dept, group in frame.groupby('DeptID')}
+    cached = data['headcount'][scope] = (build_headcount_index(frame), per_department)
+    return cached
+
+
+def headcount_dates(start, end, freq='month'):
+    """ Every day, or every month end (the last point is `end` itself), from start to end. """
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    if end < start:
+        raise ValueError('end must be on or after start')
+    if freq == 'day':
+        dates = pd.date_range(start, end, freq='D')
+    elif freq == 'month':
+        month_ends = pd.period_range(start, end, freq='M').to_timestamp(how='end').normalize()
+        dates = month_ends.where(month_ends <= end, end)
+    else:
+        raise ValueError("freq must be 'day' or 'month'")
+    if len(dates) > MAX_HEADCOUNT_POINTS:
+        raise ValueError(f'range too long: {len(dates)} points (max {MAX_HEADCOUNT_POINTS})')
+    return dates
+
+
+def headcount_series(data, start, end, freq='month', dept_ids=None, by_department=False):
+    """
+    Headcount chart data: labels plus the scope total, and with by_department
+    one series per department (largest first).
+    """
+    dates = headcount_dates(start, end, freq)
+    total_index, per_department = headcount_indexes(data, dept_ids)
+    grid = dates.to_numpy(dtype='datetime64[D]')
+
+    result = {
+        'labels': [d.strftime('%Y-%m-%d' if freq == 'day' else '%Y-%m') for d in dates],
+        'total': [int(v) for v in headcount_at(total_index, grid)]
+    }
+    if by_department:
+        series = []
+        for dept, index in per_department.items():
+            counts = headcount_at(index, grid)
+            if counts.any():
+                series.append({'dept_id': int(dept), 'label': data['dept_names'].get(dept) or 'غير محدد',
+                               'data': [int(v) for v in counts]})
+        result['departments'] = sorted(series, key=lambda s: s['data'][-1], reverse=True)
+    return result
+
+
+def get_headcount_chart_data(get_connection, start, end, freq='month', dept_id=None, by_department=False):
+    """ Headcount series for the whole company, or for dept_id and its sub-departments. """
+    data = get_workforce(get_connection)
+    dept_ids = department_subtree(data, dept_id) if dept_id is not None else None
+    return headcount_series(data, start, end, freq, dept_ids, by_department)
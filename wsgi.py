@@ -0,0 +1,9 @@
+"""
+WSGI entry point for production servers.
+
+    waitress:  python serve.py                      (Windows / any OS)
+    gunicorn:  gunicorn -c gunicorn.conf.py wsgi:application   (Linux)
+"""
+from app import create_app
+
+application = create_app()